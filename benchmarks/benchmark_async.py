@@ -0,0 +1,106 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to compare the CPU usage of the threaded and the asyncio readers with many receivers
+"""
+import asyncio
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from pyublox.ublox_serial_connection import UBloxSerialConnection
+from pyublox.async_ublox import AsyncPythonUblox
+from benchmarks.ubx_samples import mixed_stream
+
+DEVICES = 24
+DURATION = 5.0
+WRITE_PERIOD = 0.01 # every pseudo receiver writes 10 ms worth of output at a time
+
+
+def open_ptys(count):
+    """Pseudo terminals standing in for receivers: (master fd, slave path) pairs."""
+    ptys = []
+    for _ in range(count):
+        master, slave = os.openpty()
+        ptys.append((master, os.ttyname(slave), slave))
+    return ptys
+
+
+def writer(masters, duration):
+    # Runs in its own process so that its CPU time is not counted for the readers
+    stream, _ = mixed_stream(int(duration * 10) + 10, imu_per_epoch=10)
+    chunk = len(stream) // int(duration / WRITE_PERIOD + 10)
+    pos = 0
+    deadline = time.monotonic() + duration
+    next_write = time.monotonic()
+    while time.monotonic() < deadline:
+        for master in masters:
+            os.write(master, stream[pos:pos + chunk])
+        pos += chunk
+        next_write += WRITE_PERIOD
+        time.sleep(max(0.0, next_write - time.monotonic()))
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_writer(ptys):
+    process = multiprocessing.Process(target=writer, args=([master for master, _, _ in ptys], DURATION))
+    process.start()
+    return process
+
+
+def threaded(ptys):
+    counts = [0]
+    def on_frame(frame):
+        counts[0] += 1
+    connections = [UBloxSerialConnection(path, 460800) for _, path, _ in ptys]
+    for connection in connections:
+        connection.set_callback(on_frame)
+        connection.connect()
+    start = cpu_seconds()
+    run_writer(ptys).join()
+    time.sleep(0.2)
+    used = cpu_seconds() - start
+    for connection in connections:
+        connection.disconnect()
+    return used, counts[0]
+
+
+def asynchronous(ptys):
+    counts = [0]
+    async def consume(ublox):
+        async for frame in ublox.frames():
+            counts[0] += 1
+    async def main():
+        receivers = [AsyncPythonUblox() for _ in ptys]
+        for ublox, (_, path, _) in zip(receivers, ptys):
+            await ublox.connect(460800, path)
+        consumers = [asyncio.ensure_future(consume(ublox)) for ublox in receivers]
+        start = cpu_seconds()
+        process = run_writer(ptys)
+        while process.is_alive():
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.2)
+        used = cpu_seconds() - start
+        for ublox in receivers:
+            await ublox.close()
+        await asyncio.gather(*consumers)
+        return used
+    used = asyncio.run(main())
+    return used, counts[0]
+
+
+if __name__ == "__main__":
+    devices = int(sys.argv[1]) if len(sys.argv) > 1 else DEVICES
+    for name, run in (("threads", threaded), ("asyncio", asynchronous)):
+        ptys = open_ptys(devices)
+        used, frames = run(ptys)
+        for master, _, slave in ptys:
+            os.close(master)
+            os.close(slave)
+        print(f"{name:<8} {devices} devices  {frames:8d} frames  CPU {used:6.2f} s over {DURATION:.0f} s "
+              f"({100 * used / DURATION:5.1f} % of a core)")
@@ -0,0 +1,65 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to measure the RTCM fan-out of the local NTRIP caster to many rovers
+"""
+import selectors
+import socket
+import sys
+import threading
+import time
+from pyublox.ntrip_caster import NTRIPCaster
+from benchmarks.ubx_samples import rtcm_stream
+
+CLIENTS = 50
+
+
+def receive(sockets, expected, done):
+    # One thread drains every rover socket so that the caster is the bottleneck being measured
+    selector = selectors.DefaultSelector()
+    received = {sock: 0 for sock in sockets}
+    for sock in sockets:
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ)
+    remaining = len(sockets)
+    while remaining:
+        for key, _ in selector.select(timeout=5):
+            data = key.fileobj.recv(262144)
+            received[key.fileobj] += len(data)
+            if received[key.fileobj] >= expected or not data:
+                selector.unregister(key.fileobj)
+                remaining -= 1
+        else:
+            if not selector.get_map():
+                break
+    done.append(sum(received.values()))
+
+
+if __name__ == "__main__":
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else CLIENTS
+    stream, _ = rtcm_stream(3000)
+    caster = NTRIPCaster("127.0.0.1", 0, "BASE", max_client_buffer=len(stream) + 1)
+    caster.start()
+    sockets = []
+    for _ in range(clients):
+        sock = socket.create_connection(("127.0.0.1", caster.port))
+        sock.sendall(b"GET /BASE HTTP/1.0\r\nUser-Agent: NTRIP bench\r\n\r\n")
+        answer = b""
+        while b"\r\n\r\n" not in answer:
+            answer += sock.recv(64)
+        sockets.append(sock)
+    while len(caster.clients) < clients:
+        time.sleep(0.01)
+    done = []
+    reader = threading.Thread(target=receive, args=(sockets, len(stream), done))
+    reader.start()
+    start = time.perf_counter()
+    for i in range(0, len(stream), 1200): # one upstream TCP segment at a time
+        caster.write(stream[i:i + 1200])
+    reader.join()
+    elapsed = time.perf_counter() - start
+    print(f"{clients} rovers: {done[0] / 1e6:.1f} MB delivered in {elapsed:.3f} s "
+          f"({done[0] / elapsed / 1e6:.1f} MB/s, upstream {len(stream) / 1e6:.2f} MB read once)")
+    caster.stop()
+    for sock in sockets:
+        sock.close()
@@ -0,0 +1,61 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to compare the UBX/NMEA checksum routines
+"""
+import timeit
+from pyublox.ublox_framer import UbloxFramer
+from pyublox.ublox_utility import UbloxUtils
+from benchmarks.ubx_samples import mixed_stream, nmea_frame, GGA
+
+
+def legacy_ubx_checksum(recv_data):
+    # Copy of the original UbloxUtils.ubx_checksum
+    payload = recv_data[2:-2]
+    CK_A = 0
+    CK_B = 0
+    for buffer in payload:
+        CK_A = (CK_A + buffer) & 0xFF
+        CK_B = (CK_B + CK_A) & 0xFF
+    return bytes([CK_A, CK_B])
+
+
+def legacy_nmea_checksum(decoded_data):
+    # Copy of the original UbloxUtils.nmea_checksum
+    start_index = decoded_data.find('$') + 1
+    end_index = decoded_data.find('*') if '*' in decoded_data else len(decoded_data)
+    checksum = 0
+    for char in decoded_data[start_index:end_index]:
+        checksum ^= ord(char)
+    return format(checksum, '02X')
+
+
+def per_call_us(function, argument, number=20000):
+    return min(timeit.repeat(lambda: function(argument), number=number, repeat=3)) / number * 1e6
+
+
+if __name__ == "__main__":
+    for payload_size in (16, 92, 512, 2048, 8192):
+        frame = b"\xb5\x62\x01\x07" + payload_size.to_bytes(2, "little") + bytes(range(256)) * (payload_size // 256) + bytes(payload_size % 256) + b"\x00\x00"
+        print(f"UBX payload {payload_size:5d} B   legacy {per_call_us(legacy_ubx_checksum, frame, 2000):9.2f} us"
+              f"   ubx_checksum {per_call_us(UbloxUtils.ubx_checksum, frame, 2000):9.2f} us")
+    sentence = nmea_frame(GGA)
+    print(f"NMEA GGA          legacy {per_call_us(legacy_nmea_checksum, sentence.decode()):9.2f} us"
+          f"   nmea_checksum {per_call_us(UbloxUtils.nmea_checksum, sentence.decode()):8.2f} us"
+          f"   nmea_checksum_valid(bytes) {per_call_us(UbloxUtils.nmea_checksum_valid, sentence):6.2f} us")
+
+    stream, _ = mixed_stream(epochs=1000)
+    ubx, nmea = [], []
+    position = 0
+    def collect(frame):
+        global position
+        (ubx if frame[0] == 0xB5 else nmea).append((position, position + len(frame)))
+        position += len(frame)
+    UbloxFramer(callback=collect).feed(stream)
+    starts = [start for start, _ in ubx]
+    loop = min(timeit.repeat(lambda: [legacy_ubx_checksum(stream[a:b]) == stream[b - 2:b] for a, b in ubx], number=1, repeat=3))
+    batch = min(timeit.repeat(lambda: UbloxUtils.ubx_checksum_batch(stream, starts), number=1, repeat=3))
+    print(f"{len(ubx)} UBX frames       legacy loop {loop * 1e3:8.2f} ms   ubx_checksum_batch {batch * 1e3:8.2f} ms")
+    loop = min(timeit.repeat(lambda: [UbloxUtils.nmea_checksum_valid(stream[a:b]) for a, b in nmea], number=1, repeat=3))
+    batch = min(timeit.repeat(lambda: UbloxUtils.nmea_checksum_batch(stream, [a for a, _ in nmea], [b for _, b in nmea]), number=1, repeat=3))
+    print(f"{len(nmea)} NMEA sentences   scalar loop {loop * 1e3:8.2f} ms   nmea_checksum_batch {batch * 1e3:8.2f} ms")
@@ -0,0 +1,77 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to measure the time to configure a receiver with UbloxConfig
+"""
+import struct
+import threading
+import time
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_utility import UbloxUtils
+from pyublox.frame_dispatcher import FrameDispatcher
+from pyublox.ublox_config import UbloxConfig, MSGOUT_PORTS, KEY_SIZES
+
+LINK_DELAY = 0.004 # s, one way USB/UART latency
+COMMAND_TIME = 0.002 # s, receiver processing per CFG message
+KEY_TIME = 0.00005 # s, receiver processing per key
+
+
+class SimulatedReceiver:
+    """Answers CFG messages in order, one at a time, like a receiver behind a serial link."""
+    def __init__(self):
+        self.dispatcher = FrameDispatcher()
+        self.__busy_until = 0.0
+        self.__lock = threading.Lock()
+        self.values = {}
+
+    def subscribe(self, callback, types=None, policy="block", max_queue=1024):
+        return self.dispatcher.subscribe(callback, types, policy, max_queue)
+
+    def write(self, frame):
+        keys = (len(frame) - 12) // 5 if frame[3] != UbloxConst.ID_VALGET else (len(frame) - 12) // 4
+        with self.__lock:
+            start = max(time.monotonic() + LINK_DELAY, self.__busy_until)
+            self.__busy_until = start + COMMAND_TIME + keys * KEY_TIME
+            answer_at = self.__busy_until + LINK_DELAY
+        answers = [UbloxUtils.build_ubx(UbloxConst.CLASS_ACK, UbloxConst.ID_ACK_ACK, bytes((frame[2], frame[3])))]
+        if frame[3] == UbloxConst.ID_VALGET:
+            pairs = b"".join(frame[i:i + 4] + b"\x00" * KEY_SIZES[(struct.unpack_from("<I", frame, i)[0] >> 28) & 0x07]
+                             for i in range(10, len(frame) - 2, 4))
+            answers.insert(0, UbloxUtils.build_ubx(UbloxConst.CLASS_CFG, UbloxConst.ID_VALGET, bytes((1, 0, 0, 0)) + pairs))
+        timer = threading.Timer(max(answer_at - time.monotonic(), 0), lambda: [self.dispatcher.publish(answer) for answer in answers])
+        timer.start()
+
+
+def one_key_per_message(config, values):
+    start = time.perf_counter()
+    for key, value in values.items():
+        config.set({key: value})
+    return time.perf_counter() - start
+
+
+def run(name, window, batched, values):
+    receiver = SimulatedReceiver()
+    config = UbloxConfig(receiver, window=window)
+    if batched:
+        start = time.perf_counter()
+        ok = config.set(values)
+        elapsed = time.perf_counter() - start
+    else:
+        ok = True
+        elapsed = one_key_per_message(config, values)
+    print(f"{name:<28} {elapsed * 1000:8.1f} ms  {config.commands:4d} messages  acked {ok}")
+    start = time.perf_counter()
+    current = config.get(values)
+    print(f"{'read back':<28} {(time.perf_counter() - start) * 1000:8.1f} ms  {len(current)} values")
+    config.close()
+
+
+if __name__ == "__main__":
+    # Full profile: the preset on every port
+    values = {}
+    for port in MSGOUT_PORTS:
+        values.update(UbloxConfig.preset("pvt_esf_high_rate", port=port))
+    print(f"preset pvt_esf_high_rate on every port: {len(values)} keys")
+    run("one key per message", 1, False, values)
+    run("64 keys per message", 1, True, values)
+    run("64 keys, pipelined", 8, True, values)
@@ -0,0 +1,53 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to compare per-frame attribute polling with the epoch aggregator
+"""
+import time
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_framer import UbloxFramer
+from pyublox.nmea_reader import NMEAReader
+from pyublox.ubx_decoder import UBXDecoder
+from pyublox.epoch_aggregator import EpochAggregator
+from benchmarks.ubx_samples import mixed_stream
+
+EPOCHS = 2000
+
+
+def polling(stream):
+    # What applications do today: decode every frame, then read the attributes they need back on GGA
+    nmea = NMEAReader()
+    ubx = UBXDecoder()
+    rows = []
+    def on_frame(frame):
+        if frame[0:2] == UbloxConst.HEADER_NMEA:
+            nmea.decode(frame)
+            if frame[3:6] == UbloxConst.SF_GGA:
+                rows.append((nmea.gga.lat, nmea.gga.lon, nmea.vtg.sog_kmh, ubx.messages.get("NAV-PVT"), ubx.alg.yaw))
+        else:
+            ubx.decode(frame, verify=False)
+    UbloxFramer(callback=on_frame).feed(stream)
+    return len(rows)
+
+
+def aggregated(stream):
+    epochs = []
+    aggregator = EpochAggregator(NMEAReader(), UBXDecoder(), callback=epochs.append, timeout=None,
+                                 include={"GGA", "VTG", "NAV-PVT", "ESF-ALG"})
+    UbloxFramer(callback=aggregator.feed).feed(stream)
+    print(f"{'':<12} complete {aggregator.epochs - aggregator.epochs_incomplete}/{aggregator.epochs}  "
+          f"latency mean {aggregator.mean_latency_ns / 1e6:.3f} ms  max {aggregator.max_latency_ns / 1e6:.3f} ms")
+    return len(epochs)
+
+
+def timed(name, run, stream):
+    start = time.perf_counter()
+    count = run(stream)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12} {elapsed:8.3f} s {count / elapsed:12.0f} epochs/s")
+
+
+if __name__ == "__main__":
+    stream, _ = mixed_stream(EPOCHS, imu_per_epoch=10, eoe=True)
+    timed("polling", polling, stream)
+    timed("aggregator", aggregated, stream)
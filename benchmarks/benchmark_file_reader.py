@@ -0,0 +1,66 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to measure log replay speed against raw disk reads and the old line reader
+"""
+import os
+import sys
+import tempfile
+import time
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_file_reader import UbloxFileReader
+from benchmarks.ubx_samples import mixed_stream
+
+
+def write_log(path, size_mb):
+    with open(path, 'wb') as file:
+        epoch = 0
+        while file.tell() < size_mb * 1024 * 1024:
+            block, _ = mixed_stream(epochs=2000, first_epoch=epoch)
+            file.write(block)
+            epoch += 2000
+    return os.path.getsize(path)
+
+
+def disk_read(path):
+    buffer = bytearray(16 * 1024 * 1024)
+    with open(path, 'rb', buffering=0) as file:
+        while file.readinto(buffer):
+            pass
+
+
+def line_reader(path):
+    # Copy of the original PythonUblox.read_ubx_file
+    with open(path, 'rb') as file:
+        for line in file:
+            yield line.strip()
+
+
+def timed(name, size, run):
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<32} {size / elapsed / 1e6:9.1f} MB/s {elapsed:8.2f} s  {result}")
+
+
+if __name__ == "__main__":
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 256 # pass 1024 for the 1 GB target
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "drive.ubx")
+        size = write_log(path, size_mb)
+        print(f"log: {size / 1e6:.0f} MB")
+        timed("raw disk read", size, lambda: disk_read(path))
+        timed("line reader (old)", size, lambda: sum(1 for _ in line_reader(path)))
+        timed("frames()", size, lambda: sum(1 for _ in UbloxFileReader(path).frames()))
+        timed("frames() no checksum", size, lambda: sum(1 for _ in UbloxFileReader(path, verify_checksum=False).frames()))
+        timed("frame_spans()", size, lambda: sum(len(starts) for starts, _ in UbloxFileReader(path).frame_spans()))
+        reader = UbloxFileReader(path)
+        timed("build_index()", size, reader.build_index)
+        reader = UbloxFileReader(path)
+        start = time.perf_counter()
+        loaded = reader.load_index()
+        print(f"load_index() {time.perf_counter() - start:.3f} s, loaded={loaded}")
+        with reader:
+            start = time.perf_counter()
+            count = sum(1 for _ in reader.frames_in_window(100500, 100600, UbloxConst.CLASS_NAV, 0x07))
+            print(f"frames_in_window() NAV-PVT {time.perf_counter() - start:.4f} s, {count} frames")
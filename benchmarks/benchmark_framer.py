@@ -0,0 +1,62 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to compare the chunked UbloxFramer against the per-byte serial loop
+"""
+import time
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_framer import UbloxFramer
+from benchmarks.ubx_samples import mixed_stream
+
+
+class FakeSerial:
+    """Serves a byte string the way serial.Serial does when the driver buffer is full."""
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    @property
+    def in_waiting(self):
+        return len(self.data) - self.pos
+
+    def read(self, size=1):
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += len(chunk)
+        return chunk
+
+
+def legacy_read(serial_conn, callback):
+    # Copy of the original UBloxSerialConnection.__read loop
+    buffer = bytearray()
+    while serial_conn.in_waiting > 0:
+        byte = serial_conn.read(1)
+        buffer += byte
+        if len(buffer) > 1 and (buffer[-2:] == UbloxConst.HEADER_UBX or buffer[-2:] == UbloxConst.HEADER_NMEA):
+            if buffer.startswith(UbloxConst.HEADER_UBX):
+                total_length = int.from_bytes(buffer[4:6], byteorder='little', signed=False) + 2
+                if len(buffer) < total_length:
+                    continue
+            callback(buffer[:-2])
+            buffer = buffer[-2:]
+
+
+def framer_read(serial_conn, callback, chunk_size):
+    framer = UbloxFramer(callback=callback)
+    while serial_conn.in_waiting > 0:
+        framer.feed(serial_conn.read(min(serial_conn.in_waiting, chunk_size)))
+
+
+def report(name, stream, run):
+    frames = []
+    start = time.perf_counter()
+    run(FakeSerial(stream), frames.append)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<24} {len(stream) / elapsed / 1e6:8.2f} MB/s {len(frames) / elapsed:12.0f} frames/s ({len(frames)} frames)")
+
+
+if __name__ == "__main__":
+    stream, count = mixed_stream(epochs=500)
+    print(f"stream: {len(stream)} bytes, {count} frames")
+    report("per-byte loop", stream, legacy_read)
+    for chunk_size in (64, 512, 4096):
+        report(f"framer chunk={chunk_size}", stream, lambda conn, cb: framer_read(conn, cb, chunk_size))
@@ -0,0 +1,59 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to compare the per-point UbloxUtils coordinate functions with the vectorized Geodesy ones
+"""
+import time
+import numpy as np
+from pyublox.ublox_utility import UbloxUtils
+from pyublox.geodesy import Geodesy
+
+POINTS = 200000
+
+
+def timed(name, run, count):
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<40} {elapsed * 1000:9.1f} ms {elapsed / count * 1e9:9.0f} ns/point")
+    return result
+
+
+def track(count):
+    # A drive around Riverside at 10 Hz, as the NMEA GGA fields of a log
+    rng = np.random.default_rng(1)
+    lat = 33.9 + np.cumsum(rng.normal(0, 1e-5, count))
+    lon = -117.3 + np.cumsum(rng.normal(0, 1e-5, count))
+    lat_ddmm = [f"{int(value):02d}{(value - int(value)) * 60:07.4f}" for value in lat]
+    lon_ddmm = [f"{int(-value):03d}{(-value - int(-value)) * 60:07.4f}" for value in lon]
+    return lat, lon, lat_ddmm, lon_ddmm
+
+
+if __name__ == "__main__":
+    lat, lon, lat_ddmm, lon_ddmm = track(POINTS)
+    lat_list, lon_list = lat.tolist(), lon.tolist()
+    print(f"{POINTS} points")
+
+    timed("UbloxUtils.convert_gps_to_decimal", lambda: [UbloxUtils.convert_gps_to_decimal(value, "W") for value in lon_ddmm], POINTS)
+    directions = np.full(POINTS, "W")
+    timed("Geodesy.ddmm_to_decimal (strings)", lambda: Geodesy.ddmm_to_decimal(lon_ddmm, directions), POINTS)
+    lon_column = np.array(lon_ddmm, dtype=float)
+    timed("Geodesy.ddmm_to_decimal (float column)", lambda: Geodesy.ddmm_to_decimal(lon_column, directions), POINTS)
+
+    pairs = list(zip(lat_list[:-1], lon_list[:-1], lat_list[1:], lon_list[1:]))
+    per_point = timed("UbloxUtils.haversine loop", lambda: [UbloxUtils.haversine(*pair) for pair in pairs], POINTS)
+    timed("Geodesy.haversine scalar loop", lambda: [Geodesy.haversine(*pair) for pair in pairs], POINTS)
+    vectorized = timed("Geodesy.haversine arrays", lambda: Geodesy.haversine(lat[:-1], lon[:-1], lat[1:], lon[1:]), POINTS)
+    print(f"{'  max difference':<40} {np.max(np.abs(np.array(per_point) * 1000 - vectorized)):9.3g} m (6371 vs 6371.0088 km radius)")
+    timed("Geodesy.vincenty scalar loop", lambda: [Geodesy.vincenty(*pair) for pair in pairs[:POINTS // 10]], POINTS // 10)
+    timed("Geodesy.vincenty arrays", lambda: Geodesy.vincenty(lat[:-1], lon[:-1], lat[1:], lon[1:]), POINTS)
+
+    timed("track length, UbloxUtils loop", lambda: sum(UbloxUtils.haversine(*pair) for pair in pairs), POINTS)
+    timed("Geodesy.track_length", lambda: Geodesy.track_length(lat, lon), POINTS)
+
+    alt = np.full(POINTS, 400.0)
+    timed("Geodesy.lla_to_enu scalar loop", lambda: [Geodesy.lla_to_enu(a, b, 400.0, 33.9, -117.3, 400.0)
+                                                     for a, b in zip(lat_list, lon_list)], POINTS)
+    east, north, up = timed("Geodesy.lla_to_enu arrays", lambda: Geodesy.lla_to_enu(lat, lon, alt, 33.9, -117.3, 400.0), POINTS)
+    back = timed("Geodesy.enu_to_lla arrays", lambda: Geodesy.enu_to_lla(east, north, up, 33.9, -117.3, 400.0), POINTS)
+    print(f"{'  round trip error':<40} {np.max(np.abs(back[2] - alt)):9.3g} m")
@@ -0,0 +1,98 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to compare the Geofence grid index with testing every fix against every zone
+"""
+import math
+import random
+import time
+from pyublox.ublox_utility import UbloxUtils
+from pyublox.geofence import Geofence
+
+ZONES = 5000
+FIXES = 20000
+ORIGIN = (33.9737, -117.3281)
+
+
+def zones(count, seed=1):
+    # Circles and 8 to 40 vertex polygons spread over 40 x 40 km
+    rng = random.Random(seed)
+    result = []
+    for index in range(count):
+        lat = ORIGIN[0] + rng.uniform(-0.18, 0.18)
+        lon = ORIGIN[1] + rng.uniform(-0.22, 0.22)
+        size = rng.uniform(30, 300)
+        if index % 2:
+            result.append(("circle", index, (lat, lon, size)))
+        else:
+            vertices = rng.randint(8, 40)
+            points = [(lat + size / 111000 * rng.uniform(0.6, 1.0) * math.sin(a * 2 * math.pi / vertices),
+                       lon + size / 92000 * rng.uniform(0.6, 1.0) * math.cos(a * 2 * math.pi / vertices))
+                      for a in range(vertices)]
+            result.append(("polygon", index, points))
+    return result
+
+
+def fixes(count, seed=2):
+    # A 20 m/s drive sampled at 10 Hz with 3 m noise
+    rng = random.Random(seed)
+    lat, lon, heading = ORIGIN[0], ORIGIN[1], 0.0
+    result = []
+    for _ in range(count):
+        heading += rng.gauss(0, 0.05)
+        lat += 2 * math.cos(heading) / 111000
+        lon += 2 * math.sin(heading) / 92000
+        result.append((lat + rng.gauss(0, 3) / 111000, lon + rng.gauss(0, 3) / 92000, rng.uniform(0.8, 2.5)))
+    return result
+
+
+def point_in_polygon(lat, lon, points):
+    inside = False
+    for (lat0, lon0), (lat1, lon1) in zip(points, points[1:] + points[:1]):
+        if (lat0 > lat) != (lat1 > lat) and lon < lon0 + (lat - lat0) * (lon1 - lon0) / (lat1 - lat0):
+            inside = not inside
+    return inside
+
+
+def naive(zone_list, fix_list):
+    # The previous approach: every fix against every zone, in lat/lon, no hysteresis
+    haversine = UbloxUtils.haversine
+    inside = set()
+    events = 0
+    for lat, lon, _ in fix_list:
+        for kind, zone_id, shape in zone_list:
+            if kind == "circle":
+                now = haversine(lat, lon, shape[0], shape[1]) * 1000 <= shape[2]
+            else:
+                now = point_in_polygon(lat, lon, shape)
+            if now != (zone_id in inside):
+                events += 1
+                (inside.add if now else inside.discard)(zone_id)
+    return events
+
+
+def build(zone_list):
+    geofence = Geofence(origin=ORIGIN)
+    for kind, zone_id, shape in zone_list:
+        if kind == "circle":
+            geofence.add_circle(zone_id, *shape)
+        else:
+            geofence.add_polygon(zone_id, shape)
+    return geofence
+
+
+if __name__ == "__main__":
+    zone_list = zones(ZONES)
+    fix_list = fixes(FIXES)
+    sample = fix_list[:FIXES // 100]
+    start = time.perf_counter()
+    events = naive(zone_list, sample)
+    elapsed = time.perf_counter() - start
+    print(f"every zone, {len(sample)} fixes   {elapsed / len(sample) * 1e6:10.1f} us/fix {events:6d} transitions")
+    start = time.perf_counter()
+    geofence = build(zone_list)
+    print(f"indexing {ZONES} zones       {(time.perf_counter() - start) * 1000:10.1f} ms")
+    start = time.perf_counter()
+    events = sum(len(geofence.update(lat, lon, hdop=hdop)) for lat, lon, hdop in fix_list)
+    elapsed = time.perf_counter() - start
+    print(f"grid index, {FIXES} fixes  {elapsed / FIXES * 1e6:10.1f} us/fix {events:6d} events")
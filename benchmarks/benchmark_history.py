@@ -0,0 +1,60 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to compare HistoryStore window queries with lists of copied records
+"""
+import time
+from collections import deque
+from pyublox.ublox_framer import UbloxFramer
+from pyublox.ubx_decoder import UBXDecoder
+from pyublox.ubx_messages import NAV_PVT
+from pyublox.history_store import HistoryStore
+from benchmarks.ubx_samples import mixed_stream
+
+EPOCHS = 20000 # 10 Hz: about 33 minutes of NAV-PVT
+QUERIES = 200
+WINDOW_S = 30
+
+
+def timed(name, run, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        result = run()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<44} {elapsed / count * 1e6:10.1f} us")
+    return result
+
+
+if __name__ == "__main__":
+    stream, _ = mixed_stream(EPOCHS, imu_per_epoch=10)
+    frames = []
+    UbloxFramer(callback=frames.append).feed(stream)
+    pvt_key = (NAV_PVT.msg_class, NAV_PVT.msg_id)
+    pvt_frames = [frame for frame in frames if (frame[2], frame[3]) == pvt_key]
+    now = 0
+    stamps = [] # 10 Hz receive times
+    for _ in pvt_frames:
+        now += 100_000_000
+        stamps.append(now)
+
+    # The application side today: a list of (time, record) copied out of UBXDecoder
+    decoder = UBXDecoder()
+    copies = deque(maxlen=EPOCHS)
+    start = time.perf_counter()
+    for frame, stamp in zip(pvt_frames, stamps):
+        copies.append((stamp, decoder.decode(frame)))
+    print(f"{'list of records, store':<44} {(time.perf_counter() - start) / len(pvt_frames) * 1e6:10.1f} us/record")
+    store = HistoryStore(capacity=EPOCHS, types={"NAV-PVT"})
+    start = time.perf_counter()
+    for frame, stamp in zip(pvt_frames, stamps):
+        store.feed(frame, stamp)
+    print(f"{'HistoryStore, store':<44} {(time.perf_counter() - start) / len(pvt_frames) * 1e6:10.1f} us/record")
+    print(f"{'HistoryStore memory':<44} {store.nbytes / 1e6:10.2f} MB for {len(store.channel('NAV-PVT'))} records")
+
+    since = now - WINDOW_S * 1_000_000_000
+    scale = NAV_PVT.scales["lat"]
+    timed(f"list, lat/lon of the last {WINDOW_S} s (scan)",
+          lambda: [(record.lat * scale, record.lon * scale) for stamp, record in copies if stamp >= since], QUERIES)
+    window = timed(f"HistoryStore, lat/lon of the last {WINDOW_S} s", lambda: store.range("NAV-PVT", since, fields=["lat", "lon"]), QUERIES)
+    print(f"{'  records in window':<44} {len(window['lat']):10d}")
+    timed("HistoryStore, whole history to 1000 points", lambda: store.decimate("NAV-PVT", max_points=1000, fields=["lat", "lon"]), QUERIES // 10)
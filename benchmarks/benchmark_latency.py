@@ -0,0 +1,111 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to measure the delay from the last byte of a frame to its callback
+"""
+import bisect
+import random
+import time
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_framer import UbloxFramer
+from benchmarks.ubx_samples import GGA, VTG, esf_meas, esf_alg, nav_pvt, nmea_frame
+
+BAUD_RATE = 460800
+READ_INTERVAL = 0.001 # the reader thread wakes up every millisecond
+
+
+def timeline(epochs=200, seed=1):
+    """Frames of a 10 Hz navigation solution with 100 Hz ESF-MEAS, with the arrival time of their last byte."""
+    rng = random.Random(seed)
+    byte_time = 10 / BAUD_RATE # 8N1
+    frames = []
+    busy_until = 0.0
+    for epoch in range(epochs):
+        t0 = epoch * 0.1
+        itow = 100000 + epoch * 100
+        scheduled = [(t0 + i * 0.01, [esf_meas(itow * 10 + i, rng)]) for i in range(10)]
+        scheduled.append((t0 + 0.05, [nav_pvt(itow, rng), esf_alg(itow, rng), nmea_frame(GGA), nmea_frame(VTG)]))
+        scheduled.sort(key=lambda item: item[0])
+        for emit_time, burst in scheduled:
+            for frame in burst:
+                busy_until = max(busy_until, emit_time) + len(frame) * byte_time
+                frames.append((busy_until, frame))
+    return frames
+
+
+def chunks(frames):
+    """Splits the serial stream into what a reader sees every READ_INTERVAL, with the read time."""
+    stream = b"".join(frame for _, frame in frames)
+    byte_time = 10 / BAUD_RATE
+    arrival = []
+    for done, frame in frames:
+        first = done - len(frame) * byte_time
+        arrival.extend(first + (i + 1) * byte_time for i in range(len(frame)))
+    pos = 0
+    tick = READ_INTERVAL
+    while pos < len(stream):
+        stop = bisect.bisect_right(arrival, tick)
+        if stop > pos:
+            yield tick, stream[pos:stop]
+            pos = stop
+        tick += READ_INTERVAL
+
+
+def legacy_feed(callback):
+    # Copy of the original UBloxSerialConnection.__read splitting logic
+    buffer = bytearray()
+    def feed(data):
+        nonlocal buffer
+        for byte in data:
+            buffer.append(byte)
+            if len(buffer) > 1 and (buffer[-2:] == UbloxConst.HEADER_UBX or buffer[-2:] == UbloxConst.HEADER_NMEA):
+                if buffer.startswith(UbloxConst.HEADER_UBX):
+                    total_length = int.from_bytes(buffer[4:6], byteorder='little', signed=False) + 2
+                    if len(buffer) < total_length:
+                        continue
+                if len(buffer) > 2:
+                    callback(buffer[:-2])
+                buffer = buffer[-2:]
+    return feed
+
+
+def measure(name, frames, make_feed):
+    """
+    Feeds the stream chunk by chunk and measures, for every callback, the delay since the last
+    byte of its frame arrived. Callbacks are matched to frames by the stream offset where they
+    end, so a splitter delivering extra or split frames (the "next header" splitter cuts
+    payloads containing a spurious header) is reported instead of shifting every later match.
+    """
+    stream = b"".join(frame for _, frame in frames)
+    done_at = {} # stream offset after a frame -> arrival time of its last byte
+    offset = 0
+    for done, frame in frames:
+        offset += len(frame)
+        done_at[offset] = done
+    latencies = []
+    state = {"tick": 0.0, "wall": 0.0, "offset": 0, "split": 0}
+    def callback(frame):
+        now = time.perf_counter()
+        end = stream.find(bytes(frame), state["offset"]) + len(frame)
+        state["offset"] = end
+        done = done_at.get(end)
+        if done is None:
+            state["split"] += 1 # ends inside a frame
+            return
+        latencies.append(state["tick"] - done + now - state["wall"])
+    feed = make_feed(callback)
+    for tick, data in chunks(frames):
+        state["tick"] = tick
+        state["wall"] = time.perf_counter()
+        feed(data)
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    print(f"{name:<16} delivered {len(ms):5d}/{len(frames)}  extra/split {state['split']:4d}  "
+          f"mean {sum(ms) / len(ms):7.3f} ms  p50 {ms[len(ms) // 2]:7.3f} ms  "
+          f"p99 {ms[int(len(ms) * 0.99)]:7.3f} ms  max {ms[-1]:7.3f} ms")
+
+
+if __name__ == "__main__":
+    frames = timeline()
+    measure("next header", frames, legacy_feed)
+    measure("state machine", frames, lambda callback: UbloxFramer(callback=callback).feed)
@@ -0,0 +1,98 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to compare the RecordLogger sink with per-row CSV logging
+"""
+import csv
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_framer import UbloxFramer
+from pyublox.nmea_reader import NMEAReader
+from pyublox.ubx_decoder import UBXDecoder
+from pyublox.record_logger import RecordLogger, pa
+from benchmarks.ubx_samples import mixed_stream
+
+EPOCHS = 20000
+
+
+def csv_rows(frames, directory):
+    # The previous test.py: one formatted row per NMEA sentence, GGA fields only
+    nmea = NMEAReader()
+    path = os.path.join(directory, "log.csv")
+    with open(path, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['Timestamp', 'Latitude', 'Longitude', 'Altitude', 'GNSS_Time', 'Quality', 'NumSatellites', "Local_Datatime"])
+        for frame in frames:
+            if frame[0:2] == UbloxConst.HEADER_NMEA:
+                nmea.decode(frame)
+                gga = nmea.gga
+                writer.writerow([datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f'), gga.lat, gga.lon, gga.alt, gga.time,
+                                 gga.quality, gga.numSV, datetime.now()])
+    return [path]
+
+
+def sink(frames, directory, format, raw):
+    # Every decoded record of every message type
+    logger = RecordLogger(directory, format=format, raw=raw)
+    for frame in frames:
+        logger.feed(frame)
+    logger.close()
+    return logger.files
+
+
+def sink_gga(frames, directory, format):
+    # Same decoding as the CSV path, one record per GGA sentence
+    nmea = NMEAReader()
+    logger = RecordLogger(directory, format=format, raw=False)
+    for frame in frames:
+        if frame[0:2] == UbloxConst.HEADER_NMEA:
+            record = nmea.decode(frame)
+            if record is not None and frame[3:6] == UbloxConst.SF_GGA:
+                logger.write("GGA", record)
+    logger.close()
+    return logger.files
+
+
+def decode_only(frames, directory):
+    nmea = NMEAReader()
+    ubx = UBXDecoder()
+    for frame in frames:
+        if frame[0:2] == UbloxConst.HEADER_NMEA:
+            nmea.decode(frame)
+        else:
+            ubx.decode(frame)
+    return []
+
+
+def timed(name, run, frames, *args):
+    directory = tempfile.mkdtemp()
+    try:
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        files = run(frames, directory, *args)
+        cpu = time.process_time() - cpu
+        wall = time.perf_counter() - wall
+        size = sum(os.path.getsize(path) for path in files)
+        print(f"{name:<26} {wall:8.3f} s wall {cpu:8.3f} s cpu {size / 1e6:9.2f} MB")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    stream, _ = mixed_stream(EPOCHS, imu_per_epoch=10)
+    frames = []
+    UbloxFramer(callback=frames.append).feed(stream)
+    print(f"{len(frames)} frames, {len(stream) / 1e6:.2f} MB raw")
+    timed("decode only", decode_only, frames)
+    timed("csv, GGA on every NMEA", csv_rows, frames)
+    timed("binary, GGA records", sink_gga, frames, "binary")
+    timed("binary, all records", sink, frames, "binary", False)
+    timed("binary + raw frames", sink, frames, "binary", True)
+    if pa is not None:
+        timed("parquet, GGA records", sink_gga, frames, "parquet")
+        timed("parquet, all records", sink, frames, "parquet", False)
+        timed("arrow, all records", sink, frames, "arrow", False)
@@ -0,0 +1,42 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to measure how UbloxManager decoding scales with thread and process workers
+"""
+import time
+from pyublox.ublox_framer import UbloxFramer
+from pyublox.ublox_manager import UbloxManager
+from benchmarks.ubx_samples import mixed_stream
+
+DEVICES = 8
+EPOCHS = 500
+BATCH = 64 # frames per feed(), about one serial read at high rates
+
+
+def run(frames, processes, workers):
+    decoded = []
+    manager = UbloxManager(devices=[], workers=workers, processes=processes, merge_window=0.0,
+                           max_pending=1 << 20, callback=decoded.append)
+    manager.start()
+    for device in range(DEVICES):
+        manager.add_device(f"DEVICE{device}")
+    start = time.perf_counter()
+    for i in range(0, len(frames), BATCH):
+        batch = frames[i:i + BATCH]
+        for device in range(DEVICES):
+            manager.feed(f"DEVICE{device}", batch)
+    manager.stop()
+    elapsed = time.perf_counter() - start
+    dropped = sum(stats.dropped for stats in manager.stats.values())
+    print(f"{'processes' if processes else 'threads':<10} {workers:>2} workers {elapsed:8.3f} s "
+          f"{len(decoded) / elapsed:12.0f} msg/s  dropped {dropped}")
+
+
+if __name__ == "__main__":
+    stream, _ = mixed_stream(EPOCHS, imu_per_epoch=10)
+    frames = []
+    UbloxFramer(callback=frames.append).feed(stream)
+    print(f"{DEVICES} devices x {len(frames)} frames")
+    for processes in (False, True):
+        for workers in (1, 2, 4, 8):
+            run(frames, processes, workers)
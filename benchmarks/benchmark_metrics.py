@@ -0,0 +1,71 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to compare the print() error reports with rate limited logging, and measure the cost of the metrics
+"""
+import contextlib
+import io
+import subprocess
+import time
+from pyublox.ublox_framer import UbloxFramer
+from pyublox.ubx_decoder import UBXDecoder
+from pyublox.nmea_reader import NMEAReader
+from pyublox.metrics import MetricsRegistry
+from pyublox.ublox_serial_connection import UBloxSerialConnection
+from pyublox.ublox_logging import RATE_LIMIT
+from pyublox.ublox_utility import UbloxUtils
+from benchmarks.ubx_samples import mixed_stream
+
+COUNT = 20000
+
+
+def run(name, function, frames):
+    start = time.perf_counter()
+    for frame in frames:
+        function(frame)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<48} {elapsed / len(frames) * 1e6:8.2f} us/frame")
+
+
+if __name__ == "__main__":
+    stream, _ = mixed_stream(COUNT // 4, imu_per_epoch=2)
+    frames = []
+    UbloxFramer(callback=frames.append).feed(stream)
+    ubx_frames = [frame for frame in frames if frame[0] == 0xB5]
+    nmea_frames = [frame for frame in frames if frame[0] != 0xB5]
+    corrupt = [frame[:-1] + bytes(((frame[-1] + 1) & 0xFF,)) for frame in ubx_frames]
+
+    # A noisy link: every frame has a bad checksum. The old decoder printed one line per frame, to a
+    # line buffered stdout (a terminal or a pipe to a log collector, here a pipe to cat)
+    reader = subprocess.Popen(["cat"], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL)
+    stdout = io.TextIOWrapper(reader.stdin, line_buffering=True)
+    def print_decode(frame):
+        if UbloxUtils.ubx_checksum(frame) != frame[-2:]:
+            print("UBX Decoder: ", "Checksum error: ", bytes(frame), file=stdout)
+    run("checksum + print() per bad frame", print_decode, corrupt)
+    stdout.close()
+    reader.wait()
+    RATE_LIMIT.reset()
+    with contextlib.redirect_stderr(io.StringIO()):
+        run("UBXDecoder, rate limited logging", UBXDecoder().decode, corrupt)
+    print(f"{'  messages suppressed':<48} {RATE_LIMIT.suppressed:8d}")
+
+    # Decode timers
+    registry = MetricsRegistry()
+    run("UBXDecoder.decode", UBXDecoder().decode, ubx_frames)
+    timed = UBXDecoder()
+    timed.timer = registry.timer("decode_seconds", decoder="ubx")
+    run("UBXDecoder.decode with timer", timed.decode, ubx_frames)
+    run("NMEAReader.decode", NMEAReader().decode, nmea_frames)
+    timed = NMEAReader()
+    timed.timer = registry.timer("decode_seconds", decoder="nmea")
+    run("NMEAReader.decode with timer", timed.decode, nmea_frames)
+
+    # Counters are read from the components only when the metrics are collected
+    connection = UBloxSerialConnection("/dev/null")
+    registry.add_collector(connection.metrics)
+    connection.framer.feed(stream, time.monotonic_ns())
+    start = time.perf_counter()
+    for _ in range(100):
+        text = registry.prometheus()
+    print(f"{'prometheus() scrape':<48} {(time.perf_counter() - start) / 100 * 1e3:8.2f} ms ({len(text)} bytes)")
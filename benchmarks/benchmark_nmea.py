@@ -0,0 +1,57 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to measure NMEA decoding speed in sentences per second
+"""
+import timeit
+from pyublox.nmea_reader import NMEAReader
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_utility import UbloxUtils
+from benchmarks.ubx_samples import nmea_frame, GGA, VTG
+
+
+def legacy_decode(recv_data):
+    # Copy of the original NMEAReader.decode + GGA/VTG.decode, storing into a dict
+    out = {}
+    decoded_data = recv_data.decode('utf-8')
+    start_index = decoded_data.find('$') + 1
+    end_index = decoded_data.find('*')
+    checksum = 0
+    for char in decoded_data[start_index:end_index]:
+        checksum ^= ord(char)
+    if format(checksum, '02X') == decoded_data[decoded_data.find('*') + 1:].strip():
+        data_fields = decoded_data[:decoded_data.find('*')].split(",")
+        if recv_data[3:6] == UbloxConst.SF_GGA:
+            out["time"] = UbloxUtils.convert_HHMMSSsss_to_time(data_fields[1])
+            out["lat"] = UbloxUtils.convert_gps_to_decimal(data_fields[2], data_fields[3])
+            out["lon"] = UbloxUtils.convert_gps_to_decimal(data_fields[4], data_fields[5])
+            out["quality"] = UbloxUtils.get_quality(data_fields[6])
+            out["numSV"], out["HDOP"], out["alt"] = data_fields[7], data_fields[8], data_fields[9]
+        if recv_data[3:6] == UbloxConst.SF_VTG:
+            out["cog_true"], out["sog_kmh"] = data_fields[1], data_fields[7]
+            out["pos_mode"] = UbloxUtils.get_posMode(data_fields[9])
+    return out
+
+
+SENTENCES = {
+    "GGA": nmea_frame(GGA),
+    "VTG": nmea_frame(VTG),
+    "RMC": nmea_frame(b"$GNRMC,083559.00,A,4717.11437,N,00833.91522,E,0.004,77.52,091202,,,A,V*"),
+    "GSA": nmea_frame(b"$GNGSA,A,3,80,71,73,79,69,,,,,,,,1.83,1.09,1.47,1*"),
+    "GSV": nmea_frame(b"$GPGSV,3,1,09,09,21,110,17,10,45,230,40,12,60,30,49,13,10,300,35,1*"),
+    "GST": nmea_frame(b"$GPGST,082356.00,1.8,,,,1.7,1.3,2.2*"),
+    "GNS": nmea_frame(b"$GNGNS,103600.01,5114.51176,N,00012.29380,W,ANNN,07,1.18,111.5,45.6,,,V*"),
+    "ZDA": nmea_frame(b"$GNZDA,082710.00,16,09,2002,00,00*"),
+}
+
+
+def rate(function, number=20000):
+    return number / min(timeit.repeat(function, number=number, repeat=3))
+
+
+if __name__ == "__main__":
+    reader = NMEAReader()
+    print(f"{'sentence':<9} {'legacy':>12} {'objects':>12} {'raw':>12}  (sentences/s)")
+    for name, sentence in SENTENCES.items():
+        legacy = f"{rate(lambda: legacy_decode(sentence)):12.0f}" if name in ("GGA", "VTG") else f"{'-':>12}"
+        print(f"{name:<9} {legacy} {rate(lambda: reader.decode(sentence)):12.0f} {rate(lambda: reader.decode(sentence, raw=True)):12.0f}")
@@ -0,0 +1,59 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to measure decode throughput of DecodePipeline against the number of worker processes
+"""
+import os
+import time
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_framer import UbloxFramer
+from pyublox.nmea_reader import NMEAReader
+from pyublox.ubx_decoder import UBXDecoder
+from pyublox.decode_pipeline import DecodePipeline
+from benchmarks.ubx_samples import mixed_stream
+
+EPOCHS = 2000
+RECEIVERS = 8 # the same stream fed once per receiver
+BATCH = 64 # frames per feed(), about one serial read at high rates
+
+
+def single_thread(frames):
+    nmea = NMEAReader()
+    ubx = UBXDecoder()
+    start = time.perf_counter()
+    for _ in range(RECEIVERS):
+        for frame in frames:
+            if frame[0:2] == UbloxConst.HEADER_UBX:
+                ubx.decode(frame)
+            else:
+                nmea.decode(frame)
+    return time.perf_counter() - start
+
+
+def pipeline(frames, workers, ordered):
+    decoder = DecodePipeline(workers=workers, ordered=ordered, block=10)
+    decoder.start()
+    decoder.feed(frames[:BATCH]) # wait for the workers to be up before timing
+    while decoder.records < BATCH:
+        time.sleep(0.01)
+    start = time.perf_counter()
+    for _ in range(RECEIVERS):
+        for i in range(0, len(frames), BATCH):
+            decoder.feed(frames[i:i + BATCH])
+    decoder.stop()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    stream, _ = mixed_stream(EPOCHS, imu_per_epoch=10)
+    frames = []
+    UbloxFramer(callback=frames.append).feed(stream)
+    total = len(frames) * RECEIVERS
+    print(f"{total} frames, {os.cpu_count()} cores")
+    elapsed = single_thread(frames)
+    print(f"{'single thread':<24} {elapsed:8.3f} s {total / elapsed:12.0f} frames/s")
+    for ordered in (True, False):
+        for workers in (1, 2, 4, 8):
+            elapsed = pipeline(frames, workers, ordered)
+            name = f"{workers} workers{' ordered' if ordered else ''}"
+            print(f"{name:<24} {elapsed:8.3f} s {total / elapsed:12.0f} frames/s")
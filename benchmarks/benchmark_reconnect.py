@@ -0,0 +1,48 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to check the NTRIP reconnect backoff and failover when a caster refuses connections after a good session
+"""
+import random
+import time
+from pyublox.ntrip_socket_connection import NTRIPSession
+from pyublox.ntrip_sourcetable import NTRIPSourcetable
+from benchmarks.ubx_samples import rtcm_stream
+
+CANDIDATES = 3
+ATTEMPTS = 9
+
+
+def sourcetable(count):
+    lines = [f"STR;MP{i};MP{i};RTCM 3.2;1005(10),1077(1);2;GPS;NET;USA;{45 + i:.2f};-122.00;1;0;GEN;none;B;N;9600;"
+             for i in range(count)]
+    return NTRIPSourcetable(NTRIPSourcetable.parse("\r\n".join(lines) + "\r\nENDSOURCETABLE\r\n"))
+
+
+if __name__ == "__main__":
+    # The largest jitter makes every delay equal to the current backoff
+    random.uniform = lambda low, high: high
+    stream, _ = rtcm_stream(10)
+    session = NTRIPSession("localhost", 2101, "user", "password", version=1, backoff_initial=0.5, backoff_max=30,
+                           failover_after=3)
+    session.sourcetable = sourcetable(CANDIDATES)
+    session.find_mountpoint(45.0, -122.0, candidates=CANDIDATES)
+
+    # One good session, then the caster refuses every connection: NTRIPSocketConnection
+    # calls session_ended() without request() when socket.create_connection() fails
+    session.request()
+    assert session.feed(b"ICY 200 OK\r\n" + stream) == stream
+    start = time.perf_counter()
+    delays = [session.session_ended()]
+    mountpoints = []
+    for _ in range(ATTEMPTS):
+        delays.append(session.session_ended())
+        mountpoints.append(session.mountpoint)
+    elapsed = time.perf_counter() - start
+
+    print(f"delays: {', '.join(f'{delay:g}' for delay in delays)} s")
+    print(f"mountpoints: {', '.join(mountpoints)}")
+    print(f"connect failures: {session.connect_failures}, {elapsed / (ATTEMPTS + 1) * 1e6:.1f} us per session_ended()")
+    assert delays == [min(30, 0.5 * 2 ** i) for i in range(ATTEMPTS + 1)]
+    assert session.connect_failures == ATTEMPTS
+    assert mountpoints == ["MP0", "MP0", "MP1", "MP1", "MP1", "MP2", "MP2", "MP2", "MP0"]
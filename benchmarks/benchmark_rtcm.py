@@ -0,0 +1,54 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to measure the RTCM3 framer and CRC-24Q throughput
+"""
+import random
+import time
+from pyublox.ublox_utility import UbloxUtils
+from pyublox.rtcm_framer import RTCMFramer
+from benchmarks.ubx_samples import rtcm_stream
+
+
+def crc24q_bitwise(data):
+    # Straightforward bit by bit CRC-24Q, the reference for the table version
+    crc = 0
+    for byte in data:
+        crc ^= byte << 16
+        for _ in range(8):
+            crc <<= 1
+            if crc & 0x1000000:
+                crc ^= 0x1864CFB
+    return crc & 0xFFFFFF
+
+
+def timed(name, run, size):
+    start = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<24} {elapsed:8.3f} s {size / elapsed / 1e6:8.2f} MB/s")
+    return result
+
+
+if __name__ == "__main__":
+    stream, count = rtcm_stream(2000)
+    sample = stream[:1 << 18]
+    assert timed("crc24q bitwise", lambda: crc24q_bitwise(sample), len(sample)) == \
+        timed("crc24q table", lambda: UbloxUtils.crc24q(sample), len(sample))
+
+    rng = random.Random(1)
+    chunks = []
+    pos = 0
+    while pos < len(stream):
+        size = rng.randrange(1, 1500) # TCP segments split frames anywhere
+        chunks.append(stream[pos:pos + size])
+        pos += size
+    def run(framer):
+        for chunk in chunks:
+            framer.feed(chunk)
+        return framer
+    framer = timed("framer, all types", lambda: run(RTCMFramer()), len(stream))
+    print(f"{'':<24} {framer.frames}/{count} frames, {framer.crc_errors} CRC errors")
+    framer = timed("framer, deny MSM7+1033", lambda: run(RTCMFramer(deny=RTCMFramer.MSM7 | {1033})), len(stream))
+    print(f"{'':<24} {framer.frames - framer.frames_filtered} forwarded, {framer.frames_filtered} filtered")
+    framer = timed("framer, no CRC check", lambda: run(RTCMFramer(verify_crc=False)), len(stream))
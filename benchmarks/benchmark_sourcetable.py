@@ -0,0 +1,42 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to compare the k-d tree mountpoint search with a linear haversine scan
+"""
+import random
+import time
+from pyublox.ublox_utility import UbloxUtils
+from pyublox.ntrip_sourcetable import NTRIPSourcetable
+
+ENTRIES = 20000
+QUERIES = 2000
+
+
+def sourcetable_text(count, seed=1):
+    rng = random.Random(seed)
+    lines = [f"STR;MP{i};MP{i};RTCM 3.2;1005(10),1077(1),1087(1);2;GPS+GLO+GAL+BDS;NET;USA;"
+             f"{rng.uniform(-60, 70):.2f};{rng.uniform(-180, 180):.2f};1;0;GEN;none;B;N;9600;" for i in range(count)]
+    return "\r\n".join(lines) + "\r\nENDSOURCETABLE\r\n"
+
+
+def linear(entries, lat, lon):
+    # What find_mountpoint did before: haversine to every STR entry
+    return min(entries, key=lambda entry: UbloxUtils.haversine(lat, lon, entry.lat, entry.lon))
+
+
+if __name__ == "__main__":
+    text = sourcetable_text(ENTRIES)
+    start = time.perf_counter()
+    table = NTRIPSourcetable(NTRIPSourcetable.parse(text))
+    print(f"parse + index {len(table)} entries: {(time.perf_counter() - start) * 1000:.1f} ms")
+    rng = random.Random(2)
+    queries = [(rng.uniform(-60, 70), rng.uniform(-180, 180)) for _ in range(QUERIES)]
+    start = time.perf_counter()
+    tree = [table.nearest(lat, lon)[0][1] for lat, lon in queries]
+    tree_time = time.perf_counter() - start
+    start = time.perf_counter()
+    scan = [linear(table.entries, lat, lon) for lat, lon in queries[:QUERIES // 20]]
+    scan_time = (time.perf_counter() - start) * 20
+    assert tree[:len(scan)] == scan
+    print(f"k-d tree    {tree_time / QUERIES * 1e6:10.1f} us/query")
+    print(f"linear scan {scan_time / QUERIES * 1e6:10.1f} us/query")
@@ -0,0 +1,40 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to check the frame read times and GNSS clock estimate of FrameTiming, and their cost
+"""
+import time
+from pyublox.ublox_framer import UbloxFramer
+from pyublox.frame_timing import FrameTiming
+from benchmarks.benchmark_latency import timeline, chunks, BAUD_RATE
+
+RUNS = 5
+
+
+def replay(reads, timing=None):
+    framer = UbloxFramer(callback=timing.observe if timing is not None else None)
+    start = time.perf_counter()
+    for tick, data in reads:
+        framer.feed(data, int(tick * 1e9) if timing is not None else None)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    frames = timeline(epochs=2000)
+    reads = list(chunks(frames))
+    # The timeline starts at GPS time iTOW 100000 ms with the host clock at 0: offset -100 s, NAV-PVT 50 ms after the epoch
+    timing = FrameTiming(BAUD_RATE)
+    replay(reads, timing)
+    stats = timing.stats()
+    for stage in ("frame", "wire", "epoch"):
+        summary = stats[stage]
+        print(f"{stage:<8} {summary['count']:6d} frames  mean {summary['mean']:9.1f} us  p50 {summary['p50']:9.1f} us  "
+              f"p99 {summary['p99']:9.1f} us  max {summary['max']:9.1f} us")
+    offset = stats["clock"]["offset_ns"] / 1e9
+    print(f"clock offset {offset:.6f} s (true -100 s + the fastest NAV-PVT delay of 50 ms and its read)")
+
+    plain = min(replay(reads) for _ in range(RUNS))
+    stamped = min(replay(reads, FrameTiming(BAUD_RATE)) for _ in range(RUNS))
+    count = len(frames)
+    print(f"framer only            {plain / count * 1e6:6.2f} us/frame")
+    print(f"framer + Frame timing  {stamped / count * 1e6:6.2f} us/frame")
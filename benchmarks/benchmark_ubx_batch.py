@@ -0,0 +1,47 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to compare batch NumPy decoding with the per-frame decoder
+"""
+import time
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_framer import UbloxFramer
+from pyublox.ubx_decoder import UBXDecoder
+from pyublox.ubx_batch import UBXBatchDecoder
+from benchmarks.ubx_samples import mixed_stream
+
+
+def per_frame(stream):
+    # What post-processing scripts do today: frame, decode, then read the attributes back out
+    decoder = UBXDecoder()
+    rows = []
+    def on_frame(frame):
+        if frame[2] == UbloxConst.CLASS_ESF and frame[3] == UbloxConst.ID_MEAS:
+            decoder.decode(frame)
+            meas = decoder.meas
+            rows.append((meas.AccelX, meas.AccelY, meas.AccelZ, meas.GyroX, meas.GyroY, meas.GyroZ))
+    UbloxFramer(callback=on_frame).feed(stream)
+    return len(rows)
+
+
+def batch(stream):
+    meas = UBXBatchDecoder.decode(stream, UbloxConst.CLASS_ESF, UbloxConst.ID_MEAS)
+    values = meas["dataField"] / UbloxConst.D1024
+    columns = {data_type: values[meas["dataType"] == data_type] for data_type in (16, 17, 18, 14, 13, 5)}
+    return len(columns[16])
+
+
+def timed(name, run, stream):
+    start = time.perf_counter()
+    count = run(stream)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12} {elapsed:8.3f} s {count / elapsed:14.0f} ESF-MEAS/s")
+    return elapsed
+
+
+if __name__ == "__main__":
+    stream, _ = mixed_stream(epochs=3000)
+    print(f"log: {len(stream) / 1e6:.1f} MB")
+    slow = timed("per frame", per_frame, stream)
+    fast = timed("batch", batch, stream)
+    print(f"speedup: {slow / fast:.1f}x")
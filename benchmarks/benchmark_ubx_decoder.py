@@ -0,0 +1,67 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to time UBX message decoding per message type
+"""
+import random
+import struct
+import timeit
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_utility import UbloxUtils
+from pyublox.ubx_decoder import UBXDecoder
+from pyublox.ubx_messages import UBXMessage
+from benchmarks.ubx_samples import ubx_frame, esf_meas, esf_alg, nav_pvt
+
+
+def legacy_meas(recv_data):
+    # Copy of the original UBXDecoder.MEAS.decode, without the prints
+    result = {}
+    num_meas = (recv_data[11] & 0xF8) >> 3
+    checksum = UbloxUtils.ubx_checksum(recv_data)
+    if checksum == recv_data[-2:]:
+        for i in range(num_meas):
+            data = recv_data[6 + 8 + i * 4 : 6 + 8 + i * 4 + 4]
+            data_field = int.from_bytes(data[0:3], byteorder='little', signed=True)
+            result[data[3] & 0x3F] = data_field / UbloxConst.D1024
+    return result
+
+
+def legacy_alg(recv_data):
+    # Copy of the original UBXDecoder.ALG.decode (no checksum check)
+    data = recv_data[6 + 8: 6 + 8 + 8]
+    yaw = int.from_bytes(data[0:4], byteorder='little', signed=True) / UbloxConst.D100
+    pitch = int.from_bytes(data[4:6], byteorder='little', signed=True) / UbloxConst.D100
+    roll = int.from_bytes(data[6:8], byteorder='little', signed=True) / UbloxConst.D100
+    return yaw, pitch, roll
+
+
+def sample_frames():
+    rng = random.Random(1)
+    nav_sat = ubx_frame(0x01, 0x35, struct.pack("<IBB2x", 1000, 1, 30) +
+                        b"".join(struct.pack("<BBBbhhI", 0, sv, 40, 30, 120, 5, 0) for sv in range(30)))
+    rawx = ubx_frame(0x02, 0x15, struct.pack("<dHbBBB2x", 1.0, 2300, 18, 32, 1, 1) + bytes(32 * 32))
+    return {
+        "ESF-MEAS": esf_meas(1000, rng),
+        "ESF-ALG": esf_alg(1000, rng),
+        "NAV-PVT": nav_pvt(1000, rng),
+        "NAV-SAT": nav_sat,
+        "RXM-RAWX": rawx,
+        "TIM-TP": ubx_frame(0x0D, 0x01, struct.pack("<IIiHBB", 1000, 0, 0, 2300, 0, 0)),
+    }
+
+
+def per_call_us(function, frame, number=20000):
+    return min(timeit.repeat(lambda: function(frame), number=number, repeat=3)) / number * 1e6
+
+
+if __name__ == "__main__":
+    frames = sample_frames()
+    decoder = UBXDecoder()
+    print(f"{'message':<10} {'legacy':>10} {'unpack only':>12} {'UBXDecoder':>12} {'verify=False':>13}  (us per message)")
+    unverified = lambda frame: decoder.decode(frame, verify=False)
+    for name, frame in frames.items():
+        definition = UBXMessage.lookup(frame[2], frame[3])
+        legacy = {"ESF-MEAS": legacy_meas, "ESF-ALG": legacy_alg}.get(name)
+        legacy_us = f"{per_call_us(legacy, frame):10.2f}" if legacy else f"{'-':>10}"
+        print(f"{name:<10} {legacy_us} {per_call_us(definition.decode, frame):12.2f} {per_call_us(decoder.decode, frame):12.2f} "
+              f"{per_call_us(unverified, frame):13.2f}")
@@ -0,0 +1,84 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to generate synthetic ublox streams for the benchmarks
+"""
+import random
+import struct
+from pyublox.ublox_utility import UbloxUtils
+
+GGA = b"$GNGGA,202530.00,3352.4538,N,11720.4815,W,4,12,0.71,402.1,M,-33.1,M,1.0,0000*"
+VTG = b"$GNVTG,77.52,T,,M,0.004,N,0.008,K,R*"
+
+
+def ubx_frame(msg_class, msg_id, payload):
+    frame = b"\xb5\x62" + bytes([msg_class, msg_id]) + struct.pack("<H", len(payload)) + payload + b"\x00\x00"
+    return frame[:-2] + UbloxUtils.ubx_checksum(frame)
+
+
+def nmea_frame(sentence):
+    checksum = 0
+    for byte in sentence[1:-1]:
+        checksum ^= byte
+    return sentence + format(checksum, "02X").encode() + b"\r\n"
+
+
+def esf_meas(time_tag, rng):
+    words = b"".join(struct.pack("<I", (rng.randrange(-2**23, 2**23) & 0xFFFFFF) | data_type << 24)
+                     for data_type in (14, 13, 5, 16, 17, 18))
+    return ubx_frame(0x10, 0x02, struct.pack("<IHH", time_tag, 6 << 11, 0) + words)
+
+
+def esf_alg(itow, rng):
+    return ubx_frame(0x10, 0x14, struct.pack("<IBBBBihh", itow, 1, 0, 0, 0,
+                                             rng.randrange(0, 36000), rng.randrange(-9000, 9000), rng.randrange(-18000, 18000)))
+
+
+def nav_pvt(itow, rng):
+    return ubx_frame(0x01, 0x07, struct.pack("<I", itow) + bytes(rng.randrange(256) for _ in range(88)))
+
+
+def rtcm_frame(msg_type, body_length, rng):
+    payload = struct.pack(">H", msg_type << 4) + bytes(rng.randrange(256) for _ in range(body_length))
+    frame = bytes((0xD3, len(payload) >> 8, len(payload) & 0xFF)) + payload
+    return frame + UbloxUtils.crc24q(frame).to_bytes(3, "big")
+
+
+def rtcm_stream(epochs=1000, seed=1):
+    """RTCM3 output of a 1 Hz GPS/GLONASS/Galileo/BeiDou MSM7 base station with 1005 and 1033 every 10 s."""
+    rng = random.Random(seed)
+    frames = []
+    for epoch in range(epochs):
+        for msg_type, body_length in ((1077, 420), (1087, 330), (1097, 380), (1127, 360), (1230, 10)):
+            frames.append(rtcm_frame(msg_type, body_length, rng))
+        if epoch % 10 == 0:
+            frames.append(rtcm_frame(1005, 17, rng))
+            frames.append(rtcm_frame(1033, 60, rng))
+    return b"".join(frames), len(frames)
+
+
+def nav_eoe(itow):
+    return ubx_frame(0x01, 0x61, struct.pack("<I", itow))
+
+
+def mixed_stream(epochs=1000, imu_per_epoch=10, seed=1, first_epoch=0, eoe=False):
+    """
+    Builds a byte stream similar to a 10 Hz F9R configured with high-rate ESF output.
+    With eoe=True every epoch ends with NAV-EOE.
+
+    Returns:
+        tuple: (stream bytes, number of frames in the stream)
+    """
+    rng = random.Random(seed)
+    frames = []
+    for epoch in range(first_epoch, first_epoch + epochs):
+        itow = 100000 + epoch * 100
+        for i in range(imu_per_epoch):
+            frames.append(esf_meas(itow * 10 + i, rng))
+        frames.append(nav_pvt(itow, rng))
+        frames.append(esf_alg(itow, rng))
+        frames.append(nmea_frame(GGA))
+        frames.append(nmea_frame(VTG))
+        if eoe:
+            frames.append(nav_eoe(itow))
+    return b"".join(frames), len(frames)
@@ -0,0 +1,397 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to run ublox receivers and NTRIP corrections on one asyncio event loop
+"""
+import asyncio
+import os
+import time
+import serial
+from pyublox.ublox_framer import UbloxFramer
+from pyublox.ubx_decoder import UBXDecoder
+from pyublox.nmea_reader import NMEAReader
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_utility import UbloxUtils
+from pyublox.ntrip_socket_connection import NTRIPSession, rtcm_framer_metrics
+from pyublox.rtcm_framer import RTCMFramer
+from pyublox.ublox_logging import get_logger
+from pyublox.metrics import Sample
+
+logger = get_logger(__name__)
+
+
+class AsyncNTRIPClient(NTRIPSession):
+    """
+    asyncio version of NTRIPSocketConnection: the same NTRIPSession logic (GGA uploads,
+    stall detection, reconnects with backoff and failover) over asyncio streams.
+
+    Every chunk of RTCM bytes is passed to callback, e.g. RTCMFramer.feed.
+    """
+    READ_SIZE = 65536
+
+    def __init__(self, host, port, username, password, callback, mountpoint=None, **options):
+        """
+        Args:
+            callback (function): Called with the RTCM bytes of every chunk received.
+            options: Session arguments of NTRIPSession (gga_source, gga_interval, read_timeout...).
+        """
+        super().__init__(host, port, username, password, mountpoint, **options)
+        self.__callback = callback
+        self.__task = None
+
+    def start(self):
+        """
+        Returns:
+            asyncio.Task: The task keeping a session with the caster up until stop().
+        """
+        if self.__task is None or self.__task.done():
+            self.__task = asyncio.get_running_loop().create_task(self.__run())
+        return self.__task
+
+    async def stop(self):
+        task, self.__task = self.__task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def __run(self):
+        try:
+            while True:
+                await self.__session()
+                delay = self.session_ended()
+                if delay is None:
+                    return
+                await asyncio.sleep(delay)
+                self.reconnects += 1
+        except asyncio.CancelledError:
+            self.session_ended(stopped=True)
+            raise
+
+    async def __session(self):
+        writer = None
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.read_timeout)
+            writer.write(self.request())
+            while True:
+                gga = self.gga()
+                if gga:
+                    writer.write(gga)
+                reason = self.expired()
+                if reason:
+                    logger.error("__read: %s", reason)
+                    return
+                try:
+                    data = await asyncio.wait_for(reader.read(self.READ_SIZE), self.wait())
+                except asyncio.TimeoutError:
+                    continue
+                if not data:
+                    logger.error("__read: connection closed by the caster")
+                    return
+                data = self.feed(data)
+                if data is None:
+                    return
+                if data:
+                    self.__callback(data)
+        except (OSError, asyncio.TimeoutError) as e:
+            logger.error("__read: %s", e or "connection timed out")
+        finally:
+            if writer is not None:
+                writer.close()
+
+class AsyncPythonUblox:
+    """
+    asyncio version of PythonUblox, without any thread.
+
+    The serial port is opened non-blocking and registered with loop.add_reader(), so
+    bytes are read and framed only when the port is readable. Frames are handed out by
+    the async generator frames(). write() never blocks the loop: bytes go to an output
+    buffer of the device which is written whenever the port is writable
+    (loop.add_writer()), up to max_output bytes, beyond which writes are dropped and
+    counted in bytes_dropped. RTCM corrections come from an AsyncNTRIPClient on the same
+    loop. Many receivers can share one loop:
+
+        async with AsyncPythonUblox() as ublox:
+            await ublox.connect(460800, "/dev/ttyACM0")
+            await ublox.enable_RTK(credential)
+            async for frame in ublox.frames():
+                ublox.nmea.decode(frame)
+
+    On event loops without add_reader() (the Windows proactor loop) the port is polled
+    (read, and written without waiting) every poll_interval seconds instead.
+    """
+    READ_SIZE = 65536
+
+    def __init__(self, history_size=0, max_queue=4096, poll_interval=0.005, max_output=1 << 20):
+        """
+        Args:
+            history_size (int): Keep the last records of every message, see PythonUblox.
+            max_queue (int): Frames waiting in frames(), the oldest are dropped (and counted) beyond it.
+            poll_interval (float): Read period in seconds when add_reader() is not available.
+            max_output (int): Bytes waiting to be written to the receiver before write() drops data.
+        """
+        self.nmea = NMEAReader(history_size)
+        self.ubx = UBXDecoder(history_size)
+        self.framer = UbloxFramer(callback=self.__on_frame)
+        self.frames_dropped = 0
+        self.rtcm_bytes = 0
+        self.rtcm_framer = None
+        self.ntrip = None
+        self.bytes_written = 0
+        self.bytes_dropped = 0
+        self.__max_queue = max_queue
+        self.__max_output = max_output
+        self.__output = bytearray() # bytes waiting for the port to be writable
+        self.__writing = False # the fd is registered with add_writer()
+        self.__poll_interval = poll_interval
+        self.__queue = None
+        self.__loop = None
+        self.__serial_conn = None
+        self.__device_port = None
+        self.__fd = None
+        self.__poll_task = None
+        self.__position = None # future waiting for the first GGA with a position
+        self.__gga_frame = None # latest GGA sentence, decoded when the NTRIP client uploads it
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def connect(self, baud_rate=38400, device_port=None):
+        if device_port is None:
+            device_port = UbloxUtils.find_ublox_device(UbloxConst.UBLOX_DEVICE)
+        if device_port is None:
+            raise ValueError("No Device found.")
+        self.__loop = asyncio.get_running_loop()
+        self.__queue = asyncio.Queue()
+        self.__device_port = device_port
+        # timeout=0 makes read() return what the driver holds instead of blocking
+        # write_timeout=0 makes write() return without waiting in the poll mode
+        self.__serial_conn = serial.Serial(device_port, baud_rate, timeout=0, write_timeout=0)
+        try:
+            self.__fd = self.__serial_conn.fileno()
+            os.set_blocking(self.__fd, False) # os.write() then takes what the driver accepts
+            self.__loop.add_reader(self.__fd, self.__on_readable)
+        except (AttributeError, NotImplementedError):
+            self.__fd = None
+            self.__poll_task = self.__loop.create_task(self.__poll())
+        logger.info("Connected to UBLOX on port %s", device_port)
+
+    def __on_readable(self):
+        try:
+            data = self.__serial_conn.read(self.READ_SIZE)
+        except serial.SerialException as e:
+            logger.error("__read: %s", e)
+            self.__stop_reading()
+            return
+        if data:
+            self.framer.feed(data, time.monotonic_ns())
+
+    async def __poll(self):
+        while self.__serial_conn is not None:
+            self.__on_readable()
+            if self.__output:
+                self.__on_writable()
+            await asyncio.sleep(self.__poll_interval)
+
+    def __on_frame(self, frame):
+        queue = self.__queue
+        if queue.qsize() >= self.__max_queue:
+            queue.get_nowait()
+            self.frames_dropped += 1
+        queue.put_nowait(frame)
+        if frame[3:6] == UbloxConst.SF_GGA:
+            self.__gga_frame = frame
+            if self.__position is not None and not self.__position.done():
+                gga = self.__latest_gga()
+                if gga.lat is not None:
+                    self.__position.set_result(gga)
+
+    def __latest_gga(self):
+        """Returns the record of the latest GGA sentence received, whether or not the application decoded it."""
+        frame = self.__gga_frame
+        values = self.nmea.decode(frame, raw=True) if frame is not None else None
+        return NMEAReader.GGA.from_values(values) if values is not None else self.nmea.gga
+
+    def __stop_reading(self):
+        self.__output.clear()
+        self.__set_writing(False)
+        if self.__fd is not None:
+            self.__loop.remove_reader(self.__fd)
+            self.__fd = None
+        if self.__poll_task is not None:
+            self.__poll_task.cancel()
+            self.__poll_task = None
+        if self.__serial_conn is not None:
+            self.__serial_conn.close()
+            self.__serial_conn = None
+        if self.__queue is not None:
+            self.__queue.put_nowait(None) # wakes up frames()
+
+    async def frames(self):
+        """
+        Yields every frame received from the receiver until close() or a serial error.
+
+        Yields:
+            bytes: One complete UBX or NMEA frame.
+        """
+        queue = self.__queue
+        if queue is None:
+            raise ValueError("Must connect ublox before reading frames.")
+        while True:
+            frame = await queue.get()
+            if frame is None:
+                return
+            yield frame
+
+    def write(self, data):
+        """
+        Queues bytes for the receiver (UBX commands, RTCM corrections) without blocking.
+
+        Returns:
+            bool: False if the data was dropped (not connected, or max_output bytes already waiting).
+        """
+        if self.__serial_conn is None:
+            return False
+        if len(self.__output) + len(data) > self.__max_output:
+            self.bytes_dropped += len(data)
+            logger.warning("write: %d bytes waiting for the port, %d bytes dropped", len(self.__output), len(data))
+            return False
+        pending = bool(self.__output)
+        self.__output += data
+        if not pending:
+            self.__on_writable() # the port is usually writable, most writes complete here
+        return True
+
+    def __on_writable(self):
+        try:
+            if self.__fd is not None:
+                written = os.write(self.__fd, self.__output)
+            else:
+                written = self.__serial_conn.write(self.__output) or 0
+        except (BlockingIOError, serial.SerialTimeoutException):
+            written = 0
+        except (OSError, serial.SerialException) as e:
+            logger.error("write: %s", e)
+            self.bytes_dropped += len(self.__output)
+            self.__output.clear()
+            self.__set_writing(False)
+            return
+        del self.__output[:written]
+        self.bytes_written += written
+        self.__set_writing(bool(self.__output))
+
+    def __set_writing(self, writing):
+        # only the add_reader() mode registers the fd, the poll mode writes from __poll()
+        if writing == self.__writing or self.__fd is None:
+            return
+        if writing:
+            self.__loop.add_writer(self.__fd, self.__on_writable)
+        else:
+            self.__loop.remove_writer(self.__fd)
+        self.__writing = writing
+
+    async def enable_RTK(self, credential, mountpoint=None, position_timeout=10, allow=None, deny=None, gga_interval=10,
+                         read_timeout=10, reconnect=True):
+        """
+        Starts forwarding the RTCM stream of the NTRIP caster to the receiver.
+
+        Only complete, CRC-valid RTCM3 frames whose type passes allow/deny are written,
+        see RTCMFramer. The framer is available as self.rtcm_framer for its counters, and the
+        AsyncNTRIPClient as self.ntrip. The latest GGA is sent to the caster every
+        gga_interval seconds, and the session is reopened after read_timeout seconds
+        without data or when it is lost.
+
+        Without a mountpoint, the nearest one is picked once a GGA sentence with a position
+        has been received (within position_timeout seconds).
+
+        Returns:
+            asyncio.Task: The task reading the corrections.
+        """
+        if not credential:
+            raise ValueError("Credentials must be provided when RTK is enabled.")
+        if self.__serial_conn is None:
+            raise ValueError("Must connect ublox before enable RTK.")
+        self.rtcm_framer = RTCMFramer(callback=self.write, allow=allow, deny=deny)
+        ntrip = AsyncNTRIPClient(credential["host"], int(credential["port"]), credential["username"], credential["password"],
+                                 self.__on_rtcm, mountpoint, gga_source=self.__latest_gga, gga_interval=gga_interval,
+                                 read_timeout=read_timeout, reconnect=reconnect)
+        if mountpoint is None:
+            self.__position = self.__loop.create_future()
+            try:
+                gga = await asyncio.wait_for(self.__position, position_timeout)
+            except asyncio.TimeoutError:
+                logger.error("NTRIP connection failed: Timeout waiting for GPS coordinates.")
+                return None
+            finally:
+                self.__position = None
+            # The sourcetable request is a short blocking exchange, keep it off the loop
+            if await self.__loop.run_in_executor(None, ntrip.find_mountpoint, gga.lat, gga.lon) is None:
+                return None
+        self.ntrip = ntrip
+        return ntrip.start()
+
+    def __on_rtcm(self, data):
+        self.rtcm_bytes += len(data)
+        self.rtcm_framer.feed(data)
+
+    def metrics(self):
+        """
+        Collector for MetricsRegistry.add_collector: serial bytes written and dropped, and the
+        NTRIP session and RTCM framer counters once RTK is enabled.
+
+        Returns:
+            list: Sample tuples.
+        """
+        port = dict(port=str(self.__device_port))
+        samples = [
+            Sample("serial_bytes_received_total", "counter", "Bytes read from the receiver", port, self.framer.bytes_received),
+            Sample("serial_bytes_written_total", "counter", "Bytes written to the receiver", port, self.bytes_written),
+            Sample("serial_bytes_dropped_total", "counter", "Bytes not written, the output buffer was full", port, self.bytes_dropped),
+            Sample("serial_output_bytes", "gauge", "Bytes waiting for the port to be writable", port, len(self.__output)),
+            Sample("frames_dropped_total", "counter", "Frames dropped, frames() was not read fast enough", port, self.frames_dropped),
+        ]
+        ntrip = self.ntrip
+        if ntrip is not None:
+            caster = dict(caster=f"{ntrip.host}:{ntrip.port}")
+            samples += ntrip.session_metrics(caster) + rtcm_framer_metrics(self.rtcm_framer, caster)
+        return samples
+
+    async def close(self):
+        if self.ntrip is not None:
+            await self.ntrip.stop()
+            self.ntrip = None
+        self.__stop_reading()
+
+
+async def run_many(device_ports, baud_rate=38400, callback=None):
+    """
+    Reads several receivers in one event loop.
+
+    Args:
+        device_ports (list): Serial ports of the receivers.
+        baud_rate (int): Baud rate of every receiver.
+        callback (function): Called with (device_port, frame) for every frame.
+    """
+    async def consume(port):
+        async with AsyncPythonUblox() as ublox:
+            await ublox.connect(baud_rate, port)
+            async for frame in ublox.frames():
+                if callback:
+                    callback(port, frame)
+    await asyncio.gather(*(consume(port) for port in device_ports))
+
+
+# Example usage
+if __name__ == "__main__":
+    async def main():
+        async with AsyncPythonUblox() as ublox:
+            await ublox.connect(38400)
+            async for frame in ublox.frames():
+                if frame[0:2] == UbloxConst.HEADER_NMEA:
+                    print(ublox.nmea.decode(frame))
+    asyncio.run(main())
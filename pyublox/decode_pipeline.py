@@ -0,0 +1,270 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to decode frames in worker processes through a shared memory ring
+"""
+import multiprocessing
+import threading
+import time
+from collections import deque
+from multiprocessing import shared_memory
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_utility import UbloxUtils
+from pyublox.ubx_decoder import UBXDecoder
+from pyublox.nmea_reader import NMEAReader
+from pyublox.ubx_messages import UBXMessage
+
+
+class SharedFrameRing:
+    """
+    Byte ring in shared memory holding batches of frames back to back.
+
+    Only the process that created it writes: allocate() returns the offset of a contiguous
+    region for one batch (a batch never wraps around the end, the tail end is skipped
+    instead), and release() frees it once the batch is decoded. Batches may be released in
+    any order, the space is reused once every older batch is released too.
+    """
+    def __init__(self, size=8 << 20):
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.name = self.shm.name
+        self.size = size
+        self.__head = 0 # next write offset
+        self.__live = deque() # [sequence, start, released] of every batch not freed yet, oldest first
+        self.__index = {} # sequence -> entry of __live
+
+    def allocate(self, sequence, length):
+        """
+        Returns:
+            int or None: Offset of length free bytes, None if the ring is too full.
+        """
+        live = self.__live
+        if not live:
+            start = 0
+        else:
+            tail = live[0][1]
+            head = self.__head
+            if head >= tail: # used bytes are [tail, head)
+                if head + length <= self.size:
+                    start = head
+                elif length < tail: # strictly, head == tail would read as an empty ring
+                    start = 0
+                else:
+                    return None
+            elif head + length < tail: # used bytes wrap: [tail, size) and [0, head)
+                start = head
+            else:
+                return None
+        entry = [sequence, start, False]
+        live.append(entry)
+        self.__index[sequence] = entry
+        self.__head = start + length
+        return start
+
+    def write(self, offset, frames):
+        buffer = self.shm.buf
+        for frame in frames:
+            end = offset + len(frame)
+            buffer[offset:end] = frame
+            offset = end
+
+    def release(self, sequence):
+        entry = self.__index.pop(sequence, None)
+        if entry is None:
+            return
+        entry[2] = True
+        live = self.__live
+        while live and live[0][2]:
+            live.popleft()
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def ring_worker(ring_name, tasks, results):
+    """
+    Decodes the batches of the ring until it receives None.
+
+    Args:
+        ring_name (str): Name of the SharedFrameRing memory.
+        tasks: Queue of (sequence, offset, frame lengths).
+        results: Queue receiving (sequence, [(is_ubx, name, record), ...], frames not decoded).
+    """
+    shm = shared_memory.SharedMemory(name=ring_name)
+    buffer = shm.buf
+    nmea = NMEAReader()
+    ubx = UBXDecoder()
+    registry = UBXMessage.REGISTRY
+    header_ubx = UbloxConst.HEADER_UBX
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            sequence, offset, lengths = task
+            records = []
+            failed = 0
+            for length in lengths:
+                frame = buffer[offset:offset + length] # decoded in place, frames are never pickled
+                offset += length
+                if frame[0:2] == header_ubx:
+                    record = ubx.decode(frame, verify=False) # checked by the framer of the reading process
+                    if record is not None:
+                        records.append((True, registry[(frame[2], frame[3])].name, record))
+                else:
+                    record = nmea.decode(frame)
+                    if record is not None:
+                        records.append((False, type(record).__name__.lower(), record))
+                frame.release()
+                if record is None:
+                    failed += 1
+            results.put((sequence, records, failed))
+    finally:
+        del buffer
+        shm.close()
+
+
+class DecodePipeline:
+    """
+    Decodes frames in a pool of processes, outside of the GIL of the reading process.
+
+    feed() copies a batch of frames (e.g. the frames of one serial read, see
+    UBloxSerialConnection.set_batch_callback) into a SharedFrameRing and queues only its
+    offset and frame lengths; the workers decode the frames straight from the shared
+    memory. The records come back through a result queue and are published into nmea and
+    ubx (see NMEAReader.publish and UBXDecoder.publish) then passed to callback(name, record)
+    by a collector thread.
+
+    With ordered=True records are published in feed order, which keeps state built across
+    messages (UBXDecoder.meas) and the order seen by the callback identical to decoding in
+    one thread. With ordered=False a batch is published as soon as it is decoded, which
+    avoids waiting for a slow batch but may reorder batches.
+
+    When the ring is full, feed() waits up to block seconds for the workers to catch up,
+    then drops the batch (counted in frames_dropped).
+    """
+    def __init__(self, nmea=None, ubx=None, callback=None, workers=2, ring_size=8 << 20, ordered=True, block=1.0):
+        self.nmea = nmea if nmea is not None else NMEAReader()
+        self.ubx = ubx if ubx is not None else UBXDecoder()
+        self.__callback = callback
+        self.__workers_count = max(1, workers)
+        self.__ring_size = ring_size
+        self.__ordered = ordered
+        self.__block = block
+        self.__ring = None
+        self.__tasks = None
+        self.__results = None
+        self.__workers = []
+        self.__collector = None
+        self.__space = threading.Condition()
+        self.__sequence = 0
+        # counters
+        self.batches = 0
+        self.frames = 0
+        self.frames_dropped = 0
+        self.frames_undecoded = 0
+        self.records = 0
+
+    def set_callback(self, callback):
+        self.__callback = callback
+
+    def start(self):
+        context = multiprocessing.get_context("spawn")
+        self.__ring = SharedFrameRing(self.__ring_size)
+        self.__tasks = context.Queue()
+        self.__results = context.Queue()
+        for _ in range(self.__workers_count):
+            worker = context.Process(target=ring_worker, args=(self.__ring.name, self.__tasks, self.__results), daemon=True)
+            worker.start()
+            self.__workers.append(worker)
+        self.__collector = threading.Thread(target=self.__collect, daemon=True)
+        self.__collector.start()
+
+    def feed(self, frames):
+        """Queues a list of complete frames for decoding."""
+        if not frames:
+            return
+        lengths = [len(frame) for frame in frames]
+        total = sum(lengths)
+        with self.__space:
+            sequence = self.__sequence
+            offset = self.__ring.allocate(sequence, total) if total <= self.__ring.size else None
+            deadline = time.monotonic() + self.__block
+            while offset is None and total <= self.__ring.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.__space.wait(remaining)
+                offset = self.__ring.allocate(sequence, total)
+            if offset is None:
+                self.frames_dropped += len(frames)
+                return
+            self.__sequence += 1
+        self.__ring.write(offset, frames)
+        self.batches += 1
+        self.frames += len(frames)
+        self.__tasks.put((sequence, offset, lengths))
+
+    def __collect(self):
+        waiting = {} # sequence -> decoded batch, ordered mode only
+        next_sequence = 0
+        while True:
+            result = self.__results.get()
+            if result is None: # sent by stop() once every worker is done
+                break
+            sequence, records, failed = result
+            with self.__space:
+                self.__ring.release(sequence)
+                self.__space.notify_all()
+            self.frames_undecoded += failed
+            if not self.__ordered:
+                self.__publish(records)
+                continue
+            waiting[sequence] = records
+            while next_sequence in waiting:
+                self.__publish(waiting.pop(next_sequence))
+                next_sequence += 1
+
+    def __publish(self, records):
+        nmea = self.nmea
+        ubx = self.ubx
+        callback = self.__callback
+        for is_ubx, name, record in records:
+            if is_ubx:
+                ubx.publish(name, record)
+            else:
+                nmea.publish(name, record)
+            if callback:
+                callback(name, record)
+        self.records += len(records)
+
+    def stop(self):
+        """Decodes what is queued, then stops the workers and frees the ring."""
+        for _ in self.__workers:
+            self.__tasks.put(None)
+        for worker in self.__workers:
+            worker.join()
+        self.__workers = []
+        if self.__collector:
+            self.__results.put(None)
+            self.__collector.join()
+            self.__collector = None
+        if self.__ring:
+            self.__ring.close()
+            self.__ring = None
+
+
+# Example usage
+if __name__ == "__main__":
+    from pyublox.ublox_serial_connection import UBloxSerialConnection
+    pipeline = DecodePipeline(workers=4, callback=lambda name, record: print(name, record))
+    pipeline.start()
+    ublox_connection = UBloxSerialConnection(UbloxUtils.find_ublox_device(UbloxConst.UBLOX_DEVICE), 460800)
+    ublox_connection.set_batch_callback(pipeline.feed)
+    ublox_connection.connect()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        ublox_connection.disconnect()
+        pipeline.stop()
@@ -0,0 +1,219 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to group the messages of one navigation epoch into a single object
+"""
+import queue
+import threading
+import time
+from collections import namedtuple
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ubx_messages import UBXMessage
+
+
+class Epoch(namedtuple("Epoch", ("itow", "utc", "records", "first_ns", "emit_ns", "complete"))):
+    """
+    All the messages of one navigation solution.
+
+    itow: GPS time of week (ms) of the NAV messages, None if no NAV message was received
+    utc: UTC time of the NMEA sentences (datetime.time), None if no timed sentence was received
+    records: message name ("GGA", "NAV-PVT", "ESF-ALG"...) -> last record received in the epoch
+    first_ns: time.monotonic_ns() when the first message of the epoch was received (read time of its first byte for Frame objects)
+    emit_ns: time.monotonic_ns() when the epoch was emitted
+    complete: True if closed by NAV-EOE, False if closed by the next epoch, a timeout or flush()
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.records[key]
+        return super().__getitem__(key)
+
+    def get(self, name, default=None):
+        return self.records.get(name, default)
+
+    @property
+    def latency_ns(self):
+        """Time between the first message of the epoch and its delivery."""
+        return self.emit_ns - self.first_ns
+
+
+class EpochAggregator:
+    """
+    Groups decoded NMEA and UBX messages by navigation epoch and delivers one Epoch per solution.
+
+    Frames are decoded with the given NMEAReader and UBXDecoder (so their attributes keep
+    being updated) and collected until the epoch ends. An epoch ends when:
+        - NAV-EOE arrives (the receiver has sent every periodic message of the epoch),
+        - a NAV message carries a different iTOW, or a timed NMEA sentence a different UTC time,
+        - no NAV-EOE arrived timeout seconds after the first message of the epoch.
+
+    Only NAV messages and NMEA sentences open new epochs. Other time-tagged messages
+    (ESF-ALG, ESF-INS...) run on their own clock and are attached to the current epoch.
+    Completed epochs are passed to the callback and/or put on the queue from the thread
+    that fed the frame, or from the timeout watchdog thread.
+    """
+    EOE_KEY = (UbloxConst.CLASS_NAV, 0x61)
+
+    def __init__(self, nmea, ubx, callback=None, queue=None, timeout=0.5, include=None, timing=None):
+        """
+        Args:
+            nmea (NMEAReader): Decoder for the NMEA sentences.
+            ubx (UBXDecoder): Decoder for the UBX messages.
+            callback (function): Called with every completed Epoch.
+            queue (queue.Queue): Receives every completed Epoch, epochs are dropped and counted if it is full.
+            timeout (float): Seconds to wait for NAV-EOE after the first message of an epoch, None to disable.
+            include (iterable): Message names to keep (e.g. {"GGA", "VTG", "NAV-PVT", "ESF-ALG"}), None keeps all.
+            timing (FrameTiming): Records the "decode" stage of every frame.
+        """
+        self.__nmea = nmea
+        self.__ubx = ubx
+        self.__callback = callback
+        self.__queue = queue
+        self.__timeout_ns = int(timeout * 1e9) if timeout else None
+        self.__include = frozenset(include) if include is not None else None
+        self.__timing = timing
+        self.__lock = threading.Lock()
+        self.__records = {}
+        self.__itow = None
+        self.__utc = None
+        self.__first_ns = None
+        self.__watchdog = None
+        self.__running = False
+        # counters
+        self.epochs = 0
+        self.epochs_incomplete = 0
+        self.epochs_dropped = 0
+        self.last_latency_ns = 0
+        self.max_latency_ns = 0
+        self.total_latency_ns = 0
+
+    def set_callback(self, callback):
+        self.__callback = callback
+
+    @property
+    def mean_latency_ns(self):
+        return self.total_latency_ns // self.epochs if self.epochs else 0
+
+    def start(self):
+        """Starts the watchdog thread that closes epochs whose NAV-EOE never arrives."""
+        if self.__timeout_ns and not self.__running:
+            self.__running = True
+            self.__watchdog = threading.Thread(target=self.__watch, daemon=True)
+            self.__watchdog.start()
+
+    def stop(self):
+        self.__running = False
+        if self.__watchdog:
+            self.__watchdog.join()
+            self.__watchdog = None
+
+    def feed(self, frame):
+        """
+        Decodes one UBX or NMEA frame and adds it to the current epoch.
+
+        Args:
+            frame (bytes): A complete frame as delivered by UbloxFramer, a Frame dates the epoch from its first byte.
+                           Its UBX checksum is not checked again.
+        """
+        start = time.monotonic_ns() if self.__timing is not None else 0
+        if frame[0:2] == UbloxConst.HEADER_UBX:
+            record = self.__ubx.decode(frame, verify=False)
+            if record is None:
+                return
+            key = (frame[2], frame[3])
+            name = UBXMessage.REGISTRY[key].name
+            itow = record.iTOW if key[0] == UbloxConst.CLASS_NAV else None
+            utc = None
+            end = key == self.EOE_KEY
+        elif frame[0:2] == UbloxConst.HEADER_NMEA:
+            record = self.__nmea.decode(frame)
+            if record is None:
+                return
+            name = type(record).__name__
+            itow = None
+            utc = getattr(record, "time", None)
+            end = False
+        else:
+            return
+        if self.__timing is not None:
+            self.__timing.record("decode", time.monotonic_ns() - start)
+        self.add(name, record, itow=itow, utc=utc, end=end, time_ns=getattr(frame, "first_ns", None))
+
+    def add(self, name, record, itow=None, utc=None, end=False, time_ns=None):
+        """
+        Adds an already decoded record to the current epoch.
+
+        Args:
+            name (str): Message name, used as key in Epoch.records.
+            record: The decoded record.
+            itow (int): GPS time of week of the record if it defines the epoch (NAV messages).
+            utc (datetime.time): UTC time of the record if it defines the epoch (NMEA sentences).
+            end (bool): The record marks the end of the epoch (NAV-EOE).
+            time_ns (int): time.monotonic_ns() the record was received at, defaults to now.
+        """
+        now = time.monotonic_ns()
+        emitted = []
+        with self.__lock:
+            if self.__first_ns is not None:
+                if (itow is not None and self.__itow is not None and itow != self.__itow) or \
+                   (utc is not None and self.__utc is not None and utc != self.__utc):
+                    emitted.append(self.__close(now, False))
+                elif self.__timeout_ns and now - self.__first_ns > self.__timeout_ns:
+                    emitted.append(self.__close(now, False))
+            if self.__first_ns is None:
+                self.__first_ns = time_ns if time_ns is not None else now
+            if itow is not None:
+                self.__itow = itow
+            if utc is not None:
+                self.__utc = utc
+            if self.__include is None or name in self.__include:
+                self.__records[name] = record
+            if end:
+                emitted.append(self.__close(now, True))
+        # Delivered outside of the lock so that a slow consumer never blocks the watchdog
+        for epoch in emitted:
+            self.__deliver(epoch)
+
+    def flush(self):
+        """Emits the current epoch even though it is not complete, e.g. at the end of a capture."""
+        with self.__lock:
+            epoch = self.__close(time.monotonic_ns(), False) if self.__first_ns is not None else None
+        if epoch is not None:
+            self.__deliver(epoch)
+
+    def __close(self, now, complete):
+        epoch = Epoch(self.__itow, self.__utc, self.__records, self.__first_ns, now, complete)
+        self.__records = {}
+        self.__itow = None
+        self.__utc = None
+        self.__first_ns = None
+        latency = now - epoch.first_ns
+        self.epochs += 1
+        self.epochs_incomplete += not complete
+        self.last_latency_ns = latency
+        self.total_latency_ns += latency
+        if latency > self.max_latency_ns:
+            self.max_latency_ns = latency
+        return epoch
+
+    def __deliver(self, epoch):
+        if self.__queue is not None:
+            try:
+                self.__queue.put_nowait(epoch)
+            except queue.Full:
+                self.epochs_dropped += 1
+        if self.__callback:
+            self.__callback(epoch)
+
+    def __watch(self):
+        period = self.__timeout_ns / 4e9
+        while self.__running:
+            time.sleep(period)
+            epoch = None
+            with self.__lock:
+                now = time.monotonic_ns()
+                if self.__first_ns is not None and now - self.__first_ns > self.__timeout_ns:
+                    epoch = self.__close(now, False)
+            if epoch is not None:
+                self.__deliver(epoch)
@@ -0,0 +1,223 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to hand received frames to consumers through bounded queues
+"""
+import threading
+import time
+from collections import deque
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ubx_messages import UBXMessage
+from pyublox.ublox_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+_monotonic_ns = time.monotonic_ns
+
+
+def message_type(frame):
+    """
+    Returns:
+        str: The message name of a frame: the UBX message name ("NAV-PVT", or "UBX-01-07"
+             for messages without a definition) or the NMEA sentence formatter ("GGA").
+    """
+    if frame[0:2] == UbloxConst.HEADER_UBX:
+        definition = UBXMessage.REGISTRY.get((frame[2], frame[3]))
+        return definition.name if definition is not None else f"UBX-{frame[2]:02X}-{frame[3]:02X}"
+    return frame[3:6].decode("ascii", errors="replace")
+
+
+class Subscription:
+    """
+    One consumer of the frames, with its own bounded queue and delivery thread.
+
+    Policies when the queue is full:
+        "block": the reader waits for room (no loss, the consumer slows the reader down).
+        "drop_oldest": the oldest queued frame is dropped.
+        "drop_newest": the new frame is dropped.
+        "coalesce": only the latest frame of every message type is kept, a new frame
+                    replaces the queued one of its type (the queue never holds more than
+                    one frame per type, max_queue is not used).
+    """
+    POLICIES = ("block", "drop_oldest", "drop_newest", "coalesce")
+
+    def __init__(self, callback, types=None, policy="block", max_queue=1024, timing=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}, expected one of {self.POLICIES}")
+        self.callback = callback
+        self.types = frozenset(types) if types else None
+        self.policy = policy
+        self.max_queue = max_queue
+        self.timing = timing # FrameTiming recording the queue, callback and total stages
+        self.__queue = {} if policy == "coalesce" else deque() # coalesce: message type -> frame, in arrival order
+        self.__condition = threading.Condition()
+        self.__thread = None
+        self.__running = False
+        # counters
+        self.queued = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.high_water = 0 # deepest the queue has been
+        self.errors = 0 # exceptions raised by the callback
+
+    @property
+    def depth(self):
+        return len(self.__queue)
+
+    def start(self):
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__deliver, daemon=True)
+        self.__thread.start()
+
+    def stop(self, drain=True):
+        """Stops the delivery thread, after the queued frames are delivered if drain is True."""
+        with self.__condition:
+            if not drain:
+                self.dropped += len(self.__queue)
+                self.__queue.clear()
+            self.__running = False
+            self.__condition.notify_all()
+        if self.__thread and self.__thread is not threading.current_thread():
+            self.__thread.join()
+        self.__thread = None
+
+    def put(self, frame, name):
+        queue = self.__queue
+        with self.__condition:
+            if not self.__running:
+                return
+            if self.policy == "coalesce":
+                if name in queue:
+                    self.dropped += 1
+                queue[name] = frame
+            elif len(queue) >= self.max_queue:
+                if self.policy == "block":
+                    self.__condition.wait_for(lambda: len(queue) < self.max_queue or not self.__running)
+                    if not self.__running:
+                        return
+                    queue.append(frame)
+                elif self.policy == "drop_oldest":
+                    queue.popleft()
+                    queue.append(frame)
+                    self.dropped += 1
+                else:
+                    self.dropped += 1
+                    return
+            else:
+                queue.append(frame)
+            self.queued += 1
+            if len(queue) > self.high_water:
+                self.high_water = len(queue)
+            self.__condition.notify_all()
+
+    def __take(self):
+        queue = self.__queue
+        if self.policy == "coalesce":
+            name = next(iter(queue))
+            return queue.pop(name)
+        return queue.popleft()
+
+    def __deliver(self):
+        condition = self.__condition
+        while True:
+            with condition:
+                condition.wait_for(lambda: self.__queue or not self.__running)
+                if not self.__queue:
+                    return
+                frame = self.__take()
+                condition.notify_all() # room for a blocked put()
+            timing = self.timing
+            started_ns = _monotonic_ns() if timing is not None else 0
+            try:
+                self.callback(frame)
+            except Exception as e:
+                self.errors += 1
+                logger.error("callback error: %s", e, exc_info=True)
+            if timing is not None:
+                timing.delivered(frame, started_ns, _monotonic_ns())
+            self.delivered += 1
+
+
+class FrameDispatcher:
+    """
+    Decouples the serial reader from the consumers of its frames.
+
+    publish() runs on the reader thread and only classifies the frame and appends it to the
+    queue of every interested subscription; each subscription calls its callback on its own
+    thread, so a slow consumer (e.g. a CSV writer) never holds the reader back unless it
+    asked for the "block" policy. Subscriptions filtered by message type (see
+    message_type()) only receive, and only pay for, the frames they asked for.
+    """
+    def __init__(self, timing=None):
+        self.__subscriptions = ()
+        self.__timing = timing
+        self.__lock = threading.Lock()
+        self.published = 0
+
+    @property
+    def subscriptions(self):
+        return self.__subscriptions
+
+    def subscribe(self, callback, types=None, policy="block", max_queue=1024):
+        """
+        Args:
+            callback (function): Called with each frame, on the thread of the subscription.
+            types (iterable): Message types to receive, e.g. {"GGA", "NAV-PVT"}, None for all.
+            policy (str): What to do when the queue is full, see Subscription.
+            max_queue (int): Frames the queue holds.
+
+        Returns:
+            Subscription: The started subscription, pass it to unsubscribe() (counters: queued,
+                          delivered, dropped, high_water, depth).
+        """
+        subscription = Subscription(callback, types, policy, max_queue, self.__timing)
+        subscription.start()
+        with self.__lock:
+            # publish() iterates a tuple without locking, it is replaced and never modified
+            self.__subscriptions = self.__subscriptions + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription, drain=True):
+        with self.__lock:
+            self.__subscriptions = tuple(item for item in self.__subscriptions if item is not subscription)
+        subscription.stop(drain)
+
+    def publish(self, frame):
+        subscriptions = self.__subscriptions
+        if not subscriptions:
+            return
+        self.published += 1
+        name = None
+        for subscription in subscriptions:
+            if subscription.types is not None or subscription.policy == "coalesce":
+                if name is None:
+                    name = message_type(frame)
+                if subscription.types is not None and name not in subscription.types:
+                    continue
+            subscription.put(frame, name)
+
+    def stats(self):
+        """
+        Returns:
+            list: One dict of counters per subscription.
+        """
+        return [dict(types=sorted(subscription.types) if subscription.types else None, policy=subscription.policy,
+                     queued=subscription.queued, delivered=subscription.delivered, dropped=subscription.dropped,
+                     depth=subscription.depth, high_water=subscription.high_water, errors=subscription.errors)
+                for subscription in self.__subscriptions]
+
+    def close(self, drain=True):
+        for subscription in self.__subscriptions:
+            self.unsubscribe(subscription, drain)
+
+
+# Example usage
+if __name__ == "__main__":
+    dispatcher = FrameDispatcher()
+    dispatcher.subscribe(lambda frame: time.sleep(0.01), policy="drop_oldest", max_queue=4)
+    dispatcher.subscribe(print, types={"GGA"})
+    for _ in range(10):
+        dispatcher.publish(b"$GPGGA,,,,,,0,00,99.99,,,,,,*48\r\n")
+    dispatcher.close()
+    print(dispatcher.stats())
@@ -0,0 +1,290 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to measure where received frames spend their time and how the host clock relates to GNSS time
+"""
+import threading
+import time
+from collections import deque
+from pyublox.ublox_constants import UbloxConst
+
+WEEK_NS = 604800 * 10 ** 9
+
+
+class LatencyHistogram:
+    """
+    Histogram of durations in nanoseconds with logarithmic buckets.
+
+    Every power of two is split in 16 buckets (at most 6% wide), from 1 ns to days, so
+    record() is a few integer operations and percentiles are within one bucket whatever
+    the range of the values. count, total, min and max are exact.
+
+    record() takes no lock: it runs on every frame, and a histogram recorded from several
+    threads at once may only miss an increment now and then, which does not change the
+    statistics.
+    """
+    SUB_BITS = 4
+    SUB_BUCKETS = 1 << SUB_BITS
+    BUCKETS = (48 - SUB_BITS + 1) * SUB_BUCKETS # up to 2^48 ns = 78 hours
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    @classmethod
+    def bucket(cls, value):
+        if value < cls.SUB_BUCKETS:
+            return max(value, 0)
+        bits = value.bit_length()
+        index = (bits - cls.SUB_BITS) * cls.SUB_BUCKETS + (value >> (bits - cls.SUB_BITS - 1) & (cls.SUB_BUCKETS - 1))
+        return min(index, cls.BUCKETS - 1)
+
+    @classmethod
+    def bucket_bounds(cls, index):
+        """Returns (low, high) of a bucket, low included, high excluded."""
+        if index < cls.SUB_BUCKETS:
+            return index, index + 1
+        bits = index // cls.SUB_BUCKETS + cls.SUB_BITS
+        step = 1 << (bits - cls.SUB_BITS - 1)
+        low = (1 << (bits - 1)) + (index % cls.SUB_BUCKETS) * step
+        return low, low + step
+
+    def record(self, value):
+        if value < self.SUB_BUCKETS:
+            index = value if value > 0 else 0
+        else:
+            bits = value.bit_length()
+            index = (bits - self.SUB_BITS) * self.SUB_BUCKETS + (value >> (bits - self.SUB_BITS - 1) & (self.SUB_BUCKETS - 1))
+            if index >= self.BUCKETS:
+                index = self.BUCKETS - 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if self.max is None:
+            self.min = self.max = value
+        elif value < self.min:
+            self.min = value
+        elif value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """
+        Returns:
+            float: The value below which percent % of the recorded values are (middle of its bucket), None if empty.
+        """
+        counts = list(self.counts)
+        total = sum(counts)
+        if not total:
+            return None
+        rank = percent / 100 * total
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if count and seen >= rank:
+                low, high = self.bucket_bounds(index)
+                middle = (low + high) / 2 if high - low > 1 else low
+                return min(max(middle, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self, unit=1000):
+        """
+        Returns:
+            dict: count, mean, p50, p90, p99, min and max, in unit nanoseconds (microseconds by default).
+        """
+        def scaled(value):
+            return value / unit if value is not None else None
+        return dict(count=self.count, mean=scaled(self.mean), p50=scaled(self.percentile(50)),
+                    p90=scaled(self.percentile(90)), p99=scaled(self.percentile(99)),
+                    min=scaled(self.min), max=scaled(self.max))
+
+
+class GNSSClock:
+    """
+    Relates time.monotonic_ns() to GPS time.
+
+    The first frame of every navigation epoch carries the GPS time of the solution (iTOW),
+    and was read some delay after it: receive time - GPS time = clock offset + delay. The
+    smallest value over the last window epochs is taken as the offset (so the delay of
+    the fastest epoch counts as zero) and the delay of every epoch is measured above it:
+    the jitter of the navigation output and the serial transport.
+
+    With a PPS input, pps(time_ns) gives the host time of a time pulse whose GPS time came
+    in the last TIM-TP message, which gives the true offset; epoch delays are then the
+    full latency from the solution time to the first byte read.
+    """
+    def __init__(self, window=64):
+        self.__window = deque(maxlen=window) # receive time - GPS time of the last epochs
+        self.__week_ns = 0 # GPS time of the start of the current week, from iTOW rollovers
+        self.__last_itow = None
+        self.__next_pulse_ns = None # GPS time of the next time pulse, from TIM-TP
+        self.__pps_offset_ns = None
+        self.offset_ns = None # monotonic time - GPS time (time of week, weeks counted from the first epoch)
+        self.last_delay_ns = None
+        self.epochs = 0
+
+    @property
+    def pps_locked(self):
+        return self.__pps_offset_ns is not None
+
+    def gps_ns(self, itow):
+        """GPS time of an iTOW (ms) near the current epoch, weeks counted from the first epoch."""
+        return self.__week_ns + itow * 1_000_000
+
+    def to_monotonic_ns(self, itow):
+        """
+        Returns:
+            int: The time.monotonic_ns() of a GPS time of week in ms, None before the first epoch.
+        """
+        if self.offset_ns is None:
+            return None
+        return self.gps_ns(itow) + self.offset_ns
+
+    def add_epoch(self, itow, time_ns):
+        """
+        Args:
+            itow (int): GPS time of week in ms of a new epoch.
+            time_ns (int): time.monotonic_ns() of the read of the first byte of its first message.
+
+        Returns:
+            int: Delay of this epoch in ns (above the fastest epoch without PPS).
+        """
+        if self.__last_itow is not None and itow < self.__last_itow - WEEK_NS // 2_000_000:
+            self.__week_ns += WEEK_NS
+        self.__last_itow = itow
+        sample = time_ns - self.gps_ns(itow)
+        self.__window.append(sample)
+        self.epochs += 1
+        self.offset_ns = self.__pps_offset_ns if self.__pps_offset_ns is not None else min(self.__window)
+        self.last_delay_ns = sample - self.offset_ns
+        return self.last_delay_ns
+
+    def add_time_pulse(self, tow_ms, tow_sub_ms=0.0):
+        """GPS time of the next time pulse, from TIM-TP (towMS and scaled towSubMS)."""
+        itow = tow_ms + tow_sub_ms
+        week_ns = self.__week_ns
+        if self.__last_itow is not None and tow_ms < self.__last_itow - WEEK_NS // 2_000_000:
+            week_ns += WEEK_NS # the pulse is in the next week
+        self.__next_pulse_ns = week_ns + round(itow * 1_000_000)
+
+    def pps(self, time_ns):
+        """
+        Args:
+            time_ns (int): time.monotonic_ns() of a time pulse edge captured by the host.
+        """
+        if self.__next_pulse_ns is not None:
+            self.__pps_offset_ns = time_ns - self.__next_pulse_ns
+
+    def reset(self):
+        self.__window.clear()
+        self.__pps_offset_ns = None
+        self.offset_ns = None
+
+
+class FrameTiming:
+    """
+    Latency instrumentation of the received frames.
+
+    Stages, one LatencyHistogram each (frames carrying their read times, see Frame):
+        "frame": first byte read -> last byte read (the frame spread over reads)
+        "wire": time the frame takes on the UART at the baud rate (its serial transfer time)
+        "queue": last byte read -> callback started (FrameDispatcher queue)
+        "decode": time to decode a frame (EpochAggregator)
+        "callback": time spent in the callback
+        "total": first byte read -> callback done
+        "epoch": GPS time of the solution -> first byte of the epoch read, see GNSSClock
+    Other components can record their own stages with record() or timed().
+    """
+    def __init__(self, baud_rate=None, window=64):
+        self.baud_rate = baud_rate
+        self.clock = GNSSClock(window)
+        self.histograms = {}
+        self.__epoch_itow = None
+        self.__lock = threading.Lock()
+        self.__frame = self.histogram("frame") # stages recorded on every frame, looked up once
+        self.__wire = self.histogram("wire")
+
+    def histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self.__lock:
+                histogram = self.histograms.setdefault(stage, LatencyHistogram())
+        return histogram
+
+    def record(self, stage, duration_ns):
+        self.histogram(stage).record(duration_ns)
+
+    def timed(self, stage, function):
+        """Wraps function so that the duration of every call is recorded under stage."""
+        histogram = self.histogram(stage)
+        monotonic_ns = time.monotonic_ns
+        def wrapper(*args, **kwargs):
+            start = monotonic_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.record(monotonic_ns() - start)
+        return wrapper
+
+    def observe(self, frame):
+        """
+        Records the read times of a frame and feeds the GNSS clock; called by the reader for every frame.
+        """
+        first_ns = getattr(frame, "first_ns", None)
+        if first_ns is None:
+            return
+        self.__frame.record(frame.last_ns - first_ns)
+        if self.baud_rate:
+            self.__wire.record(len(frame) * 10_000_000_000 // self.baud_rate) # start + 8 data + stop bits
+        if frame[0:2] != UbloxConst.HEADER_UBX or len(frame) < 14:
+            return
+        key = (frame[2], frame[3])
+        if key == (UbloxConst.CLASS_TIM, 0x01): # TIM-TP: towMS, towSubMS (ms * 2^-32)
+            self.clock.add_time_pulse(int.from_bytes(frame[6:10], "little"), int.from_bytes(frame[10:14], "little") / 2 ** 32)
+            return
+        offset = UbloxConst.ITOW_OFFSETS.get(key) if key[0] == UbloxConst.CLASS_NAV else None
+        if offset is None or len(frame) < 10 + offset + 2:
+            return
+        itow = int.from_bytes(frame[6 + offset:10 + offset], "little")
+        if itow != self.__epoch_itow: # first message of a new epoch
+            self.__epoch_itow = itow
+            self.record("epoch", self.clock.add_epoch(itow, first_ns))
+
+    def delivered(self, frame, started_ns, finished_ns):
+        """Records the queue, callback and total stages of a frame delivered to a callback."""
+        last_ns = getattr(frame, "last_ns", None)
+        self.record("callback", finished_ns - started_ns)
+        if last_ns is not None:
+            self.record("queue", started_ns - last_ns)
+            self.record("total", finished_ns - frame.first_ns)
+
+    def stats(self, unit=1000):
+        """
+        Returns:
+            dict: stage -> LatencyHistogram.summary() (microseconds by default), plus "clock":
+                  offset_ns, pps_locked and epochs of the GNSS clock.
+        """
+        stats = {stage: histogram.summary(unit) for stage, histogram in list(self.histograms.items())}
+        stats["clock"] = dict(offset_ns=self.clock.offset_ns, pps_locked=self.clock.pps_locked, epochs=self.clock.epochs)
+        return stats
+
+    def reset(self):
+        for histogram in list(self.histograms.values()):
+            histogram.reset()
+
+
+# Example usage
+if __name__ == "__main__":
+    histogram = LatencyHistogram()
+    for value in range(1, 100001):
+        histogram.record(value * 1000)
+    print(histogram.summary())
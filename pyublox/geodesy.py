@@ -0,0 +1,355 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to convert and measure WGS84 coordinates, for single fixes and whole tracks
+"""
+import math
+try:
+    import numpy as np
+except ImportError: # lists are then processed point by point
+    np = None
+
+
+_SCALAR_TYPES = {int, float}
+if np is not None:
+    _SCALAR_TYPES.update((np.float64, np.float32, np.int64, np.int32))
+
+
+def _is_scalar(value):
+    return type(value) in _SCALAR_TYPES
+
+
+class Geodesy:
+    """
+    WGS84 geodesy on scalars or NumPy arrays.
+
+    Every function takes either plain numbers, which go through a math-only path with no
+    array overhead (for the live loop, one fix at a time), or array-likes, which are
+    converted with numpy.asarray and processed in a few vectorized operations (for post
+    processing of whole logs). Without NumPy, lists are processed point by point.
+
+    Distances and heights are in meters, angles in decimal degrees.
+    """
+    A = 6378137.0 # semi-major axis
+    F = 1 / 298.257223563 # flattening
+    B = A * (1 - F) # semi-minor axis
+    E2 = F * (2 - F) # first eccentricity squared
+    EP2 = (A * A - B * B) / (B * B) # second eccentricity squared
+    MEAN_RADIUS = 6371008.8 # mean earth radius, for the spherical (haversine) formulas
+
+    @staticmethod
+    def __each(function, *args):
+        # Without NumPy: applies the scalar function to every point of lists
+        results = [function(*values) for values in zip(*args)]
+        if results and isinstance(results[0], tuple):
+            return tuple(list(column) for column in zip(*results))
+        return results
+
+    @staticmethod
+    def ddmm_to_decimal(values, directions=None):
+        """
+        Converts NMEA DDMM.MMMM / DDDMM.MMMM coordinates to decimal degrees.
+
+        Args:
+            values: Coordinates as numbers or strings (a column of a log), empty strings give NaN.
+                    A single empty string or None (a missing field) gives None.
+            directions: Matching 'N'/'S'/'E'/'W' indicators, 'S' and 'W' give negative values. None keeps the sign of values.
+
+        Returns:
+            float or numpy.ndarray: Decimal degrees.
+        """
+        if values is None or _is_scalar(values) or isinstance(values, (str, bytes)):
+            if values in ("", b"", None): # empty NMEA field
+                return None
+            value = float(values)
+            degrees = int(abs(value) // 100)
+            decimal = math.copysign(degrees + (abs(value) - degrees * 100) / 60, value)
+            if directions in ("S", "W", b"S", b"W"):
+                decimal = -decimal
+            return decimal
+        if np is None:
+            directions = directions if directions is not None else [None] * len(values)
+            return Geodesy.__each(Geodesy.ddmm_to_decimal, values, directions)
+        values = np.asarray(values)
+        if values.dtype.kind == "O":
+            values = np.array([float(value) if value not in ("", b"", None) else np.nan for value in values])
+        elif values.dtype.kind in "SU":
+            values = values.astype(str)
+            values = np.where(values == "", "nan", values)
+        values = values.astype(float, copy=False)
+        magnitude = np.abs(values)
+        degrees = np.floor(magnitude / 100)
+        decimal = np.copysign(degrees + (magnitude - degrees * 100) / 60, values)
+        if directions is not None:
+            directions = np.asarray(directions)
+            if directions.dtype.kind == "S":
+                directions = directions.astype(str)
+            decimal = np.where((directions == "S") | (directions == "W"), -decimal, decimal)
+        return decimal
+
+    @staticmethod
+    def haversine(lat1, lon1, lat2, lon2):
+        """
+        Great circle distance on the mean sphere, about 0.5% accurate.
+
+        Returns:
+            float or numpy.ndarray: Distance in meters.
+        """
+        scalars = _SCALAR_TYPES
+        if type(lat1) in scalars and type(lon1) in scalars and type(lat2) in scalars and type(lon2) in scalars:
+            lat1, lat2 = lat1 * _RADIANS, lat2 * _RADIANS
+            sin_lat = math.sin((lat2 - lat1) / 2)
+            sin_lon = math.sin((lon2 - lon1) * _RADIANS / 2)
+            a = sin_lat * sin_lat + math.cos(lat1) * math.cos(lat2) * sin_lon * sin_lon
+            return _DIAMETER * math.asin(math.sqrt(a if a < 1.0 else 1.0))
+        if np is None:
+            return Geodesy.__each(Geodesy.haversine, *Geodesy.__broadcast(lat1, lon1, lat2, lon2))
+        lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=float)) for value in (lat1, lon1, lat2, lon2))
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        return 2 * Geodesy.MEAN_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    @staticmethod
+    def __broadcast(*args):
+        # Without NumPy: repeats scalar arguments to the length of the list arguments
+        length = max(len(value) for value in args if not _is_scalar(value))
+        return [[value] * length if _is_scalar(value) else value for value in args]
+
+    @staticmethod
+    def vincenty(lat1, lon1, lat2, lon2, tolerance=1e-12, max_iterations=200):
+        """
+        Ellipsoidal distance with Vincenty's inverse formula, accurate to about a millimeter.
+
+        Nearly antipodal points, for which the iteration does not converge, give NaN.
+
+        Returns:
+            float or numpy.ndarray: Distance in meters.
+        """
+        if _is_scalar(lat1) and _is_scalar(lon1) and _is_scalar(lat2) and _is_scalar(lon2):
+            return Geodesy.__vincenty_scalar(lat1, lon1, lat2, lon2, tolerance, max_iterations)
+        if np is None:
+            return Geodesy.__each(lambda *values: Geodesy.__vincenty_scalar(*values, tolerance, max_iterations),
+                                  *Geodesy.__broadcast(lat1, lon1, lat2, lon2))
+        a, b, f = Geodesy.A, Geodesy.B, Geodesy.F
+        lat1, lon1, lat2, lon2 = np.broadcast_arrays(*(np.radians(np.asarray(value, dtype=float)) for value in (lat1, lon1, lat2, lon2)))
+        L = lon2 - lon1
+        U1 = np.arctan((1 - f) * np.tan(lat1))
+        U2 = np.arctan((1 - f) * np.tan(lat2))
+        sinU1, cosU1, sinU2, cosU2 = np.sin(U1), np.cos(U1), np.sin(U2), np.cos(U2)
+        lam = L.copy()
+        active = np.ones(L.shape, dtype=bool) # points still iterating
+        shape = L.shape
+        sin_sigma = np.zeros(shape)
+        cos_sigma = np.ones(shape)
+        sigma = np.zeros(shape)
+        cos2_alpha = np.ones(shape)
+        cos_2sigma_m = np.zeros(shape)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for _ in range(max_iterations):
+                sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+                sin_sigma_i = np.hypot(cosU2 * sin_lam, cosU1 * sinU2 - sinU1 * cosU2 * cos_lam)
+                cos_sigma_i = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+                sigma_i = np.arctan2(sin_sigma_i, cos_sigma_i)
+                sin_alpha = np.where(sin_sigma_i == 0, 0.0, cosU1 * cosU2 * sin_lam / sin_sigma_i)
+                cos2_alpha_i = 1 - sin_alpha ** 2
+                cos_2sigma_m_i = np.where(cos2_alpha_i == 0, 0.0, cos_sigma_i - 2 * sinU1 * sinU2 / cos2_alpha_i)
+                C = f / 16 * cos2_alpha_i * (4 + f * (4 - 3 * cos2_alpha_i))
+                lam_next = L + (1 - C) * f * sin_alpha * (
+                    sigma_i + C * sin_sigma_i * (cos_2sigma_m_i + C * cos_sigma_i * (-1 + 2 * cos_2sigma_m_i ** 2)))
+                sin_sigma = np.where(active, sin_sigma_i, sin_sigma)
+                cos_sigma = np.where(active, cos_sigma_i, cos_sigma)
+                sigma = np.where(active, sigma_i, sigma)
+                cos2_alpha = np.where(active, cos2_alpha_i, cos2_alpha)
+                cos_2sigma_m = np.where(active, cos_2sigma_m_i, cos_2sigma_m)
+                converged = np.abs(lam_next - lam) <= tolerance
+                lam = np.where(active, lam_next, lam)
+                active &= ~converged
+                if not active.any():
+                    break
+            u2 = cos2_alpha * (a * a - b * b) / (b * b)
+            A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+            B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+            delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+                                           - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+            distance = b * A * (sigma - delta_sigma)
+        return np.where(active, np.nan, distance)
+
+    @staticmethod
+    def __vincenty_scalar(lat1, lon1, lat2, lon2, tolerance, max_iterations):
+        a, b, f = Geodesy.A, Geodesy.B, Geodesy.F
+        L = math.radians(lon2 - lon1)
+        U1 = math.atan((1 - f) * math.tan(math.radians(lat1)))
+        U2 = math.atan((1 - f) * math.tan(math.radians(lat2)))
+        sinU1, cosU1, sinU2, cosU2 = math.sin(U1), math.cos(U1), math.sin(U2), math.cos(U2)
+        lam = L
+        for _ in range(max_iterations):
+            sin_lam, cos_lam = math.sin(lam), math.cos(lam)
+            sin_sigma = math.hypot(cosU2 * sin_lam, cosU1 * sinU2 - sinU1 * cosU2 * cos_lam)
+            if sin_sigma == 0:
+                return 0.0 # same point
+            cos_sigma = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+            sigma = math.atan2(sin_sigma, cos_sigma)
+            sin_alpha = cosU1 * cosU2 * sin_lam / sin_sigma
+            cos2_alpha = 1 - sin_alpha ** 2
+            cos_2sigma_m = cos_sigma - 2 * sinU1 * sinU2 / cos2_alpha if cos2_alpha != 0 else 0.0 # equatorial line
+            C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            lam_previous = lam
+            lam = L + (1 - C) * f * sin_alpha * (sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+            if abs(lam - lam_previous) <= tolerance:
+                break
+        else:
+            return math.nan
+        u2 = cos2_alpha * (a * a - b * b) / (b * b)
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+                                       - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+        return b * A * (sigma - delta_sigma)
+
+    @staticmethod
+    def lla_to_ecef(lat, lon, alt=0.0):
+        """
+        Returns:
+            tuple: x, y, z earth-centered earth-fixed coordinates in meters (alt is the ellipsoidal height).
+        """
+        if _is_scalar(lat) and _is_scalar(lon) and _is_scalar(alt):
+            lat, lon = math.radians(lat), math.radians(lon)
+            sin_lat, cos_lat = math.sin(lat), math.cos(lat)
+            n = Geodesy.A / math.sqrt(1 - Geodesy.E2 * sin_lat * sin_lat)
+            return ((n + alt) * cos_lat * math.cos(lon), (n + alt) * cos_lat * math.sin(lon), (n * (1 - Geodesy.E2) + alt) * sin_lat)
+        if np is None:
+            return Geodesy.__each(Geodesy.lla_to_ecef, *Geodesy.__broadcast(lat, lon, alt))
+        lat, lon = np.radians(np.asarray(lat, dtype=float)), np.radians(np.asarray(lon, dtype=float))
+        alt = np.asarray(alt, dtype=float)
+        sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+        n = Geodesy.A / np.sqrt(1 - Geodesy.E2 * sin_lat * sin_lat)
+        return (n + alt) * cos_lat * np.cos(lon), (n + alt) * cos_lat * np.sin(lon), (n * (1 - Geodesy.E2) + alt) * sin_lat
+
+    @staticmethod
+    def ecef_to_lla(x, y, z):
+        """
+        Closed form conversion (Heikkinen), no iteration, sub-millimeter on and near the earth.
+
+        Returns:
+            tuple: lat, lon in decimal degrees and ellipsoidal height in meters.
+        """
+        scalar = _is_scalar(x) and _is_scalar(y) and _is_scalar(z)
+        if not scalar and np is None:
+            return Geodesy.__each(Geodesy.ecef_to_lla, x, y, z)
+        m = math if scalar else np
+        if not scalar:
+            x, y, z = (np.asarray(value, dtype=float) for value in (x, y, z))
+        a, b, e2, ep2 = Geodesy.A, Geodesy.B, Geodesy.E2, Geodesy.EP2
+        p = m.sqrt(x * x + y * y)
+        F = 54 * b * b * z * z
+        G = p * p + (1 - e2) * z * z - e2 * (a * a - b * b)
+        c = e2 * e2 * F * p * p / (G * G * G)
+        s = (1 + c + m.sqrt(c * c + 2 * c)) ** (1 / 3)
+        P = F / (3 * (s + 1 / s + 1) ** 2 * G * G)
+        Q = m.sqrt(1 + 2 * e2 * e2 * P)
+        r0 = -(P * e2 * p) / (1 + Q) + m.sqrt(a * a / 2 * (1 + 1 / Q) - P * (1 - e2) * z * z / (Q * (1 + Q)) - P * p * p / 2)
+        U = m.sqrt((p - e2 * r0) ** 2 + z * z)
+        V = m.sqrt((p - e2 * r0) ** 2 + (1 - e2) * z * z)
+        z0 = b * b * z / (a * V)
+        alt = U * (1 - b * b / (a * V))
+        lat = m.atan2(z + ep2 * z0, p) if scalar else np.arctan2(z + ep2 * z0, p)
+        lon = m.atan2(y, x) if scalar else np.arctan2(y, x)
+        return m.degrees(lat), m.degrees(lon), alt
+
+    @staticmethod
+    def ecef_to_enu(x, y, z, lat0, lon0, alt0=0.0):
+        """
+        Returns:
+            tuple: east, north, up in meters relative to the reference point lat0, lon0, alt0.
+        """
+        x0, y0, z0 = Geodesy.lla_to_ecef(lat0, lon0, alt0)
+        sin_lat, cos_lat = math.sin(math.radians(lat0)), math.cos(math.radians(lat0))
+        sin_lon, cos_lon = math.sin(math.radians(lon0)), math.cos(math.radians(lon0))
+        scalar = _is_scalar(x) and _is_scalar(y) and _is_scalar(z)
+        if not scalar:
+            if np is None:
+                return Geodesy.__each(lambda *values: Geodesy.ecef_to_enu(*values, lat0, lon0, alt0), x, y, z)
+            x, y, z = (np.asarray(value, dtype=float) for value in (x, y, z))
+        dx, dy, dz = x - x0, y - y0, z - z0
+        east = -sin_lon * dx + cos_lon * dy
+        north = -sin_lat * cos_lon * dx - sin_lat * sin_lon * dy + cos_lat * dz
+        up = cos_lat * cos_lon * dx + cos_lat * sin_lon * dy + sin_lat * dz
+        return east, north, up
+
+    @staticmethod
+    def enu_to_ecef(east, north, up, lat0, lon0, alt0=0.0):
+        """
+        Returns:
+            tuple: x, y, z ECEF coordinates of a point given in meters east, north and up of lat0, lon0, alt0.
+        """
+        x0, y0, z0 = Geodesy.lla_to_ecef(lat0, lon0, alt0)
+        sin_lat, cos_lat = math.sin(math.radians(lat0)), math.cos(math.radians(lat0))
+        sin_lon, cos_lon = math.sin(math.radians(lon0)), math.cos(math.radians(lon0))
+        scalar = _is_scalar(east) and _is_scalar(north) and _is_scalar(up)
+        if not scalar:
+            if np is None:
+                return Geodesy.__each(lambda *values: Geodesy.enu_to_ecef(*values, lat0, lon0, alt0), east, north, up)
+            east, north, up = (np.asarray(value, dtype=float) for value in (east, north, up))
+        x = x0 - sin_lon * east - sin_lat * cos_lon * north + cos_lat * cos_lon * up
+        y = y0 + cos_lon * east - sin_lat * sin_lon * north + cos_lat * sin_lon * up
+        z = z0 + cos_lat * north + sin_lat * up
+        return x, y, z
+
+    @staticmethod
+    def lla_to_enu(lat, lon, alt, lat0, lon0, alt0=0.0):
+        """
+        Returns:
+            tuple: east, north, up in meters of points relative to the reference point lat0, lon0, alt0.
+        """
+        return Geodesy.ecef_to_enu(*Geodesy.lla_to_ecef(lat, lon, alt), lat0, lon0, alt0)
+
+    @staticmethod
+    def enu_to_lla(east, north, up, lat0, lon0, alt0=0.0):
+        """
+        Returns:
+            tuple: lat, lon, alt of points given in meters east, north and up of lat0, lon0, alt0.
+        """
+        return Geodesy.ecef_to_lla(*Geodesy.enu_to_ecef(east, north, up, lat0, lon0, alt0))
+
+    @staticmethod
+    def track_length(lat, lon, method="haversine"):
+        """
+        Cumulative distance along a track.
+
+        Args:
+            lat, lon: Points of the track in order, NaN points (no fix) are skipped.
+            method (str): "haversine" or "vincenty".
+
+        Returns:
+            numpy.ndarray or list: Distance from the first point to every point in meters, the last value is the track length.
+        """
+        distance = Geodesy.vincenty if method == "vincenty" else Geodesy.haversine
+        if np is None:
+            steps = [distance(*points) for points in zip(lat[:-1], lon[:-1], lat[1:], lon[1:])]
+            total = [0.0]
+            for step in steps:
+                total.append(total[-1] + (step if step == step else 0.0))
+            return total
+        lat, lon = np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+        if len(lat) == 0:
+            return np.zeros(0)
+        valid = ~(np.isnan(lat) | np.isnan(lon))
+        indices = np.flatnonzero(valid)
+        total = np.zeros(len(lat))
+        if len(indices) > 1:
+            steps = distance(lat[indices[:-1]], lon[indices[:-1]], lat[indices[1:]], lon[indices[1:]])
+            total[indices[1:]] = np.cumsum(np.nan_to_num(steps))
+        # points without fix keep the distance of the last valid point
+        total = np.maximum.accumulate(total)
+        return total
+
+
+_RADIANS = math.pi / 180
+_DIAMETER = 2 * Geodesy.MEAN_RADIUS
+
+
+# Example usage
+if __name__ == "__main__":
+    print(Geodesy.vincenty(33.8742, -117.3413, 34.0522, -118.2437))
+    print(Geodesy.lla_to_enu(33.8743, -117.3413, 402.0, 33.8742, -117.3413, 400.0))
+    if np is not None:
+        print(Geodesy.track_length(np.linspace(33.87, 33.88, 5), np.full(5, -117.34))[-1])
@@ -0,0 +1,359 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to raise enter, exit and dwell events of live fixes against geofence zones
+"""
+import math
+import threading
+import time
+from collections import namedtuple
+from pyublox.ublox_constants import UbloxConst
+from pyublox.nmea_reader import NMEAReader
+from pyublox.ubx_messages import NAV_PVT
+from pyublox.geodesy import Geodesy
+try:
+    import numpy as np
+except ImportError: # polygons are then tested edge by edge in Python
+    np = None
+
+# One geofence transition
+# type: "enter", "exit" or "dwell"
+# zone: id of the zone
+# time: time of the fix (seconds, time.monotonic() unless given to update())
+# lat, lon: the fix
+# distance: signed distance of the fix to the zone boundary in meters, negative inside
+# duration: seconds spent in the zone (0 on enter)
+GeofenceEvent = namedtuple("GeofenceEvent", ("type", "zone", "time", "lat", "lon", "distance", "duration"))
+
+
+class Zone:
+    """
+    A circle or polygon projected on the local east/north plane of the Geofence origin.
+
+    id: id given when the zone was added
+    kind: "circle" or "polygon"
+    bbox: east/north bounding box (min_e, min_n, max_e, max_n) in meters
+    dwell_time: seconds inside before a "dwell" event, None for no dwell event
+    data: anything attached to the zone by the application
+    """
+    __slots__ = ("id", "kind", "bbox", "dwell_time", "data", "inradius", "center", "radius", "edges", "arrays")
+
+    def __init__(self, id, kind, bbox, dwell_time=None, data=None):
+        self.id = id
+        self.kind = kind
+        self.bbox = bbox
+        self.dwell_time = dwell_time
+        self.data = data
+        self.inradius = None # size bound for the hysteresis band, a band wider than the zone could never be crossed
+        self.center = None
+        self.radius = None
+        self.edges = None # polygon: (e0, n0, de, dn, length^2) per edge
+        self.arrays = None # polygon with many edges: the edges as NumPy columns
+
+    def signed_distance(self, east, north):
+        """
+        Returns:
+            float: Distance of the point to the boundary in meters, negative inside the zone.
+        """
+        if self.kind == "circle":
+            return math.hypot(east - self.center[0], north - self.center[1]) - self.radius
+        if self.arrays is not None:
+            e0, n0, de, dn, length2 = self.arrays
+            crossing = (n0 > north) != (n0 + dn > north)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                inside = np.count_nonzero(crossing & (east < e0 + (north - n0) * de / dn)) & 1
+            t = np.clip(((east - e0) * de + (north - n0) * dn) / length2, 0.0, 1.0)
+            distance = math.sqrt(float(np.min((e0 + t * de - east) ** 2 + (n0 + t * dn - north) ** 2)))
+            return -distance if inside else distance
+        inside = False
+        closest = math.inf
+        for e0, n0, de, dn, length2 in self.edges:
+            if (n0 > north) != (n0 + dn > north) and east < e0 + (north - n0) * de / dn:
+                inside = not inside
+            t = ((east - e0) * de + (north - n0) * dn) / length2
+            t = 0.0 if t < 0.0 else 1.0 if t > 1.0 else t
+            distance2 = (e0 + t * de - east) ** 2 + (n0 + t * dn - north) ** 2
+            if distance2 < closest:
+                closest = distance2
+        closest = math.sqrt(closest)
+        return -closest if inside else closest
+
+
+class Geofence:
+    """
+    Tests live fixes against thousands of zones and raises enter, exit and dwell events.
+
+    Zones (circles and polygons given in lat/lon) are projected once on the east/north
+    plane of a local origin (the first zone unless given, accurate over the ~100 km around
+    it) and their bounding boxes, widened by max_margin, are stored in a uniform grid of
+    cell_size meters. A fix is projected with Geodesy, its grid cell gives the few zones
+    near it, and only those (plus the zones the fix was inside) are measured, so an update
+    costs tens of microseconds whatever the number of zones.
+
+    Hysteresis: a fix enters a zone when it is margin meters inside the boundary and exits
+    when it is margin meters outside; in between the state does not change, so noisy fixes
+    along a boundary do not flap. margin = sigma * horizontal accuracy, clamped to
+    [min_margin, max_margin] and to half the size of the zone. The accuracy is NAV-PVT hAcc,
+    or GGA HDOP * uere when no NAV-PVT is received.
+    """
+    def __init__(self, origin=None, cell_size=500.0, callback=None, sigma=1.0, uere=3.0, min_margin=1.0,
+                 max_margin=50.0, polygon_vectorize=64):
+        """
+        Args:
+            origin (tuple): (lat, lon) of the local projection, defaults to the first zone added.
+            cell_size (float): Grid cell size in meters, around the typical zone size.
+            callback (function): Called with every GeofenceEvent.
+            sigma (float): Hysteresis margin in horizontal accuracies.
+            uere (float): User equivalent range error in meters, accuracy = HDOP * uere for GGA fixes.
+            min_margin, max_margin (float): Bounds of the hysteresis margin in meters.
+            polygon_vectorize (int): Polygons with at least this many edges are measured with NumPy.
+        """
+        self.__origin = origin
+        self.__cell_size = cell_size
+        self.__callback = callback
+        self.__sigma = sigma
+        self.__uere = uere
+        self.__min_margin = min_margin
+        self.__max_margin = max_margin
+        self.__polygon_vectorize = polygon_vectorize
+        self.__lock = threading.Lock()
+        self.__zones = {} # id -> Zone
+        self.__grid = {} # (cell east, cell north) -> tuple of Zone
+        self.__inside = {} # id -> time the zone was entered
+        self.__dwelled = set() # ids of the zones whose dwell event was raised
+        self.__fix_source = None # "UBX" once a NAV-PVT is received, GGA fixes are ignored from then on
+        self.position = None # last fix: (lat, lon, east, north, accuracy)
+        # counters
+        self.updates = 0
+        self.events = 0
+        self.update_time_ns = 0 # total time spent in update()
+
+    @property
+    def zones(self):
+        return self.__zones
+
+    @property
+    def inside(self):
+        """Ids of the zones the last fix is in."""
+        return set(self.__inside)
+
+    def set_callback(self, callback):
+        self.__callback = callback
+
+    def __project(self, lat, lon):
+        if self.__origin is None:
+            self.__origin = (lat, lon)
+        east, north, _ = Geodesy.lla_to_enu(lat, lon, 0.0, self.__origin[0], self.__origin[1], 0.0)
+        return east, north
+
+    def add_circle(self, zone_id, lat, lon, radius, dwell_time=None, data=None):
+        """
+        Args:
+            zone_id: Unique id of the zone, used in the events. An existing zone with this id is replaced.
+            lat, lon (float): Center in decimal degrees.
+            radius (float): Radius in meters.
+            dwell_time (float): Seconds inside before a "dwell" event, None for no dwell event.
+            data: Anything to attach to the zone.
+        """
+        east, north = self.__project(lat, lon)
+        zone = Zone(zone_id, "circle", (east - radius, north - radius, east + radius, north + radius), dwell_time, data)
+        zone.center = (east, north)
+        zone.radius = radius
+        zone.inradius = radius
+        self.__add(zone)
+        return zone
+
+    def add_polygon(self, zone_id, points, dwell_time=None, data=None):
+        """
+        Args:
+            zone_id: Unique id of the zone, used in the events. An existing zone with this id is replaced.
+            points (list): (lat, lon) vertices in decimal degrees, closed or not, in any winding order.
+            dwell_time (float): Seconds inside before a "dwell" event, None for no dwell event.
+            data: Anything to attach to the zone.
+        """
+        if len(points) > 1 and tuple(points[0]) == tuple(points[-1]):
+            points = points[:-1]
+        if len(points) < 3:
+            raise ValueError(f"Polygon {zone_id!r} needs at least 3 points")
+        vertices = [self.__project(lat, lon) for lat, lon in points]
+        edges = []
+        for (e0, n0), (e1, n1) in zip(vertices, vertices[1:] + vertices[:1]):
+            if e0 != e1 or n0 != n1:
+                edges.append((e0, n0, e1 - e0, n1 - n0, (e1 - e0) ** 2 + (n1 - n0) ** 2))
+        easts = [vertex[0] for vertex in vertices]
+        norths = [vertex[1] for vertex in vertices]
+        zone = Zone(zone_id, "polygon", (min(easts), min(norths), max(easts), max(norths)), dwell_time, data)
+        zone.edges = edges
+        if np is not None and len(edges) >= self.__polygon_vectorize:
+            zone.arrays = tuple(np.array(column) for column in zip(*edges))
+        zone.inradius = min(zone.bbox[2] - zone.bbox[0], zone.bbox[3] - zone.bbox[1]) / 2
+        self.__add(zone)
+        return zone
+
+    def __cells(self, bbox):
+        size = self.__cell_size
+        margin = self.__max_margin
+        for cell_e in range(math.floor((bbox[0] - margin) / size), math.floor((bbox[2] + margin) / size) + 1):
+            for cell_n in range(math.floor((bbox[1] - margin) / size), math.floor((bbox[3] + margin) / size) + 1):
+                yield cell_e, cell_n
+
+    def __add(self, zone):
+        with self.__lock:
+            if zone.id in self.__zones:
+                self.__remove(zone.id)
+            self.__zones[zone.id] = zone
+            grid = self.__grid
+            for cell in self.__cells(zone.bbox):
+                # update() reads the tuples without locking, they are replaced and never modified
+                grid[cell] = grid.get(cell, ()) + (zone,)
+
+    def remove(self, zone_id):
+        """Removes a zone, without exit event."""
+        with self.__lock:
+            self.__remove(zone_id)
+
+    def __remove(self, zone_id):
+        zone = self.__zones.pop(zone_id, None)
+        if zone is None:
+            return
+        grid = self.__grid
+        for cell in self.__cells(zone.bbox):
+            remaining = tuple(item for item in grid.get(cell, ()) if item is not zone)
+            if remaining:
+                grid[cell] = remaining
+            else:
+                grid.pop(cell, None)
+        self.__inside.pop(zone_id, None)
+        self.__dwelled.discard(zone_id)
+
+    def zones_at(self, lat, lon):
+        """
+        Returns:
+            list: Ids of the zones containing the point, without hysteresis.
+        """
+        east, north = self.__project(lat, lon)
+        size = self.__cell_size
+        return [zone.id for zone in self.__grid.get((math.floor(east / size), math.floor(north / size)), ())
+                if zone.bbox[0] <= east <= zone.bbox[2] and zone.bbox[1] <= north <= zone.bbox[3]
+                and zone.signed_distance(east, north) <= 0]
+
+    def margin(self, accuracy=None, hdop=None):
+        """
+        Returns:
+            float: Hysteresis margin in meters for a fix of the given horizontal accuracy (m) or HDOP.
+        """
+        if accuracy is None and hdop is not None:
+            accuracy = hdop * self.__uere
+        if accuracy is None:
+            return self.__min_margin
+        return min(max(self.__sigma * accuracy, self.__min_margin), self.__max_margin)
+
+    def update(self, lat, lon, accuracy=None, hdop=None, time=None):
+        """
+        Tests a fix against the zones and raises the events it causes.
+
+        Args:
+            lat, lon (float): The fix in decimal degrees.
+            accuracy (float): Horizontal accuracy in meters (NAV-PVT hAcc).
+            hdop (float): HDOP, used when accuracy is not given.
+            time (float): Time of the fix in seconds, defaults to time.monotonic().
+
+        Returns:
+            list: The GeofenceEvents of this fix, also passed to the callback.
+        """
+        start = _monotonic_ns()
+        if time is None:
+            time = _monotonic()
+        if self.__origin is None:
+            return []
+        east, north = self.__project(lat, lon)
+        margin = self.margin(accuracy, hdop)
+        self.position = (lat, lon, east, north, accuracy if accuracy is not None else hdop * self.__uere if hdop is not None else None)
+        size = self.__cell_size
+        candidates = self.__grid.get((math.floor(east / size), math.floor(north / size)), ())
+        inside = self.__inside
+        events = []
+        for zone in candidates:
+            bbox = zone.bbox
+            if zone.id not in inside and not (bbox[0] < east < bbox[2] and bbox[1] < north < bbox[3]):
+                continue # outside the box, cannot enter
+            self.__test(zone, east, north, margin, time, lat, lon, events)
+        if inside:
+            for zone_id in [zone_id for zone_id in inside if zone_id in self.__zones]:
+                zone = self.__zones[zone_id]
+                if zone not in candidates: # the fix moved away from the zone, its cell does not list it
+                    self.__test(zone, east, north, margin, time, lat, lon, events)
+        self.updates += 1
+        self.update_time_ns += _monotonic_ns() - start
+        if events:
+            self.events += len(events)
+            if self.__callback:
+                for event in events:
+                    self.__callback(event)
+        return events
+
+    def __test(self, zone, east, north, margin, time, lat, lon, events):
+        distance = zone.signed_distance(east, north)
+        band = min(margin, zone.inradius / 2)
+        entered = self.__inside.get(zone.id)
+        if entered is None:
+            if distance <= -band:
+                self.__inside[zone.id] = time
+                events.append(GeofenceEvent("enter", zone.id, time, lat, lon, distance, 0.0))
+                if zone.dwell_time == 0:
+                    self.__dwelled.add(zone.id)
+                    events.append(GeofenceEvent("dwell", zone.id, time, lat, lon, distance, 0.0))
+        elif distance >= band:
+            del self.__inside[zone.id]
+            self.__dwelled.discard(zone.id)
+            events.append(GeofenceEvent("exit", zone.id, time, lat, lon, distance, time - entered))
+        elif zone.dwell_time is not None and zone.id not in self.__dwelled and time - entered >= zone.dwell_time:
+            self.__dwelled.add(zone.id)
+            events.append(GeofenceEvent("dwell", zone.id, time, lat, lon, distance, time - entered))
+
+    def feed(self, frame):
+        """
+        Updates the geofence from a GGA or NAV-PVT frame, other frames are ignored.
+
+        Fixes without a position (GGA quality 0, NAV-PVT without gnssFixOK) are skipped.
+        """
+        if frame[0:2] == UbloxConst.HEADER_UBX:
+            if (frame[2], frame[3]) != (NAV_PVT.msg_class, NAV_PVT.msg_id):
+                return None
+            record = NAV_PVT.decode(frame)
+            if record is None:
+                return None
+            return self.on_record(NAV_PVT.name, record)
+        if self.__fix_source is None and frame[3:6] == UbloxConst.SF_GGA:
+            values = _nmea.decode(frame, raw=True)
+            if values is None or not values[5] or values[1] is None or values[3] is None:
+                return None
+            return self.update(values[1], values[3], hdop=values[7])
+        return None
+
+    def on_record(self, name, record):
+        """Same as feed() for decoded (raw, unscaled) records, e.g. the callback(name, record) of a DecodePipeline."""
+        if name == "NAV-PVT":
+            self.__fix_source = "UBX"
+            if record.flags & 0x01: # gnssFixOK
+                return self.update(record.lat * _PVT_SCALES["lat"], record.lon * _PVT_SCALES["lon"],
+                                   accuracy=record.hAcc * _PVT_SCALES["hAcc"])
+        elif name in ("gga", "GGA") and self.__fix_source is None:
+            if record.quality not in (None, "No fix") and record.lat is not None and record.lon is not None:
+                return self.update(record.lat, record.lon, hdop=record.HDOP)
+        return None
+
+
+_monotonic = time.monotonic
+_monotonic_ns = time.monotonic_ns
+_nmea = NMEAReader() # raw=True decoding only, keeps no state
+_PVT_SCALES = NAV_PVT.scales
+
+
+# Example usage
+if __name__ == "__main__":
+    geofence = Geofence(callback=print)
+    geofence.add_circle("depot", 33.9737, -117.3281, 50, dwell_time=2)
+    geofence.add_polygon("campus", [(33.970, -117.335), (33.980, -117.335), (33.980, -117.320), (33.970, -117.320)])
+    for step in range(12):
+        geofence.update(33.9730 + step * 0.0001, -117.3281, accuracy=2.0, time=step)
@@ -0,0 +1,377 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to keep a time indexed history of decoded records in fixed size arrays
+"""
+import math
+import threading
+import time
+from datetime import time as time_of_day
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ubx_messages import UBXMessage, ESF_MEAS
+from pyublox.nmea_reader import NMEAReader
+from pyublox.ubx_decoder import UBXDecoder
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Fields holding angles in degrees, interpolated across the 0/360 wrap
+ANGLE_FIELDS = frozenset(("yaw", "heading", "headMot", "headVeh", "cog", "cog_true", "cog_mag"))
+
+
+class HistoryChannel:
+    """
+    Fixed size ring of the records of one message type.
+
+    Every record is a row of float64 values (one column per numeric field, NaN for missing
+    values) with two times: the GNSS time of the message in seconds (iTOW for UBX messages,
+    UTC time of day for NMEA sentences, NaN when the message has none) and the
+    time.monotonic_ns() it was received at. The arrays are allocated once, so a channel
+    uses capacity * (fields + 2) * 8 bytes whatever the rate of the message. Both times
+    grow with the rows (GNSS time until the week or day rollover), which lets range
+    queries bisect the two sorted halves of the ring in O(log n).
+    """
+    def __init__(self, name, fields, capacity):
+        self.name = name
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self.__index = {field: i for i, field in enumerate(self.fields)}
+        self.__values = np.full((capacity, len(self.fields)), np.nan)
+        self.__gnss = np.full(capacity, np.nan)
+        self.__mono = np.zeros(capacity, dtype=np.int64)
+        self.__count = 0 # rows ever appended
+        self.__last_gnss = math.nan
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.__count, self.capacity)
+
+    @property
+    def nbytes(self):
+        return self.__values.nbytes + self.__gnss.nbytes + self.__mono.nbytes
+
+    @property
+    def has_gnss_time(self):
+        return not math.isnan(self.__last_gnss)
+
+    def append(self, values, gnss_time, mono_ns):
+        """
+        Args:
+            values (list): One float per field.
+            gnss_time (float): GNSS time in seconds, None repeats the previous one to keep the column sorted.
+            mono_ns (int): time.monotonic_ns() of the record.
+        """
+        if gnss_time is None:
+            gnss_time = self.__last_gnss
+        with self.__lock:
+            slot = self.__count % self.capacity
+            self.__values[slot] = values
+            self.__gnss[slot] = gnss_time
+            self.__mono[slot] = mono_ns
+            self.__last_gnss = gnss_time
+            self.__count += 1
+
+    def __search(self, times, value, side):
+        # Logical index of value in the ring: bisects the older half, then the newer half
+        count, capacity = self.__count, self.capacity
+        if count <= capacity:
+            return int(np.searchsorted(times[:count], value, side))
+        start = count % capacity
+        older = times[start:]
+        index = int(np.searchsorted(older, value, side))
+        if index < len(older):
+            return index
+        return len(older) + int(np.searchsorted(times[:start], value, side))
+
+    def __slots(self, first, last):
+        # Physical rows of the logical rows [first, last)
+        offset = self.__count % self.capacity if self.__count > self.capacity else 0
+        return (np.arange(first, last) + offset) % self.capacity
+
+    def __times(self, clock):
+        if clock == "monotonic":
+            return self.__mono
+        if clock == "gnss":
+            if not self.has_gnss_time:
+                raise ValueError(f"{self.name} has no GNSS time, use clock='monotonic'")
+            return self.__gnss
+        raise ValueError(f"Unknown clock {clock!r}, expected 'gnss' or 'monotonic'")
+
+    def __columns(self, slots, fields):
+        columns = {"time": self.__gnss[slots], "mono_ns": self.__mono[slots]}
+        values = self.__values[slots]
+        for field in self.fields if fields is None else fields:
+            columns[field] = values[:, self.__index[field]]
+        return columns
+
+    def range(self, start=None, end=None, clock="monotonic", fields=None):
+        """
+        Records with start <= time < end.
+
+        Args:
+            start, end: Bounds in seconds (clock="gnss") or nanoseconds (clock="monotonic"), None for no bound.
+            clock (str): "gnss" or "monotonic".
+            fields (list): Columns to return, all by default.
+
+        Returns:
+            dict: "time" (GNSS seconds), "mono_ns" and one column per field, as NumPy arrays (copies), oldest first.
+        """
+        with self.__lock:
+            times = self.__times(clock)
+            first = self.__search(times, start, "left") if start is not None else 0
+            last = self.__search(times, end, "left") if end is not None else len(self)
+            return self.__columns(self.__slots(first, last), fields)
+
+    def latest(self, count, fields=None):
+        with self.__lock:
+            length = len(self)
+            return self.__columns(self.__slots(max(length - count, 0), length), fields)
+
+    def decimate(self, start=None, end=None, every=None, max_points=None, clock="monotonic", method="mean", fields=None):
+        """
+        Downsamples a range for display.
+
+        Args:
+            every (float): Bucket length in seconds, one output row per bucket.
+            max_points (int): Without every, buckets of consecutive rows so that at most max_points remain.
+            method (str): "mean" of every bucket, or its "first" or "last" row.
+
+        Returns:
+            dict: Same columns as range().
+        """
+        columns = self.range(start, end, clock, fields)
+        times = columns["mono_ns"] if clock == "monotonic" else columns["time"]
+        count = len(times)
+        if count == 0:
+            return columns
+        if every is not None:
+            buckets = ((times - times[0]) // (every * 1e9 if clock == "monotonic" else every)).astype(np.int64)
+            starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+        elif max_points is not None and count > max_points:
+            starts = np.arange(0, count, math.ceil(count / max_points))
+        else:
+            return columns
+        if method == "first":
+            return {name: column[starts] for name, column in columns.items()}
+        if method == "last":
+            return {name: column[np.append(starts[1:] - 1, count - 1)] for name, column in columns.items()}
+        if method != "mean":
+            raise ValueError(f"Unknown decimation method {method!r}, expected 'mean', 'first' or 'last'")
+        sizes = np.diff(np.append(starts, count))
+        result = {}
+        for name, column in columns.items():
+            if name in ANGLE_FIELDS: # circular mean
+                radians = np.radians(column)
+                result[name] = np.degrees(np.arctan2(np.add.reduceat(np.sin(radians), starts),
+                                                     np.add.reduceat(np.cos(radians), starts))) % 360
+            elif column.dtype == np.int64:
+                result[name] = np.add.reduceat(column, starts) // sizes
+            else:
+                result[name] = np.add.reduceat(column, starts) / sizes
+        return result
+
+    def interpolate(self, times, clock="monotonic", fields=None):
+        """
+        Linear interpolation of the fields at the given times, angles across the 0/360 wrap.
+
+        Returns:
+            dict: One column per field, NaN for times outside the stored range.
+        """
+        times = np.asarray(times)
+        fields = self.fields if fields is None else fields
+        if len(times) == 0 or len(self) == 0:
+            return {field: np.full(len(times), np.nan) for field in fields}
+        with self.__lock:
+            source = self.__times(clock)
+            # one row on each side of the requested span is enough to interpolate inside it
+            first = max(self.__search(source, times.min(), "right") - 1, 0)
+            last = min(self.__search(source, times.max(), "left") + 1, len(self))
+            slots = self.__slots(first, last)
+            source = source[slots]
+            values = self.__values[slots]
+        if clock == "monotonic": # nanoseconds lose precision as float64, interpolate relative to the first row
+            times = (times - source[0]).astype(float)
+            source = (source - source[0]).astype(float)
+        result = {}
+        for field in fields:
+            column = values[:, self.__index[field]]
+            if field in ANGLE_FIELDS:
+                valid = ~np.isnan(column)
+                unwrapped = column.copy()
+                unwrapped[valid] = np.degrees(np.unwrap(np.radians(column[valid])))
+                result[field] = np.interp(times, source, unwrapped, left=np.nan, right=np.nan) % 360
+            else:
+                result[field] = np.interp(times, source, column, left=np.nan, right=np.nan)
+        return result
+
+
+class HistoryStore:
+    """
+    Time indexed history of decoded messages, one HistoryChannel per message type.
+
+    Unlike RecordHistory (a deque of record objects), the numeric fields of every record
+    are stored in preallocated NumPy arrays, so memory is fixed per channel and a window
+    ("NAV-PVT over the last 30 s") comes back as columns ready to plot, found by bisection
+    instead of a scan. UBX fields are stored scaled (degrees, meters...) and ESF-MEAS as the
+    MEAS axes of UBXDecoder (m/s^2, deg/s). Text fields are not stored.
+
+    feed() can be used as a ublox callback (or subscription) and stamps every record with
+    time.monotonic_ns(); add() takes records decoded elsewhere.
+    """
+    def __init__(self, capacity=4096, capacities=None, types=None):
+        """
+        Args:
+            capacity (int): Records kept per message type.
+            capacities (dict): Capacity per message type, e.g. {"ESF-MEAS": 60000}.
+            types (iterable): Message types to keep, e.g. {"GGA", "NAV-PVT"}, None for all.
+        """
+        if np is None:
+            raise ImportError("HistoryStore needs NumPy, use RecordHistory without it")
+        self.__capacity = capacity
+        self.__capacities = capacities or {}
+        self.__types = frozenset(types) if types else None
+        self.__channels = {}
+        self.__layouts = {} # message type -> (field indexes, scales, GNSS time index, GNSS time kind)
+        self.__nmea = NMEAReader()
+        self.__ubx = UBXDecoder()
+        self.records = 0
+
+    def __contains__(self, name):
+        return name in self.__channels
+
+    def names(self):
+        return tuple(self.__channels)
+
+    def channel(self, name):
+        """
+        Returns:
+            HistoryChannel: The channel of a message type, KeyError if none was received.
+        """
+        return self.__channels[name]
+
+    @property
+    def nbytes(self):
+        return sum(channel.nbytes for channel in self.__channels.values())
+
+    def feed(self, frame, time_ns=None):
+        """
+        Decodes a frame and stores its record. Can be used as a ublox callback: UBX frames are
+        expected to come from UbloxFramer, their checksum is not checked again.
+        """
+        if time_ns is None:
+            time_ns = time.monotonic_ns()
+        if frame[0:2] == UbloxConst.HEADER_UBX:
+            definition = UBXMessage.REGISTRY.get((frame[2], frame[3]))
+            if definition is None or (self.__types is not None and definition.name not in self.__types):
+                return
+            record = self.__ubx.decode(frame, verify=False)
+            if record is None:
+                return
+            if definition is ESF_MEAS:
+                record = self.__ubx.meas
+            self.add(definition.name, record, time_ns)
+        elif frame[0:2] == UbloxConst.HEADER_NMEA:
+            record = self.__nmea.decode(frame)
+            if record is not None:
+                self.add(type(record).__name__, record, time_ns)
+
+    def __layout(self, name, record):
+        definition = UBXMessage.NAMES.get(name)
+        scales = definition.scales if definition is not None and isinstance(record, definition.record) else {}
+        fields, indexes = [], []
+        gnss = None
+        for index, (field, value) in enumerate(zip(record._fields, record)):
+            if field == "iTOW" and gnss is None:
+                gnss = (index, "itow")
+            elif isinstance(value, time_of_day):
+                gnss = (index, "utc")
+            elif (value is None or isinstance(value, (int, float))) and field != "blocks":
+                fields.append(field)
+                indexes.append(index)
+        layout = (indexes, [scales.get(field, 1.0) for field in fields], gnss)
+        return fields, layout
+
+    def add(self, name, record, time_ns=None):
+        """
+        Stores one record.
+
+        Args:
+            name (str): Message type, e.g. "GGA" or "NAV-PVT". All records of a type must have the same fields.
+            record (namedtuple): The record, UBX records raw as decoded (they are scaled here).
+            time_ns (int): time.monotonic_ns() of the record, defaults to now.
+        """
+        if self.__types is not None and name not in self.__types:
+            return
+        layout = self.__layouts.get(name)
+        if layout is None:
+            fields, layout = self.__layout(name, record)
+            self.__channels[name] = HistoryChannel(name, fields, self.__capacities.get(name, self.__capacity))
+            self.__layouts[name] = layout
+        indexes, scales, gnss = layout
+        values = [math.nan if record[index] is None else record[index] * scale for index, scale in zip(indexes, scales)]
+        gnss_time = None
+        if gnss is not None:
+            value = record[gnss[0]]
+            if value is not None:
+                gnss_time = value / 1000 if gnss[1] == "itow" else \
+                    value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+        self.__channels[name].append(values, gnss_time, time_ns if time_ns is not None else time.monotonic_ns())
+        self.records += 1
+
+    def range(self, name, start=None, end=None, clock="monotonic", fields=None):
+        """Records of a message type between two times, see HistoryChannel.range."""
+        return self.__channels[name].range(start, end, clock, fields)
+
+    def last(self, name, seconds, fields=None):
+        """
+        Returns:
+            dict: The records of a message type received in the last seconds, see HistoryChannel.range.
+        """
+        return self.__channels[name].range(time.monotonic_ns() - int(seconds * 1e9), None, "monotonic", fields)
+
+    def latest(self, name, count, fields=None):
+        return self.__channels[name].latest(count, fields)
+
+    def decimate(self, name, start=None, end=None, every=None, max_points=None, clock="monotonic", method="mean", fields=None):
+        """Downsampled records of a message type, see HistoryChannel.decimate."""
+        return self.__channels[name].decimate(start, end, every, max_points, clock, method, fields)
+
+    def interpolate(self, name, times, clock="monotonic", fields=None):
+        """Fields of a message type interpolated at the given times, see HistoryChannel.interpolate."""
+        return self.__channels[name].interpolate(times, clock, fields)
+
+    def align(self, name, epochs="NAV-PVT", start=None, end=None, clock="monotonic", fields=None):
+        """
+        Interpolates a message type (e.g. ESF-MEAS, ESF-ALG) to the epochs of another (e.g. NAV-PVT).
+
+        ESF-MEAS has no GNSS time (its timeTag is the sensor clock), so the epochs are matched
+        on the monotonic receive times by default; use clock="gnss" for two messages with iTOW.
+
+        Args:
+            start, end: Range of the epochs, in the unit of clock.
+
+        Returns:
+            dict: "time" and "mono_ns" of the epochs and the interpolated fields.
+        """
+        target = self.__channels[epochs].range(start, end, clock, fields=())
+        times = target["mono_ns"] if clock == "monotonic" else target["time"]
+        target.update(self.__channels[name].interpolate(times, clock, fields))
+        return target
+
+
+# Example usage
+if __name__ == "__main__":
+    import struct
+    from pyublox.ublox_utility import UbloxUtils
+    store = HistoryStore(capacity=1000, capacities={"ESF-MEAS": 20000})
+    # 10 s of a 10 Hz NAV-PVT with ESF-MEAS at 100 Hz (data type 16: AccelX, 5: GyroZ)
+    for epoch in range(100):
+        itow = 100000 + epoch * 100
+        for i in range(10):
+            words = struct.pack("<II", (epoch * 10 + i) & 0xFFFFFF | 16 << 24, -i & 0xFFFFFF | 5 << 24)
+            frame = UbloxUtils.build_ubx(UbloxConst.CLASS_ESF, UbloxConst.ID_MEAS, struct.pack("<IHH", itow * 10 + i, 2 << 11, 0) + words)
+            store.feed(frame, (itow + i * 10) * 1000000)
+        store.feed(UbloxUtils.build_ubx(UbloxConst.CLASS_NAV, 0x07, struct.pack("<I", itow) + bytes(88)), itow * 1000000)
+    print(store.names(), store.nbytes)
+    print(store.align("ESF-MEAS", "NAV-PVT", fields=["AccelX", "GyroZ"]))
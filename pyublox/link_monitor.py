@@ -0,0 +1,179 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to measure how much of the serial link the receiver output uses
+"""
+import threading
+import time
+from collections import namedtuple
+from pyublox.ublox_constants import UbloxConst
+from pyublox.frame_dispatcher import message_type
+from pyublox.ublox_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Link statistics of one report interval
+LinkReport = namedtuple("LinkReport", (
+    "time", "bytes_per_s", "capacity", "utilization", "types", "epochs", "epochs_missing", "completeness",
+    "checksum_errors", "bytes_discarded"))
+
+
+class LinkMonitor:
+    """
+    Measures the load of the serial link and warns (or throttles) before it overruns.
+
+    Every interval seconds a LinkReport is built from the frames received since the last
+    one: bytes per second against the capacity of the link (baud rate / 10 on an 8N1 UART),
+    bytes per second of every message type, and epoch completeness. An overrun loses
+    bytes, so whole epochs go missing: epochs are counted by iTOW (GGA time without UBX
+    navigation messages) and a gap larger than the navigation period counts the skipped
+    epochs as missing. Framer checksum errors and discarded bytes are reported too.
+
+    When the utilization goes past threshold a warning is printed, and with throttle=True
+    the output rate of the biggest message type is halved through config (CFG-MSGOUT on
+    port), one message type per report, until the link is back under threshold.
+    """
+    def __init__(self, connection, interval=1.0, threshold=0.8, callback=None, config=None, port="UART1",
+                 throttle=False, capacity=None):
+        """
+        Args:
+            connection (UBloxSerialConnection): The link to monitor, its frames, baud rate and framer counters are used.
+            interval (float): Seconds between reports.
+            threshold (float): Utilization (0-1) above which the link is considered overloaded.
+            callback (function): Called with every LinkReport.
+            config (UbloxConfig): Needed to throttle.
+            port (str): Receiver port of the link, for the CFG-MSGOUT keys.
+            throttle (bool): Lower the output rates when the link is overloaded.
+            capacity (float): Link capacity in bytes per second, defaults to baud rate / 10 (e.g. for USB links).
+        """
+        self.__connection = connection
+        self.__interval = interval
+        self.__threshold = threshold
+        self.__callback = callback
+        self.__config = config
+        self.__port = port
+        self.__throttle = throttle
+        self.__capacity = capacity
+        self.__lock = threading.Lock()
+        self.__types = {} # message type -> bytes since the last report
+        self.__bytes = 0
+        self.__epochs = 0
+        self.__epochs_missing = 0
+        self.__last_itow = None
+        self.__itow_source = None # "UBX" once a UBX iTOW is seen, GGA time is ignored from then on
+        self.__report_time = time.monotonic()
+        self.__framer_counts = self.__read_framer()
+        self.__throttling = None
+        self.rate_dividers = {} # message type -> output rate divider set by throttling
+        self.period_ms = None # navigation period estimated from the iTOW steps
+        self.report = None # last LinkReport
+        self.overloads = 0
+        self.__subscription = connection.subscribe(self.feed, max_queue=8192)
+
+    def set_callback(self, callback):
+        self.__callback = callback
+
+    def close(self):
+        self.__connection.dispatcher.unsubscribe(self.__subscription)
+
+    def __read_framer(self):
+        framer = getattr(self.__connection, "framer", None)
+        return (framer.checksum_errors, framer.bytes_discarded) if framer is not None else (0, 0)
+
+    def feed(self, frame):
+        name = message_type(frame)
+        size = len(frame)
+        with self.__lock:
+            self.__types[name] = self.__types.get(name, 0) + size
+            self.__bytes += size
+            itow = self.__itow(frame)
+            if itow is not None:
+                self.__add_epoch(itow)
+        if time.monotonic() - self.__report_time >= self.__interval:
+            self.__make_report()
+
+    def __itow(self, frame):
+        if frame[0:2] == UbloxConst.HEADER_UBX:
+            offset = UbloxConst.ITOW_OFFSETS.get((frame[2], frame[3]))
+            if offset is None or len(frame) < 10 + offset + 2:
+                return None
+            self.__itow_source = "UBX"
+            return int.from_bytes(frame[6 + offset:10 + offset], "little")
+        if self.__itow_source is None and frame[3:6] == UbloxConst.SF_GGA:
+            field = frame[7:frame.find(b",", 7)]
+            if len(field) >= 6:
+                try:
+                    return round((int(field[0:2]) * 3600 + int(field[2:4]) * 60 + float(field[4:])) * 1000)
+                except ValueError:
+                    return None
+        return None
+
+    def __add_epoch(self, itow):
+        last = self.__last_itow
+        if last is not None and 0 <= last - itow < 60000:
+            return # same epoch, or an older message of a previous one
+        self.__epochs += 1
+        self.__last_itow = itow
+        if last is None or itow < last: # first epoch, week or day rollover
+            return
+        step = itow - last
+        if self.period_ms is None or step < self.period_ms:
+            self.period_ms = step
+        skipped = round(step / self.period_ms) - 1
+        if skipped > 0:
+            self.__epochs_missing += skipped
+
+    def __make_report(self):
+        now = time.monotonic()
+        counts = self.__read_framer()
+        with self.__lock:
+            elapsed = now - self.__report_time
+            types, self.__types = self.__types, {}
+            total, self.__bytes = self.__bytes, 0
+            epochs, self.__epochs = self.__epochs, 0
+            missing, self.__epochs_missing = self.__epochs_missing, 0
+            self.__report_time = now
+            previous, self.__framer_counts = self.__framer_counts, counts
+        capacity = self.__capacity
+        if capacity is None:
+            baud_rate = getattr(self.__connection, "baud_rate", None)
+            capacity = baud_rate / 10 if baud_rate else None # start + 8 data + stop bits
+        bytes_per_s = total / elapsed
+        report = LinkReport(
+            time=time.time(), bytes_per_s=bytes_per_s, capacity=capacity,
+            utilization=bytes_per_s / capacity if capacity else None,
+            types={name: size / elapsed for name, size in sorted(types.items(), key=lambda item: -item[1])},
+            epochs=epochs, epochs_missing=missing,
+            completeness=epochs / (epochs + missing) if epochs + missing else None,
+            checksum_errors=counts[0] - previous[0], bytes_discarded=counts[1] - previous[1])
+        self.report = report
+        if report.utilization is not None and report.utilization > self.__threshold:
+            self.overloads += 1
+            logger.warning("link at %.0f%% of %.0f B/s, largest: %s", report.utilization * 100, capacity,
+                           ", ".join(f"{name} {rate:.0f} B/s" for name, rate in list(report.types.items())[:3]))
+            if self.__throttle:
+                self.__throttle_largest(report)
+        if self.__callback:
+            self.__callback(report)
+
+    def __throttle_largest(self, report):
+        if self.__config is None or (self.__throttling is not None and self.__throttling.is_alive()):
+            return
+        for name in report.types:
+            message = "NMEA_ID_" + name if len(name) == 3 else "UBX_" + name.replace("-", "_")
+            key = f"CFG-MSGOUT-{message}_{self.__port}"
+            if key in self.__config.KEYS and self.rate_dividers.get(name, 1) < 255:
+                # set() waits for the ACK, keep it off the frame delivery thread
+                self.__throttling = threading.Thread(target=self.__slow_down, args=(name, key), daemon=True)
+                self.__throttling.start()
+                return
+
+    def __slow_down(self, name, key):
+        current = self.__config.get([key]).get(key)
+        if not current:
+            self.rate_dividers[name] = 255 # not configurable on this port, do not try again
+            return
+        divider = min(current * 2, 255)
+        if self.__config.set({key: divider}):
+            self.rate_dividers[name] = divider
+            logger.info("throttled %s to 1 message every %s solutions", name, divider)
@@ -0,0 +1,280 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to collect the counters, gauges and timers of pyublox and export them as a dict or in the Prometheus text format
+"""
+import json
+import threading
+import time
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pyublox.frame_timing import LatencyHistogram
+from pyublox.ublox_logging import get_logger
+
+logger = get_logger(__name__)
+
+# One value of a metric family. kind: "counter", "gauge" or "summary" (value is then a LatencyHistogram of ns)
+Sample = namedtuple("Sample", ("name", "kind", "help", "labels", "value"))
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ("value", "function")
+
+    def __init__(self, function=None):
+        self.value = 0
+        self.function = function # read at collection time instead of value
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+
+class MetricsRegistry:
+    """
+    Counters, gauges and timers of the package, read as a dict (snapshot()) or in the
+    Prometheus text format (prometheus(), or over HTTP with serve()).
+
+    Most pyublox components already keep plain integer counters on their hot paths
+    (UbloxFramer.checksum_errors, Subscription.depth...). They are not copied into the
+    registry on every frame: a collector, a function returning Sample tuples, reads them
+    when the metrics are collected, e.g. UBloxSerialConnection.metrics. Metrics owned by
+    the registry are created with counter(), gauge() and timer(); a timer is a
+    LatencyHistogram of nanoseconds exported as a summary in seconds.
+
+    Names get the prefix ("pyublox_") when exported, labels are passed as keyword arguments.
+    """
+    QUANTILES = (0.5, 0.9, 0.99)
+
+    def __init__(self, prefix="pyublox_"):
+        self.prefix = prefix
+        self.__families = {} # name -> [kind, help, {labels tuple: Counter, Gauge or LatencyHistogram}]
+        self.__collectors = []
+        self.__lock = threading.Lock()
+        self.__server = None
+        self.__thread = None
+
+    def __metric(self, name, kind, help, labels, factory):
+        key = tuple(sorted(labels.items()))
+        family = self.__families.get(name)
+        if family is None or key not in family[2]:
+            with self.__lock:
+                family = self.__families.setdefault(name, [kind, help, {}])
+                if family[0] != kind:
+                    raise ValueError(f"Metric {name} is a {family[0]}, not a {kind}")
+                family[2].setdefault(key, factory())
+        return family[2][key]
+
+    def counter(self, name, help="", **labels):
+        """
+        Returns:
+            Counter: The counter of name and labels, created on first use; call inc() on it.
+        """
+        return self.__metric(name, "counter", help, labels, Counter)
+
+    def gauge(self, name, help="", function=None, **labels):
+        """
+        Args:
+            function (function): Returns the value when the metrics are collected, set() is used if None.
+
+        Returns:
+            Gauge: The gauge of name and labels.
+        """
+        gauge = self.__metric(name, "gauge", help, labels, Gauge)
+        if function is not None:
+            gauge.function = function
+        return gauge
+
+    def timer(self, name, help="", **labels):
+        """
+        Returns:
+            LatencyHistogram: The histogram of name and labels, record() durations in nanoseconds into it.
+        """
+        return self.__metric(name, "summary", help, labels, LatencyHistogram)
+
+    def timed(self, name, function, help="", **labels):
+        """Wraps function so that the duration of every call is recorded in timer(name, **labels)."""
+        histogram = self.timer(name, help, **labels)
+        monotonic_ns = time.monotonic_ns
+        def wrapper(*args, **kwargs):
+            start = monotonic_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.record(monotonic_ns() - start)
+        return wrapper
+
+    def add_collector(self, collector):
+        """
+        Args:
+            collector (function): Called on every collection, returns an iterable of Sample.
+        """
+        with self.__lock:
+            self.__collectors = self.__collectors + [collector]
+
+    def remove_collector(self, collector):
+        with self.__lock:
+            self.__collectors = [item for item in self.__collectors if item != collector]
+
+    def collect(self):
+        """
+        Returns:
+            dict: name -> (kind, help, list of (labels dict, value)), registry metrics first, then the collectors.
+        """
+        families = {}
+        for name, (kind, help, metrics) in list(self.__families.items()):
+            samples = []
+            for key, metric in list(metrics.items()):
+                value = metric.get() if kind == "gauge" else metric if kind == "summary" else metric.value
+                samples.append((dict(key), value))
+            families[name] = (kind, help, samples)
+        for collector in self.__collectors:
+            try:
+                for sample in collector():
+                    family = families.get(sample.name)
+                    if family is None:
+                        family = families[sample.name] = (sample.kind, sample.help, [])
+                    family[2].append((sample.labels or {}, sample.value))
+            except Exception as e:
+                logger.warning("Collector %r failed: %s", collector, e)
+        return families
+
+    def snapshot(self, unit=1000):
+        """
+        Returns:
+            dict: name -> value for metrics without labels, name -> {"label=value,...": value} otherwise.
+                  Summaries are LatencyHistogram.summary() dicts in unit ns (microseconds by default).
+        """
+        snapshot = {}
+        for name, (kind, _, samples) in self.collect().items():
+            values = {}
+            for labels, value in samples:
+                values[",".join(f"{key}={label}" for key, label in sorted(labels.items()))] = \
+                    value.summary(unit) if kind == "summary" else value
+            snapshot[name] = values[""] if list(values) == [""] else values
+        return snapshot
+
+    def prometheus(self):
+        """
+        Returns:
+            str: Every metric in the Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        for name, (kind, help, samples) in self.collect().items():
+            name = self.prefix + name
+            if help:
+                lines.append(f"# HELP {name} {_escape_help(help)}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                if kind == "summary":
+                    for quantile in self.QUANTILES:
+                        duration_ns = value.percentile(quantile * 100)
+                        seconds = duration_ns / 1e9 if duration_ns is not None else None
+                        lines.append(f"{name}{_labels(labels, quantile=quantile)} {_number(seconds)}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(value.total / 1e9)}")
+                    lines.append(f"{name}_count{_labels(labels)} {value.count}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9108, host="127.0.0.1"):
+        """
+        Serves /metrics (Prometheus text) and /metrics.json (snapshot()) over HTTP on a daemon thread.
+
+        Args:
+            port (int): TCP port, 0 picks a free one.
+            host (str): Address to listen on, the loopback interface by default.
+
+        Returns:
+            int: The port the server listens on.
+        """
+        if self.__server is not None:
+            return self.__server.server_address[1]
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path in ("/", "/metrics"):
+                    body = registry.prometheus().encode()
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body = json.dumps(registry.snapshot(), default=str).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass # one line per scrape is not worth a print
+
+        self.__server = ThreadingHTTPServer((host, port), Handler)
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+        return self.__server.server_address[1]
+
+    def stop(self):
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__thread.join()
+        self.__server = None
+        self.__thread = None
+
+
+def _number(value):
+    if value is None:
+        return "NaN"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float):
+        if value != value:
+            return "NaN"
+        if value in (float("inf"), float("-inf")):
+            return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def _escape_help(text):
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, **extra):
+    items = list(labels.items()) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in items) + "}"
+
+
+# Example usage
+if __name__ == "__main__":
+    registry = MetricsRegistry()
+    frames = registry.counter("frames_total", "Frames received per message type", type="GGA")
+    decode = registry.timer("decode_seconds", "Duration of one decode() call", decoder="nmea")
+    registry.gauge("queue_depth", "Frames waiting in the queue", function=lambda: 3)
+    for i in range(100):
+        frames.inc()
+        decode.record(2000 + i * 10)
+    print(registry.prometheus())
+    print(registry.snapshot())
@@ -3,77 +3,360 @@ author: Xuanpeng Zhao
 Date: Feb 07 2024
 Description: This script is designed to read NMEA messages
 """
+import time as _time
+from collections import namedtuple
+from datetime import date, time
 from pyublox.ublox_utility import UbloxUtils
 from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_records import RecordHistory
+from pyublox.ublox_logging import get_logger
+
+logger = get_logger(__name__)
+_monotonic_ns = _time.monotonic_ns
 
 class NMEAReader:
+    """
+    Decodes NMEA sentences straight from the received bytes.
+
+    The checksum is verified on the bytes, the sentence is split once with bytes.split()
+    and numeric fields go through float()/int(), which accept bytes, so no str copy of
+    the sentence is made. decode(recv_data, raw=True) returns a plain tuple of numbers in
+    the order of the fields of the sentence record (times as seconds of the day, latitude
+    and longitude as signed decimal degrees) and skips the record construction entirely.
+
+    Every decoded sentence produces a new immutable record (GGA, VTG, RMC...) which
+    replaces the previous one in a single attribute assignment. Grab the record once
+    (gga = reader.gga) and read its fields from that reference to get values of one epoch
+    without locking. With history_size > 0 the last records of every sentence are also
+    kept in reader.history (see RecordHistory).
+
+    Invalid sentences are counted in checksum_errors and errors and logged to the
+    "pyublox.nmea_reader" logger (rate limited). Setting timer to a LatencyHistogram (see
+    MetricsRegistry.timer) records the duration of every decode() call.
+    """
 
-    def __init__(self):
+    def __init__(self, history_size=0):
         self.gga = self.GGA()
         self.vtg = self.VTG()
+        self.rmc = self.RMC()
+        self.gsa = self.GSA()
+        self.gsv = self.GSV()
+        self.gst = self.GST()
+        self.gns = self.GNS()
+        self.zda = self.ZDA()
+        self.history = RecordHistory(history_size) if history_size > 0 else None
+        self.timer = None
+        self.checksum_errors = 0
+        self.errors = 0 # sentences that could not be parsed or are not NMEA
+        self.__sentences = {
+            UbloxConst.SF_GGA: (NMEAReader.parse_gga, "gga", self.GGA),
+            UbloxConst.SF_VTG: (NMEAReader.parse_vtg, "vtg", self.VTG),
+            UbloxConst.SF_RMC: (NMEAReader.parse_rmc, "rmc", self.RMC),
+            UbloxConst.SF_GSA: (NMEAReader.parse_gsa, "gsa", self.GSA),
+            UbloxConst.SF_GSV: (NMEAReader.parse_gsv, "gsv", self.GSV),
+            UbloxConst.SF_GST: (NMEAReader.parse_gst, "gst", self.GST),
+            UbloxConst.SF_GNS: (NMEAReader.parse_gns, "gns", self.GNS),
+            UbloxConst.SF_ZDA: (NMEAReader.parse_zda, "zda", self.ZDA),
+        }
 
-    def decode(self, recv_data):
-        header = recv_data[0:2]
-        talker_ID = recv_data[1:3]
-        sentence_formatter = recv_data[3:6]
-        if header == UbloxConst.HEADER_NMEA:
+    def decode(self, recv_data, raw=False):
+        """
+        Args:
+            recv_data (bytes or memoryview): One NMEA sentence, CRLF optional.
+            raw (bool): Return the parsed tuple instead of updating the sentence object.
+
+        Returns:
+            The new immutable record of the sentence (or the raw tuple), None if the sentence is invalid or not supported.
+        """
+        timer = self.timer
+        if timer is None:
+            return self.__decode(recv_data, raw)
+        start = _monotonic_ns()
+        try:
+            return self.__decode(recv_data, raw)
+        finally:
+            timer.record(_monotonic_ns() - start)
+
+    def __decode(self, recv_data, raw):
+        if not isinstance(recv_data, bytes):
+            recv_data = bytes(recv_data)
+        if recv_data[0:2] == UbloxConst.HEADER_NMEA:
             try:
-                decoded_data = recv_data.decode('utf-8')
-                checksum = UbloxUtils.nmea_checksum(decoded_data)
-                if checksum == decoded_data[decoded_data.find('*')+1:].strip():
-                    sentence = decoded_data[:decoded_data.find('*')]
-                    data_fields = sentence.split(",")
-                    if sentence_formatter == UbloxConst.SF_GGA:
-                        self.gga.decode(data_fields)
-                    if sentence_formatter == UbloxConst.SF_VTG:
-                        self.vtg.decode(data_fields)
-                else:
-                    print("NMEA Reader: ", "", "Checksum error: ", decoded_data)
+                star = recv_data.rfind(b'*')
+                if star < 0 or int(recv_data[star + 1:star + 3], 16) != UbloxUtils.nmea_checksum_bytes(recv_data[:star]):
+                    self.checksum_errors += 1
+                    logger.warning("Checksum error: %s", recv_data)
+                    return None
+                sentence = self.__sentences.get(recv_data[3:6]) # recv_data[3:6] is the sentence formatter
+                if sentence is None:
+                    return None
+                parse, name, record_type = sentence
+                values = parse(recv_data[:star].split(b','))
+                if values is None or raw:
+                    return values
+                record = record_type.from_values(values)
+                self.publish(name, record)
+                return record
             except Exception as e:
-                print("NMEA Reader: ", e, f", Error decoding data: {recv_data}")
+                self.errors += 1
+                logger.warning("%s, Error decoding data: %s", e, recv_data)
         else:
-            print("Wrong input for NMEA reader")
-            
-    class GGA:
-        def __init__(self):
-            self.time = None  # UTC time of the fix (hhmmss.ss format)
-            self.lat = None  # Latitude (ddmm.mmmmm format)
-            self.NS = None  # North/South indicator (N or S)
-            self.lon = None  # Longitude (dddmm.mmmmm format)
-            self.EW = None  # East/West indicator (E or W)
-            self.quality = None  # Quality indicator for position fix
-            self.numSV = None  # Number of satellites used
-            self.HDOP = None  # Horizontal Dilution of Precision
-            self.alt = None  # Altitude above mean sea level
-            self.sep = None  # Geoid separation: difference between ellipsoid and mean sea level
-            self.diffAge = None  # Age of differential corrections (null when DGPS is not used)
-            self.diffStation = None  # ID of station providing differential corrections (null when DGPS is not used)
-        def decode(self, data_fields):
-            if len(data_fields) >= 14:
-                self.time = UbloxUtils.convert_HHMMSSsss_to_time(data_fields[1])
-                self.NS = data_fields[3]
-                self.lat = UbloxUtils.convert_gps_to_decimal(data_fields[2], self.NS)
-                self.EW = data_fields[5]
-                self.lon = UbloxUtils.convert_gps_to_decimal(data_fields[4], self.EW)
-                self.quality = UbloxUtils.get_quality(data_fields[6])
-                self.numSV = data_fields[7]
-                self.HDOP = data_fields[8]
-                self.alt = data_fields[9]
-                self.sep = data_fields[11]
-                self.diffAge = data_fields[13]
-                self.diffStation = data_fields[14]
-    class VTG:
-        def __init__(self):
-            self.cog_true = None  # Course over ground (true), in degrees
-            self.cog_mag = None  # Course over ground (magnetic), in degrees
-            self.sog_knots = None  # Speed over ground, in knots
-            self.sog_kmh = None  # Speed over ground, in kilometers per hour
-            self.pos_mode = None  # Mode indicator (available in NMEA 2.3 and later)
-        def decode(self, data_fields):
-            self.cog_true = data_fields[1]
-            self.cog_mag = data_fields[3]
-            self.sog_knots = data_fields[5]
-            self.sog_kmh = data_fields[7]
-            self.pos_mode = UbloxUtils.get_posMode(data_fields[9])
+            self.errors += 1
+            logger.warning("Wrong input for NMEA reader")
+        return None
+
+    def publish(self, name, record):
+        """
+        Makes a record decoded elsewhere (e.g. by a DecodePipeline worker) the current one.
+
+        Args:
+            name (str): Attribute of the sentence, e.g. "gga".
+            record: The sentence record.
+        """
+        # Publishing is a single reference swap, readers never see a half updated record
+        setattr(self, name, record)
+        if self.history is not None:
+            self.history.append(name, record)
+
+    @staticmethod
+    def to_float(field):
+        return float(field) if field else None
+
+    @staticmethod
+    def to_int(field):
+        return int(field) if field else None
+
+    @staticmethod
+    def to_seconds(field):
+        """Converts an hhmmss.ss field to seconds of the day."""
+        if not field:
+            return None
+        return int(field[0:2]) * 3600 + int(field[2:4]) * 60 + float(field[4:])
+
+    @staticmethod
+    def to_degrees(field, direction):
+        """Converts a (d)ddmm.mmmm field and its N/S/E/W indicator to signed decimal degrees."""
+        if not field:
+            return None
+        value = float(field)
+        degrees = int(value // 100)
+        decimal_degrees = degrees + (value - degrees * 100) / 60
+        return -decimal_degrees if direction in (b'S', b'W') else decimal_degrees
+
+    @staticmethod
+    def to_time(seconds):
+        """Converts seconds of the day to datetime.time, the type the sentence objects expose."""
+        if seconds is None:
+            return None
+        microseconds = int(round(seconds * 1000)) * 1000 % 86400000000
+        return time(hour=microseconds // 3600000000, minute=microseconds // 60000000 % 60,
+                    second=microseconds // 1000000 % 60, microsecond=microseconds % 1000000)
+
+    @staticmethod
+    def to_date(field):
+        """Converts a ddmmyy field to datetime.date."""
+        if not field:
+            return None
+        return date(2000 + int(field[4:6]), int(field[2:4]), int(field[0:2]))
+
+    @staticmethod
+    def parse_gga(fields):
+        if len(fields) < 15:
+            return None
+        to_degrees = NMEAReader.to_degrees
+        return (NMEAReader.to_seconds(fields[1]), to_degrees(fields[2], fields[3]), fields[3],
+                to_degrees(fields[4], fields[5]), fields[5], int(fields[6]) if fields[6] else None,
+                int(fields[7]) if fields[7] else None, float(fields[8]) if fields[8] else None,
+                float(fields[9]) if fields[9] else None, float(fields[11]) if fields[11] else None,
+                float(fields[13]) if fields[13] else None, fields[14])
+
+    @staticmethod
+    def parse_vtg(fields):
+        if len(fields) < 10:
+            return None
+        return (float(fields[1]) if fields[1] else None, float(fields[3]) if fields[3] else None,
+                float(fields[5]) if fields[5] else None, float(fields[7]) if fields[7] else None, fields[9])
+
+    @staticmethod
+    def parse_rmc(fields):
+        if len(fields) < 13:
+            return None
+        mv = NMEAReader.to_float(fields[10])
+        if mv is not None and fields[11] == b'W':
+            mv = -mv
+        # The date stays the ddmmyy field, an int would lose the leading zero of the day
+        return (NMEAReader.to_seconds(fields[1]), fields[2], NMEAReader.to_degrees(fields[3], fields[4]),
+                NMEAReader.to_degrees(fields[5], fields[6]), NMEAReader.to_float(fields[7]),
+                NMEAReader.to_float(fields[8]), fields[9], mv, fields[12], fields[13] if len(fields) > 13 else b'')
+
+    @staticmethod
+    def parse_gsa(fields):
+        if len(fields) < 18:
+            return None
+        return (fields[1], NMEAReader.to_int(fields[2]), tuple(int(sv) for sv in fields[3:15] if sv),
+                NMEAReader.to_float(fields[15]), NMEAReader.to_float(fields[16]), NMEAReader.to_float(fields[17]),
+                NMEAReader.to_int(fields[18]) if len(fields) > 18 else None)
+
+    @staticmethod
+    def parse_gsv(fields):
+        if len(fields) < 4:
+            return None
+        # NMEA 4.10 appends a signal ID after the satellite blocks
+        signal_id = NMEAReader.to_int(fields[-1]) if (len(fields) - 4) % 4 == 1 else None
+        to_int = NMEAReader.to_int
+        satellites = tuple((to_int(fields[i]), to_int(fields[i + 1]), to_int(fields[i + 2]), to_int(fields[i + 3]))
+                           for i in range(4, len(fields) - 3, 4))
+        return (to_int(fields[1]), to_int(fields[2]), to_int(fields[3]), satellites, signal_id)
+
+    @staticmethod
+    def parse_gst(fields):
+        if len(fields) < 9:
+            return None
+        to_float = NMEAReader.to_float
+        return (NMEAReader.to_seconds(fields[1]), to_float(fields[2]), to_float(fields[3]), to_float(fields[4]),
+                to_float(fields[5]), to_float(fields[6]), to_float(fields[7]), to_float(fields[8]))
+
+    @staticmethod
+    def parse_gns(fields):
+        if len(fields) < 13:
+            return None
+        return (NMEAReader.to_seconds(fields[1]), NMEAReader.to_degrees(fields[2], fields[3]),
+                NMEAReader.to_degrees(fields[4], fields[5]), fields[6], NMEAReader.to_int(fields[7]),
+                NMEAReader.to_float(fields[8]), NMEAReader.to_float(fields[9]), NMEAReader.to_float(fields[10]),
+                NMEAReader.to_float(fields[11]), fields[12], fields[13] if len(fields) > 13 else b'')
+
+    @staticmethod
+    def parse_zda(fields):
+        if len(fields) < 7:
+            return None
+        to_int = NMEAReader.to_int
+        return (NMEAReader.to_seconds(fields[1]), to_int(fields[2]), to_int(fields[3]), to_int(fields[4]),
+                to_int(fields[5]), to_int(fields[6]))
+
+    class GGA(namedtuple("GGA", ("time", "lat", "NS", "lon", "EW", "quality", "numSV", "HDOP", "alt", "sep",
+                                 "diffAge", "diffStation"), defaults=(None,) * 12)):
+        """
+        time: UTC time of the fix (datetime.time)
+        lat, lon: Latitude and longitude in decimal degrees, negative in the south/west
+        NS, EW: North/South and East/West indicators
+        quality: Quality indicator for position fix
+        numSV: Number of satellites used
+        HDOP: Horizontal Dilution of Precision
+        alt: Altitude above mean sea level
+        sep: Geoid separation: difference between ellipsoid and mean sea level
+        diffAge: Age of differential corrections (None when DGPS is not used)
+        diffStation: ID of station providing differential corrections (empty when DGPS is not used)
+        """
+        __slots__ = ()
+        @classmethod
+        def from_values(cls, values):
+            seconds, lat, NS, lon, EW, quality, numSV, HDOP, alt, sep, diffAge, diffStation = values
+            return cls(NMEAReader.to_time(seconds), lat, NS.decode(), lon, EW.decode(),
+                       UbloxUtils.get_quality(quality) if quality is not None else None,
+                       numSV, HDOP, alt, sep, diffAge, diffStation.decode())
+
+    class VTG(namedtuple("VTG", ("cog_true", "cog_mag", "sog_knots", "sog_kmh", "pos_mode"), defaults=(None,) * 5)):
+        """
+        cog_true: Course over ground (true), in degrees
+        cog_mag: Course over ground (magnetic), in degrees
+        sog_knots: Speed over ground, in knots
+        sog_kmh: Speed over ground, in kilometers per hour
+        pos_mode: Mode indicator (available in NMEA 2.3 and later)
+        """
+        __slots__ = ()
+        @classmethod
+        def from_values(cls, values):
+            return cls(*values[:4], UbloxUtils.get_posMode(values[4].decode()))
+
+    class RMC(namedtuple("RMC", ("time", "status", "lat", "lon", "spd", "cog", "date", "mv", "pos_mode",
+                                 "nav_status"), defaults=(None,) * 10)):
+        """
+        time: UTC time (datetime.time)
+        status: A = data valid, V = data invalid
+        lat, lon: Latitude and longitude in decimal degrees
+        spd: Speed over ground, in knots
+        cog: Course over ground, in degrees
+        date: UTC date (datetime.date)
+        mv: Magnetic variation, in degrees, negative to the west
+        pos_mode: Mode indicator
+        nav_status: Navigational status (NMEA 4.10 and later)
+        """
+        __slots__ = ()
+        @classmethod
+        def from_values(cls, values):
+            seconds, status, lat, lon, spd, cog, date, mv, pos_mode, nav_status = values
+            return cls(NMEAReader.to_time(seconds), status.decode(), lat, lon, spd, cog, NMEAReader.to_date(date), mv,
+                       UbloxUtils.get_posMode(pos_mode.decode()), nav_status.decode())
+
+    class GSA(namedtuple("GSA", ("op_mode", "nav_mode", "sv_ids", "PDOP", "HDOP", "VDOP", "system_id"),
+                         defaults=(None,) * 7)):
+        """
+        op_mode: M = manual, A = automatic 2D/3D
+        nav_mode: 1 = no fix, 2 = 2D, 3 = 3D
+        sv_ids: Satellites used in the solution
+        PDOP, HDOP, VDOP: Position, horizontal and vertical dilution of precision
+        system_id: GNSS system ID (NMEA 4.10 and later)
+        """
+        __slots__ = ()
+        @classmethod
+        def from_values(cls, values):
+            return cls(values[0].decode(), *values[1:])
+
+    class GSV(namedtuple("GSV", ("num_msg", "msg_num", "num_sv", "satellites", "signal_id"), defaults=(None,) * 5)):
+        """
+        num_msg: Number of GSV messages in this group
+        msg_num: Number of this message
+        num_sv: Number of satellites in view
+        satellites: (sv_id, elevation, azimuth, cno) of up to 4 satellites
+        signal_id: Signal ID (NMEA 4.10 and later)
+        """
+        __slots__ = ()
+        @classmethod
+        def from_values(cls, values):
+            return cls._make(values)
+
+    class GST(namedtuple("GST", ("time", "range_rms", "std_major", "std_minor", "orient", "std_lat", "std_lon",
+                                 "std_alt"), defaults=(None,) * 8)):
+        """
+        time: UTC time (datetime.time)
+        range_rms: RMS value of the pseudorange residuals, in meters
+        std_major, std_minor: Standard deviation of the semi-major and semi-minor axis, in meters
+        orient: Orientation of the semi-major axis, in degrees
+        std_lat, std_lon, std_alt: Standard deviation of latitude, longitude and altitude, in meters
+        """
+        __slots__ = ()
+        @classmethod
+        def from_values(cls, values):
+            return cls(NMEAReader.to_time(values[0]), *values[1:])
 
+    class GNS(namedtuple("GNS", ("time", "lat", "lon", "pos_mode", "numSV", "HDOP", "alt", "sep", "diffAge",
+                                 "diffStation", "nav_status"), defaults=(None,) * 11)):
+        """
+        time: UTC time (datetime.time)
+        lat, lon: Latitude and longitude in decimal degrees
+        pos_mode: Mode indicator per GNSS (e.g. "RR" for GPS and GLONASS RTK fixed)
+        numSV: Number of satellites used
+        HDOP: Horizontal Dilution of Precision
+        alt: Altitude above mean sea level
+        sep: Geoid separation
+        diffAge: Age of differential corrections
+        diffStation: ID of station providing differential corrections
+        nav_status: Navigational status (NMEA 4.10 and later)
+        """
+        __slots__ = ()
+        @classmethod
+        def from_values(cls, values):
+            seconds, lat, lon, pos_mode, numSV, HDOP, alt, sep, diffAge, diffStation, nav_status = values
+            return cls(NMEAReader.to_time(seconds), lat, lon, pos_mode.decode(), numSV, HDOP, alt, sep, diffAge,
+                       diffStation.decode(), nav_status.decode())
 
+    class ZDA(namedtuple("ZDA", ("time", "day", "month", "year", "ltzh", "ltzn"), defaults=(None,) * 6)):
+        """
+        time: UTC time (datetime.time)
+        day, month, year: UTC date
+        ltzh, ltzn: Local time zone hours and minutes
+        """
+        __slots__ = ()
+        @classmethod
+        def from_values(cls, values):
+            return cls(NMEAReader.to_time(values[0]), *values[1:])
@@ -0,0 +1,343 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to re-serve one RTCM stream to many local rovers as a small NTRIP caster
+"""
+import base64
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from pyublox.ublox_logging import get_logger
+
+logger = get_logger(__name__)
+
+class CasterClient:
+    """One connected rover. pending holds, per broadcast, the memoryviews of the shared buffers still to send."""
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.request = bytearray()
+        self.streaming = False
+        self.chunked = False # NTRIP v2 clients get the data with chunked transfer encoding
+        self.pending = deque()
+        self.queued = 0
+        self.bytes_sent = 0
+        self.bytes_dropped = 0
+        self.connected_time = time.monotonic()
+        self.over_limit_since = None
+
+
+class NTRIPCaster:
+    """
+    Minimal NTRIP v1/v2 caster serving one mountpoint to local clients.
+
+    write() (or broadcast()) takes RTCM from one upstream source, e.g. pass the caster as
+    the ublox_connection of an NTRIPSocketConnection, set it as its rtcm callback, or
+    feed a base receiver's RTCM output through an RTCMFramer whose callback is
+    caster.write. Every broadcast buffer is stored once and queued to every client as a
+    memoryview, so fan-out does not copy the data per client. Sockets are non-blocking
+    and served by one selector thread.
+
+    A client that does not keep up has its oldest queued buffers dropped once more than
+    max_client_buffer bytes are waiting (old corrections are useless to an RTK engine),
+    and is disconnected if it stays over the limit for slow_client_timeout seconds.
+    With tcp_port set, clients connecting to that port get the raw stream without any
+    NTRIP handshake.
+    """
+    def __init__(self, host="0.0.0.0", port=2101, mountpoint="PYUBLOX", username=None, password=None, tcp_port=None,
+                 max_client_buffer=262144, slow_client_timeout=10, lat=0.0, lon=0.0):
+        self.__host = host
+        self.__port = port
+        self.__tcp_port = tcp_port
+        self.__mountpoint = mountpoint
+        self.__auth = base64.b64encode(f"{username}:{password}".encode()).decode() if username is not None else None
+        self.__max_client_buffer = max_client_buffer
+        self.__slow_client_timeout = slow_client_timeout
+        self.__lat = lat
+        self.__lon = lon
+        self.__selector = None
+        self.__servers = []
+        self.__clients = {}
+        self.__lock = threading.Lock()
+        self.__thread = None
+        self.__running = False
+        self.__wakeup_r = None
+        self.__wakeup_w = None
+        # counters
+        self.bytes_in = 0
+        self.clients_total = 0
+        self.clients_dropped_slow = 0
+
+    @property
+    def port(self):
+        """The NTRIP port, useful when the caster was started with port=0."""
+        return self.__servers[0].getsockname()[1] if self.__servers else self.__port
+
+    @property
+    def tcp_port(self):
+        return self.__servers[1].getsockname()[1] if len(self.__servers) > 1 else self.__tcp_port
+
+    @property
+    def clients(self):
+        with self.__lock:
+            return [client for client in self.__clients.values() if client.streaming]
+
+    def start(self):
+        if self.__running:
+            return
+        self.__selector = selectors.DefaultSelector()
+        for port, raw in ((self.__port, False), (self.__tcp_port, True)):
+            if port is None:
+                continue
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind((self.__host, port))
+            server.listen(64)
+            server.setblocking(False)
+            self.__selector.register(server, selectors.EVENT_READ, ("accept", raw))
+            self.__servers.append(server)
+        # write() runs on other threads, a byte on this pair wakes the selector up to send the new data
+        self.__wakeup_r, self.__wakeup_w = socket.socketpair()
+        self.__wakeup_r.setblocking(False)
+        self.__wakeup_w.setblocking(False)
+        self.__selector.register(self.__wakeup_r, selectors.EVENT_READ, ("wakeup", None))
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__serve, daemon=True)
+        self.__thread.start()
+        logger.info("serving /%s on port %s", self.__mountpoint, self.port)
+
+    def stop(self):
+        self.__running = False
+        if self.__wakeup_w:
+            self.__wake()
+        if self.__thread:
+            self.__thread.join()
+            self.__thread = None
+        for client in list(self.__clients.values()):
+            self.__close(client)
+        for sock in self.__servers + [self.__wakeup_r, self.__wakeup_w]:
+            if sock:
+                sock.close()
+        self.__servers = []
+        if self.__selector:
+            self.__selector.close()
+            self.__selector = None
+
+    def write(self, data):
+        self.broadcast(data)
+
+    def broadcast(self, data):
+        """Queues data for every streaming client, without copying it per client."""
+        if not data:
+            return
+        data = bytes(data)
+        self.bytes_in += len(data)
+        view = memoryview(data)
+        chunk = (memoryview(b"%x\r\n" % len(data)), view, memoryview(b"\r\n"))
+        chunk_size = len(chunk[0]) + len(data) + 2
+        now = time.monotonic()
+        with self.__lock:
+            for client in self.__clients.values():
+                if not client.streaming:
+                    continue
+                if client.chunked:
+                    client.pending.append(list(chunk))
+                    client.queued += chunk_size
+                else:
+                    client.pending.append([view])
+                    client.queued += len(data)
+                self.__limit(client, now)
+        self.__wake()
+
+    def __limit(self, client, now):
+        if client.queued <= self.__max_client_buffer:
+            # The new broadcast fits: the client caught up enough, even with data still queued
+            client.over_limit_since = None
+            return
+        if client.over_limit_since is None:
+            client.over_limit_since = now
+        # Drop whole broadcasts, oldest first, but never the head, it may be half sent
+        pending = client.pending
+        while client.queued > self.__max_client_buffer and len(pending) > 1:
+            size = sum(len(part) for part in pending[1])
+            del pending[1]
+            client.queued -= size
+            client.bytes_dropped += size
+
+    def __wake(self):
+        try:
+            self.__wakeup_w.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass # already pending
+
+    def __serve(self):
+        selector = self.__selector
+        while self.__running:
+            for key, events in selector.select(timeout=1.0):
+                kind, extra = key.data
+                if kind == "accept":
+                    self.__accept(key.fileobj, extra)
+                elif kind == "wakeup":
+                    try:
+                        while self.__wakeup_r.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    self.__update_interest()
+                else:
+                    client = extra
+                    if events & selectors.EVENT_READ:
+                        self.__on_readable(client)
+                    if events & selectors.EVENT_WRITE and client.sock.fileno() >= 0:
+                        self.__flush(client)
+            self.__drop_slow_clients()
+
+    def __accept(self, server, raw):
+        try:
+            sock, address = server.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = CasterClient(sock, address)
+        client.streaming = raw
+        with self.__lock:
+            self.__clients[sock] = client
+        self.clients_total += 1
+        self.__selector.register(sock, selectors.EVENT_READ, ("client", client))
+
+    def __on_readable(self, client):
+        try:
+            data = client.sock.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.__close(client)
+            return
+        if client.streaming:
+            return # GGA updates from the rovers are not needed for a single base stream
+        client.request += data
+        if b"\r\n\r\n" not in client.request:
+            if len(client.request) > 8192:
+                self.__close(client)
+            return
+        self.__answer(client, bytes(client.request))
+
+    def __answer(self, client, request):
+        header = request.split(b"\r\n\r\n", 1)[0].decode("latin-1")
+        lines = header.split("\r\n")
+        parts = lines[0].split()
+        path = parts[1] if len(parts) > 1 else "/"
+        fields = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            fields[name.strip().lower()] = value.strip()
+        version2 = fields.get("ntrip-version", "").lower().startswith("ntrip/2")
+        if path.strip("/") != self.__mountpoint:
+            self.__send_now(client, self.__sourcetable(version2))
+            self.__close(client)
+            return
+        if self.__auth is not None and fields.get("authorization", "") != f"Basic {self.__auth}":
+            status = b"HTTP/1.1 401 Unauthorized\r\n" if version2 else b"HTTP/1.0 401 Unauthorized\r\n"
+            self.__send_now(client, status + b"WWW-Authenticate: Basic realm=\"/" + self.__mountpoint.encode() + b"\"\r\n\r\n")
+            self.__close(client)
+            return
+        if version2:
+            self.__send_now(client, b"HTTP/1.1 200 OK\r\nNtrip-Version: Ntrip/2.0\r\nServer: NTRIP PythonCaster/1.0\r\n"
+                                    b"Content-Type: gnss/data\r\nCache-Control: no-store, no-cache, max-age=0\r\n"
+                                    b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        else:
+            self.__send_now(client, b"ICY 200 OK\r\n\r\n")
+        with self.__lock:
+            client.chunked = version2
+            client.streaming = True
+
+    def __sourcetable(self, version2):
+        body = (f"STR;{self.__mountpoint};{self.__mountpoint};RTCM 3;;2;GPS+GLO+GAL+BDS;PYUBLOX;XXX;"
+                f"{self.__lat:.2f};{self.__lon:.2f};0;0;pyublox;none;{'B' if self.__auth else 'N'};N;0;\r\n"
+                "ENDSOURCETABLE\r\n").encode()
+        status = b"HTTP/1.1 200 OK\r\nNtrip-Version: Ntrip/2.0\r\n" if version2 else b"SOURCETABLE 200 OK\r\n"
+        return status + b"Server: NTRIP PythonCaster/1.0\r\nContent-Type: text/plain\r\nContent-Length: " + \
+            str(len(body)).encode() + b"\r\nConnection: close\r\n\r\n" + body
+
+    def __send_now(self, client, data):
+        # Answers are small, they fit in the socket buffer of a fresh connection
+        try:
+            client.sock.sendall(data)
+        except OSError:
+            pass
+
+    def __update_interest(self):
+        with self.__lock:
+            clients = list(self.__clients.values())
+        for client in clients:
+            if client.pending and client.sock.fileno() >= 0:
+                self.__flush(client)
+
+    def __flush(self, client):
+        sock = client.sock
+        closing = False
+        with self.__lock:
+            pending = client.pending
+            try:
+                while pending:
+                    parts = pending[0]
+                    while parts:
+                        sent = sock.send(parts[0])
+                        client.bytes_sent += sent
+                        client.queued -= sent
+                        if sent < len(parts[0]):
+                            parts[0] = parts[0][sent:] # zero-copy remainder of the shared buffer
+                            raise BlockingIOError
+                        parts.pop(0)
+                    pending.popleft()
+            except BlockingIOError:
+                pass
+            except OSError:
+                pending.clear()
+                closing = True
+            waiting = bool(pending)
+            if not waiting:
+                client.over_limit_since = None # caught up
+        if closing:
+            self.__close(client)
+            return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if waiting else 0)
+        try:
+            self.__selector.modify(sock, events, ("client", client))
+        except (KeyError, ValueError):
+            pass
+
+    def __drop_slow_clients(self):
+        now = time.monotonic()
+        with self.__lock:
+            slow = [client for client in self.__clients.values()
+                    if client.over_limit_since is not None and now - client.over_limit_since > self.__slow_client_timeout]
+        for client in slow:
+            logger.warning("dropping slow client %s", client.address)
+            self.clients_dropped_slow += 1
+            self.__close(client)
+
+    def __close(self, client):
+        with self.__lock:
+            self.__clients.pop(client.sock, None)
+        try:
+            self.__selector.unregister(client.sock)
+        except (KeyError, ValueError, AttributeError):
+            pass
+        client.sock.close()
+
+
+# Example usage
+if __name__ == "__main__":
+    caster = NTRIPCaster(port=2101, mountpoint="PYUBLOX")
+    caster.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        caster.stop()
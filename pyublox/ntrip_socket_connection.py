@@ -1,118 +1,530 @@
 """
 author: Xuanpeng Zhao
-Date: Feb 07 2024 
+Date: Feb 07 2024
 Description: This script is designed to create socket connection to basestation to retreive RTCM
 """
 
 import socket
 import base64
+import random
 import threading
+import time
+from pyublox.ntrip_sourcetable import NTRIPSourcetable
+from pyublox.rtcm_framer import RTCMFramer
+from pyublox.metrics import Sample
 from pyublox.ublox_utility import UbloxUtils
+from pyublox.ublox_logging import get_logger
 
-class NTRIPSocketConnection:
-    def __init__(self, host, port, username, password, ublox_connection, mountpoint=None, buffersize=65536, recv_data_callback=None):
+logger = get_logger(__name__)
+
+class ChunkedDecoder:
+    """Incremental decoder of an HTTP chunked transfer encoded body (NTRIP v2 data stream)."""
+    def __init__(self):
+        self.__buffer = bytearray()
+        self.__remaining = 0 # payload bytes left in the current chunk
+        self.__skip = 0 # CRLF bytes left after the current chunk
+        self.finished = False
+
+    def feed(self, data):
+        """
+        Returns:
+            bytes: The payload bytes contained in data.
+        """
+        buffer = self.__buffer
+        buffer += data
+        out = bytearray()
+        pos = 0
+        while pos < len(buffer) and not self.finished:
+            if self.__remaining:
+                take = min(self.__remaining, len(buffer) - pos)
+                out += buffer[pos:pos + take]
+                pos += take
+                self.__remaining -= take
+                if not self.__remaining:
+                    self.__skip = 2
+            elif self.__skip:
+                take = min(self.__skip, len(buffer) - pos)
+                pos += take
+                self.__skip -= take
+            else:
+                line_end = buffer.find(b"\r\n", pos)
+                if line_end < 0:
+                    break
+                size = int(bytes(buffer[pos:line_end]).split(b";")[0] or b"0", 16)
+                pos = line_end + 2
+                if size == 0:
+                    self.finished = True
+                self.__remaining = size
+        del buffer[:pos]
+        return bytes(out)
+
+
+class NTRIPSession:
+    """
+    Client side of the NTRIP v1/v2 protocol, without any I/O.
+
+    NTRIPSocketConnection (a thread with blocking sockets) and AsyncNTRIPClient (asyncio
+    streams) only move bytes and share the session logic here. For every session the client
+    sends request(), passes every received chunk to feed(), which parses the caster answer
+    and returns the RTCM bytes, sends gga() whenever it returns a sentence, and waits at most
+    wait() seconds for the next chunk; expired() says when the session has to be dropped.
+    session_ended() then returns the delay before the next session, or None to stop.
+
+    The request carries the latest GGA (Ntrip-GGA header for v2) and the GGA is sent again
+    every gga_interval seconds, which VRS casters need to generate the corrections. No data
+    for read_timeout seconds is treated as a stall. Sessions are reopened after a jittered
+    exponential backoff, and after failover_after failed sessions the next nearest
+    mountpoint found by find_mountpoint() is tried.
+
+    Metrics: reconnects, connect_failures, last/max_reconnect_latency (seconds from the
+    loss of the stream to the first bytes of the next session), gaps/total_gap_time/
+    max_gap_time (periods longer than gap_threshold without corrections), current_gap
+    (seconds since the last correction byte) and bytes_received.
+    """
+    def __init__(self, host, port, username, password, mountpoint=None, version=2, gga_source=None, gga_interval=10,
+                 read_timeout=10, reconnect=True, backoff_initial=0.5, backoff_max=30, failover_after=3, gap_threshold=2.0):
+        """
+        Args:
+            version (int): NTRIP version, 2 sends Ntrip-Version: Ntrip/2.0 and accepts chunked data.
+            gga_source (function): Returns the latest NMEAReader.GGA record (or None), e.g. lambda: nmea.gga.
+            gga_interval (float): Seconds between GGA uploads, 0 disables them.
+            read_timeout (float): Seconds without data after which the session is considered stalled.
+            reconnect (bool): Reopen the session when it is lost.
+            backoff_initial, backoff_max (float): Bounds in seconds of the reconnect backoff.
+            failover_after (int): Failed sessions in a row before switching to the next nearest mountpoint.
+            gap_threshold (float): Seconds without corrections counted as a gap.
+        """
         self.__host = host
         self.__port = port
         self.__username = username
         self.__password = password
+        self.sourcetable = None
+        self.__mountpoint = mountpoint # '7ODM_RTCM3'
+        self.__candidates = [mountpoint] if mountpoint else []
+        self.__version = version
+        self.__gga_source = gga_source
+        self.__gga_interval = gga_interval
+        self.read_timeout = read_timeout
+        self.__reconnect = reconnect
+        self.__backoff_initial = backoff_initial
+        self.__backoff_max = backoff_max
+        self.__failover_after = failover_after
+        self.__gap_threshold = gap_threshold
+        self.__failures = 0
+        self.__backoff = backoff_initial
+        self.__refused = False # the caster rejected the credentials, retrying does not help
+        # state of the current session
+        self.__response = None # answer bytes until the header is complete, None once answered
+        self.__decoder = None
+        self.__connected = False
+        self.__received = False
+        self.__session_start = None
+        self.__last_gga = None
+        # metrics
+        self.reconnects = 0
+        self.connect_failures = 0
+        self.last_reconnect_latency = None
+        self.max_reconnect_latency = 0.0
+        self.gaps = 0
+        self.total_gap_time = 0.0
+        self.max_gap_time = 0.0
+        self.bytes_received = 0
+        self.__last_data_time = None
+        self.__lost_time = None
+
+    @property
+    def host(self):
+        return self.__host
+
+    @property
+    def port(self):
+        return self.__port
+
+    @property
+    def mountpoint(self):
+        return self.__mountpoint
+
+    @property
+    def connected(self):
+        """True while a session streams corrections (the caster accepted the request)."""
+        return self.__connected
+
+    @property
+    def current_gap(self):
+        """Seconds since the last correction byte, None before the first one."""
+        return time.monotonic() - self.__last_data_time if self.__last_data_time is not None else None
+
+    def find_mountpoint(self, my_lat, my_lon, formats=None, nav_systems=None, ttl=3600, candidates=3):
+        """
+        Picks the closest mountpoint of the caster, see NTRIPSourcetable.nearest() for the filters.
+
+        The sourcetable is read in full once and cached on disk for ttl seconds. The next
+        closest mountpoints (up to candidates in total) are kept for failover. This is a
+        short blocking exchange with the caster.
+
+        Returns:
+            SourceEntry: The selected entry, None if no entry matches.
+        """
+        if self.sourcetable is None:
+            self.sourcetable = NTRIPSourcetable.load(self.__host, self.__port, ttl=ttl)
+        nearest = self.sourcetable.nearest(my_lat, my_lon, k=max(1, candidates), formats=formats, nav_systems=nav_systems)
+        if not nearest:
+            logger.error("No mountpoint found in the sourcetable")
+            return None
+        self.ntrip_source = nearest[0][1]
+        self.__mountpoint = self.ntrip_source.mountpoint
+        self.__candidates = [entry.mountpoint for _, entry in nearest]
+        return self.ntrip_source
+
+    @staticmethod
+    def build_request(mountpoint, username, password, host=None, version=2, gga=None):
+        """
+        Returns the bytes of the NTRIP request for the RTCM stream of a mountpoint.
+
+        Args:
+            host (str): Caster host name for the v2 Host header.
+            version (int): NTRIP version (1 or 2).
+            gga (bytes): GGA sentence sent in the Ntrip-GGA header (v2 only).
+        """
+        auth_token = base64.b64encode(f"{username}:{password}".encode()).decode()
+        lines = [f"GET /{mountpoint} HTTP/1.1" if version == 2 else f"GET /{mountpoint} HTTP/1.0"]
+        if version == 2:
+            if host:
+                lines.append(f"Host: {host}")
+            lines.append("Ntrip-Version: Ntrip/2.0")
+        lines += ["User-Agent: NTRIP PythonClient/1.0", "Accept: */*", "Connection: close"]
+        if version == 2 and gga:
+            lines.append("Ntrip-GGA: " + gga.decode().strip())
+        lines.append(f"Authorization: Basic {auth_token}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+    def request(self):
+        """Starts a session, returns the request to send once connected to the caster."""
+        now = time.monotonic()
+        self.__response = b""
+        self.__decoder = None
+        self.__connected = False
+        self.__received = False
+        self.__session_start = now
+        self.__last_gga = now
+        return self.build_request(self.__mountpoint, self.__username, self.__password, self.__host, self.__version,
+                                  self.__gga())
+
+    def feed(self, data):
+        """
+        Parses a chunk received from the caster.
+
+        Returns:
+            bytes: The RTCM bytes it contains (possibly none), None if the caster refused the request.
+        """
+        if self.__response is not None:
+            data = self.__read_response(self.__response + data)
+            if not data:
+                return data
+        if self.__decoder:
+            data = self.__decoder.feed(data)
+        if data:
+            self.__on_data(data)
+        return data
+
+    def gga(self):
+        """Returns the GGA sentence to send now, None if none is due."""
+        if self.__response is not None or self.__gga_source is None:
+            return None
+        now = time.monotonic()
+        if self.__last_gga is not None and not (self.__gga_interval and now - self.__last_gga >= self.__gga_interval):
+            return None
+        self.__last_gga = now
+        return self.__gga()
+
+    def wait(self):
+        """Seconds to wait for data before calling gga() and expired() again."""
+        now = time.monotonic()
+        wait = self.__read_timeout_left(now)
+        if self.__gga_interval and self.__gga_source is not None and self.__response is None and self.__last_gga is not None:
+            wait = min(wait, self.__last_gga + self.__gga_interval - now)
+        return max(0.01, wait)
+
+    def expired(self):
+        """Returns why the session has to be dropped (stall, end of the stream), None while it is alive."""
+        if self.__decoder and self.__decoder.finished:
+            return "stream ended"
+        if self.__read_timeout_left(time.monotonic()) <= 0:
+            return f"no data for {self.read_timeout} s"
+        return None
+
+    def session_ended(self, stopped=False):
+        """
+        Records the end of the current session.
+
+        Args:
+            stopped (bool): The client closed the session itself, it is not counted as lost.
+
+        Returns:
+            float: Seconds to wait before the next session, None if the client has to stop.
+        """
+        self.__connected = False
+        self.__response = None
+        if stopped:
+            return None
+        if self.__lost_time is None:
+            self.__lost_time = time.monotonic()
+        # Cleared for the next attempt, which may fail before request() is even reached
+        received, self.__received = self.__received, False
+        if received:
+            self.__failures = 0
+            self.__backoff = self.__backoff_initial
+        else:
+            self.__failures += 1
+            self.connect_failures += 1
+            if self.__failover_after and self.__failures % self.__failover_after == 0 and len(self.__candidates) > 1:
+                index = self.__candidates.index(self.__mountpoint) if self.__mountpoint in self.__candidates else -1
+                self.__mountpoint = self.__candidates[(index + 1) % len(self.__candidates)]
+                logger.warning("failing over to mountpoint %s", self.__mountpoint)
+        if not self.__reconnect or self.__refused:
+            return None
+        # Full jitter keeps many clients from reconnecting to the caster in lockstep
+        delay = random.uniform(0, self.__backoff)
+        self.__backoff = min(self.__backoff_max, self.__backoff * 2)
+        return delay
+
+    def __read_timeout_left(self, now):
+        last_data = self.__last_data_time if self.__received else self.__session_start
+        return last_data + self.read_timeout - now
+
+    def __read_response(self, response):
+        """Parses the caster answer, returns the data received after it, b"" until it is complete, None if refused."""
+        self.__response = response
+        if response.startswith(b"ICY 200 OK\r\n"):
+            # NTRIP v1 answer, the RTCM data can follow right after it
+            data = response[len(b"ICY 200 OK\r\n"):]
+            if data.startswith(b"\r\n"):
+                data = data[2:]
+            self.__answered(False)
+            return data
+        header_end = response.find(b"\r\n\r\n")
+        if header_end < 0:
+            if len(response) > 8192:
+                logger.error("connect: invalid answer")
+                return None
+            return b""
+        header = response[:header_end].decode("latin-1")
+        status = header.split("\r\n", 1)[0]
+        if status.startswith("SOURCETABLE"):
+            logger.error("connect: mountpoint %s not available", self.__mountpoint)
+            return None
+        if " 200" not in status:
+            logger.error("connect: %s", status)
+            if " 401" in status:
+                self.__refused = True
+            return None
+        self.__answered("transfer-encoding: chunked" in header.lower())
+        return response[header_end + 4:]
+
+    def __answered(self, chunked):
+        self.__response = None
+        self.__decoder = ChunkedDecoder() if chunked else None
+        self.__connected = True
+        if self.__version != 2:
+            self.__last_gga = None # v1 casters get the GGA right after their answer
+        logger.info("Connected to NTRIP mountpoint %s", self.__mountpoint)
+
+    def __on_data(self, data):
+        now = time.monotonic()
+        if self.__lost_time is not None:
+            latency = now - self.__lost_time
+            self.last_reconnect_latency = latency
+            self.max_reconnect_latency = max(self.max_reconnect_latency, latency)
+            self.__lost_time = None
+        if self.__last_data_time is not None:
+            gap = now - self.__last_data_time
+            if gap > self.__gap_threshold:
+                self.gaps += 1
+                self.total_gap_time += gap
+                self.max_gap_time = max(self.max_gap_time, gap)
+        self.__last_data_time = now
+        self.__received = True
+        self.bytes_received += len(data)
+
+    def __gga(self):
+        if self.__gga_source is None:
+            return None
+        return UbloxUtils.build_gga(self.__gga_source())
+
+    def session_metrics(self, labels):
+        """
+        Returns:
+            list: Sample tuples of the session metrics, labelled with labels.
+        """
+        return [
+            Sample("ntrip_connected", "gauge", "1 while a session streams corrections", dict(labels, mountpoint=str(self.__mountpoint)), int(self.__connected)),
+            Sample("ntrip_bytes_received_total", "counter", "RTCM bytes received from the caster", labels, self.bytes_received),
+            Sample("ntrip_reconnects_total", "counter", "Sessions reopened", labels, self.reconnects),
+            Sample("ntrip_connect_failures_total", "counter", "Sessions that ended without corrections", labels, self.connect_failures),
+            Sample("ntrip_gaps_total", "counter", "Periods without corrections longer than gap_threshold", labels, self.gaps),
+            Sample("ntrip_gap_seconds_total", "counter", "Time spent in those periods", labels, self.total_gap_time),
+            Sample("ntrip_current_gap_seconds", "gauge", "Seconds since the last correction byte", labels, self.current_gap),
+            Sample("ntrip_reconnect_latency_seconds", "gauge", "Loss of the stream to the first bytes of the next session, last reconnect",
+                   labels, self.last_reconnect_latency),
+        ]
+
+
+class NTRIPSocketConnection(NTRIPSession):
+    """
+    NTRIP v1/v2 client forwarding RTCM corrections to the receiver.
+
+    connect() starts one thread that keeps a session with the caster up over a blocking
+    socket, with the GGA uploads, stall detection, reconnects and failover of NTRIPSession.
+    bytes_received counts the RTCM bytes of the caster, bytes_forwarded and
+    frames_forwarded what reached the receiver; metrics() exports them all for
+    MetricsRegistry.
+    """
+    def __init__(self, host, port, username, password, ublox_connection, mountpoint=None, buffersize=65536, recv_data_callback=None,
+                 rtcm_framing=True, allow=None, deny=None, version=2, gga_source=None, gga_interval=10, read_timeout=10,
+                 reconnect=True, backoff_initial=0.5, backoff_max=30, failover_after=3, gap_threshold=2.0):
+        """
+        Args:
+            ublox_connection: Receives the RTCM frames through its write(), e.g. UBloxSerialConnection.
+            rtcm_framing (bool): Forward only complete, CRC-valid RTCM3 frames passing allow/deny (see RTCMFramer).
+            See NTRIPSession for the session arguments.
+        """
+        super().__init__(host, port, username, password, mountpoint, version, gga_source, gga_interval, read_timeout,
+                         reconnect, backoff_initial, backoff_max, failover_after, gap_threshold)
         self.__buffersize = buffersize
         self.__socket = None
-        self.__running = False
+        self.__stop = threading.Event()
         self.__thread = None
         self.__recv_data_callback = recv_data_callback
+        self.__rtcm_callback = None
         self.__ublox_connection = ublox_connection
-        self.__ntrip_sources_list = None
-        self.__mountpoint = mountpoint # '7ODM_RTCM3'
         self.__recv_data = None
-         
-         
+        # Forward only complete, CRC-valid RTCM3 frames of the selected message types to the receiver
+        self.rtcm_framer = RTCMFramer(callback=self.__forward, allow=allow, deny=deny) if rtcm_framing else None
+        self.bytes_forwarded = 0
+        self.frames_forwarded = 0
 
     def connect(self):
+        if self.__thread and self.__thread.is_alive():
+            return
+        if not self.mountpoint:
+            logger.error("connect: no mountpoint")
+            return
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def __run(self):
+        while not self.__stop.is_set():
+            self.__session()
+            delay = self.session_ended(self.__stop.is_set())
+            if delay is None or self.__stop.wait(delay):
+                break
+            self.reconnects += 1
+
+    def __session(self):
+        """Runs one caster session."""
         try:
-            self.__socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.__socket.connect((self.__host, self.__port))
-            self.__running = True
-            self.__send_auth_request()
-            print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-            self.__recv_data = self.__socket.recv(self.__buffersize)
-            # b'ICY 200 OK\r\n\r\n'
-            if (b"ICY 200 OK") in self.__recv_data:
-                self.__thread = threading.Thread(target=self.__read)
-                self.__thread.start()
-            else:
-                print("Error NTRIP socket connection: ", "Failed to receive ICY 200 OK")
-        except Exception as e:
-            print("Error NTRIP socket connection: ", f"connect: {e}")
-            self.__running = False
-
-    def find_mountpoint(self, my_lat, my_lon):
-        self.__get_ntrip_sources_list()
-        closest_source = None
-        min_distance = float('inf')
-        for source in self.__ntrip_sources_list:
-            if source.startswith('STR;'):
-                sourceInfo = source.split(';')
-                if len(sourceInfo) > 11:
-                    # ['STR', '7ODM_RTCM3', '7ODM_RTCM3', 'RTCM 3.1', '1004(1),1005(60),1007(60),1012(1),1033(60)', '2', 'GPS+GLO', 'UNAVCO', 'USA', '34.12', '-117.09', '0', '0', 'TRIMBLE NETR9', 'None',
-                    source_lat = float(sourceInfo[9])
-                    source_lon = float(sourceInfo[10])
-                    distance = UbloxUtils.haversine(my_lat, my_lon, source_lat, source_lon)
-                    if distance < min_distance:
-                        min_distance = distance
-                        closest_source = sourceInfo
-        self.ntrip_source = closest_source
-        self.__mountpoint = self.ntrip_source[1]
-        return self.ntrip_source
-            
-    def __get_ntrip_sources_list(self):
-        self.__socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.__socket.connect((self.__host, self.__port))
-        self.__running = True
-        print("Get NTRIP sources list")
-        request = (f"GET / HTTP/1.1\r\n"
-                   f"User-Agent: NTRIP PythonClient/1.0\r\n"
-                   f"Connection: close\r\n\r\n")
-        self.__socket.sendall(request.encode())
-        if self.__running and self.__socket:
-            __recv_data = self.__socket.recv(self.__buffersize)
-            # b'SOURCETABLE 200 OK\r\nServer: NTRIP BKG Caster 2.0.45/2.0\r\nDate: Fri, 09 Feb 2024 22:56:27 GMT\r\nConnection: close\r\nContent-Type: text/plain\r\nContent-Length: 173416\r\n\r\n'
-            if (b"SOURCETABLE 200 OK") in __recv_data:
-                __recv_data = self.__socket.recv(self.__buffersize)
-            else:
-                print("Error NTRIP socket connection: ", "Failed to receive SOURCETABLE 200 OK")
-        decoded_data = __recv_data.decode('utf-8')
-        self.__ntrip_sources_list = decoded_data.split('\r\n')
-        self.__running = False
-        if self.__socket:
-            self.__socket.close()
-
-    def __send_auth_request(self):
-        auth_token = base64.b64encode(f"{self.__username}:{self.__password}".encode()).decode()
-        request = (f"GET /{self.__mountpoint} HTTP/1.1\r\n"
-                   f"User-Agent: NTRIP PythonClient/1.0\r\n"
-                   f"Accept: */*\r\n"
-                   f"Connection: close\r\n"
-                   f"Ntrip-GGA: \r\n"
-                   f"Authorization: Basic {auth_token}\r\n\r\n")
-        print(request)
-        self.__socket.sendall(request.encode())
-
-    def __read(self):
-        while self.__running:
-            if self.__socket:
+            sock = self.__socket = socket.create_connection((self.host, self.port), timeout=self.read_timeout)
+            sock.sendall(self.request())
+            while not self.__stop.is_set():
+                gga = self.gga()
+                if gga:
+                    sock.sendall(gga)
+                reason = self.expired()
+                if reason:
+                    logger.error("__read: %s", reason)
+                    break
+                sock.settimeout(self.wait())
                 try:
-                    self.__recv_data = self.__socket.recv(self.__buffersize)
-                    self.__ublox_connection.write(self.__recv_data)
-                    if self.__recv_data_callback:
-                        self.__recv_data_callback(self.__recv_data)
-                except Exception as e:
-                    print("Error NTRIP socket connection: ", f"__read: {e}")
-                    self.disconnect()
+                    data = sock.recv(self.__buffersize)
+                except socket.timeout:
+                    continue
+                if not data:
+                    if not self.__stop.is_set():
+                        logger.error("__read: connection closed by the caster")
+                    break
+                data = self.feed(data)
+                if data is None:
+                    break
+                if data:
+                    self.__on_data(data)
+        except OSError as e:
+            if not self.__stop.is_set():
+                logger.error("__read: %s", e)
+        finally:
+            self.__close_socket()
+
+    def __on_data(self, data):
+        self.__recv_data = data
+        if self.rtcm_framer:
+            self.rtcm_framer.feed(data)
+        else:
+            self.__forward(data)
+        if self.__recv_data_callback:
+            self.__recv_data_callback(data)
+
+    def set_rtcm_callback(self, callback):
+        """Also passes every forwarded RTCM frame (or chunk without framing) to callback, e.g. NTRIPCaster.write."""
+        self.__rtcm_callback = callback
+
+    def __forward(self, data):
+        self.bytes_forwarded += len(data)
+        self.frames_forwarded += 1
+        if self.__ublox_connection:
+            self.__ublox_connection.write(data)
+        if self.__rtcm_callback:
+            self.__rtcm_callback(data)
+
+    def metrics(self):
+        """
+        Collector for MetricsRegistry.add_collector: RTCM bytes received and forwarded, the
+        RTCM framer counters per message type, and the session metrics.
+
+        Returns:
+            list: Sample tuples labelled with the caster.
+        """
+        caster = dict(caster=f"{self.host}:{self.port}")
+        samples = self.session_metrics(caster) + [
+            Sample("ntrip_bytes_forwarded_total", "counter", "RTCM bytes forwarded to the receiver", caster, self.bytes_forwarded),
+            Sample("ntrip_frames_forwarded_total", "counter", "RTCM frames (chunks without framing) forwarded to the receiver", caster, self.frames_forwarded),
+        ]
+        framer = self.rtcm_framer
+        if framer is not None:
+            samples += rtcm_framer_metrics(framer, caster)
+        return samples
+
+    def __close_socket(self):
+        # disconnect() and the session thread may both get here, only one of them sees the socket
+        sock, self.__socket = self.__socket, None
+        if sock:
+            try:
+                # shutdown() wakes up a recv() blocked in the session thread, close() alone does not
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
 
     def disconnect(self):
-        self.__running = False
-        if self.__socket:
-            self.__socket.close()
-            print("Disconnected from NTRIP server.")
-        if self.__thread:
-            self.__thread.join()
\ No newline at end of file
+        self.__stop.set()
+        self.__close_socket()
+        if self.__thread and self.__thread is not threading.current_thread():
+            self.__thread.join()
+        self.__thread = None
+        logger.info("Disconnected from NTRIP server.")
+
+
+def rtcm_framer_metrics(framer, labels):
+    """
+    Returns:
+        list: Sample tuples of the counters of an RTCMFramer, labelled with labels.
+    """
+    samples = [
+        Sample("ntrip_rtcm_crc_errors_total", "counter", "RTCM frames dropped for a bad CRC", labels, framer.crc_errors),
+        Sample("ntrip_rtcm_filtered_total", "counter", "RTCM frames not forwarded by the allow/deny lists", labels, framer.frames_filtered),
+        Sample("ntrip_rtcm_bytes_discarded_total", "counter", "Bytes outside of any valid RTCM frame", labels, framer.bytes_discarded),
+    ]
+    for msg_type, (frames, size) in list(framer.stats.items()):
+        msg_labels = dict(labels, msg_type=str(msg_type))
+        samples.append(Sample("ntrip_rtcm_frames_total", "counter", "Valid RTCM frames per message type", msg_labels, frames))
+        samples.append(Sample("ntrip_rtcm_bytes_total", "counter", "Bytes of the valid RTCM frames per message type", msg_labels, size))
+    return samples
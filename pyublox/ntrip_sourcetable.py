@@ -0,0 +1,260 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to download, cache and search NTRIP caster sourcetables
+"""
+import heapq
+import math
+import os
+import socket
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pyublox.ublox_utility import UbloxUtils
+from pyublox.ublox_logging import get_logger
+
+logger = get_logger(__name__)
+
+# One STR line of a sourcetable, plus the caster it comes from
+SourceEntry = namedtuple("SourceEntry", (
+    "mountpoint", "identifier", "format", "format_details", "carrier", "nav_system", "network", "country",
+    "lat", "lon", "nmea", "solution", "generator", "compression", "authentication", "fee", "bitrate", "misc",
+    "host", "port"))
+
+
+class NTRIPSourcetable:
+    """
+    The STR entries of one or more NTRIP casters, with a spatial index for mountpoint selection.
+
+    fetch() reads the whole sourcetable body (Content-Length, chunked transfer encoding or
+    until ENDSOURCETABLE/close), load() keeps a copy on disk and only downloads it again once
+    it is older than ttl seconds, and load_many() queries several casters concurrently.
+    Entries are indexed by a k-d tree on their positions as unit vectors, where the
+    straight-line distance grows with the great circle distance, so nearest() only visits
+    a few nodes instead of computing the haversine distance to every entry.
+    """
+    EARTH_RADIUS = 6371 # km, same as UbloxUtils.haversine
+    CACHE_DIR = os.path.join(os.path.expanduser("~"), ".pyublox", "sourcetables")
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        self.__tree = self.__build([(self.__unit_vector(entry.lat, entry.lon), i) for i, entry in enumerate(self.entries)], 0)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def fetch(host, port, timeout=10, buffersize=65536):
+        """
+        Downloads the sourcetable of a caster.
+
+        Returns:
+            str: The sourcetable body, one entry per line.
+        """
+        request = (f"GET / HTTP/1.1\r\n"
+                   f"Host: {host}\r\n"
+                   f"Ntrip-Version: Ntrip/2.0\r\n"
+                   f"User-Agent: NTRIP PythonClient/1.0\r\n"
+                   f"Connection: close\r\n\r\n")
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.sendall(request.encode())
+            data = bytearray()
+            while b"\r\n\r\n" not in data:
+                chunk = sock.recv(buffersize)
+                if not chunk:
+                    raise ConnectionError("NTRIP sourcetable: connection closed before the end of the header")
+                data += chunk
+            header_end = data.index(b"\r\n\r\n")
+            header = bytes(data[:header_end]).decode("latin-1")
+            body = data[header_end + 4:]
+            status = header.split("\r\n", 1)[0]
+            # NTRIP v1 casters answer "SOURCETABLE 200 OK", v2 casters a regular HTTP status line
+            if " 200 " not in status + " ":
+                raise ConnectionError(f"NTRIP sourcetable: unexpected answer {status!r}")
+            fields = {}
+            for line in header.split("\r\n")[1:]:
+                name, _, value = line.partition(":")
+                fields[name.strip().lower()] = value.strip()
+            if fields.get("transfer-encoding", "").lower() == "chunked":
+                body = NTRIPSourcetable.__read_chunked(sock, body, buffersize)
+            elif "content-length" in fields:
+                length = int(fields["content-length"])
+                while len(body) < length:
+                    chunk = sock.recv(buffersize)
+                    if not chunk:
+                        break
+                    body += chunk
+                del body[length:]
+            else:
+                while b"ENDSOURCETABLE" not in body:
+                    chunk = sock.recv(buffersize)
+                    if not chunk:
+                        break
+                    body += chunk
+        return bytes(body).decode("utf-8", errors="replace")
+
+    @staticmethod
+    def __read_chunked(sock, data, buffersize):
+        body = bytearray()
+        pos = 0
+        while True:
+            while data.find(b"\r\n", pos) < 0:
+                chunk = sock.recv(buffersize)
+                if not chunk:
+                    return body
+                data += chunk
+            line_end = data.find(b"\r\n", pos)
+            size = int(bytes(data[pos:line_end]).split(b";")[0], 16)
+            if size == 0:
+                return body
+            while len(data) < line_end + 2 + size + 2:
+                chunk = sock.recv(buffersize)
+                if not chunk:
+                    body += data[line_end + 2:line_end + 2 + size]
+                    return body
+                data += chunk
+            body += data[line_end + 2:line_end + 2 + size]
+            pos = line_end + 2 + size + 2
+
+    @staticmethod
+    def parse(text, host=None, port=None):
+        """
+        Returns:
+            list: A SourceEntry for every well-formed STR line.
+        """
+        entries = []
+        for line in text.splitlines():
+            if not line.startswith("STR;"):
+                continue
+            # The misc field is free text and may itself contain ';'
+            fields = line.split(";", 18)[1:]
+            if len(fields) < 17:
+                continue
+            try:
+                lat = float(fields[8])
+                lon = float(fields[9])
+            except ValueError:
+                continue
+            fields[8] = lat
+            fields[9] = lon
+            fields += [""] * (18 - len(fields))
+            entries.append(SourceEntry(*fields[:18], host, port))
+        return entries
+
+    @staticmethod
+    def load(host, port, ttl=3600, cache_dir=None, timeout=10):
+        """
+        Returns the sourcetable of a caster, from the disk cache if it is younger than ttl seconds.
+
+        A stale cache is still used when the caster cannot be reached.
+        """
+        cache_dir = cache_dir or NTRIPSourcetable.CACHE_DIR
+        cache_path = os.path.join(cache_dir, f"{host}_{port}.txt")
+        cached = None
+        if os.path.exists(cache_path):
+            with open(cache_path, 'r', encoding="utf-8") as file:
+                cached = file.read()
+            if time.time() - os.path.getmtime(cache_path) < ttl:
+                return NTRIPSourcetable(NTRIPSourcetable.parse(cached, host, port))
+        try:
+            text = NTRIPSourcetable.fetch(host, port, timeout)
+        except OSError as e:
+            if cached is None:
+                raise
+            logger.warning("%s:%s unreachable, using the cached sourcetable: %s", host, port, e)
+            return NTRIPSourcetable(NTRIPSourcetable.parse(cached, host, port))
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = cache_path + ".tmp"
+        with open(temp_path, 'w', encoding="utf-8") as file:
+            file.write(text)
+        os.replace(temp_path, cache_path) # readers never see a half written cache
+        return NTRIPSourcetable(NTRIPSourcetable.parse(text, host, port))
+
+    @staticmethod
+    def load_many(casters, ttl=3600, cache_dir=None, timeout=10, max_workers=8):
+        """
+        Loads the sourcetables of several casters concurrently and merges them.
+
+        Args:
+            casters (list): (host, port) pairs.
+
+        Returns:
+            NTRIPSourcetable: The entries of every caster that answered, each tagged with its host and port.
+        """
+        def load(caster):
+            try:
+                return NTRIPSourcetable.load(caster[0], caster[1], ttl, cache_dir, timeout).entries
+            except OSError as e:
+                logger.warning("%s:%s: %s", caster[0], caster[1], e)
+                return []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            tables = list(executor.map(load, casters))
+        return NTRIPSourcetable(entry for entries in tables for entry in entries)
+
+    def nearest(self, lat, lon, k=1, formats=None, nav_systems=None, max_distance=None):
+        """
+        Finds the k entries closest to a position.
+
+        Args:
+            lat, lon (float): Position in decimal degrees.
+            k (int): Number of entries to return.
+            formats (iterable): Accepted formats, matched as prefixes (e.g. {"RTCM 3"}), None accepts all.
+            nav_systems (iterable): Constellations the entry must carry (e.g. {"GPS", "GAL"}), None accepts all.
+            max_distance (float): Maximum distance in kilometers.
+
+        Returns:
+            list: (distance in km, SourceEntry) pairs, closest first.
+        """
+        formats = tuple(formats) if formats else None
+        nav_systems = frozenset(system.upper() for system in nav_systems) if nav_systems else None
+        entries = self.entries
+        def accept(index):
+            entry = entries[index]
+            if formats and not entry.format.startswith(formats):
+                return False
+            if nav_systems and not nav_systems.issubset(entry.nav_system.upper().split("+")):
+                return False
+            return True
+        limit = math.inf
+        if max_distance is not None:
+            limit = (2 * math.sin(min(max_distance / self.EARTH_RADIUS, math.pi) / 2)) ** 2
+        best = [] # max-heap of (-squared chord, index)
+        self.__search(self.__tree, self.__unit_vector(lat, lon), k, accept, best, limit)
+        found = sorted((-negative, index) for negative, index in best)
+        return [(UbloxUtils.haversine(lat, lon, entries[index].lat, entries[index].lon), entries[index]) for _, index in found]
+
+    @staticmethod
+    def __unit_vector(lat, lon):
+        lat = math.radians(lat)
+        lon = math.radians(lon)
+        return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+    @staticmethod
+    def __build(points, depth):
+        # Node: (point, entry index, split axis, left subtree, right subtree)
+        if not points:
+            return None
+        axis = depth % 3
+        points.sort(key=lambda item: item[0][axis])
+        middle = len(points) // 2
+        point, index = points[middle]
+        return (point, index, axis, NTRIPSourcetable.__build(points[:middle], depth + 1),
+                NTRIPSourcetable.__build(points[middle + 1:], depth + 1))
+
+    @staticmethod
+    def __search(node, target, k, accept, best, limit):
+        if node is None:
+            return
+        point, index, axis, left, right = node
+        distance = (point[0] - target[0]) ** 2 + (point[1] - target[1]) ** 2 + (point[2] - target[2]) ** 2
+        if distance <= limit and accept(index):
+            if len(best) < k:
+                heapq.heappush(best, (-distance, index))
+            elif distance < -best[0][0]:
+                heapq.heapreplace(best, (-distance, index))
+        delta = target[axis] - point[axis]
+        near, far = (left, right) if delta < 0 else (right, left)
+        NTRIPSourcetable.__search(near, target, k, accept, best, limit)
+        bound = -best[0][0] if len(best) == k else limit
+        if delta * delta <= bound:
+            NTRIPSourcetable.__search(far, target, k, accept, best, limit)
@@ -10,53 +10,294 @@ from pyublox.nmea_reader import NMEAReader
 from pyublox.ublox_constants import UbloxConst
 from pyublox.ublox_utility import UbloxUtils
 from pyublox.ntrip_socket_connection import NTRIPSocketConnection
+from pyublox.ublox_file_reader import UbloxFileReader
+from pyublox.epoch_aggregator import EpochAggregator
+from pyublox.ntrip_caster import NTRIPCaster
+from pyublox.decode_pipeline import DecodePipeline
+from pyublox.ublox_config import UbloxConfig
+from pyublox.link_monitor import LinkMonitor
+from pyublox.record_logger import RecordLogger
+from pyublox.geofence import Geofence
+from pyublox.history_store import HistoryStore
+from pyublox.metrics import MetricsRegistry, Sample
+from pyublox.sampling_profiler import SamplingProfiler
+from pyublox.ublox_logging import RATE_LIMIT, get_logger
 import threading
 
+logger = get_logger(__name__)
+
 class PythonUblox:
-    def __init__(self):
+    def __init__(self, history_size=0):
+        # history_size > 0 keeps the last records of every message in nmea.history and ubx.history
         self.__enable_RTK_thread = None
         self.__ntrip_connection = None
         self.__ublox_connection = None
-        self.nmea = NMEAReader()
-        self.ubx = UBXDecoder()
+        self.epochs = None
+        self.caster = None
+        self.pipeline = None
+        self.config = None # UbloxConfig of the receiver, set by connect()
+        self.link = None
+        self.logger = None
+        self.geofence = None
+        self.store = None
+        self.metrics = None
+        self.profiler = None
+        self.nmea = NMEAReader(history_size)
+        self.ubx = UBXDecoder(history_size)
 
-    def connect(self, baud_rate=38400, device_port=None):
+    def connect(self, baud_rate=38400, device_port=None, auto_baud=False):
+        # auto_baud: use the baud rate the receiver answers at, baud_rate if none does
         self.__baud_rate = baud_rate
         self.__device_port = device_port # device_port Example: "COM3" on Windows or "/dev/ttyUSB0" on Linux
         if self.__device_port is None:
             self.__device_port = UbloxUtils.find_ublox_device(UbloxConst.UBLOX_DEVICE)
         if self.__device_port is None:
             raise ValueError("No Device found.")
+        if auto_baud:
+            self.__baud_rate = UBloxSerialConnection.detect_baud_rate(self.__device_port) or baud_rate
         self.__ublox_connection = UBloxSerialConnection(self.__device_port, self.__baud_rate)
         self.__ublox_connection.connect()
+        self.config = UbloxConfig(self.__ublox_connection)
+
+    def switch_baud_rate(self, baud_rate=921600, port="UART1"):
+        """
+        Moves the receiver UART and this port to baud_rate, see UbloxConfig.switch_baud_rate.
+
+        Returns:
+            bool: True if the receiver answers at the new rate, otherwise the previous rate is restored.
+        """
+        if not self.__ublox_connection:
+            raise ValueError("Must connect ublox before switch baud rate.")
+        previous = self.__ublox_connection.baud_rate
+        if self.config.switch_baud_rate(baud_rate, port):
+            self.__baud_rate = baud_rate
+            return True
+        self.__ublox_connection.set_baud_rate(previous)
+        return False
+
+    def enable_link_monitor(self, interval=1.0, threshold=0.8, callback=None, throttle=False, port="UART1", capacity=None):
+        """
+        Reports link utilization, per message type bandwidth and epoch completeness, see LinkMonitor.
+
+        Returns:
+            LinkMonitor: The monitor, also available as self.link (last report in self.link.report).
+        """
+        if not self.__ublox_connection:
+            raise ValueError("Must connect ublox before enable link monitor.")
+        self.link = LinkMonitor(self.__ublox_connection, interval=interval, threshold=threshold, callback=callback,
+                                config=self.config, port=port, throttle=throttle, capacity=capacity)
+        return self.link
+
+    def enable_logging(self, directory="logs", types=None, **kwargs):
+        """
+        Logs the decoded records in columnar files and keeps the raw frames, see RecordLogger.
+
+        Args:
+            directory (str): Output directory.
+            types (iterable): Message types to log, e.g. {"GGA", "NAV-PVT"}, None for all (the raw
+                              capture only holds these types too).
+            **kwargs: RecordLogger arguments (format, compression, rotate_bytes, ...).
+
+        Returns:
+            RecordLogger: The logger, also available as self.logger. Call close() on it to finish the files.
+        """
+        if not self.__ublox_connection:
+            raise ValueError("Must connect ublox before enable logging.")
+        self.logger = RecordLogger(directory, **kwargs)
+        self.__ublox_connection.subscribe(self.logger.feed, types=types, max_queue=16384)
+        return self.logger
+
+    def enable_geofence(self, callback=None, geofence=None, **kwargs):
+        """
+        Tests every fix (NAV-PVT, or GGA without NAV-PVT) against geofence zones, see Geofence.
+
+        Args:
+            callback (function): Called with every GeofenceEvent (enter, exit, dwell).
+            geofence (Geofence): Zones already loaded, a new empty Geofence(**kwargs) if None.
+
+        Returns:
+            Geofence: The geofence, also available as self.geofence. Add zones with add_circle() and add_polygon().
+        """
+        if not self.__ublox_connection:
+            raise ValueError("Must connect ublox before enable geofence.")
+        self.geofence = geofence if geofence is not None else Geofence(**kwargs)
+        if callback is not None:
+            self.geofence.set_callback(callback)
+        self.__ublox_connection.subscribe(self.geofence.feed, types={"GGA", "NAV-PVT"}, policy="coalesce")
+        return self.geofence
+
+    def enable_history_store(self, capacity=4096, capacities=None, types=None):
+        """
+        Keeps the numeric fields of the received messages in fixed size arrays for time range queries, see HistoryStore.
+
+        Returns:
+            HistoryStore: The store, also available as self.store, e.g. self.store.last("NAV-PVT", 30).
+        """
+        if not self.__ublox_connection:
+            raise ValueError("Must connect ublox before enable history store.")
+        self.store = HistoryStore(capacity=capacity, capacities=capacities, types=types)
+        self.__ublox_connection.subscribe(self.store.feed, types=types, max_queue=16384)
+        return self.store
+
+    def enable_metrics(self, port=None, host="127.0.0.1", registry=None):
+        """
+        Collects the counters, queue gauges and timers of the serial link, the decoders and
+        the NTRIP client, see MetricsRegistry.
+
+        The decoders then time every decode() call; everything else is read from the
+        counters the components keep anyway, when the metrics are collected.
+
+        Args:
+            port (int): Serves /metrics (Prometheus text) and /metrics.json on this port, None serves nothing.
+            host (str): Address of the HTTP endpoint, the loopback interface by default.
+            registry (MetricsRegistry): Registry to add the metrics to, a new one if None.
+
+        Returns:
+            MetricsRegistry: The registry, also available as self.metrics, e.g. self.metrics.snapshot().
+        """
+        if not self.__ublox_connection:
+            raise ValueError("Must connect ublox before enable metrics.")
+        self.metrics = registry if registry is not None else MetricsRegistry()
+        self.ubx.timer = self.metrics.timer("decode_seconds", "Duration of one decode() call", decoder="ubx")
+        self.nmea.timer = self.metrics.timer("decode_seconds", "Duration of one decode() call", decoder="nmea")
+        self.metrics.add_collector(self.__ublox_connection.metrics)
+        self.metrics.add_collector(self.__collect_metrics)
+        if port is not None:
+            self.metrics.serve(port, host)
+        return self.metrics
+
+    def __collect_metrics(self):
+        samples = []
+        for name, decoder in (("ubx", self.ubx), ("nmea", self.nmea)):
+            labels = dict(decoder=name)
+            samples.append(Sample("decode_checksum_errors_total", "counter", "Frames rejected by a decoder for a bad checksum", labels, decoder.checksum_errors))
+            samples.append(Sample("decode_errors_total", "counter", "Frames a decoder could not decode", labels, decoder.errors))
+        samples.append(Sample("log_suppressed_total", "counter", "Log messages dropped by the rate limit", {}, RATE_LIMIT.suppressed))
+        if self.__ntrip_connection is not None:
+            samples += self.__ntrip_connection.metrics()
+        return samples
+
+    def enable_profiler(self, interval=0.001, include="pyublox"):
+        """
+        Samples the stacks of the reader, dispatcher and decode threads, see SamplingProfiler.
+
+        Returns:
+            SamplingProfiler: The started profiler, also available as self.profiler; stop() it and
+                              read report() or collapsed() (flame graph input).
+        """
+        if self.profiler is not None:
+            self.profiler.stop()
+        self.profiler = SamplingProfiler(interval=interval, include=include).start()
+        return self.profiler
 
     def read_ubx_file(self, file_path):
-        with open(file_path, 'rb') as file:
-            for line in file:
-                yield line.strip()
+        # Yields zero-copy memoryview frames, use UbloxFileReader directly for the index and seek functions
+        return UbloxFileReader(file_path).frames()
         # Enable RTK
-    def enable_RTK(self, credential, mountpoint=None):
+    def enable_RTK(self, credential, mountpoint=None, allow=None, deny=None):
+        # allow/deny: RTCM message types forwarded to the receiver, e.g. deny={1033}, see RTCMFramer
         if credential:
-            self.__enable_RTK_thread = threading.Thread(target=self.__create_ntrip_connection, args=(credential, mountpoint))
+            self.__enable_RTK_thread = threading.Thread(target=self.__create_ntrip_connection, args=(credential, mountpoint, allow, deny))
             self.__enable_RTK_thread.start()
         else:
             raise ValueError("Credentials must be provided when RTK is enabled.")
     
-    def set_ublox_callback(self, callback):
+    def set_ublox_callback(self, callback, types=None, policy="block", max_queue=4096):
+        # The callback runs on its own thread behind a bounded queue, policy: "block", "drop_oldest", "drop_newest" or "coalesce"
         if self.__ublox_connection:
-            self.__ublox_connection.set_callback(callback=callback)
+            self.__ublox_connection.set_callback(callback=callback, types=types, policy=policy, max_queue=max_queue)
         else:
             raise ValueError("Must connect ublox before set callback.")
 
-    def __create_ntrip_connection(self, credential, mountpoint):
-        self.__ntrip_connection = NTRIPSocketConnection(credential["host"], credential["port"], credential["username"], credential["password"], self.__ublox_connection, mountpoint=mountpoint)
+    def subscribe(self, callback, types=None, policy="block", max_queue=1024):
+        """
+        Adds a frame consumer next to the ublox callback, e.g. subscribe(logger.write, types={"GGA"}).
+
+        Returns:
+            Subscription: Its counters (queued, delivered, dropped, high_water), see FrameDispatcher.
+        """
+        if not self.__ublox_connection:
+            raise ValueError("Must connect ublox before subscribe.")
+        return self.__ublox_connection.subscribe(callback, types, policy, max_queue)
+
+    def enable_epochs(self, callback=None, queue=None, timeout=0.5, include=None):
+        """
+        Delivers one Epoch per navigation solution instead of one callback per frame.
+
+        The frames are decoded into self.nmea and self.ubx as before and grouped by
+        EpochAggregator, see its documentation for the arguments. This replaces the
+        callback set with set_ublox_callback().
+
+        Returns:
+            EpochAggregator: The aggregator, also available as self.epochs (counters, latency).
+        """
+        if not self.__ublox_connection:
+            raise ValueError("Must connect ublox before enable epochs.")
+        self.epochs = EpochAggregator(self.nmea, self.ubx, callback=callback, queue=queue, timeout=timeout, include=include,
+                                      timing=self.__ublox_connection.timing)
+        self.epochs.start()
+        self.__ublox_connection.set_callback(callback=self.epochs.feed)
+        return self.epochs
+
+    def enable_pipeline(self, callback=None, workers=2, ordered=True, ring_size=8 << 20):
+        """
+        Decodes the frames in worker processes, see DecodePipeline.
+
+        The serial thread only copies the frames of each read into shared memory; the
+        decoded records are published into self.nmea and self.ubx and passed to
+        callback(name, record), e.g. ("gga", GGA) or ("NAV-PVT", record). This replaces the
+        callback set with set_ublox_callback(). Worker processes are spawned, so the
+        application must start from an if __name__ == "__main__" block.
+
+        Returns:
+            DecodePipeline: The started pipeline, also available as self.pipeline (counters).
+        """
+        if not self.__ublox_connection:
+            raise ValueError("Must connect ublox before enable pipeline.")
+        self.pipeline = DecodePipeline(self.nmea, self.ubx, callback=callback, workers=workers, ordered=ordered, ring_size=ring_size)
+        self.pipeline.start()
+        self.__ublox_connection.set_callback(callback=None)
+        self.__ublox_connection.set_batch_callback(self.pipeline.feed)
+        return self.pipeline
+
+    def latency_stats(self, unit=1000):
+        """
+        Latency of the received frames per stage (frame, wire, queue, decode, callback, total,
+        epoch) and the estimated host clock offset to GPS time, see FrameTiming.
+
+        Returns:
+            dict: stage -> count, mean, p50, p90, p99, min, max in unit ns (microseconds by default), plus "clock".
+        """
+        if not self.__ublox_connection:
+            raise ValueError("Must connect ublox before latency stats.")
+        return self.__ublox_connection.timing.stats(unit)
+
+    def enable_caster(self, port=2101, mountpoint="PYUBLOX", username=None, password=None, tcp_port=None):
+        """
+        Re-serves the RTCM stream of enable_RTK() to local rovers, see NTRIPCaster.
+
+        Call it before enable_RTK(). Rovers connect to this host with their own
+        enable_RTK() (host, port and mountpoint of this caster) instead of the remote caster.
+
+        Returns:
+            NTRIPCaster: The started caster, also available as self.caster.
+        """
+        self.caster = NTRIPCaster(port=port, mountpoint=mountpoint, username=username, password=password, tcp_port=tcp_port)
+        self.caster.start()
+        return self.caster
+
+    def __create_ntrip_connection(self, credential, mountpoint, allow=None, deny=None):
+        self.__ntrip_connection = NTRIPSocketConnection(credential["host"], credential["port"], credential["username"], credential["password"], self.__ublox_connection, mountpoint=mountpoint,
+                                                        allow=allow, deny=deny, gga_source=lambda: self.nmea.gga)
+        if self.caster:
+            self.__ntrip_connection.set_rtcm_callback(self.caster.write)
         if mountpoint is None:
             elapsed_time = 0
             while self.nmea.gga.lat is None and self.nmea.gga.lon is None:
                 if elapsed_time >= 10: # 10 seconds timeout
-                    print(f"NTRIP connection failed: Timeout waiting for GPS coordinates.")
+                    logger.error("NTRIP connection failed: Timeout waiting for GPS coordinates.")
                     return  # Exit the function if timeout is reached
-                print(f"NTRIP connection waiting for valid GPS coordinates... {elapsed_time}s")
+                logger.info("NTRIP connection waiting for valid GPS coordinates... %ss", elapsed_time)
                 time.sleep(1)  # Wait for a second before checking again
                 elapsed_time += 1
             self.__ntrip_connection.find_mountpoint(self.nmea.gga.lat, self.nmea.gga.lon)
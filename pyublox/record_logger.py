@@ -0,0 +1,493 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to log decoded records in columnar files and raw frames for replay
+"""
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from array import array
+from datetime import date as datetime_date, time as datetime_time
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ubx_decoder import UBXDecoder
+from pyublox.nmea_reader import NMEAReader
+from pyublox.ubx_messages import UBXMessage
+from pyublox.ublox_logging import get_logger
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError: # the binary format is used instead
+    pa = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+logger = get_logger(__name__)
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODEC_LZ4 = 3
+
+
+def _compress(codec, data):
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == CODEC_LZ4:
+        return lz4.frame.compress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.compress(data, 6)
+    return data
+
+
+def _decompress(codec, data):
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == CODEC_LZ4:
+        return lz4.frame.decompress(data)
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(data)
+    return data
+
+
+class RecordLogger:
+    """
+    Logs decoded records per message type in columnar batches, plus the raw frames.
+
+    write() only appends the record to the buffer of its message type; a writer thread
+    turns full buffers (batch_size records, or everything every flush_interval seconds)
+    into columns and writes them, so logging costs the receiving thread one list append
+    per record instead of a formatted CSV row. Every record gets a time_ns column (wall
+    clock, nanoseconds).
+
+    Formats:
+        "parquet", "arrow": one file per message type and segment (needs pyarrow).
+        "binary": one file per segment of length-prefixed, compressed column blocks
+                  (zstd, lz4 or zlib, whichever is installed), read back with read().
+    The default is parquet when pyarrow is installed, binary otherwise. With raw=True the
+    frames passed to feed()/write_frame() are also written as they came, to a .ubx file
+    per segment which UbloxFileReader replays. A new segment starts once rotate_bytes have
+    been written or rotate_seconds have passed.
+    """
+    MAGIC = b"PYUBLOG1"
+    BLOCK = struct.Struct("<BII") # codec, rows, compressed payload length (after the name)
+
+    def __init__(self, directory="logs", prefix="ublox", format=None, compression=None, batch_size=4096,
+                 flush_interval=1.0, rotate_bytes=256 << 20, rotate_seconds=None, raw=True, max_pending=64):
+        """
+        Args:
+            directory (str): Output directory, created if needed.
+            prefix (str): File name prefix, followed by the start time and segment number.
+            format (str): "parquet", "arrow" or "binary", see above.
+            compression (str): "zstd", "lz4", "zlib" or "none" for the binary format (the best installed by default),
+                               passed to pyarrow for parquet.
+            batch_size (int): Records per message type buffered before they are written.
+            flush_interval (float): Seconds after which partial buffers are written anyway.
+            rotate_bytes (int): Segment size limit.
+            rotate_seconds (float): Segment duration limit, None for no limit.
+            raw (bool): Keep the raw frames alongside.
+            max_pending (int): Batches waiting for the writer thread before write() blocks.
+        """
+        if format is None:
+            format = "parquet" if pa is not None else "binary"
+        if format in ("parquet", "arrow") and pa is None:
+            raise ValueError(f"The {format} format needs pyarrow, use format='binary'")
+        if format not in ("parquet", "arrow", "binary"):
+            raise ValueError(f"Unknown log format {format!r}")
+        self.format = format
+        self.__codec = self.__pick_codec(compression) if format == "binary" else None
+        self.__compression = compression
+        self.__directory = directory
+        self.__name = f"{prefix}_{time.strftime('%Y-%m-%d_%H-%M-%S')}"
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+        self.__rotate_bytes = rotate_bytes
+        self.__rotate_seconds = rotate_seconds
+        self.__raw = raw
+        self.__buffers = {} # message name -> (records, times)
+        self.__raw_buffer = bytearray()
+        self.__lock = threading.Lock()
+        self.__pending = queue.Queue(max_pending)
+        self.__sequence = 0 # number given to the next batch taken from the buffers
+        self.__next_write = 0 # writer thread: number of the next batch to write
+        self.__waiting = {} # writer thread: batch number -> (batch, from the queue) of batches written too early
+        self.__nmea = NMEAReader()
+        self.__ubx = UBXDecoder()
+        # writer thread state
+        self.__segment = -1
+        self.__segment_start = None
+        self.__segment_bytes = 0
+        self.__binary_file = None
+        self.__raw_file = None
+        self.__arrow_writers = {} # message name -> (writer, path)
+        self.files = []
+        # counters
+        self.records = 0
+        self.frames = 0
+        self.batches = 0
+        self.bytes_written = 0
+        os.makedirs(directory, exist_ok=True)
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__running = True
+        self.__thread.start()
+
+    @staticmethod
+    def __pick_codec(compression):
+        if compression is None:
+            return CODEC_ZSTD if zstandard is not None else CODEC_LZ4 if lz4 is not None else CODEC_ZLIB
+        codec = {"zstd": CODEC_ZSTD, "lz4": CODEC_LZ4, "zlib": CODEC_ZLIB, "none": CODEC_NONE}.get(compression)
+        if codec is None:
+            raise ValueError(f"Unknown compression {compression!r}")
+        if (codec == CODEC_ZSTD and zstandard is None) or (codec == CODEC_LZ4 and lz4 is None):
+            raise ValueError(f"{compression} is not installed")
+        return codec
+
+    def feed(self, frame):
+        """
+        Decodes a frame, logs its record and keeps the raw frame. Can be used as a ublox
+        callback: UBX frames are expected to come from UbloxFramer, their checksum is not checked again.
+        """
+        if self.__raw:
+            self.write_frame(frame)
+        if frame[0:2] == UbloxConst.HEADER_UBX:
+            record = self.__ubx.decode(frame, verify=False)
+            if record is not None:
+                self.write(UBXMessage.REGISTRY[(frame[2], frame[3])].name, record)
+        elif frame[0:2] == UbloxConst.HEADER_NMEA:
+            record = self.__nmea.decode(frame)
+            if record is not None:
+                self.write(type(record).__name__, record)
+
+    def write(self, name, record, time_ns=None):
+        """
+        Logs one record.
+
+        Args:
+            name (str): Message type, e.g. "GGA" or "NAV-PVT". All records of a type must have the same fields.
+            record (namedtuple): The record.
+            time_ns (int): Timestamp, defaults to time.time_ns().
+        """
+        with self.__lock:
+            buffer = self.__buffers.get(name)
+            if buffer is None:
+                buffer = self.__buffers[name] = ([], [])
+            buffer[0].append(record)
+            buffer[1].append(time_ns or time.time_ns())
+            self.records += 1
+            if len(buffer[0]) < self.__batch_size:
+                return
+            del self.__buffers[name]
+            item = (self.__sequence, name, buffer)
+            self.__sequence += 1
+        self.__pending.put(item)
+
+    def write_frame(self, frame):
+        with self.__lock:
+            self.__raw_buffer += frame
+            self.frames += 1
+
+    def flush(self):
+        """Hands every buffered record to the writer thread and waits until it is written."""
+        self.__queue_buffers()
+        self.__pending.join()
+
+    def close(self):
+        self.flush()
+        self.__running = False
+        self.__pending.put(None)
+        self.__thread.join()
+
+    def __take_buffers(self):
+        # Batches are numbered under the lock in the order they leave the buffers, the writer
+        # thread writes them in that order whichever path (queue or flush tick) brings them
+        with self.__lock:
+            buffers, self.__buffers = self.__buffers, {}
+            raw, self.__raw_buffer = self.__raw_buffer, bytearray()
+            items = list(buffers.items())
+            if raw:
+                items.append((None, raw))
+            first = self.__sequence
+            self.__sequence += len(items)
+        return [(first + i, name, data) for i, (name, data) in enumerate(items)]
+
+    def __queue_buffers(self):
+        for item in self.__take_buffers():
+            self.__pending.put(item)
+
+    def __run(self):
+        next_flush = time.monotonic() + self.__flush_interval
+        while True:
+            try:
+                item = self.__pending.get(timeout=max(next_flush - time.monotonic(), 0.01))
+            except queue.Empty:
+                item = False
+            if item is None:
+                self.__pending.task_done()
+                break
+            if item is not False:
+                self.__write_in_order(item, True)
+            if time.monotonic() >= next_flush:
+                next_flush = time.monotonic() + self.__flush_interval
+                for item in self.__take_buffers(): # not queued, this thread must not wait on its own queue
+                    self.__write_in_order(item, False)
+        self.__close_segment()
+
+    def __write_in_order(self, item, queued):
+        """
+        Writes a batch once every batch taken from the buffers before it is written.
+
+        A full batch is numbered in write() but queued after the lock is released, so a
+        flush tick can take newer records before it reaches the queue; they wait here
+        until it arrives instead of being written first.
+        """
+        self.__waiting[item[0]] = (item, queued)
+        while self.__next_write in self.__waiting:
+            (_, name, data), queued = self.__waiting.pop(self.__next_write)
+            self.__next_write += 1
+            self.__write_item(name, data)
+            if queued:
+                self.__pending.task_done()
+
+    def __write_item(self, name, data):
+        try:
+            self.__write(name, data)
+        except Exception as e:
+            logger.error("write error: %s", e)
+
+    def __write(self, name, data):
+        self.__check_rotation()
+        if name is None:
+            self.__raw_file.write(data)
+            self.__count(len(data))
+            return
+        records, times = data
+        columns = self.columns(records, times)
+        if self.format == "binary":
+            self.__write_block(name, columns, len(records))
+        else:
+            self.__write_arrow(name, columns)
+        self.batches += 1
+
+    @staticmethod
+    def columns(records, times):
+        """
+        Turns records of one type into columns: time_ns, one per field, and one per block field ("blocks.<field>").
+
+        Returns:
+            dict: Column name -> list of values.
+        """
+        fields = records[0]._fields
+        values = list(zip(*records))
+        columns = {"time_ns": times}
+        for field, column in zip(fields, values):
+            if field == "blocks" and hasattr(column[0], "_fields"):
+                for block_field, block_column in zip(column[0]._fields, zip(*column)):
+                    columns[f"blocks.{block_field}"] = list(block_column)
+            else:
+                columns[field] = list(column)
+        return columns
+
+    def __count(self, size):
+        self.__segment_bytes += size
+        self.bytes_written += size
+
+    def __check_rotation(self):
+        now = time.monotonic()
+        if self.__segment >= 0:
+            if self.format != "binary":
+                self.__segment_bytes = sum(os.path.getsize(path) for _, path in self.__arrow_writers.values()) + \
+                    self.__raw_file.tell()
+            too_big = self.__segment_bytes >= self.__rotate_bytes
+            too_old = self.__rotate_seconds is not None and now - self.__segment_start >= self.__rotate_seconds
+            if not (too_big or too_old):
+                return
+            self.__close_segment()
+        self.__segment += 1
+        self.__segment_start = now
+        self.__segment_bytes = 0
+        base = os.path.join(self.__directory, f"{self.__name}_{self.__segment:03d}")
+        self.__raw_file = open(base + ".ubx", "wb")
+        self.files.append(base + ".ubx")
+        if self.format == "binary":
+            self.__binary_file = open(base + ".pyl", "wb")
+            self.__binary_file.write(self.MAGIC)
+            self.files.append(base + ".pyl")
+
+    def __close_segment(self):
+        if self.__raw_file:
+            self.__raw_file.close()
+            self.__raw_file = None
+        if self.__binary_file:
+            self.__binary_file.close()
+            self.__binary_file = None
+        for writer, _ in self.__arrow_writers.values():
+            writer.close()
+        self.__arrow_writers = {}
+
+    def __write_arrow(self, name, columns):
+        table = pa.table(columns)
+        entry = self.__arrow_writers.get(name)
+        if entry is not None and not table.schema.equals(entry[0].schema):
+            try:
+                table = table.cast(entry[0].schema) # e.g. a column that was all None in the first batch
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError):
+                entry[0].close()
+                entry = None
+        if entry is None:
+            part = sum(1 for path in self.files if f"_{self.__segment:03d}_{name}" in path)
+            suffix = f"_{part}" if part else ""
+            base = os.path.join(self.__directory, f"{self.__name}_{self.__segment:03d}_{name}{suffix}")
+            if self.format == "parquet":
+                path = base + ".parquet"
+                writer = pa.parquet.ParquetWriter(path, table.schema, compression=self.__compression or "zstd")
+            else:
+                path = base + ".arrow"
+                writer = pa.ipc.new_file(path, table.schema)
+            entry = self.__arrow_writers[name] = (writer, path)
+            self.files.append(path)
+        entry[0].write_table(table)
+
+    def __write_block(self, name, columns, rows):
+        payload = bytearray(struct.pack("<H", len(columns)))
+        for column_name, column in columns.items():
+            kind, data = self.__encode_column(column)
+            encoded_name = column_name.encode()
+            payload += struct.pack("<B", len(encoded_name)) + encoded_name + kind + struct.pack("<I", len(data)) + data
+        compressed = _compress(self.__codec, bytes(payload))
+        encoded_name = name.encode()
+        block = struct.pack("<B", len(encoded_name)) + encoded_name + self.BLOCK.pack(self.__codec, rows, len(compressed)) + compressed
+        self.__binary_file.write(block)
+        self.__count(len(block))
+
+    @staticmethod
+    def __encode_column(column):
+        # q: int64, n: nullable int64 (null bitmap first), d: float64 (None as NaN), t: time of day in
+        # microseconds (-1 for None), D: date as proleptic ordinal (-1 for None), s/b: strings/bytes
+        # (int32 lengths, -1 for None, then UTF-8/raw), l: sequences (int32 lengths, -1 for None, then
+        # their items flattened into one nested column). Only plain data is stored, reading a log
+        # never runs code; values of any other type are stored as their str().
+        kinds = set(map(type, column))
+        if kinds <= {int, bool}:
+            return b"q", array("q", column).tobytes()
+        if kinds <= {int, bool, type(None)}:
+            nulls = bytes(value is None for value in column)
+            return b"n", nulls + array("q", [0 if value is None else value for value in column]).tobytes()
+        if kinds <= {float, int, type(None)}:
+            return b"d", array("d", [float("nan") if value is None else value for value in column]).tobytes()
+        if kinds <= {datetime_time, type(None)}:
+            return b"t", array("q", [-1 if value is None else
+                                     ((value.hour * 60 + value.minute) * 60 + value.second) * 1000000 + value.microsecond
+                                     for value in column]).tobytes()
+        if kinds <= {datetime_date, type(None)}:
+            return b"D", array("q", [-1 if value is None else value.toordinal() for value in column]).tobytes()
+        if kinds <= {str, type(None)}:
+            encoded = [None if value is None else value.encode() for value in column]
+            lengths = array("i", [-1 if value is None else len(value) for value in encoded])
+            return b"s", lengths.tobytes() + b"".join(value for value in encoded if value is not None)
+        if kinds <= {bytes, bytearray, memoryview, type(None)}:
+            encoded = [None if value is None else bytes(value) for value in column]
+            lengths = array("i", [-1 if value is None else len(value) for value in encoded])
+            return b"b", lengths.tobytes() + b"".join(value for value in encoded if value is not None)
+        if all(value is None or isinstance(value, (tuple, list)) for value in column):
+            lengths = array("i", [-1 if value is None else len(value) for value in column])
+            kind, data = RecordLogger.__encode_column([item for value in column if value is not None for item in value])
+            return b"l", lengths.tobytes() + kind + struct.pack("<I", len(data)) + data
+        return RecordLogger.__encode_column([None if value is None else str(value) for value in column])
+
+    @staticmethod
+    def __decode_column(kind, data, rows):
+        if kind == b"q":
+            return array("q", data).tolist()
+        if kind == b"n":
+            values = array("q", data[rows:]).tolist()
+            return [None if null else value for null, value in zip(data[:rows], values)]
+        if kind == b"d":
+            return [None if value != value else value for value in array("d", data).tolist()]
+        if kind == b"t":
+            return [None if value < 0 else datetime_time(value // 3600000000, value // 60000000 % 60,
+                                                         value // 1000000 % 60, value % 1000000)
+                    for value in array("q", data).tolist()]
+        if kind == b"D":
+            return [None if value < 0 else datetime_date.fromordinal(value) for value in array("q", data).tolist()]
+        if kind in (b"s", b"b", b"l"):
+            lengths = array("i", data[:4 * rows]).tolist()
+            position = 4 * rows
+            if kind == b"l":
+                items_kind = data[position:position + 1]
+                size = struct.unpack_from("<I", data, position + 1)[0]
+                data = RecordLogger.__decode_column(items_kind, data[position + 5:position + 5 + size],
+                                                    sum(length for length in lengths if length > 0))
+                position = 0
+            values = []
+            for length in lengths:
+                if length < 0:
+                    values.append(None)
+                else:
+                    value = data[position:position + length]
+                    values.append(value.decode() if kind == b"s" else tuple(value) if kind == b"l" else bytes(value))
+                    position += length
+            return values
+        raise ValueError(f"unknown column kind {kind!r}")
+
+    @staticmethod
+    def read(path):
+        """
+        Reads a binary log.
+
+        Yields:
+            tuple: (message name, dict of columns) for every block, in the order they were written.
+        """
+        with open(path, "rb") as file:
+            data = file.read()
+        if data[:len(RecordLogger.MAGIC)] != RecordLogger.MAGIC:
+            raise ValueError(f"{path} is not a pyublox binary log")
+        position = len(RecordLogger.MAGIC)
+        while position < len(data):
+            name_length = data[position]
+            name = data[position + 1:position + 1 + name_length].decode()
+            position += 1 + name_length
+            codec, rows, length = RecordLogger.BLOCK.unpack_from(data, position)
+            position += RecordLogger.BLOCK.size
+            payload = _decompress(codec, data[position:position + length])
+            position += length
+            count = struct.unpack_from("<H", payload)[0]
+            offset = 2
+            columns = {}
+            for _ in range(count):
+                column_name = payload[offset + 1:offset + 1 + payload[offset]].decode()
+                offset += 1 + payload[offset]
+                kind = payload[offset:offset + 1]
+                size = struct.unpack_from("<I", payload, offset + 1)[0]
+                offset += 5
+                columns[column_name] = RecordLogger.__decode_column(kind, payload[offset:offset + size], rows)
+                offset += size
+            yield name, columns
+
+    @staticmethod
+    def load(path):
+        """
+        Returns:
+            dict: Message name -> dict of columns, every block of a binary log concatenated.
+        """
+        tables = {}
+        for name, columns in RecordLogger.read(path):
+            table = tables.setdefault(name, {})
+            for column_name, values in columns.items():
+                table.setdefault(column_name, []).extend(values)
+        return tables
+
+
+# Example usage
+if __name__ == "__main__":
+    import sys
+    for name, table in RecordLogger.load(sys.argv[1]).items():
+        print(name, len(table["time_ns"]), "records,", ", ".join(table))
@@ -0,0 +1,166 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to split an NTRIP byte stream into RTCM3 frames and filter them by message type
+"""
+import time
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_utility import UbloxUtils
+
+class RTCMFramer:
+    """
+    Streaming RTCM3 frame splitter with a message type filter.
+
+    An RTCM3 frame is the 0xD3 preamble, 6 reserved bits and a 10-bit payload length,
+    the payload (the message type is its first 12 bits) and a 24-bit CRC-24Q over
+    everything before it. Chunks of any size are appended with feed(), and only
+    complete frames whose CRC is valid reach the callback. Bytes that do not belong to a
+    frame are dropped and counted. A frame with a bad CRC is dropped, and the search
+    starts again one byte after its preamble.
+
+    allow and deny select the message types that are forwarded (e.g. deny={1033} or
+    deny=RTCMFramer.MSM7 when the link to the receiver is saturated). Per-type frame and
+    byte counters are kept for every valid frame, forwarded or not.
+    """
+    OVERHEAD = 6 # preamble(1) + length(2) + CRC(3)
+    MSM7 = frozenset((1077, 1087, 1097, 1107, 1117, 1127, 1137))
+    MSM4 = frozenset((1074, 1084, 1094, 1104, 1114, 1124, 1134))
+
+    def __init__(self, callback=None, allow=None, deny=None, verify_crc=True):
+        """
+        Args:
+            callback (function): Called with every forwarded frame (bytes).
+            allow (iterable): Message types to forward, None forwards every type not denied.
+            deny (iterable): Message types to drop.
+            verify_crc (bool): Drop the frames whose CRC does not match.
+        """
+        self.__buffer = bytearray()
+        self.__start = 0
+        self.__position = 0
+        self.__need = 0 # length of the incomplete frame at __start, 0 if unknown
+        self.__callback = callback
+        self.__verify_crc = verify_crc
+        self.set_filter(allow, deny)
+        self.__started = None
+        self.bytes_received = 0
+        self.bytes_discarded = 0
+        self.frames = 0
+        self.frames_filtered = 0
+        self.crc_errors = 0
+        self.stats = {} # message type -> [frames, bytes]
+
+    def set_callback(self, callback):
+        self.__callback = callback
+
+    def set_filter(self, allow=None, deny=None):
+        self.__allow = frozenset(allow) if allow is not None else None
+        self.__deny = frozenset(deny) if deny else frozenset()
+
+    def forwards(self, msg_type):
+        """Whether frames of msg_type pass the allow/deny lists."""
+        return (self.__allow is None or msg_type in self.__allow) and msg_type not in self.__deny
+
+    def feed(self, data):
+        """
+        Appends a chunk of bytes received from the caster and forwards every complete frame.
+
+        Args:
+            data (bytes): Raw bytes read from the NTRIP socket.
+
+        Returns:
+            int: The number of frames forwarded.
+        """
+        if self.__started is None:
+            self.__started = time.monotonic()
+        buffer = self.__buffer
+        buffer += data
+        self.bytes_received += len(data)
+        if self.__need and len(buffer) < self.__start + self.__need:
+            return 0
+        count = 0
+        stats = self.stats
+        forwards = self.forwards
+        with memoryview(buffer) as view:
+            for start, stop, msg_type in self.iter_frames(buffer, self.__start, len(buffer)):
+                counter = stats.get(msg_type)
+                if counter is None:
+                    counter = stats[msg_type] = [0, 0]
+                counter[0] += 1
+                counter[1] += stop - start
+                if forwards(msg_type):
+                    count += 1
+                    if self.__callback:
+                        self.__callback(bytes(view[start:stop]))
+                else:
+                    self.frames_filtered += 1
+        self.__start = self.__position
+        if self.__start > len(buffer) - self.__start:
+            del buffer[:self.__start]
+            self.__start = 0
+        return count
+
+    def iter_frames(self, buffer, pos=0, end=None):
+        """
+        Scans buffer[pos:end] and yields every complete frame.
+
+        After the generator is exhausted, position holds the offset where the next scan
+        has to resume (the beginning of an incomplete frame).
+
+        Yields:
+            tuple: (start, stop, message type) of a frame, preamble and CRC included.
+        """
+        if end is None:
+            end = len(buffer)
+        header = UbloxConst.HEADER_RTCM
+        need = 0
+        while True:
+            start = buffer.find(header, pos, end)
+            if start < 0:
+                self.bytes_discarded += end - pos
+                pos = end
+                break
+            self.bytes_discarded += start - pos
+            pos = start
+            if end - pos < 5:
+                break
+            if buffer[pos + 1] & 0xFC:
+                # The 6 reserved bits are always 0, this 0xD3 is not a preamble
+                self.bytes_discarded += 1
+                pos += 1
+                continue
+            stop = pos + ((buffer[pos + 1] & 0x03) << 8 | buffer[pos + 2]) + self.OVERHEAD
+            if stop > end:
+                need = stop - pos
+                break
+            if self.__verify_crc and UbloxUtils.crc24q(buffer, pos, stop - 3) != \
+                    (buffer[stop - 3] << 16 | buffer[stop - 2] << 8 | buffer[stop - 1]):
+                self.crc_errors += 1
+                self.bytes_discarded += 1
+                pos += 1
+                continue
+            self.frames += 1
+            yield pos, stop, buffer[pos + 3] << 4 | buffer[pos + 4] >> 4
+            pos = stop
+        self.__position = pos
+        self.__need = need
+
+    def rates(self):
+        """
+        Returns:
+            dict: message type -> (frames per second, bytes per second) since the first feed().
+        """
+        elapsed = time.monotonic() - self.__started if self.__started is not None else 0
+        if elapsed <= 0:
+            return {}
+        return {msg_type: (frames / elapsed, size / elapsed) for msg_type, (frames, size) in self.stats.items()}
+
+    @property
+    def position(self):
+        """Offset of the first byte not consumed by the last iter_frames() run."""
+        return self.__position
+
+    def reset(self):
+        self.__buffer = bytearray()
+        self.__start = 0
+        self.__position = 0
+        self.__need = 0
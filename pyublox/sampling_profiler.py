@@ -0,0 +1,172 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to find where the reader and decode threads spend their time by sampling their stacks
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler of running threads.
+
+    A daemon thread wakes up every interval seconds and records the stack of every other
+    thread (sys._current_frames()), so the profiled code runs unmodified: the cost is paid
+    by the sampler, not per call as with cProfile, and it can stay on in production for a
+    while. Only stacks going through a file whose path contains include (the pyublox
+    package by default) are kept, which leaves the idle application threads out and
+    focuses the report on the reader, dispatcher and decode threads. Threads that used no
+    CPU since the previous sample (blocked in a queue wait or a serial read) are skipped
+    where the per-thread CPU clocks are available (Linux), so idle consumers do not fill
+    the report.
+
+    The sampler needs the GIL to take a sample, so a thread holding it for long (a C
+    extension call) is sampled when it releases it; the sample counts are proportions of
+    time, not exact durations.
+    """
+    def __init__(self, interval=0.001, include="pyublox", threads=None, max_depth=64, idle=False):
+        """
+        Args:
+            interval (float): Seconds between samples.
+            include (str): Keep only the stacks with a file path containing it, None keeps all.
+            threads (iterable): threading.Thread objects to sample, None for all threads.
+            max_depth (int): Frames kept per stack, from the innermost one.
+            idle (bool): Also sample the threads that used no CPU since the previous sample.
+        """
+        self.interval = interval
+        self.include = include
+        self.max_depth = max_depth
+        self.idle = idle
+        self.__cpu_times = {} # thread ident -> CPU time at the previous sample
+        self.__threads = {thread.ident for thread in threads} if threads is not None else None
+        self.__stacks = Counter() # tuple of code objects, outermost first -> samples
+        self.__stop = threading.Event()
+        self.__thread = None
+        self.samples = 0 # stacks recorded
+        self.ticks = 0 # sampler wake ups
+
+    @property
+    def running(self):
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return self
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__run, name="SamplingProfiler", daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+        self.__thread = None
+
+    def reset(self):
+        self.__stacks = Counter()
+        self.samples = 0
+        self.ticks = 0
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def __run(self):
+        own = threading.get_ident()
+        while not self.__stop.wait(self.interval):
+            self.ticks += 1
+            self.__sample_threads(own)
+
+    def __sample_threads(self, own):
+        # Frame objects are only referenced during this call: a frame object kept after its
+        # function returns also keeps the temporaries it held when it was sampled, e.g. the
+        # memoryview slice of UbloxFramer.feed(), which then cannot resize its buffer
+        for ident, frame in sys._current_frames().items():
+            if ident == own or (self.__threads is not None and ident not in self.__threads):
+                continue
+            if not self.idle and not self.__busy(ident):
+                continue
+            self.__sample(frame)
+
+    def __busy(self, ident):
+        try:
+            cpu_time = time.clock_gettime(time.pthread_getcpuclockid(ident))
+        except (AttributeError, OSError):
+            return True # no per-thread CPU clock, sample every thread
+        previous = self.__cpu_times.get(ident)
+        self.__cpu_times[ident] = cpu_time
+        return previous is None or cpu_time > previous
+
+    def __sample(self, frame):
+        stack = []
+        included = self.include is None
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            if not included and self.include in code.co_filename:
+                included = True
+            stack.append(code)
+            frame = frame.f_back
+        if included:
+            stack.reverse()
+            self.__stacks[tuple(stack)] += 1
+            self.samples += 1
+
+    @staticmethod
+    def label(code):
+        """Returns file:function of a code object, e.g. ubx_decoder.py:decode."""
+        return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+    def top(self, count=20):
+        """
+        Returns:
+            list: (function, self samples, total samples) of the functions with the most own samples,
+                  self counts the samples where the function was running, total also its callees.
+        """
+        own = Counter()
+        total = Counter()
+        for stack, samples in list(self.__stacks.items()):
+            own[self.label(stack[-1])] += samples
+            for label in {self.label(code) for code in stack}:
+                total[label] += samples
+        return [(label, samples, total[label]) for label, samples in own.most_common(count)]
+
+    def collapsed(self):
+        """
+        Returns:
+            str: One "outer;...;inner samples" line per stack, the input of flamegraph.pl and speedscope.
+        """
+        lines = Counter()
+        for stack, samples in list(self.__stacks.items()):
+            lines[";".join(self.label(code) for code in stack)] += samples
+        return "\n".join(f"{stack} {samples}" for stack, samples in lines.most_common())
+
+    def report(self, count=20):
+        """
+        Returns:
+            str: The top() table with the share of the samples of every function.
+        """
+        samples = self.samples or 1
+        lines = [f"{self.samples} samples in {self.ticks} ticks of {self.interval * 1000:g} ms",
+                 f"{'self %':>7} {'total %':>8}  function"]
+        for label, own, total in self.top(count):
+            lines.append(f"{own / samples * 100:7.1f} {total / samples * 100:8.1f}  {label}")
+        return "\n".join(lines)
+
+
+# Example usage
+if __name__ == "__main__":
+    from pyublox.ubx_decoder import UBXDecoder
+    from pyublox.ublox_utility import UbloxUtils
+    frame = UbloxUtils.build_ubx(0x01, 0x07, bytes(92)) # NAV-PVT
+    decoder = UBXDecoder()
+    with SamplingProfiler() as profiler:
+        for _ in range(200000):
+            decoder.decode(frame)
+    print(profiler.report(10))
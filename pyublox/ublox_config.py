@@ -0,0 +1,431 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to configure ublox receivers with UBX-CFG-VALSET/VALGET/VALDEL
+"""
+import struct
+import threading
+import time
+from collections import deque
+from itertools import chain
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_utility import UbloxUtils
+from pyublox.ublox_logging import get_logger
+
+logger = get_logger(__name__)
+
+# Ports of the CFG-MSGOUT keys, in the order of their key IDs
+MSGOUT_PORTS = ("I2C", "UART1", "UART2", "USB", "SPI")
+
+# Key ID of the I2C output rate of every message, the other ports follow in MSGOUT_PORTS order
+MSGOUT_BASES = {
+    "UBX_NAV_PVT": 0x20910006, "UBX_NAV_SAT": 0x20910015, "UBX_NAV_STATUS": 0x2091001a, "UBX_NAV_ATT": 0x2091001f,
+    "UBX_NAV_POSLLH": 0x20910029, "UBX_NAV_HPPOSLLH": 0x20910033, "UBX_NAV_DOP": 0x20910038,
+    "UBX_NAV_VELNED": 0x20910042, "UBX_NAV_TIMEGPS": 0x20910047, "UBX_NAV_RELPOSNED": 0x2091008d,
+    "UBX_NAV_EOE": 0x2091015f, "UBX_RXM_RAWX": 0x209102a4, "UBX_TIM_TP": 0x2091017d,
+    "UBX_ESF_MEAS": 0x20910277, "UBX_ESF_RAW": 0x2091029f, "UBX_ESF_STATUS": 0x20910105,
+    "UBX_ESF_ALG": 0x2091010f, "UBX_ESF_INS": 0x20910114,
+    "NMEA_ID_GGA": 0x209100ba, "NMEA_ID_GLL": 0x209100c9, "NMEA_ID_GSA": 0x209100bf, "NMEA_ID_GSV": 0x209100c4,
+    "NMEA_ID_RMC": 0x209100ab, "NMEA_ID_VTG": 0x209100b0, "NMEA_ID_GST": 0x209100d3, "NMEA_ID_ZDA": 0x209100d8,
+    "NMEA_ID_GNS": 0x209100b5,
+    "RTCM_3X_TYPE1005": 0x209102bd, "RTCM_3X_TYPE1074": 0x2091035e, "RTCM_3X_TYPE1077": 0x209102cc,
+    "RTCM_3X_TYPE1084": 0x20910363, "RTCM_3X_TYPE1087": 0x209102d1, "RTCM_3X_TYPE1094": 0x20910368,
+    "RTCM_3X_TYPE1097": 0x20910318, "RTCM_3X_TYPE1124": 0x2091036d, "RTCM_3X_TYPE1127": 0x209102d6,
+    "RTCM_3X_TYPE1230": 0x20910303,
+}
+
+# struct format of every value type of the configuration interface
+VALUE_FORMATS = {
+    "L": "<B", "U1": "<B", "I1": "<b", "X1": "<B", "E1": "<B", "U2": "<H", "I2": "<h", "X2": "<H", "E2": "<H",
+    "U4": "<I", "I4": "<i", "X4": "<I", "E4": "<I", "R4": "<f", "U8": "<Q", "I8": "<q", "X8": "<Q", "R8": "<d",
+}
+
+# Value size in bytes from bits 28-30 of a key ID (size 1 is a one bit value stored in one byte)
+KEY_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8}
+
+
+def _config_keys():
+    # name -> (key ID, value type), a subset of the F9P/F9R interface description
+    keys = {
+        "CFG-RATE-MEAS": (0x30210001, "U2"), # ms between measurements
+        "CFG-RATE-NAV": (0x30210002, "U2"), # measurements per navigation solution
+        "CFG-RATE-TIMEREF": (0x20210003, "E1"),
+        "CFG-RATE-NAV_PRIO": (0x20210004, "U1"), # Hz of the priority navigation mode (F9R)
+        "CFG-NAVSPG-DYNMODEL": (0x20110021, "E1"),
+        "CFG-NAVSPG-FIXMODE": (0x20110011, "E1"),
+        "CFG-NAVSPG-INFIL_MINELEV": (0x201100a4, "I1"),
+        "CFG-NAVHPG-DGNSSMODE": (0x20140011, "E1"),
+        "CFG-SFCORE-USE_SF": (0x10080001, "L"),
+        "CFG-SFIMU-AUTO_MNTALG_ENA": (0x10060027, "L"),
+        "CFG-TP-TIMEGRID_TP1": (0x2005000c, "E1"),
+        "CFG-UART1-BAUDRATE": (0x40520001, "U4"),
+        "CFG-UART2-BAUDRATE": (0x40530001, "U4"),
+        "CFG-UART1INPROT-UBX": (0x10730001, "L"), "CFG-UART1INPROT-NMEA": (0x10730002, "L"),
+        "CFG-UART1INPROT-RTCM3X": (0x10730004, "L"),
+        "CFG-UART1OUTPROT-UBX": (0x10740001, "L"), "CFG-UART1OUTPROT-NMEA": (0x10740002, "L"),
+        "CFG-UART1OUTPROT-RTCM3X": (0x10740004, "L"),
+        "CFG-UART2INPROT-UBX": (0x10750001, "L"), "CFG-UART2INPROT-NMEA": (0x10750002, "L"),
+        "CFG-UART2INPROT-RTCM3X": (0x10750004, "L"),
+        "CFG-UART2OUTPROT-UBX": (0x10760001, "L"), "CFG-UART2OUTPROT-NMEA": (0x10760002, "L"),
+        "CFG-UART2OUTPROT-RTCM3X": (0x10760004, "L"),
+        "CFG-USBINPROT-UBX": (0x10770001, "L"), "CFG-USBINPROT-NMEA": (0x10770002, "L"),
+        "CFG-USBINPROT-RTCM3X": (0x10770004, "L"),
+        "CFG-USBOUTPROT-UBX": (0x10780001, "L"), "CFG-USBOUTPROT-NMEA": (0x10780002, "L"),
+        "CFG-USBOUTPROT-RTCM3X": (0x10780004, "L"),
+    }
+    for message, base in MSGOUT_BASES.items():
+        for offset, port in enumerate(MSGOUT_PORTS):
+            keys[f"CFG-MSGOUT-{message}_{port}"] = (base + offset, "U1")
+    return keys
+
+
+class ConfigCommand:
+    """One CFG command waiting for its ACK. acked is None until ACK-ACK (True), ACK-NAK or timeout (False)."""
+    def __init__(self, msg_id, frame):
+        self.msg_id = msg_id
+        self.frame = frame
+        self.sent = None
+        self.acked = None
+        self.timed_out = False
+        self.response = None # CFG-VALGET answer frame
+
+
+class UbloxConfig:
+    """
+    Reads and writes the configuration of a ublox generation 9 receiver.
+
+    Values are encoded from a key database (KEYS, name -> key ID and type, unknown keys can
+    be given as key IDs), packed 64 keys per CFG-VALSET/VALGET/VALDEL message, and a set
+    of more than 64 keys is sent as one transaction so the receiver applies all of them or
+    none. Up to window commands are sent before the first ACK is back: the receiver
+    answers CFG commands in order, so every ACK-ACK/ACK-NAK resolves the oldest command of
+    its message ID, and a configuration costs about one round trip instead of one per
+    message. Commands without an answer after timeout seconds are failed; their answer can
+    still come later, so they are kept for LATE_ANSWER_TIME seconds to swallow it instead
+    of resolving a newer command with the same message ID.
+
+    last_duration holds the time the last set()/get()/delete() took, in seconds.
+    """
+    KEYS = _config_keys()
+    KEY_NAMES = {key_id: name for name, (key_id, _) in KEYS.items()}
+    MAX_KEYS = 64 # keys per message allowed by the receiver
+    LATE_ANSWER_TIME = 10.0 # seconds after which the answer of a timed-out command is not expected anymore
+
+    # Output presets: messages output at every navigation solution, every other message of
+    # MSGOUT_BASES is turned off on the port. nmea/rtcm: keep the protocol on the port.
+    PRESETS = {
+        "pvt_esf_high_rate": dict(messages={"UBX_NAV_PVT": 1, "UBX_NAV_EOE": 1, "UBX_ESF_INS": 1, "UBX_ESF_ALG": 1,
+                                            "UBX_ESF_MEAS": 1, "UBX_ESF_STATUS": 10},
+                                  settings={"CFG-RATE-MEAS": 100, "CFG-RATE-NAV": 1, "CFG-RATE-NAV_PRIO": 30},
+                                  nmea=False),
+        "pvt_only": dict(messages={"UBX_NAV_PVT": 1}, settings={}, nmea=False),
+        "rtk_rover": dict(messages={"UBX_NAV_PVT": 1, "UBX_NAV_HPPOSLLH": 1, "UBX_NAV_EOE": 1, "NMEA_ID_GGA": 1},
+                          settings={"CFG-RATE-MEAS": 200, "CFG-RATE-NAV": 1}, nmea=True, rtcm_in=True),
+        "raw_logging": dict(messages={"UBX_RXM_RAWX": 1, "UBX_NAV_PVT": 1, "UBX_NAV_SAT": 5, "UBX_NAV_EOE": 1},
+                            settings={"CFG-RATE-MEAS": 200, "CFG-RATE-NAV": 1}, nmea=False),
+        "nmea_basic": dict(messages={"NMEA_ID_GGA": 1, "NMEA_ID_RMC": 1, "NMEA_ID_VTG": 1},
+                           settings={"CFG-RATE-MEAS": 1000, "CFG-RATE-NAV": 1}, nmea=True),
+    }
+
+    def __init__(self, connection, timeout=1.0, window=8):
+        """
+        Args:
+            connection: The UBloxSerialConnection of the receiver (write() and subscribe()).
+            timeout (float): Seconds to wait for the ACK of a command.
+            window (int): Commands sent ahead of their ACK, 1 sends one command at a time.
+        """
+        self.__connection = connection
+        self.__timeout = timeout
+        self.__window = max(1, window)
+        self.__pending = deque()
+        self.__late = deque() # timed-out commands whose answer may still come, oldest first
+        self.__condition = threading.Condition()
+        self.__lock = threading.Lock() # one configuration at a time, ACKs are matched by order
+        self.__subscription = connection.subscribe(self.__on_frame, types={"ACK-ACK", "ACK-NAK", "CFG-VALGET"})
+        # counters
+        self.commands = 0
+        self.acks = 0
+        self.naks = 0
+        self.timeouts = 0
+        self.late_answers = 0
+        self.last_duration = None
+
+    def close(self):
+        self.__connection.dispatcher.unsubscribe(self.__subscription)
+
+    @staticmethod
+    def key(name):
+        """
+        Returns:
+            tuple: (key ID, value type) of a key name or key ID, the type of unknown IDs is unsigned of the ID size.
+        """
+        if isinstance(name, int):
+            name = UbloxConfig.KEY_NAMES.get(name, name)
+            if isinstance(name, int):
+                size = KEY_SIZES.get((name >> 28) & 0x07)
+                if size is None:
+                    raise ValueError(f"Invalid configuration key ID 0x{name:08x}")
+                return name, "L" if (name >> 28) & 0x07 == 1 else f"U{size}"
+        definition = UbloxConfig.KEYS.get(name)
+        if definition is None:
+            raise ValueError(f"Unknown configuration key {name!r}")
+        return definition
+
+    @staticmethod
+    def encode(name, value):
+        key_id, value_type = UbloxConfig.key(name)
+        return struct.pack("<I", key_id) + struct.pack(VALUE_FORMATS[value_type], value)
+
+    @staticmethod
+    def decode_values(payload):
+        """
+        Decodes the key/value pairs of a CFG-VALGET answer.
+
+        Args:
+            payload (bytes): The payload after the 4 header bytes.
+
+        Returns:
+            dict: Key name (or key ID when not in KEYS) -> value.
+        """
+        values = {}
+        position = 0
+        while position + 4 <= len(payload):
+            key_id = struct.unpack_from("<I", payload, position)[0]
+            position += 4
+            size = KEY_SIZES.get((key_id >> 28) & 0x07)
+            if size is None or position + size > len(payload):
+                logger.warning("cannot decode the value of key 0x%08x", key_id)
+                break
+            key_id, value_type = UbloxConfig.key(key_id)
+            value = struct.unpack_from(VALUE_FORMATS[value_type], payload, position)[0]
+            position += size
+            values[UbloxConfig.KEY_NAMES.get(key_id, key_id)] = value
+        return values
+
+    @staticmethod
+    def valset_frames(values, layers=UbloxConst.LAYER_RAM):
+        """
+        Builds the CFG-VALSET messages of a set of values, a transaction when more than one is needed.
+
+        Args:
+            values (dict): Key name or ID -> value.
+            layers (int): LAYER_RAM, LAYER_BBR and/or LAYER_FLASH bits.
+
+        Returns:
+            list: The frames, to be sent in order.
+        """
+        items = [UbloxConfig.encode(name, value) for name, value in values.items()]
+        return UbloxConfig.__transaction_frames(UbloxConst.ID_VALSET, layers, items)
+
+    @staticmethod
+    def __transaction_frames(msg_id, layers, items):
+        # Up to MAX_KEYS items per message, several messages are sent as one transaction
+        batches = [items[i:i + UbloxConfig.MAX_KEYS] for i in range(0, len(items), UbloxConfig.MAX_KEYS)] or [[]]
+        frames = []
+        for i, batch in enumerate(batches):
+            if len(batches) == 1:
+                transaction = 0 # no transaction
+            elif i == 0:
+                transaction = 1 # begin
+            elif i == len(batches) - 1:
+                transaction = 3 # apply and end
+            else:
+                transaction = 2 # continue
+            payload = bytes((1, layers, transaction, 0)) + b"".join(batch)
+            frames.append(UbloxUtils.build_ubx(UbloxConst.CLASS_CFG, msg_id, payload))
+        return frames
+
+    def set(self, values, layers=UbloxConst.LAYER_RAM):
+        """
+        Writes configuration values.
+
+        Args:
+            values (dict): Key name or ID -> value, e.g. {"CFG-RATE-MEAS": 100}.
+            layers (int): LAYER_RAM, LAYER_BBR and/or LAYER_FLASH bits.
+
+        Returns:
+            bool: True if every message was acknowledged.
+        """
+        commands = [ConfigCommand(UbloxConst.ID_VALSET, frame) for frame in self.valset_frames(values, layers)]
+        return self.__report("set", self.__execute(commands))
+
+    def get(self, keys, layer=UbloxConst.GET_LAYER_RAM):
+        """
+        Reads configuration values.
+
+        Args:
+            keys (iterable): Key names or IDs.
+            layer (int): GET_LAYER_RAM, GET_LAYER_BBR, GET_LAYER_FLASH or GET_LAYER_DEFAULT.
+
+        Returns:
+            dict: Key name (or ID) -> value, for the keys the receiver answered.
+        """
+        ids = [struct.pack("<I", self.key(name)[0]) for name in keys]
+        commands = []
+        for i in range(0, len(ids), self.MAX_KEYS):
+            payload = bytes((0, layer, 0, 0)) + b"".join(ids[i:i + self.MAX_KEYS])
+            commands.append(ConfigCommand(UbloxConst.ID_VALGET, UbloxUtils.build_ubx(UbloxConst.CLASS_CFG, UbloxConst.ID_VALGET, payload)))
+        self.__report("get", self.__execute(commands))
+        values = {}
+        for command in commands:
+            if command.response is not None:
+                values.update(self.decode_values(command.response[10:-2]))
+        return values
+
+    def delete(self, keys, layers=UbloxConst.LAYER_BBR | UbloxConst.LAYER_FLASH):
+        """
+        Removes configuration values from the BBR and/or flash layers, the defaults apply again after a reset.
+
+        Returns:
+            bool: True if every message was acknowledged.
+        """
+        ids = [struct.pack("<I", self.key(name)[0]) for name in keys]
+        commands = [ConfigCommand(UbloxConst.ID_VALDEL, frame) for frame in self.__transaction_frames(UbloxConst.ID_VALDEL, layers, ids)]
+        return self.__report("delete", self.__execute(commands))
+
+    @staticmethod
+    def preset(name, port="UART1"):
+        """
+        Returns:
+            dict: The values of an output preset (see PRESETS) for one port, ready for set().
+        """
+        preset = UbloxConfig.PRESETS[name]
+        values = dict(preset["settings"])
+        for message in MSGOUT_BASES:
+            values[f"CFG-MSGOUT-{message}_{port}"] = preset["messages"].get(message, 0)
+        prefix = "CFG-USB" if port == "USB" else f"CFG-{port}"
+        if port in ("UART1", "UART2", "USB"):
+            values[f"{prefix}OUTPROT-UBX"] = 1
+            values[f"{prefix}OUTPROT-NMEA"] = int(preset["nmea"])
+            values[f"{prefix}OUTPROT-RTCM3X"] = 0
+            if preset.get("rtcm_in"):
+                values[f"{prefix}INPROT-RTCM3X"] = 1
+        return values
+
+    def apply_preset(self, name, port="UART1", layers=UbloxConst.LAYER_RAM, changed_only=False):
+        """
+        Applies an output preset, e.g. apply_preset("pvt_esf_high_rate") for NAV-PVT and ESF output without NMEA.
+
+        With changed_only the current RAM values are read first and only the differences
+        are written, which saves time when the receiver is already mostly configured.
+
+        Returns:
+            bool: True if every message was acknowledged.
+        """
+        values = self.preset(name, port)
+        start = time.perf_counter()
+        if changed_only:
+            current = self.get(values)
+            values = {key: value for key, value in values.items() if current.get(key) != value}
+            if not values:
+                self.last_duration = time.perf_counter() - start
+                return True
+        result = self.set(values, layers)
+        self.last_duration = time.perf_counter() - start
+        return result
+
+    def switch_baud_rate(self, baud_rate=921600, port="UART1", settle_time=0.1):
+        """
+        Switches the receiver UART and the host port to a new baud rate.
+
+        The receiver changes rate right after the CFG-VALSET, so its ACK comes back at
+        either rate or is lost; it is not waited for. The new rate is confirmed by reading
+        the key back at the new rate instead. Only useful on UART links, USB ignores it.
+
+        Returns:
+            bool: True if the receiver answers at the new rate.
+        """
+        key = f"CFG-{port}-BAUDRATE"
+        self.__connection.write(self.valset_frames({key: baud_rate})[0])
+        time.sleep(settle_time)
+        self.__connection.set_baud_rate(baud_rate)
+        time.sleep(settle_time)
+        if self.get([key]).get(key) == baud_rate:
+            return True
+        logger.warning("receiver does not answer at %s baud", baud_rate)
+        return False
+
+    def __report(self, action, commands):
+        failed = [command for command in commands if not command.acked]
+        for command in failed:
+            logger.warning("%s %s", action, "timed out" if command.timed_out else "rejected (ACK-NAK)")
+        return not failed
+
+    def __execute(self, commands):
+        start = time.perf_counter()
+        with self.__lock:
+            condition = self.__condition
+            for command in commands:
+                with condition:
+                    while len(self.__pending) >= self.__window:
+                        self.__wait()
+                    command.sent = time.monotonic()
+                    self.__pending.append(command) # before the write, the ACK may come back before write() returns
+                self.__connection.write(command.frame)
+                self.commands += 1
+            with condition:
+                while self.__pending:
+                    self.__wait()
+        self.last_duration = time.perf_counter() - start
+        return commands
+
+    def __wait(self):
+        # Called with the condition held: waits for an answer or fails the oldest command once it is too old
+        oldest = self.__pending[0]
+        remaining = oldest.sent + self.__timeout - time.monotonic()
+        if remaining > 0:
+            self.__condition.wait(remaining)
+            return
+        self.__pending.popleft()
+        oldest.acked = False
+        oldest.timed_out = True
+        self.__late.append(oldest)
+        self.timeouts += 1
+
+    def __on_frame(self, frame):
+        if len(frame) < 10:
+            return
+        with self.__condition:
+            late = self.__late
+            expired = time.monotonic() - self.LATE_ANSWER_TIME
+            while late and late[0].sent < expired:
+                late.popleft()
+            if frame[2] == UbloxConst.CLASS_CFG:
+                # CFG-VALGET answer, followed by its ACK-ACK
+                for command in chain(late, self.__pending):
+                    if command.msg_id == UbloxConst.ID_VALGET and command.response is None:
+                        command.response = frame
+                        break
+                return
+            if frame[6] != UbloxConst.CLASS_CFG:
+                return
+            acked = frame[3] == UbloxConst.ID_ACK_ACK
+            # Answers come in order: one of a timed-out command is older than any pending one
+            for command in late:
+                if command.msg_id == frame[7]:
+                    late.remove(command)
+                    self.late_answers += 1
+                    return
+            for command in self.__pending:
+                if command.msg_id == frame[7]:
+                    command.acked = acked
+                    self.__pending.remove(command)
+                    break
+            else:
+                return # answer of a command not sent by this instance
+            if acked:
+                self.acks += 1
+            else:
+                self.naks += 1
+            self.__condition.notify_all()
+
+
+# Example usage
+if __name__ == "__main__":
+    from pyublox.ublox_serial_connection import UBloxSerialConnection
+    ublox_connection = UBloxSerialConnection(UbloxUtils.find_ublox_device(UbloxConst.UBLOX_DEVICE), 38400)
+    ublox_connection.connect()
+    config = UbloxConfig(ublox_connection)
+    print(config.get(["CFG-RATE-MEAS", "CFG-UART1-BAUDRATE"]))
+    print(config.apply_preset("pvt_esf_high_rate", port="USB"), f"{config.last_duration * 1000:.1f} ms")
+    ublox_connection.disconnect()
@@ -11,9 +11,12 @@ class UbloxConst:
             (0x403, 0x6015) # ublox: F9P
 
     ]
+    # Baud rates of the ublox UARTs, slowest first
+    BAUD_RATES = (9600, 19200, 38400, 57600, 115200, 230400, 460800, 921600)
     # header
     HEADER_NMEA = b"$G"
     HEADER_UBX = b'\xb5\x62'
+    HEADER_RTCM = b'\xd3'
     # Talker ID
     TID_GPS_SBAS = b"GP"
     TID_GLONASS = b"GL"
@@ -24,9 +27,65 @@ class UbloxConst:
     # Sentence Formatter
     SF_GGA = b"GGA" # Global positioning system fix data
     SF_VTG = b"VTG" # Course over ground and ground speed
+    SF_RMC = b"RMC" # Recommended minimum data
+    SF_GSA = b"GSA" # GNSS DOP and active satellites
+    SF_GSV = b"GSV" # GNSS satellites in view
+    SF_GST = b"GST" # GNSS pseudorange error statistics
+    SF_GNS = b"GNS" # GNSS fix data
+    SF_ZDA = b"ZDA" # Time and date
 
     D1024 = 1024
     D100 = 100
     CLASS_ESF = 0x10
     ID_MEAS = 0x02
-    ID_ALG = 0x14
\ No newline at end of file
+    ID_ALG = 0x14
+    CLASS_NAV = 0x01
+    CLASS_TIM = 0x0D
+    ID_INS = 0x15
+    CLASS_ACK = 0x05
+    ID_ACK_NAK = 0x00
+    ID_ACK_ACK = 0x01
+    CLASS_CFG = 0x06
+    ID_VALSET = 0x8A
+    ID_VALGET = 0x8B
+    ID_VALDEL = 0x8C
+    # CFG-VALSET/VALDEL layer bits
+    LAYER_RAM = 0x01
+    LAYER_BBR = 0x02
+    LAYER_FLASH = 0x04
+    # CFG-VALGET layer numbers
+    GET_LAYER_RAM = 0
+    GET_LAYER_BBR = 1
+    GET_LAYER_FLASH = 2
+    GET_LAYER_DEFAULT = 7
+    # NMEA sentences use the UBX class/ID pairs of the CFG-MSG standard messages
+    CLASS_NMEA = 0xF0
+    NMEA_IDS = {
+        b"GGA": 0x00, b"GLL": 0x01, b"GSA": 0x02, b"GSV": 0x03, b"RMC": 0x04, b"VTG": 0x05, b"GRS": 0x06,
+        b"GST": 0x07, b"ZDA": 0x08, b"GBS": 0x09, b"DTM": 0x0A, b"GNS": 0x0D, b"VLW": 0x0F,
+    }
+    # Payload offset of the GPS time of week (ms) for the messages that carry one
+    ITOW_OFFSETS = {
+        (CLASS_NAV, 0x01): 0, # NAV-POSECEF
+        (CLASS_NAV, 0x02): 0, # NAV-POSLLH
+        (CLASS_NAV, 0x03): 0, # NAV-STATUS
+        (CLASS_NAV, 0x04): 0, # NAV-DOP
+        (CLASS_NAV, 0x05): 0, # NAV-ATT
+        (CLASS_NAV, 0x07): 0, # NAV-PVT
+        (CLASS_NAV, 0x11): 0, # NAV-VELECEF
+        (CLASS_NAV, 0x12): 0, # NAV-VELNED
+        (CLASS_NAV, 0x13): 4, # NAV-HPPOSECEF
+        (CLASS_NAV, 0x14): 4, # NAV-HPPOSLLH
+        (CLASS_NAV, 0x20): 0, # NAV-TIMEGPS
+        (CLASS_NAV, 0x21): 0, # NAV-TIMEUTC
+        (CLASS_NAV, 0x22): 0, # NAV-CLOCK
+        (CLASS_NAV, 0x35): 0, # NAV-SAT
+        (CLASS_NAV, 0x36): 0, # NAV-COV
+        (CLASS_NAV, 0x3C): 4, # NAV-RELPOSNED
+        (CLASS_NAV, 0x43): 0, # NAV-SIG
+        (CLASS_NAV, 0x61): 0, # NAV-EOE
+        (CLASS_ESF, 0x10): 0, # ESF-STATUS
+        (CLASS_ESF, ID_ALG): 0, # ESF-ALG
+        (CLASS_ESF, ID_INS): 8, # ESF-INS
+        (CLASS_TIM, 0x01): 0, # TIM-TP
+    }
@@ -0,0 +1,433 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to replay recorded ublox logs (UBX + NMEA captures)
+"""
+import bisect
+import mmap
+import operator
+import os
+import struct
+from array import array
+from itertools import islice
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_framer import UbloxFramer
+from pyublox.ublox_utility import UbloxUtils
+try:
+    import numpy as np
+except ImportError: # the captures are then split by UbloxFramer, one frame at a time
+    np = None
+
+class UbloxFileReader:
+    """
+    Reads a binary capture of the receiver output through a read-only memory map.
+
+    frames() splits the capture exactly like the UbloxFramer of the live serial path and
+    yields memoryview slices of the map, so no frame is copied. With NumPy the capture is
+    scanned in chunks of SCAN_CHUNK bytes instead of frame by frame: the header candidates,
+    their lengths and CRLFs are found with array comparisons, the frames the framer would
+    accept are followed from one to the next through the candidate array, and the UBX
+    checksums are verified with UbloxUtils.ubx_checksum_batch(). A frame failing its
+    checksum is dropped and the chain is followed again from the candidates after its
+    header, which is where the framer resynchronizes. build_index() stores the offset,
+    length, class/ID and GPS time of week of every frame in a sidecar file
+    (<capture>.idx) which lets frames_in_window() and frames_of() jump straight to the
+    frames they need instead of scanning the capture again.
+    """
+    INDEX_MAGIC = b"PYUBLOXIDX1\x00"
+    INDEX_HEADER = struct.Struct("<12sQQQ") # magic, capture size, capture mtime (ns), frame count
+    SCAN_CHUNK = 1 << 23 # bytes scanned at once with NumPy
+    MAX_UBX_PAYLOAD = 8192 # same limits as the UbloxFramer defaults
+    MAX_NMEA_LENGTH = 200
+
+    def __init__(self, file_path, index_path=None, verify_checksum=True):
+        self.__file_path = file_path
+        self.__index_path = index_path or file_path + ".idx"
+        self.__verify_checksum = verify_checksum
+        self.__file = None
+        self.__mmap = None
+        self.__view = None
+        # index columns
+        self.offsets = None
+        self.lengths = None
+        self.msg_keys = None # msg_class << 8 | msg_id
+        self.itows = None
+        self.__itow_sorted = False
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def open(self):
+        if self.__mmap is None:
+            self.__file = open(self.__file_path, 'rb')
+            if os.fstat(self.__file.fileno()).st_size == 0:
+                # mmap refuses empty files, an empty bytes object behaves the same for the framer
+                self.__mmap = b""
+            else:
+                self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.__view = memoryview(self.__mmap)
+
+    def close(self):
+        if self.__view is not None:
+            self.__view.release()
+            self.__view = None
+        if self.__mmap is not None:
+            try:
+                if isinstance(self.__mmap, mmap.mmap):
+                    self.__mmap.close()
+            except BufferError:
+                # Frames still referenced by the caller keep the map alive, it is unmapped once they are released
+                pass
+            self.__mmap = None
+        if self.__file:
+            self.__file.close()
+            self.__file = None
+
+    def frames(self, start=0, end=None):
+        """
+        Yields every complete, checksum-valid frame of the capture.
+
+        Args:
+            start (int): Byte offset to start from.
+            end (int): Byte offset to stop at, defaults to the end of the file.
+
+        Yields:
+            memoryview: A zero-copy view of one UBX or NMEA frame. The view points into the
+                        memory map and is valid until the reader is closed.
+        """
+        opened_here = self.__mmap is None
+        self.open()
+        try:
+            view = self.__view
+            for starts, stops in self.__scan(start, end):
+                if np is not None:
+                    starts, stops = starts.tolist(), stops.tolist()
+                for frame_start, frame_stop in zip(starts, stops):
+                    yield view[frame_start:frame_stop]
+        finally:
+            if opened_here:
+                self.close()
+
+    def frame_spans(self, start=0, end=None):
+        """
+        Yields the offsets of the frames frames() would yield, a chunk of the capture at a time.
+
+        Consumers working on arrays (UBXBatchDecoder, NumPy gathers on np.frombuffer() of
+        the file) can use them directly instead of going through one memoryview per frame.
+
+        Args:
+            start (int): Byte offset to start from.
+            end (int): Byte offset to stop at, defaults to the end of the file.
+
+        Yields:
+            tuple: (starts, stops) int64 arrays with NumPy, lists of int without.
+        """
+        opened_here = self.__mmap is None
+        self.open()
+        try:
+            yield from self.__scan(start, end)
+        finally:
+            if opened_here:
+                self.close()
+
+    def __scan(self, start=0, end=None):
+        # Yields (starts, stops) of the frames of [start, end), arrays with NumPy, lists without
+        if end is None:
+            end = len(self.__mmap)
+        if np is None:
+            framer = UbloxFramer(verify_checksum=self.__verify_checksum,
+                                 max_ubx_payload=self.MAX_UBX_PAYLOAD, max_nmea_length=self.MAX_NMEA_LENGTH)
+            spans = list(framer.iter_frames(self.__mmap, start, end))
+            yield [span[0] for span in spans], [span[1] for span in spans]
+            return
+        data = np.frombuffer(self.__mmap, dtype=np.uint8)[:end]
+        overlap = self.MAX_UBX_PAYLOAD + UbloxFramer.UBX_OVERHEAD # longest frame starting in a chunk
+        position = start
+        while position < end:
+            chunk_end = min(end, position + self.SCAN_CHUNK)
+            window_end = min(end, chunk_end + overlap)
+            starts, stops, incomplete = self.__scan_window(data[position:window_end], chunk_end - position)
+            yield starts + position, stops + position
+            if incomplete:
+                break # only the last window can end with an incomplete frame
+            # frames starting in this chunk may end in the next one
+            position = max(chunk_end, position + int(stops[-1])) if len(stops) else chunk_end
+
+    def __scan_window(self, window, end):
+        """
+        Finds the frames UbloxFramer would accept among the ones starting before end in window.
+
+        Returns:
+            tuple: (starts, stops, incomplete) offsets in window, incomplete is True when the
+                   scan stopped at a frame running past the window.
+        """
+        size = len(window)
+        ubx_all = self.__pairs(window, UbloxConst.HEADER_UBX)
+        ubx = ubx_all[ubx_all < end]
+        nmea = self.__pairs(window, UbloxConst.HEADER_NMEA)
+        nmea = nmea[nmea < end]
+        # UBX: a length over the limit is rejected, a frame running past the window is incomplete
+        has_length = ubx + 6 <= size
+        lengths = np.zeros(len(ubx), dtype=np.int64)
+        lengths[has_length] = window[ubx[has_length] + 4] | window[ubx[has_length] + 5].astype(np.int64) << 8
+        ubx_stops = ubx + lengths + UbloxFramer.UBX_OVERHEAD
+        too_long = has_length & (lengths > self.MAX_UBX_PAYLOAD)
+        ubx_incomplete = ~has_length | (~too_long & (ubx_stops > size))
+        # NMEA: the CRLF has to come before the next UBX header and within MAX_NMEA_LENGTH bytes
+        limits = np.minimum(self.__following(ubx_all, nmea, size), nmea + self.MAX_NMEA_LENGTH)
+        nmea_stops = self.__following(self.__pairs(window, b"\r\n"), nmea + 2, size) + 2
+        nmea_valid = nmea_stops <= limits
+        nmea_incomplete = ~nmea_valid & (limits >= size)
+        # candidates of both kinds in stream order
+        starts = np.concatenate((ubx, nmea))
+        order = np.argsort(starts, kind="stable")
+        starts = starts[order]
+        stops = np.concatenate((ubx_stops, nmea_stops))[order]
+        valid = np.concatenate((~too_long & ~ubx_incomplete, nmea_valid))[order]
+        incomplete = np.concatenate((ubx_incomplete, nmea_incomplete))[order]
+        is_ubx = order < len(ubx)
+        while True:
+            path = self.__chain(starts, stops, valid, incomplete)
+            cut = np.flatnonzero(incomplete[path])
+            if len(cut):
+                path = path[:cut[0]]
+            if not self.__verify_checksum:
+                break
+            checked = path[is_ubx[path]]
+            failed = ~UbloxUtils.ubx_checksum_batch(window, starts[checked], stops[checked] - starts[checked] - 8)
+            if not failed.any():
+                break
+            valid[checked[failed]] = False
+        return starts[path], stops[path], len(cut) > 0
+
+    @staticmethod
+    def __pairs(window, header):
+        # offsets of the two byte header in window
+        candidates = np.flatnonzero(window[:-1] == header[0])
+        return candidates[window[candidates + 1] == header[1]]
+
+    @staticmethod
+    def __following(positions, offsets, default):
+        # first of the sorted positions at or after every offset, default if there is none
+        index = np.searchsorted(positions, offsets)
+        found = index < len(positions)
+        result = np.full(len(offsets), default, dtype=np.int64)
+        result[found] = positions[index[found]]
+        return result
+
+    @staticmethod
+    def __chain(starts, stops, valid, incomplete):
+        """
+        Returns the candidates UbloxFramer stops at: the first valid or incomplete one, then
+        after every valid frame the first valid or incomplete candidate at or after its stop.
+        """
+        count = len(starts)
+        node = valid | incomplete
+        following = np.minimum.accumulate(np.where(node, np.arange(count), count)[::-1])[::-1]
+        following = np.append(following, count)
+        if following[0] == count:
+            return np.zeros(0, dtype=np.int64)
+        first = following[0]
+        successors = np.where(valid, following[np.searchsorted(starts, stops)], count)
+        # Successors always lie after their node, so removing the nodes nobody points to
+        # until none is left keeps exactly the chain starting at the first node
+        alive = node.copy()
+        alive[:first] = False
+        while True:
+            pointed = np.zeros(count + 1, dtype=bool)
+            pointed[successors[alive]] = True
+            pointed[first] = True
+            kept = alive & pointed[:count]
+            if np.array_equal(kept, alive):
+                return np.flatnonzero(alive)
+            alive = kept
+
+    def build_index(self, save=True):
+        """
+        Scans the capture once and records where every frame is.
+
+        UBX messages that carry an iTOW set the time of the frames that follow them, so
+        NMEA sentences and time-less UBX messages inherit the iTOW of their epoch. Frames
+        before the first time-tagged message get iTOW 0.
+
+        Args:
+            save (bool): Whether to write the sidecar index file.
+
+        Returns:
+            int: The number of indexed frames.
+        """
+        opened_here = self.__mmap is None
+        self.open()
+        try:
+            columns = self.__index_frames() if np is None else self.__index_arrays()
+        finally:
+            if opened_here:
+                self.close()
+        self.__set_index(*columns)
+        if save:
+            self.save_index()
+        return len(self.offsets)
+
+    def __index_frames(self):
+        offsets = array('Q')
+        lengths = array('I')
+        msg_keys = array('H')
+        itows = array('I')
+        itow_offsets = UbloxConst.ITOW_OFFSETS
+        nmea_ids = UbloxConst.NMEA_IDS
+        nmea_key = UbloxConst.CLASS_NMEA << 8
+        header_ubx = UbloxConst.HEADER_UBX[0]
+        itow = 0
+        data = self.__mmap
+        for starts, stops in self.__scan():
+            for frame_start, frame_stop in zip(starts, stops):
+                if data[frame_start] == header_ubx:
+                    key = data[frame_start + 2] << 8 | data[frame_start + 3]
+                    itow_offset = itow_offsets.get((key >> 8, key & 0xFF))
+                    if itow_offset is not None:
+                        at = frame_start + 6 + itow_offset
+                        itow = data[at] | data[at + 1] << 8 | data[at + 2] << 16 | data[at + 3] << 24
+                else:
+                    key = nmea_key | nmea_ids.get(data[frame_start + 3:frame_start + 6], 0xFF)
+                offsets.append(frame_start)
+                lengths.append(frame_stop - frame_start)
+                msg_keys.append(key)
+                itows.append(itow)
+        return offsets, lengths, msg_keys, itows
+
+    def __index_arrays(self):
+        # The columns of __index_frames() computed with NumPy over all frames at once
+        data = np.frombuffer(self.__mmap, dtype=np.uint8)
+        spans = list(self.__scan())
+        starts = np.concatenate([span[0] for span in spans]) if spans else np.zeros(0, dtype=np.int64)
+        stops = np.concatenate([span[1] for span in spans]) if spans else np.zeros(0, dtype=np.int64)
+        is_ubx = data[starts] == UbloxConst.HEADER_UBX[0]
+        msg_keys = np.empty(len(starts), dtype=np.uint16)
+        ubx = starts[is_ubx]
+        ubx_keys = data[ubx + 2].astype(np.uint16) << 8 | data[ubx + 3]
+        msg_keys[is_ubx] = ubx_keys
+        # NMEA: the three letters after the talker ID, looked up among the sorted codes of NMEA_IDS
+        nmea = starts[~is_ubx]
+        known = nmea + 6 <= len(data)
+        letters = data[np.minimum(nmea[:, None] + np.arange(3, 6), len(data) - 1)].astype(np.int64)
+        codes = letters[:, 0] << 16 | letters[:, 1] << 8 | letters[:, 2]
+        id_codes = np.array([int.from_bytes(name, "big") for name in UbloxConst.NMEA_IDS], dtype=np.int64)
+        id_values = np.array(list(UbloxConst.NMEA_IDS.values()), dtype=np.int64)
+        order = np.argsort(id_codes)
+        id_codes = id_codes[order]
+        id_values = id_values[order]
+        index = np.minimum(np.searchsorted(id_codes, codes), len(id_codes) - 1)
+        known &= id_codes[index] == codes
+        msg_keys[~is_ubx] = UbloxConst.CLASS_NMEA << 8 | np.where(known, id_values[index], 0xFF)
+        # iTOW of the time-tagged UBX messages, carried forward to the frames after them
+        itow_offsets = np.full(1 << 16, -1, dtype=np.int64)
+        for (msg_class, msg_id), offset in UbloxConst.ITOW_OFFSETS.items():
+            itow_offsets[msg_class << 8 | msg_id] = offset
+        at = ubx + 6 + itow_offsets[ubx_keys]
+        tagged = (at >= ubx + 6) & (at + 4 <= stops[is_ubx] - 2)
+        at = at[tagged]
+        values = data[at[:, None] + np.arange(4)].copy().view("<u4").ravel()
+        tagged_frames = np.flatnonzero(is_ubx)[tagged]
+        last_tagged = np.full(len(starts), -1, dtype=np.int64)
+        last_tagged[tagged_frames] = np.arange(len(tagged_frames))
+        last_tagged = np.maximum.accumulate(last_tagged) if len(starts) else last_tagged
+        itows = np.where(last_tagged >= 0, values[last_tagged] if len(values) else 0, 0)
+        return (self.__to_array('Q', starts), self.__to_array('I', stops - starts),
+                self.__to_array('H', msg_keys), self.__to_array('I', itows))
+
+    @staticmethod
+    def __to_array(typecode, values):
+        column = array(typecode)
+        column.frombytes(np.ascontiguousarray(values, dtype=typecode).tobytes())
+        return column
+
+    def save_index(self):
+        stat = os.stat(self.__file_path)
+        with open(self.__index_path, 'wb') as file:
+            file.write(self.INDEX_HEADER.pack(self.INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, len(self.offsets)))
+            for column in (self.offsets, self.lengths, self.msg_keys, self.itows):
+                column.tofile(file)
+
+    def load_index(self):
+        """
+        Loads the sidecar index if it exists and still matches the capture.
+
+        Returns:
+            bool: True if the index was loaded, False if it is missing or stale.
+        """
+        if not os.path.exists(self.__index_path):
+            return False
+        stat = os.stat(self.__file_path)
+        with open(self.__index_path, 'rb') as file:
+            header = file.read(self.INDEX_HEADER.size)
+            if len(header) < self.INDEX_HEADER.size:
+                return False
+            magic, size, mtime_ns, count = self.INDEX_HEADER.unpack(header)
+            if magic != self.INDEX_MAGIC or size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+                return False
+            columns = [array('Q'), array('I'), array('H'), array('I')]
+            for column in columns:
+                column.fromfile(file, count)
+        self.__set_index(*columns)
+        return True
+
+    def __set_index(self, offsets, lengths, msg_keys, itows):
+        self.offsets = offsets
+        self.lengths = lengths
+        self.msg_keys = msg_keys
+        self.itows = itows
+        if np is not None:
+            values = np.frombuffer(itows, dtype=itows.typecode)
+            self.__itow_sorted = bool(np.all(values[1:] >= values[:-1]))
+        else:
+            self.__itow_sorted = all(map(operator.le, itows, islice(itows, 1, None)))
+
+    def __ensure_index(self):
+        if self.offsets is None and not self.load_index():
+            self.build_index()
+
+    def __indexed_frames(self, positions):
+        opened_here = self.__mmap is None
+        self.open()
+        try:
+            view = self.__view
+            offsets = self.offsets
+            lengths = self.lengths
+            for i in positions:
+                yield view[offsets[i]:offsets[i] + lengths[i]]
+        finally:
+            if opened_here:
+                self.close()
+
+    def frames_in_window(self, itow_start, itow_end, msg_class=None, msg_id=None):
+        """
+        Yields the frames whose epoch lies in [itow_start, itow_end] (GPS time of week, ms).
+
+        Uses a binary search on the index when the capture does not cross a week
+        rollover, otherwise filters the index linearly. The index is loaded or built on
+        first use.
+        """
+        self.__ensure_index()
+        itows = self.itows
+        if self.__itow_sorted:
+            positions = range(bisect.bisect_left(itows, itow_start), bisect.bisect_right(itows, itow_end))
+        else:
+            positions = [i for i, itow in enumerate(itows) if itow_start <= itow <= itow_end]
+        if msg_class is not None:
+            key = msg_class << 8 | msg_id
+            msg_keys = self.msg_keys
+            positions = [i for i in positions if msg_keys[i] == key]
+        return self.__indexed_frames(positions)
+
+    def frames_of(self, msg_class, msg_id):
+        """
+        Yields every frame of one message type, e.g. (UbloxConst.CLASS_ESF, UbloxConst.ID_MEAS)
+        or (UbloxConst.CLASS_NMEA, UbloxConst.NMEA_IDS[b"GGA"]).
+        """
+        self.__ensure_index()
+        key = msg_class << 8 | msg_id
+        return self.__indexed_frames([i for i, msg_key in enumerate(self.msg_keys) if msg_key == key])
@@ -0,0 +1,241 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to split a ublox byte stream into UBX and NMEA frames
+"""
+from collections import deque
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_utility import UbloxUtils
+
+
+class Frame(bytes):
+    """
+    A received frame (plain bytes for every consumer) with its read times.
+
+    first_ns: time.monotonic_ns() of the read that returned the first byte of the frame
+    last_ns: time.monotonic_ns() of the read that returned its last byte (the frame was complete)
+    """
+    first_ns = None
+    last_ns = None
+
+
+class UbloxFramer:
+    """
+    Streaming frame splitter for the mixed UBX/NMEA output of a ublox receiver.
+
+    Bytes are appended in chunks of any size with feed(). The parser is a state machine
+    (sync -> UBX header -> UBX payload/checksum, or sync -> NMEA body -> CRLF), so a UBX
+    frame is delivered as soon as its last checksum byte arrives and an NMEA sentence as
+    soon as its CRLF arrives, without waiting for the next header. Partial frames are not
+    rescanned when more bytes come in. Frames with a bad checksum, an impossible length or
+    a missing terminator are dropped and the parser resynchronizes one byte after the
+    rejected header, so every byte is searched a bounded number of times.
+
+    The internal bytearray is reused and only compacted once the consumed prefix outgrows
+    the unread part, which keeps compaction amortized O(1).
+
+    When feed() is given the read time of the chunk, frames are delivered as Frame objects
+    carrying the read times of their first and last bytes.
+    """
+    UBX_OVERHEAD = 8 # sync(2) + class(1) + id(1) + length(2) + checksum(2)
+    # parser states
+    SYNC = 0
+    UBX_HEADER = 1
+    UBX_PAYLOAD = 2
+    NMEA_BODY = 3
+
+    def __init__(self, callback=None, verify_checksum=True, max_ubx_payload=8192, max_nmea_length=200):
+        self.__buffer = bytearray()
+        self.__start = 0
+        self.__position = 0
+        self.__state = self.SYNC
+        self.__need = 0 # UBX_PAYLOAD: frame length, NMEA_BODY: bytes already searched for CRLF
+        self.__callback = callback
+        self.__verify_checksum = verify_checksum
+        self.__max_ubx_payload = max_ubx_payload
+        self.__max_nmea_length = max_nmea_length
+        self.__chunks = deque() # (stream offset after the chunk, read time) of chunks not fully consumed
+        self.__consumed = 0 # stream offset of buffer[0]
+        self.bytes_received = 0
+        self.bytes_discarded = 0
+        self.frames_ubx = 0
+        self.frames_nmea = 0
+        self.checksum_errors = 0
+        self.resyncs = 0
+
+    def set_callback(self, callback):
+        self.__callback = callback
+
+    @property
+    def position(self):
+        """Offset of the first byte not consumed by the last iter_frames() run."""
+        return self.__position
+
+    def feed(self, data, time_ns=None):
+        """
+        Appends a chunk of received bytes and delivers every complete frame to the callback.
+
+        Args:
+            data (bytes): Raw bytes read from the receiver.
+            time_ns (int): time.monotonic_ns() of the read, frames are then delivered as Frame objects.
+
+        Returns:
+            int: The number of frames delivered.
+        """
+        buffer = self.__buffer
+        buffer += data
+        self.bytes_received += len(data)
+        chunks = self.__chunks
+        if time_ns is not None:
+            chunks.append((self.__consumed + len(buffer), time_ns))
+        if self.__state == self.UBX_PAYLOAD and len(buffer) < self.__start + self.__need:
+            return 0
+        count = 0
+        callback = self.__callback
+        with memoryview(buffer) as view:
+            for start, stop in self.iter_frames(buffer, self.__start, len(buffer)):
+                count += 1
+                if time_ns is None:
+                    if callback:
+                        callback(bytes(view[start:stop]))
+                    continue
+                # the last byte is always in this chunk, the first one in the oldest chunk ending after start
+                offset = self.__consumed + start
+                while chunks and chunks[0][0] <= offset:
+                    chunks.popleft()
+                frame = Frame(view[start:stop])
+                frame.first_ns = chunks[0][1] if chunks else time_ns
+                frame.last_ns = time_ns
+                if callback:
+                    callback(frame)
+        self.__start = self.__position
+        while chunks and chunks[0][0] <= self.__consumed + self.__start: # discarded bytes
+            chunks.popleft()
+        # Compact only when the consumed prefix is larger than what is left to parse
+        if self.__start > len(buffer) - self.__start:
+            del buffer[:self.__start]
+            self.__consumed += self.__start
+            self.__start = 0
+        return count
+
+    def iter_frames(self, buffer, pos=0, end=None):
+        """
+        Scans buffer[pos:end] and yields the (start, stop) offsets of every complete frame.
+
+        The buffer can be any object supporting find(), slicing and integer indexing
+        (bytes, bytearray, mmap). After the generator is exhausted, position holds the
+        offset where the next scan has to resume (the beginning of an incomplete frame),
+        and the parser state is kept so that the next call continues that frame.
+
+        Args:
+            buffer (bytes-like): The data to scan.
+            pos (int): Offset to start scanning from.
+            end (int): Offset to stop scanning at, defaults to len(buffer).
+
+        Yields:
+            tuple: (start, stop) offsets of a frame, header and checksum/CRLF included.
+        """
+        if end is None:
+            end = len(buffer)
+        header_ubx = UbloxConst.HEADER_UBX
+        header_nmea = UbloxConst.HEADER_NMEA
+        state = self.__state
+        stop = pos + self.__need
+        scan_from = pos + self.__need
+        next_ubx = -1
+        next_nmea = -1
+        while True:
+            if state == self.SYNC:
+                # Header positions are cached so that each byte is searched at most once per scan
+                if next_ubx < pos:
+                    next_ubx = buffer.find(header_ubx, pos, end)
+                    if next_ubx < 0:
+                        next_ubx = end
+                if next_nmea < pos:
+                    next_nmea = buffer.find(header_nmea, pos, end)
+                    if next_nmea < 0:
+                        next_nmea = end
+                start = next_ubx if next_ubx < next_nmea else next_nmea
+                if start >= end:
+                    # Keep the last byte, it may be the first half of a header
+                    keep = end - 1 if end - 1 > pos else pos
+                    self.bytes_discarded += keep - pos
+                    pos = keep
+                    break
+                self.bytes_discarded += start - pos
+                pos = start
+                if start == next_ubx:
+                    state = self.UBX_HEADER
+                else:
+                    state = self.NMEA_BODY
+                    scan_from = pos + 2
+
+            if state == self.UBX_HEADER:
+                if end - pos < 6:
+                    break
+                length = buffer[pos + 4] | buffer[pos + 5] << 8
+                if length > self.__max_ubx_payload:
+                    state = self.__resync()
+                    pos += 1
+                    continue
+                stop = pos + length + self.UBX_OVERHEAD
+                state = self.UBX_PAYLOAD
+
+            if state == self.UBX_PAYLOAD:
+                if stop > end:
+                    break
+                if self.__verify_checksum and not UbloxUtils.ubx_checksum_valid(buffer, pos, stop):
+                    self.checksum_errors += 1
+                    state = self.__resync()
+                    pos += 1
+                    continue
+                self.frames_ubx += 1
+                yield pos, stop
+                pos = stop
+                state = self.SYNC
+                continue
+
+            if state == self.NMEA_BODY:
+                # A sentence is plain ASCII, a UBX header inside it means the sentence was cut short
+                if next_ubx < pos:
+                    next_ubx = buffer.find(header_ubx, pos, end)
+                    if next_ubx < 0:
+                        next_ubx = end
+                limit = min(next_ubx, pos + self.__max_nmea_length)
+                crlf = buffer.find(b"\r\n", scan_from, limit)
+                if crlf >= 0:
+                    stop = crlf + 2
+                    self.frames_nmea += 1
+                    yield pos, stop
+                    pos = stop
+                    state = self.SYNC
+                elif limit < end:
+                    state = self.__resync()
+                    pos += 1
+                else:
+                    scan_from = end - 1 if end - 1 > pos + 2 else pos + 2
+                    break
+
+        self.__state = state
+        self.__position = pos
+        if state == self.UBX_PAYLOAD:
+            self.__need = stop - pos
+        elif state == self.NMEA_BODY:
+            self.__need = scan_from - pos
+        else:
+            self.__need = 0
+
+    def __resync(self):
+        # Drop the first byte of the rejected header and go back to searching
+        self.resyncs += 1
+        self.bytes_discarded += 1
+        return self.SYNC
+
+    def reset(self):
+        self.__buffer = bytearray()
+        self.__chunks.clear()
+        self.__consumed = 0
+        self.__start = 0
+        self.__position = 0
+        self.__state = self.SYNC
+        self.__need = 0
@@ -0,0 +1,115 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to give the pyublox modules loggers whose repeated messages are rate limited
+"""
+import logging
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Lets through at most burst messages in a row, then rate messages per second, of every
+    message template of every logger.
+
+    Messages are keyed by logger and template (the message before the % arguments), so a
+    flood of checksum errors with different bytes counts as one message and does not hide
+    the other ones.
+    """
+    def __init__(self, rate=1.0, burst=10):
+        self.rate = rate
+        self.burst = burst
+        self.__buckets = {} # (logger name, template) -> [tokens, last refill time, dropped messages]
+        self.__lock = threading.Lock()
+        self.suppressed = 0
+
+    def allow(self, key):
+        """
+        Returns:
+            int or None: The number of messages of key dropped since the last one let through, None to drop this one.
+        """
+        now = time.monotonic()
+        with self.__lock:
+            bucket = self.__buckets.get(key)
+            if bucket is None:
+                bucket = self.__buckets[key] = [self.burst, now, 0]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                self.suppressed += 1
+                return None
+            bucket[0] -= 1
+            dropped, bucket[2] = bucket[2], 0
+            return dropped
+
+    def reset(self):
+        with self.__lock:
+            self.__buckets.clear()
+
+
+class RateLimitedLogger:
+    """
+    A logging.Logger front whose messages go through a RateLimiter.
+
+    The limit is checked before the logging module creates the record, so a dropped
+    message costs a dictionary lookup instead of a stack walk and a LogRecord: a decoder
+    seeing a corrupted stream does not slow down because it reports it. The first message
+    let through after some were dropped says how many. Call it with % arguments
+    (logger.warning("Checksum error: %s", data)) so that dropped messages are never formatted.
+    """
+    def __init__(self, logger, limiter):
+        self.logger = logger
+        self.limiter = limiter
+
+    @property
+    def name(self):
+        return self.logger.name
+
+    def log(self, level, msg, *args, **kwargs):
+        if not self.logger.isEnabledFor(level):
+            return
+        dropped = self.limiter.allow((self.logger.name, msg))
+        if dropped is None:
+            return
+        if dropped:
+            msg = f"{msg} ({dropped} similar messages suppressed)"
+        kwargs.setdefault("stacklevel", 3) # file and line of the caller of debug(), warning()...
+        self.logger.log(level, msg, *args, **kwargs)
+
+    def debug(self, msg, *args, **kwargs):
+        self.log(logging.DEBUG, msg, *args, **kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        self.log(logging.INFO, msg, *args, **kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        self.log(logging.WARNING, msg, *args, **kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        self.log(logging.ERROR, msg, *args, **kwargs)
+
+
+# Shared by every logger of get_logger(), set its rate and burst to change the limits of the whole package
+RATE_LIMIT = RateLimiter()
+
+
+def get_logger(name):
+    """
+    Returns:
+        RateLimitedLogger: The logger of a module (name is its __name__), limited by RATE_LIMIT.
+    """
+    return RateLimitedLogger(logging.getLogger(name), RATE_LIMIT)
+
+
+# Example usage
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(name)s %(filename)s:%(lineno)d %(message)s")
+    logger = get_logger("pyublox.example")
+    for i in range(1000):
+        logger.warning("Checksum error: %s", i)
+    time.sleep(1.1)
+    logger.warning("Checksum error: %s", "last")
+    print("suppressed:", RATE_LIMIT.suppressed)
@@ -0,0 +1,262 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to run many ublox receivers from one process and merge their output
+"""
+import heapq
+import multiprocessing
+import queue
+import threading
+import time
+from collections import namedtuple
+from pyublox.ublox_serial_connection import UBloxSerialConnection
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_utility import UbloxUtils
+from pyublox.ubx_decoder import UBXDecoder
+from pyublox.nmea_reader import NMEAReader
+from pyublox.ubx_messages import UBXMessage
+
+# One decoded message of the merged stream
+DeviceMessage = namedtuple("DeviceMessage", ("time_ns", "device", "name", "record"))
+
+
+def decode_worker(inbox, outbox):
+    """
+    Decodes batches of frames until it receives None.
+
+    Every device has its own NMEAReader/UBXDecoder in the worker, and all the batches of a
+    device go to the same worker, so per-device state (e.g. UBXDecoder.meas) stays in order.
+
+    Args:
+        inbox: Queue of (device, time_ns, frames) batches.
+        outbox: Queue receiving (device, [(time_ns, name, record), ...], frames not decoded).
+    """
+    decoders = {}
+    registry = UBXMessage.REGISTRY
+    header_ubx = UbloxConst.HEADER_UBX
+    while True:
+        batch = inbox.get()
+        if batch is None:
+            break
+        device, time_ns, frames = batch
+        pipeline = decoders.get(device)
+        if pipeline is None:
+            pipeline = decoders[device] = (NMEAReader(), UBXDecoder())
+        nmea, ubx = pipeline
+        messages = []
+        failed = 0
+        for frame in frames:
+            if frame[0:2] == header_ubx:
+                record = ubx.decode(frame, verify=False) # checked by the framer of the connection
+                name = registry[(frame[2], frame[3])].name if record is not None else None
+            else:
+                record = nmea.decode(frame)
+                name = type(record).__name__ if record is not None else None
+            if record is None:
+                failed += 1
+            else:
+                messages.append((time_ns, name, record))
+        outbox.put((device, messages, failed))
+
+
+class DeviceStats:
+    """Counters of one receiver."""
+    def __init__(self, port):
+        self.port = port
+        self.started = time.monotonic()
+        self.bytes = 0
+        self.frames = 0
+        self.decoded = 0
+        self.undecoded = 0 # frames of message types without a definition, or invalid
+        self.dropped = 0 # frames dropped because the decode worker was behind
+
+    def rates(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {"frames_per_s": self.frames / elapsed, "bytes_per_s": self.bytes / elapsed}
+
+
+class UbloxManager:
+    """
+    Opens every connected ublox receiver and merges their decoded output.
+
+    Each device keeps its own serial read thread and framer, and the frames of every read
+    are sent as one batch to a decode worker (device index modulo workers), so decoding
+    runs in parallel across devices. With processes=True the workers are processes and
+    decoding scales with the cores, otherwise they are threads (lower latency, one core).
+
+    Decoded messages come back as DeviceMessage(time_ns, device, name, record) tagged with
+    the USB serial number of the device (its port name when it has none). They are merged
+    by receive time: a message is released once it is older than merge_window seconds, so
+    messages of different devices received within that window come out in time order.
+    They are delivered to the callback and/or read with messages().
+    """
+    def __init__(self, devices=None, baud_rate=38400, workers=4, processes=False, merge_window=0.05,
+                 max_pending=1024, callback=None, max_messages=65536):
+        """
+        Args:
+            devices (list): (port, serial number) pairs, defaults to every device found by UbloxUtils.find_ublox_devices().
+            baud_rate (int): Baud rate of every receiver.
+            workers (int): Number of decode workers.
+            processes (bool): Run the workers as processes instead of threads.
+            merge_window (float): Seconds messages are held to be merged in time order.
+            max_pending (int): Batches waiting per worker before frames are dropped.
+            callback (function): Called with every DeviceMessage, in time order.
+            max_messages (int): Size of the messages() queue, the newest messages are dropped when it is full.
+        """
+        self.__devices = devices
+        self.__baud_rate = baud_rate
+        self.__workers_count = max(1, workers)
+        self.__processes = processes
+        self.__merge_window_ns = int(merge_window * 1e9)
+        self.__max_pending = max_pending
+        self.__callback = callback
+        self.__messages = queue.Queue(max_messages)
+        self.__connections = {}
+        self.__inboxes = []
+        self.__assignment = {} # device -> inbox
+        self.__workers = []
+        self.__outbox = None
+        self.__merger = None
+        self.__running = False
+        self.stats = {} # device -> DeviceStats
+        self.messages_dropped = 0
+
+    def set_callback(self, callback):
+        self.__callback = callback
+
+    @property
+    def devices(self):
+        return list(self.stats)
+
+    def start(self):
+        """Starts the workers and opens every device. Returns the device tags."""
+        if self.__devices is None:
+            self.__devices = UbloxUtils.find_ublox_devices(UbloxConst.UBLOX_DEVICE)
+        if self.__processes:
+            context = multiprocessing.get_context("spawn")
+            self.__outbox = context.Queue()
+            make_queue = lambda: context.Queue(self.__max_pending)
+            make_worker = lambda inbox: context.Process(target=decode_worker, args=(inbox, self.__outbox), daemon=True)
+        else:
+            self.__outbox = queue.Queue()
+            make_queue = lambda: queue.Queue(self.__max_pending)
+            make_worker = lambda inbox: threading.Thread(target=decode_worker, args=(inbox, self.__outbox), daemon=True)
+        for _ in range(self.__workers_count):
+            inbox = make_queue()
+            worker = make_worker(inbox)
+            worker.start()
+            self.__inboxes.append(inbox)
+            self.__workers.append(worker)
+        self.__running = True
+        self.__merger = threading.Thread(target=self.__merge, daemon=True)
+        self.__merger.start()
+        for port, serial_number in self.__devices:
+            device = serial_number or port
+            self.add_device(device, port)
+        return self.devices
+
+    def add_device(self, device, port=None):
+        """
+        Registers a device tag and, when port is given, opens its serial connection.
+
+        Without a port, frames of the device are passed with feed() (replays, tests).
+        """
+        self.stats[device] = DeviceStats(port)
+        self.__assignment[device] = self.__inboxes[(len(self.__assignment)) % len(self.__inboxes)]
+        if port is not None:
+            connection = UBloxSerialConnection(port, self.__baud_rate)
+            connection.set_batch_callback(lambda frames, device=device: self.feed(device, frames))
+            connection.connect()
+            self.__connections[device] = connection
+
+    def feed(self, device, frames, time_ns=None):
+        """Queues a list of complete frames of one device for decoding."""
+        stats = self.stats[device]
+        stats.frames += len(frames)
+        stats.bytes += sum(map(len, frames))
+        try:
+            self.__assignment[device].put_nowait((device, time_ns or time.monotonic_ns(), frames))
+        except queue.Full:
+            stats.dropped += len(frames)
+
+    def messages(self, timeout=None):
+        """Yields the merged DeviceMessage stream, stops after timeout seconds without a message."""
+        while self.__running or not self.__messages.empty():
+            try:
+                yield self.__messages.get(timeout=timeout)
+            except queue.Empty:
+                if timeout is not None:
+                    return
+
+    def __merge(self):
+        heap = []
+        sequence = 0 # keeps the order of equal timestamps and avoids comparing records
+        window = self.__merge_window_ns
+        outbox = self.__outbox
+        wait = max(window / 1e9, 0.001)
+        while True:
+            try:
+                item = outbox.get(timeout=wait)
+                if item is None: # sent by stop() once every worker is done
+                    break
+                device, messages, failed = item
+                stats = self.stats[device]
+                stats.decoded += len(messages)
+                stats.undecoded += failed
+                for time_ns, name, record in messages:
+                    heapq.heappush(heap, (time_ns, sequence, DeviceMessage(time_ns, device, name, record)))
+                    sequence += 1
+            except queue.Empty:
+                pass
+            horizon = time.monotonic_ns() - window
+            while heap and heap[0][0] <= horizon:
+                self.__deliver(heapq.heappop(heap)[2])
+        while heap:
+            self.__deliver(heapq.heappop(heap)[2])
+
+    def __deliver(self, message):
+        if self.__callback:
+            self.__callback(message)
+        try:
+            self.__messages.put_nowait(message)
+        except queue.Full:
+            self.messages_dropped += 1
+
+    def report(self):
+        """
+        Returns:
+            dict: device -> counters and rates (frames, bytes, decoded, undecoded, dropped, frames_per_s, bytes_per_s).
+        """
+        return {device: dict(port=stats.port, frames=stats.frames, bytes=stats.bytes, decoded=stats.decoded,
+                             undecoded=stats.undecoded, dropped=stats.dropped, **stats.rates())
+                for device, stats in self.stats.items()}
+
+    def stop(self):
+        """Closes the devices, decodes what is queued and flushes the merged stream."""
+        for connection in self.__connections.values():
+            connection.disconnect()
+        self.__connections = {}
+        for inbox in self.__inboxes:
+            inbox.put(None)
+        for worker in self.__workers:
+            worker.join()
+        if self.__merger:
+            self.__outbox.put(None)
+            self.__merger.join()
+            self.__merger = None
+        self.__inboxes = []
+        self.__workers = []
+        self.__running = False
+
+
+# Example usage
+if __name__ == "__main__":
+    manager = UbloxManager(workers=4, processes=True)
+    print("Devices:", manager.start())
+    try:
+        for message in manager.messages():
+            if message.name == "GGA":
+                print(message.device, message.record.lat, message.record.lon)
+    except KeyboardInterrupt:
+        manager.stop()
+        print(manager.report())
@@ -0,0 +1,45 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to keep a bounded history of decoded records
+"""
+from collections import deque
+
+class RecordHistory:
+    """
+    Bounded ring of the last decoded records of every message type.
+
+    Decoders publish immutable records (namedtuples), so the ring only stores references.
+    deque.append and the tuple() copy in get() both run without releasing the GIL, which
+    lets reader threads take a consistent copy while the decoder thread keeps appending,
+    without any lock.
+    """
+    def __init__(self, size):
+        self.__size = size
+        self.__rings = {}
+
+    @property
+    def size(self):
+        return self.__size
+
+    def append(self, name, record):
+        ring = self.__rings.get(name)
+        if ring is None:
+            ring = self.__rings.setdefault(name, deque(maxlen=self.__size))
+        ring.append(record)
+
+    def get(self, name):
+        """
+        Returns:
+            tuple: The records of one message type, oldest first.
+        """
+        ring = self.__rings.get(name)
+        return tuple(ring) if ring is not None else ()
+
+    def latest(self, name, count):
+        """Returns up to count of the newest records of one message type, oldest first."""
+        records = self.get(name)
+        return records[-count:] if count > 0 else ()
+
+    def names(self):
+        return tuple(self.__rings)
@@ -5,53 +5,138 @@ Description: This script is designed to create serial connection to ubloxs
 """
 import serial
 import threading
+import time
+from pyublox.ublox_framer import UbloxFramer
+from pyublox.frame_dispatcher import FrameDispatcher
+from pyublox.frame_timing import FrameTiming
+from pyublox.metrics import Sample
 from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_utility import UbloxUtils
+from pyublox.ublox_logging import get_logger
+from pyublox.ubx_messages import UBXMessage
+
+logger = get_logger(__name__)
+_UBX_SYNC = UbloxConst.HEADER_UBX[0]
+
+
+def _frame_type(key):
+    # key of frame_counts: class and ID bytes of a UBX frame, sentence formatter of an NMEA one
+    if len(key) == 2:
+        definition = UBXMessage.REGISTRY.get((key[0], key[1]))
+        return definition.name if definition is not None else f"UBX-{key[0]:02X}-{key[1]:02X}"
+    return key.decode("ascii", errors="replace")
+
 
 class UBloxSerialConnection:
-    def __init__(self, port, baud_rate=38400):
+    def __init__(self, port, baud_rate=38400, read_timeout=0.1):
         self.__port = port
         self.__baud_rate = baud_rate
+        self.__read_timeout = read_timeout # blocking read timeout in seconds, lets __read notice disconnect()
         self.__serial_conn = None
         self.__thread = None
         self.__running = False
-        self.__recv_data_callback = None
+        self.__recv_data_subscription = None
+        self.__batch_callback = None
+        self.__batch = []
         self.__recv_data = None
-        self.__buffer = bytearray()
-        
+        self.__framer = UbloxFramer(callback=self.__on_frame)
+        # Frames carry the read times of their first and last bytes (see Frame), the stages are measured in timing
+        self.timing = FrameTiming(baud_rate)
+        # Consumers get the frames through bounded queues on their own threads, never on the reader thread
+        self.dispatcher = FrameDispatcher(timing=self.timing)
+        self.frame_counts = {} # UBX class and ID bytes or NMEA formatter -> frames, see metrics()
+        self.bytes_written = 0
+
+    @property
+    def framer(self):
+        return self.__framer
+
+    @property
+    def baud_rate(self):
+        return self.__baud_rate
+
+    def set_baud_rate(self, baud_rate):
+        """Changes the baud rate of the open port, after the bytes already written are sent."""
+        self.__baud_rate = baud_rate
+        self.timing.baud_rate = baud_rate
+        if self.__serial_conn and self.__serial_conn.is_open:
+            try:
+                self.__serial_conn.flush()
+                self.__serial_conn.baudrate = baud_rate
+            except serial.SerialException as e:
+                logger.error("set_baud_rate: %s", e)
+
+    @staticmethod
+    def detect_baud_rate(port, candidates=None, listen_time=0.3):
+        """
+        Finds the baud rate the receiver currently uses on a port.
+
+        Every candidate is tried in turn: a CFG-VALGET poll makes the receiver answer even
+        with its periodic output off, and the rate is accepted once complete UBX or NMEA
+        frames with a valid checksum come in. USB ports accept any rate, the first
+        candidate that gets an answer is returned.
+
+        Args:
+            port (str): Serial port of the receiver.
+            candidates (iterable): Baud rates to try, defaults to UbloxConst.BAUD_RATES, most common first.
+            listen_time (float): Seconds to listen at each rate.
+
+        Returns:
+            int or None: The baud rate, None if no rate gives valid frames.
+        """
+        if candidates is None:
+            candidates = sorted(UbloxConst.BAUD_RATES, key=lambda rate: (rate != 38400, rate != 9600, -rate))
+        poll = UbloxUtils.build_ubx(UbloxConst.CLASS_CFG, UbloxConst.ID_VALGET, bytes((0, 0, 0, 0)) + b"\x01\x00\x52\x40") # CFG-UART1-BAUDRATE
+        for baud_rate in candidates:
+            framer = UbloxFramer()
+            try:
+                with serial.Serial(port, baud_rate, timeout=0.05) as serial_conn:
+                    serial_conn.reset_input_buffer()
+                    serial_conn.write(poll)
+                    deadline = time.monotonic() + listen_time
+                    while time.monotonic() < deadline:
+                        framer.feed(serial_conn.read(serial_conn.in_waiting or 1))
+                        if framer.frames_ubx + framer.frames_nmea >= 2:
+                            return baud_rate
+            except serial.SerialException as e:
+                logger.error("detect_baud_rate: %s", e)
+                return None
+        return None
 
     def connect(self):
         try:
-            self.__serial_conn = serial.Serial(self.__port, self.__baud_rate)
+            self.__serial_conn = serial.Serial(self.__port, self.__baud_rate, timeout=self.__read_timeout)
             self.__running = True
             self.__thread = threading.Thread(target=self.__read)
             self.__thread.start()
-            print("Connected to UBLOX on port", self.__port)
+            logger.info("Connected to UBLOX on port %s", self.__port)
         except serial.SerialException as e:
-            print("Error ublox serial connection: ", f"connect: {e}")
+            logger.error("connect: %s", e)
             self.__running = False
 
     def __read(self):
         while self.__running:
-            if self.__serial_conn and self.__serial_conn.in_waiting > 0:
-                try:
-                    byte = self.__serial_conn.read(1)
-                    if byte is None:
-                        continue
-                    self.__buffer += byte
-                    if len(self.__buffer) > 1 and (self.__buffer[-2:] == UbloxConst.HEADER_UBX or self.__buffer[-2:] == UbloxConst.HEADER_NMEA):
-                        if self.__buffer.startswith(UbloxConst.HEADER_UBX):
-                            total_length = int.from_bytes(self.__buffer[4:6], byteorder='little', signed=False) + 2
-                            if len(self.__buffer) < total_length:
-                                continue
-                        # Process the current packet, excluding the last 2 bytes
-                        self.__recv_data = self.__buffer[:-2]
-                        if self.__recv_data_callback:
-                            self.__recv_data_callback(self.__recv_data)
-                        # Start new buffer with the beginning of the next packet
-                        self.__buffer = self.__buffer[-2:]
-                except serial.SerialException as e:
-                    print("Error ublox serial connection: ", f"__read: {e}")
-                    self.disconnect()
+            try:
+                # Take everything the driver already holds, otherwise block for one byte up to read_timeout
+                data = self.__serial_conn.read(self.__serial_conn.in_waiting or 1)
+                if data:
+                    self.__framer.feed(data, time.monotonic_ns())
+                    if self.__batch:
+                        batch, self.__batch = self.__batch, []
+                        self.__batch_callback(batch)
+            except serial.SerialException as e:
+                logger.error("__read: %s", e)
+                self.__running = False
+                self.__serial_conn.close()
+
+    def __on_frame(self, frame):
+        self.__recv_data = frame
+        key = frame[2:4] if frame[0] == _UBX_SYNC else frame[3:6]
+        self.frame_counts[key] = self.frame_counts.get(key, 0) + 1
+        self.timing.observe(frame)
+        self.dispatcher.publish(frame)
+        if self.__batch_callback:
+            self.__batch.append(frame)
 
     def disconnect(self):
         self.__running = False
@@ -59,16 +144,75 @@ class UBloxSerialConnection:
             self.__thread.join()
         if self.__serial_conn:
             self.__serial_conn.close()
+        self.dispatcher.close() # delivers what is still queued
 
     def write(self, data):
         if self.__serial_conn and self.__serial_conn.is_open:
             try:
                 self.__serial_conn.write(data)#.encode('utf-8')
+                self.bytes_written += len(data)
             except serial.SerialException as e:
-                print("Error ublox serial connection: ", f"write: {e}")
+                logger.error("write: %s", e)
+
+    def set_callback(self, callback, types=None, policy="block", max_queue=4096):
+        """
+        Sets the frame callback, replacing the previous one (None removes it).
+
+        The callback runs on its own thread behind a bounded queue, see FrameDispatcher.subscribe
+        for the arguments; use subscribe() to add more consumers.
+        """
+        if self.__recv_data_subscription:
+            self.dispatcher.unsubscribe(self.__recv_data_subscription)
+            self.__recv_data_subscription = None
+        if callback:
+            self.__recv_data_subscription = self.dispatcher.subscribe(callback, types, policy, max_queue)
+
+    def subscribe(self, callback, types=None, policy="block", max_queue=1024):
+        """Adds a frame consumer, see FrameDispatcher.subscribe."""
+        return self.dispatcher.subscribe(callback, types, policy, max_queue)
+
+    def set_batch_callback(self, callback):
+        """Calls callback once per read with the list of frames completed by that read."""
+        self.__batch_callback = callback
+
+    def metrics(self):
+        """
+        Collector for MetricsRegistry.add_collector: bytes in and out, frames per message type,
+        the framer errors, the queues of the subscriptions and the FrameTiming stages.
 
-    def set_callback(self, callback):
-        self.__recv_data_callback = callback
+        Returns:
+            list: Sample tuples labelled with the port.
+        """
+        port = dict(port=str(self.__port))
+        framer = self.__framer
+        samples = [
+            Sample("serial_bytes_received_total", "counter", "Bytes read from the receiver", port, framer.bytes_received),
+            Sample("serial_bytes_written_total", "counter", "Bytes written to the receiver", port, self.bytes_written),
+            Sample("serial_bytes_discarded_total", "counter", "Bytes read outside of any valid frame", port, framer.bytes_discarded),
+            Sample("serial_checksum_errors_total", "counter", "UBX frames dropped for a bad checksum", port, framer.checksum_errors),
+            Sample("serial_resyncs_total", "counter", "Headers dropped by the framer to search for the next one", port, framer.resyncs),
+            Sample("serial_baud_rate", "gauge", "Baud rate of the port", port, self.__baud_rate),
+        ]
+        for key, count in list(self.frame_counts.items()):
+            samples.append(Sample("serial_frames_total", "counter", "Frames received per message type", dict(port, type=_frame_type(key)), count))
+        for index, subscription in enumerate(self.dispatcher.subscriptions):
+            callback = subscription.callback
+            labels = dict(port, subscription=str(index), policy=subscription.policy,
+                          callback=getattr(callback, "__qualname__", type(callback).__name__))
+            samples += [
+                Sample("queue_depth", "gauge", "Frames waiting in the queue of a subscription", labels, subscription.depth),
+                Sample("queue_high_water", "gauge", "Deepest the queue of a subscription has been", labels, subscription.high_water),
+                Sample("queue_delivered_total", "counter", "Frames delivered to the callback of a subscription", labels, subscription.delivered),
+                Sample("queue_dropped_total", "counter", "Frames dropped by the queue policy of a subscription", labels, subscription.dropped),
+                Sample("queue_callback_errors_total", "counter", "Exceptions raised by the callback of a subscription", labels, subscription.errors),
+            ]
+        for stage, histogram in list(self.timing.histograms.items()):
+            samples.append(Sample("frame_latency_seconds", "summary", "Latency of the received frames per stage, see FrameTiming",
+                                  dict(port, stage=stage), histogram))
+        offset_ns = self.timing.clock.offset_ns
+        samples.append(Sample("gnss_clock_offset_seconds", "gauge", "Host monotonic clock minus GPS time of week", port,
+                              offset_ns / 1e9 if offset_ns is not None else None))
+        return samples
 
 # Example usage
 if __name__ == "__main__":
@@ -8,6 +8,26 @@ from datetime import time
 import serial.tools.list_ports
 import configparser
 import math
+import operator
+from functools import reduce
+from itertools import accumulate
+from pyublox.ublox_constants import UbloxConst
+try:
+    import numpy as np
+except ImportError: # NumPy only speeds up long payloads and the batch checks
+    np = None
+
+def _crc24q_table():
+    # CRC-24Q (polynomial 0x1864CFB), one entry per value of the top byte of the register
+    table = []
+    for byte in range(256):
+        crc = byte << 16
+        for _ in range(8):
+            crc <<= 1
+            if crc & 0x1000000:
+                crc ^= 0x1864CFB
+        table.append(crc & 0xFFFFFF)
+    return tuple(table)
 
 class UbloxUtils:
     @staticmethod
@@ -133,16 +153,28 @@ class UbloxUtils:
         Returns:
             str or None: The name of the serial port if a matching device is found, otherwise None.
         """
+        devices = UbloxUtils.find_ublox_devices(ublox_devices)
+        return devices[0][0] if devices else None
+
+    @staticmethod
+    def find_ublox_devices(ublox_devices):
+        """
+        Searches connected USB devices for every port matching one of the vendor/product IDs.
+
+        Args:
+            ublox_devices (list): (vendor_id, product_id) pairs, e.g. UbloxConst.UBLOX_DEVICE.
+
+        Returns:
+            list: (port name, USB serial number) pairs, in the order of ublox_devices then of the port names.
+                  The serial number is None if the device does not report one.
+        """
+        ports = serial.tools.list_ports.comports()
+        devices = []
         for vendor_id, product_id in ublox_devices:
-            ports = serial.tools.list_ports.comports()
-            for port in ports:
-                # if port.vid:
-                #     print(hex(port.vid))
-                #     print(hex(port.pid))
-                if port.vid == vendor_id and port.pid == product_id:
-                    return port.device
-        return None
-    
+            matches = [port for port in ports if port.vid == vendor_id and port.pid == product_id]
+            devices += [(port.device, port.serial_number) for port in sorted(matches, key=lambda port: port.device)]
+        return devices
+
     @staticmethod
     def nmea_checksum(decoded_data):
         """
@@ -154,23 +186,68 @@ class UbloxUtils:
         Returns:
             str: The two-character hexadecimal checksum.
         """
-        # Remove the '$' start character and the '*' before the checksum, if they exist
-        start_index = decoded_data.find('$') + 1
-        end_index = decoded_data.find('*') if '*' in decoded_data else len(decoded_data)
-        
-        # Calculate checksum by XORing all characters between '$' and '*'
-        checksum = 0
-        for char in decoded_data[start_index:end_index]:
-            checksum ^= ord(char)
+        return format(UbloxUtils.nmea_checksum_bytes(decoded_data.encode('ascii', 'replace')), '02X')
+
+    @staticmethod
+    def nmea_checksum_bytes(data):
+        """
+        Calculate the NMEA checksum of a sentence held in a bytes-like object, without decoding it.
+
+        The characters between '$' and '*' are zero-padded to a multiple of 8 and XORed
+        together as 64-bit words, then the word is folded down to one byte, which takes
+        one step per 8 characters instead of one Python step per character.
 
-        # Convert the checksum to a two-character hexadecimal string
-        return format(checksum, '02X')
+        Args:
+            data (bytes or memoryview): The NMEA sentence, '$', '*' and the checksum are optional.
+
+        Returns:
+            int: The checksum value (0-255).
+        """
+        if not isinstance(data, bytes):
+            data = bytes(data)
+        start_index = data.find(b'$') + 1
+        end_index = data.find(b'*', start_index)
+        if end_index < 0:
+            end_index = len(data)
+        body = data[start_index:end_index]
+        if len(body) % 8:
+            body += bytes(8 - len(body) % 8)
+        value = reduce(operator.xor, memoryview(body).cast('Q'), 0)
+        value ^= value >> 32
+        value ^= value >> 16
+        value ^= value >> 8
+        return value & 0xFF
+
+    @staticmethod
+    def nmea_checksum_valid(data):
+        """
+        Checks the '*hh' checksum of a complete NMEA sentence (bytes-like, CRLF optional).
+
+        Returns:
+            bool: True if the sentence carries a checksum and it matches.
+        """
+        if not isinstance(data, bytes):
+            data = bytes(data)
+        star = data.rfind(b'*')
+        if star < 0 or len(data) < star + 3:
+            return False
+        try:
+            return int(data[star + 1:star + 3], 16) == UbloxUtils.nmea_checksum_bytes(data[:star])
+        except ValueError:
+            return False
+
+    NUMPY_CHECKSUM_MIN = 256 # payload size from which the NumPy kernel beats the pure Python one
 
     @staticmethod
     def ubx_checksum(recv_data):
         """
         Calculates the UBX checksum for a given message.
 
+        CK_A is the sum of the bytes and CK_B the sum of the running CK_A values, both
+        modulo 256, so they are computed with sum() and itertools.accumulate() on a
+        memoryview of the message instead of a Python loop and a copy of the payload.
+        Long payloads use NumPy when it is installed.
+
         Args:
             recv_data (bytes): The UBX message data including header and checksum. 
                                The checksum needs to be calculated on the payload, 
@@ -179,15 +256,232 @@ class UbloxUtils:
         Returns:
             bytes: A two-byte checksum calculated from the payload of the UBX message.
         """
-        payload = recv_data[2:-2]
-        CK_A = 0
-        CK_B = 0
-        for buffer in payload:
-            CK_A = (CK_A + buffer) & 0xFF  # Ensure it stays within 8 bits
-            CK_B = (CK_B + CK_A) & 0xFF  # Ensure it stays within 8 bits
+        payload = memoryview(recv_data)[2:-2]
+        if np is not None and len(payload) >= UbloxUtils.NUMPY_CHECKSUM_MIN:
+            running = np.cumsum(np.frombuffer(payload, dtype=np.uint8), dtype=np.uint64)
+            return bytes((int(running[-1]) & 0xFF, int(running.sum()) & 0xFF))
+        return bytes((sum(payload) & 0xFF, sum(accumulate(payload)) & 0xFF))
+
+    @staticmethod
+    def ubx_checksum_valid(buffer, start=0, stop=None):
+        """
+        Checks the checksum of the UBX frame buffer[start:stop] without copying it.
+
+        Args:
+            buffer (bytes-like): Any buffer holding the frame (bytes, bytearray, mmap).
+            start (int): Offset of the frame header.
+            stop (int): Offset just past the frame checksum, defaults to the end of buffer.
+
+        Returns:
+            bool: True if the checksum matches.
+        """
+        view = memoryview(buffer)
+        if stop is None:
+            stop = len(view)
+        return UbloxUtils.ubx_checksum(view[start:stop]) == view[stop - 2:stop]
+
+    @staticmethod
+    def ubx_checksum_batch(buffer, starts, lengths=None):
+        """
+        Verifies the checksums of many UBX frames of a buffer at once.
+
+        With NumPy, frames that do not overlap (the frames of a stream) are summed in place
+        with np.add.reduceat over uint8 values, which wrap modulo 256 like the checksum
+        itself: CK_A is the sum of the bytes of a frame, and CK_B, the sum of every byte
+        weighted by its distance to the end of the frame, is derived from CK_A and the sum of
+        the bytes weighted by their positions. Overlapping frames (header candidates of a
+        corrupted stream) are gathered into one array first. Without NumPy every frame is
+        checked with ubx_checksum_valid().
+
+        Args:
+            buffer (bytes-like): The buffer holding the frames.
+            starts (sequence of int): Offsets of the frame headers.
+            lengths (sequence of int): Payload lengths, read from the headers when omitted.
+
+        Returns:
+            numpy.ndarray or list: One bool per frame, False for frames running past the buffer.
+        """
+        if np is None:
+            size = len(buffer)
+            if lengths is None:
+                lengths = [buffer[start + 4] | buffer[start + 5] << 8 if start + 6 <= size else size for start in starts]
+            return [start + length + 8 <= size and UbloxUtils.ubx_checksum_valid(buffer, start, start + length + 8)
+                    for start, length in zip(starts, lengths)]
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        starts = np.asarray(starts, dtype=np.int64)
+        result = np.zeros(len(starts), dtype=bool)
+        inside = starts + 6 <= len(data)
+        if lengths is None:
+            lengths = np.zeros(len(starts), dtype=np.int64)
+            lengths[inside] = data[starts[inside] + 4].astype(np.int64) | data[starts[inside] + 5].astype(np.int64) << 8
+        lengths = np.asarray(lengths, dtype=np.int64)
+        inside &= starts + lengths + 8 <= len(data)
+        index = np.flatnonzero(inside)
+        if len(index) == 0:
+            return result
+        first = starts[index] + 2 # class byte
+        last = first + lengths[index] + 4 # CK_A byte
+        order = np.argsort(first, kind="stable")
+        first = first[order]
+        last = last[order]
+        if np.any(first[1:] < last[:-1]):
+            valid = UbloxUtils.__ubx_checksum_gathered(data, first, last)
+        else:
+            valid = UbloxUtils.__ubx_checksum_sequential(data, first, last)
+        result[index[order]] = valid
+        return result
+
+    CHECKSUM_CHUNK = 1 << 23 # bytes summed at once by ubx_checksum_batch()
+    __positions = None # uint8 table of 0, 1, ... 255, 0, 1... for the CK_B sums
+
+    @staticmethod
+    def __ubx_checksum_sequential(data, first, last):
+        # first, last: sorted offsets of the class and CK_A bytes of frames that do not overlap
+        valid = np.empty(len(first), dtype=bool)
+        group = 0
+        while group < len(first):
+            # bounded groups of frames keep the uint8 temporaries small on long buffers
+            origin = first[group]
+            stop = max(group + 1, int(np.searchsorted(last, origin + UbloxUtils.CHECKSUM_CHUNK, "right")))
+            window = data[origin:last[stop - 1]]
+            positions = UbloxUtils.__positions
+            if positions is None or len(positions) < len(window):
+                positions = np.arange(max(len(window), UbloxUtils.CHECKSUM_CHUNK)).astype(np.uint8)
+                UbloxUtils.__positions = positions
+            bounds = np.empty(2 * (stop - group) - 1, dtype=np.int64) # frame, gap, frame...
+            bounds[0::2] = first[group:stop] - origin
+            bounds[1::2] = last[group:stop - 1] - origin
+            ck_a = np.add.reduceat(window, bounds, dtype=np.uint8)[0::2]
+            weighted = np.add.reduceat(window * positions[:len(window)], bounds, dtype=np.uint8)[0::2]
+            ends = last[group:stop]
+            ck_b = ((ends - origin) * ck_a - weighted) & 0xFF
+            valid[group:stop] = (ck_a == data[ends]) & (ck_b == data[ends + 1])
+            group = stop
+        return valid
+
+    @staticmethod
+    def __ubx_checksum_gathered(data, first, last):
+        covered = last - first # class, id, length and payload
+        offsets = np.cumsum(covered) - covered
+        position = np.arange(int(covered.sum()), dtype=np.int64) - np.repeat(offsets, covered)
+        values = data[np.repeat(first, covered) + position].astype(np.uint64)
+        # CK_B weights every byte by the number of bytes from it to the end of its frame
+        weights = (np.repeat(covered, covered) - position).astype(np.uint64)
+        ck_a = np.add.reduceat(values, offsets) & 0xFF
+        ck_b = np.add.reduceat(values * weights, offsets) & 0xFF
+        return (ck_a == data[last]) & (ck_b == data[last + 1])
+
+    @staticmethod
+    def nmea_checksum_batch(buffer, starts, stops):
+        """
+        Verifies the checksums of many NMEA sentences of a buffer at once.
+
+        Each sentence buffer[start:stop] must end with '*hh' and CRLF. With NumPy the characters
+        are XOR-reduced per sentence with np.bitwise_xor.reduceat and the hex digits are
+        converted through a 256-entry lookup table.
+
+        Returns:
+            numpy.ndarray or list: One bool per sentence.
+        """
+        if np is None:
+            return [UbloxUtils.nmea_checksum_valid(buffer[start:stop]) for start, stop in zip(starts, stops)]
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        starts = np.asarray(starts, dtype=np.int64)
+        stars = np.asarray(stops, dtype=np.int64) - 5
+        result = np.zeros(len(starts), dtype=bool)
+        shaped = (stars > starts + 1) & (starts >= 0) & (stars + 5 <= len(data))
+        shaped[shaped] = data[stars[shaped]] == ord('*')
+        starts = starts[shaped] + 1
+        stars = stars[shaped]
+        if len(starts) == 0:
+            return result
+        covered = stars - starts
+        offsets = np.cumsum(covered) - covered
+        position = np.arange(int(covered.sum()), dtype=np.int64) - np.repeat(offsets, covered)
+        checksum = np.bitwise_xor.reduceat(data[np.repeat(starts, covered) + position], offsets)
+        hex_table = np.full(256, -1, dtype=np.int16)
+        hex_table[np.frombuffer(b"0123456789ABCDEFabcdef", dtype=np.uint8)] = list(range(16)) + list(range(10, 16))
+        high = hex_table[data[stars + 1]]
+        low = hex_table[data[stars + 2]]
+        result[shaped] = (high >= 0) & (low >= 0) & (checksum == (high << 4) + low)
+        return result
+
+    CRC24Q_TABLE = _crc24q_table()
+
+    @staticmethod
+    def crc24q(data, start=0, stop=None, crc=0):
+        """
+        Calculates the CRC-24Q used by RTCM3 frames with a 256 entry table.
+
+        Args:
+            data (bytes-like): Buffer holding the bytes to check.
+            start (int): First byte included.
+            stop (int): Offset just past the last byte included, defaults to the end of data.
+            crc (int): Initial value, lets the CRC be computed over several pieces.
+
+        Returns:
+            int: The 24-bit CRC.
+        """
+        table = UbloxUtils.CRC24Q_TABLE
+        view = memoryview(data)
+        if stop is None:
+            stop = len(view)
+        for byte in view[start:stop]:
+            crc = ((crc << 8) & 0xFFFFFF) ^ table[(crc >> 16) ^ byte]
+        return crc
+
+    GGA_QUALITY_CODES = {"No fix": 0, "2D/3D fix": 1, "RTK fixed": 4, "RTK float": 5, "DR fixed": 6}
+
+    @staticmethod
+    def build_gga(gga, talker=b"GP"):
+        """
+        Builds a GGA sentence from a decoded GGA record, e.g. for the NTRIP position upload.
+
+        Args:
+            gga (NMEAReader.GGA): The record, lat and lon in decimal degrees.
+            talker (bytes): Talker ID of the sentence.
+
+        Returns:
+            bytes: The sentence with checksum and CRLF, None if the record has no position.
+        """
+        if gga is None or gga.lat is None or gga.lon is None:
+            return None
+        # Rounded to the 1e-5 minute of the sentence before the split, 59.999999' must carry into the degrees
+        lat_degrees, lat_minutes = divmod(round(abs(gga.lat) * 6_000_000), 6_000_000)
+        lon_degrees, lon_minutes = divmod(round(abs(gga.lon) * 6_000_000), 6_000_000)
+        utc = gga.time.strftime("%H%M%S.") + f"{gga.time.microsecond // 10000:02d}" if gga.time is not None else ""
+        def number(value, digits):
+            return f"{value:.{digits}f}" if value is not None else ""
+        fields = [utc,
+                  f"{lat_degrees:02d}{lat_minutes / 100_000:08.5f}", "N" if gga.lat >= 0 else "S",
+                  f"{lon_degrees:03d}{lon_minutes / 100_000:08.5f}", "E" if gga.lon >= 0 else "W",
+                  str(UbloxUtils.GGA_QUALITY_CODES.get(gga.quality, 0)),
+                  f"{gga.numSV:02d}" if gga.numSV is not None else "",
+                  number(gga.HDOP, 2), number(gga.alt, 3), "M", number(gga.sep, 3), "M", "", ""]
+        body = b"$" + talker + b"GGA," + ",".join(fields).encode()
+        return body + b"*" + format(UbloxUtils.nmea_checksum_bytes(body), "02X").encode() + b"\r\n"
+
+    @staticmethod
+    def build_ubx(msg_class, msg_id, payload=b""):
+        """
+        Builds a complete UBX frame, e.g. a command for the receiver.
+
+        Args:
+            msg_class (int): Message class.
+            msg_id (int): Message ID.
+            payload (bytes): Message payload.
+
+        Returns:
+            bytes: The frame with header, length and checksum.
+        """
+        length = len(payload)
+        frame = bytearray(UbloxConst.HEADER_UBX)
+        frame += bytes((msg_class, msg_id, length & 0xFF, length >> 8))
+        frame += payload
+        frame += b"\x00\x00"
+        frame[-2:] = UbloxUtils.ubx_checksum(frame)
+        return bytes(frame)
 
-        return bytes([CK_A, CK_B])
-    
     @staticmethod
     def read_credentials(file_path, tag="DEFAULT"):
         config = configparser.ConfigParser()
@@ -0,0 +1,177 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to decode many UBX messages at once into NumPy arrays
+"""
+import mmap
+import re
+try:
+    import numpy as np
+except ImportError: # NumPy is only needed for batch decoding
+    np = None
+from pyublox.ublox_constants import UbloxConst
+from pyublox.ublox_utility import UbloxUtils
+from pyublox.ubx_messages import UBXMessage
+
+class UBXBatchDecoder:
+    """
+    Vectorized decoding of every frame of one UBX message type in a buffer or capture file.
+
+    Frames are located with array comparisons on the whole buffer, verified with
+    UbloxUtils.ubx_checksum_batch() and decoded by reinterpreting the gathered payload bytes
+    as a NumPy structured array built from the UBXMessage definition. Messages with
+    repeated blocks produce one row per block, carrying the header fields of its frame
+    and the index of the frame it came from.
+    """
+    SCAN_CHUNK = 1 << 24 # bytes compared at once while looking for headers
+    MAX_PAYLOAD = 8192 # longer length fields are not frames, same limit as the UbloxFramer default
+    NUMPY_TYPES = {"B": "u1", "b": "i1", "H": "<u2", "h": "<i2", "I": "<u4", "i": "<i4",
+                   "Q": "<u8", "q": "<i8", "f": "<f4", "d": "<f8"}
+
+    @staticmethod
+    def find_frames(buffer, msg_class, msg_id, verify_checksum=True):
+        """
+        Locates every frame of one message type.
+
+        Candidates are walked in order and the scan resumes after each accepted frame, so
+        header bytes inside the payload of a frame are not taken for frames.
+
+        Args:
+            buffer (bytes-like): Raw receiver output (bytes, bytearray, mmap, memoryview).
+            msg_class (int): UBX class, e.g. UbloxConst.CLASS_ESF.
+            msg_id (int): UBX ID, e.g. UbloxConst.ID_MEAS.
+            verify_checksum (bool): Drop the frames whose checksum does not match.
+
+        Returns:
+            tuple: (starts, lengths) int64 arrays with the frame offsets and payload lengths.
+        """
+        UBXBatchDecoder.__require_numpy()
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        size = len(data)
+        found = []
+        for chunk_start in range(0, size, UBXBatchDecoder.SCAN_CHUNK):
+            # Only the header bytes are compared, the overlap lets headers straddle two chunks
+            chunk = data[chunk_start:min(size, chunk_start + UBXBatchDecoder.SCAN_CHUNK + 5)]
+            candidates = np.flatnonzero(chunk[:-5] == UbloxConst.HEADER_UBX[0])
+            for offset, value in ((1, UbloxConst.HEADER_UBX[1]), (2, msg_class), (3, msg_id)):
+                candidates = candidates[chunk[candidates + offset] == value]
+            found.append(candidates + chunk_start)
+        starts = np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+        starts = starts.astype(np.int64)
+        lengths = data[starts + 4].astype(np.int64) | data[starts + 5].astype(np.int64) << 8
+        complete = (starts + lengths + 8 <= size) & (lengths <= UBXBatchDecoder.MAX_PAYLOAD)
+        starts = starts[complete]
+        lengths = lengths[complete]
+        if verify_checksum and len(starts):
+            valid = UbloxUtils.ubx_checksum_batch(data, starts, lengths)
+            starts = starts[valid]
+            lengths = lengths[valid]
+        ends = starts + lengths + 8
+        if len(starts) > 1 and (starts[1:] < ends[:-1]).any():
+            # Rare: a candidate starts inside the previous frame, only then walk them one by one
+            keep = np.zeros(len(starts), dtype=bool)
+            next_start = 0
+            for i, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+                if start >= next_start:
+                    keep[i] = True
+                    next_start = end
+            starts = starts[keep]
+            lengths = lengths[keep]
+        return starts, lengths
+
+    @staticmethod
+    def dtype(fields):
+        """Builds a packed little endian NumPy dtype from UBXMessage field tuples."""
+        UBXBatchDecoder.__require_numpy()
+        names, formats, offsets = [], [], []
+        offset = 0
+        for field in fields:
+            count, code = re.fullmatch(r"(\d*)(\w)", field[1]).groups()
+            count = int(count or 1)
+            if code == "x":
+                offset += count
+                continue
+            names.append(field[0])
+            formats.append(UBXBatchDecoder.NUMPY_TYPES[code])
+            offsets.append(offset)
+            offset += np.dtype(formats[-1]).itemsize * count
+        return np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": offset})
+
+    @staticmethod
+    def decode(buffer, msg_class, msg_id, verify_checksum=True):
+        """
+        Decodes every frame of one registered message type into a structured array.
+
+        Values are raw (unscaled), as in UBXMessage.decode(). For ESF-MEAS and ESF-RAW the
+        24-bit signed data field and the 6-bit data type of every data word are added as
+        the dataField and dataType columns.
+
+        Returns:
+            numpy.ndarray: One row per frame, or per repeated block with a frame column.
+        """
+        UBXBatchDecoder.__require_numpy()
+        definition = UBXMessage.lookup(msg_class, msg_id)
+        if definition is None:
+            raise ValueError(f"UBX message 0x{msg_class:02x} 0x{msg_id:02x} is not registered.")
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        starts, lengths = UBXBatchDecoder.find_frames(data, msg_class, msg_id, verify_checksum)
+        header_size = definition.struct.size
+        keep = lengths >= header_size
+        starts = starts[keep]
+        lengths = lengths[keep]
+        header = UBXBatchDecoder.__gather(data, starts + UBXMessage.HEADER_LENGTH, header_size, UBXBatchDecoder.dtype(definition.fields))
+        if definition.block_struct is None:
+            return header
+
+        block_size = definition.block_struct.size
+        counts = (lengths - header_size) // block_size
+        if definition.block_count is not None:
+            # The count functions index the header values positionally, columns work the same way
+            columns = [header[name] for name in definition.record._fields[:-1]]
+            counts = np.minimum(counts, np.asarray(definition.block_count(columns), dtype=np.int64))
+        frame_index = np.repeat(np.arange(len(starts)), counts)
+        first_block = np.repeat(np.cumsum(counts) - counts, counts)
+        block_starts = starts[frame_index] + UBXMessage.HEADER_LENGTH + header_size + (np.arange(len(frame_index)) - first_block) * block_size
+        blocks = UBXBatchDecoder.__gather(data, block_starts, block_size, UBXBatchDecoder.dtype(definition.block_fields))
+
+        derived = []
+        if definition.name in ("ESF-MEAS", "ESF-RAW"):
+            derived = [("dataField", "<i4"), ("dataType", "u1")]
+        out_fields = [("frame", "<i8")] + [(name, header.dtype[name]) for name in header.dtype.names]
+        out_fields += [(name, blocks.dtype[name]) for name in blocks.dtype.names] + derived
+        out = np.empty(len(frame_index), dtype=out_fields)
+        out["frame"] = frame_index
+        for name in header.dtype.names:
+            out[name] = header[name][frame_index]
+        for name in blocks.dtype.names:
+            out[name] = blocks[name]
+        if derived:
+            words = blocks["data"]
+            out["dataField"] = (words << 8).view(np.int32) >> 8 # sign extend bits 0-23
+            out["dataType"] = (words >> 24) & 0x3F
+        return out
+
+    @staticmethod
+    def decode_file(file_path, msg_class, msg_id, verify_checksum=True):
+        """Same as decode() on a memory mapped capture file."""
+        with open(file_path, 'rb') as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                result = UBXBatchDecoder.decode(data, msg_class, msg_id, verify_checksum)
+                # The result is gathered into new arrays, nothing keeps pointing into the map
+                return result
+
+    @staticmethod
+    def as_columns(array):
+        """Returns the structured array as a dict of contiguous column arrays."""
+        return {name: np.ascontiguousarray(array[name]) for name in array.dtype.names}
+
+    @staticmethod
+    def __gather(data, starts, size, dtype):
+        # One fancy-index copy of all the rows, then a zero-copy reinterpretation as records
+        rows = data[starts[:, None] + np.arange(size)] if len(starts) else np.zeros((0, size), dtype=np.uint8)
+        return np.ascontiguousarray(rows).view(dtype).reshape(len(starts))
+
+    @staticmethod
+    def __require_numpy():
+        if np is None:
+            raise ImportError("UBXBatchDecoder requires numpy, install it with 'pip install numpy'.")
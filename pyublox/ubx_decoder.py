@@ -3,88 +3,140 @@ author: Xuanpeng Zhao
 Date: Feb 07 2024
 Description: This script is designed to decode UBX messages
 """
+import time
+from collections import namedtuple
 from pyublox.ublox_utility import UbloxUtils
 from pyublox.ublox_constants import UbloxConst
+from pyublox.ubx_messages import UBXMessage, ESF_MEAS, ESF_ALG
+from pyublox.ublox_records import RecordHistory
+from pyublox.ublox_logging import get_logger
+
+logger = get_logger(__name__)
+_monotonic_ns = time.monotonic_ns
 
 class UBXDecoder:
+    """
+    Decodes UBX frames into immutable records.
+
+    Every attribute (meas, alg and the entries of messages) is replaced by a new record
+    on each frame instead of being modified in place, so a reader holding one record
+    always sees the values of a single message. snapshot() returns all of them at once.
+    With history_size > 0 the last records of every message are kept in history.
+
+    Invalid frames are counted in checksum_errors and errors and logged to the
+    "pyublox.ubx_decoder" logger (rate limited). Setting timer to a LatencyHistogram (see
+    MetricsRegistry.timer) records the duration of every decode() call.
+    """
 
-    def __init__(self):
+    def __init__(self, history_size=0):
         self.meas = self.MEAS()
         self.alg = self.ALG()
-    
-    def decode(self, recv_data):
-        if len(recv_data) > 3:
-            header = recv_data[0:2] # recvData[0] & recvData[1] is the header
-            msg_class = recv_data[2] # recvData[2] is the class
-            msg_ID = recv_data[3] # recvData[3] is the ID
-            if header == UbloxConst.HEADER_UBX:
-                if msg_class == UbloxConst.CLASS_ESF:
-                    if msg_ID == UbloxConst.ID_MEAS:
-                        self.meas.decode(recv_data)
-                    if msg_ID == UbloxConst.ID_ALG:
-                        self.alg.decode(recv_data)
+        self.messages = {} # message name (e.g. "NAV-PVT") -> last decoded record
+        self.history = RecordHistory(history_size) if history_size > 0 else None
+        self.timer = None
+        self.checksum_errors = 0
+        self.errors = 0 # frames too short or not UBX
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: The latest record of every decoded message, plus "MEAS" and "ALG".
+        """
+        # dict.copy() runs without releasing the GIL, the copy is consistent with one decode() call
+        records = self.messages.copy()
+        records["MEAS"] = self.meas
+        records["ALG"] = self.alg
+        return records
+
+    def decode(self, recv_data, verify=True):
+        """
+        Decodes any UBX message declared in pyublox.ubx_messages.
+
+        Args:
+            recv_data (bytes or memoryview): A complete UBX frame, header and checksum included.
+            verify (bool): Whether to check the checksum, pass False for frames delivered by
+                           UbloxFramer, which already verified it.
+
+        Returns:
+            namedtuple: The raw record of the message, or None if the frame is invalid or unknown.
+        """
+        timer = self.timer
+        if timer is None:
+            return self.__decode(recv_data, verify)
+        start = _monotonic_ns()
+        try:
+            return self.__decode(recv_data, verify)
+        finally:
+            timer.record(_monotonic_ns() - start)
+
+    def __decode(self, recv_data, verify):
+        if len(recv_data) > 7:
+            if recv_data[0:2] == UbloxConst.HEADER_UBX:
+                if verify and UbloxUtils.ubx_checksum(recv_data) != recv_data[-2:]:
+                    self.checksum_errors += 1
+                    logger.warning("Checksum error: %s", bytes(recv_data))
+                    return None
+                definition = UBXMessage.REGISTRY.get((recv_data[2], recv_data[3])) # recvData[2] is the class, recvData[3] is the ID
+                if definition is None:
+                    return None
+                record = definition.decode(recv_data)
+                if record is None:
+                    self.errors += 1
+                    logger.warning("%s: recv_data length not enough: %s", definition.name, bytes(recv_data))
+                    return None
+                self.publish(definition.name, record)
+                return record
             else:
-                print("Wrong input for UBX decoder")
+                self.errors += 1
+                logger.warning("Wrong input for UBX decoder")
         else:
-            print("UBX Decoder: ", "recv_data length not enough: ", recv_data)
-
-    class MEAS:
-        def __init__(self):
-            self.AccelX = None
-            self.AccelY = None
-            self.AccelZ = None
-            self.GyroX = None
-            self.GyroY = None
-            self.GyroZ = None
-
-        def decode(self, recv_data):
-            if len(recv_data) > 18:
-                # num_means is at recv_data[11] and only use the first 5 bits
-                num_meas = (recv_data[11] & 0xF8) >> 3
-                checksum = UbloxUtils.ubx_checksum(recv_data)
-                if checksum == recv_data[-2:]:
-                    for i in range(num_meas):
-                        # data is composed of 4 bytes and first 3 is data field and last one is data type
-                        data = recv_data[6 + 8 + i * 4 : 6 + 8 + i * 4 + 4]
-                        data_field = int.from_bytes(data[0:3], byteorder='little', signed=True)
-                        data_type = data[3] & 0x3F
-                        if data_type == 14:
-                            self.GyroX = data_field / UbloxConst.D1024
-                        elif data_type == 13:
-                            self.GyroY = data_field / UbloxConst.D1024
-                        elif data_type == 5:
-                            self.GyroZ = data_field / UbloxConst.D1024
-                        elif data_type == 16:
-                            self.AccelX = data_field / UbloxConst.D1024
-                        elif data_type == 17:
-                            self.AccelY = data_field / UbloxConst.D1024
-                        elif data_type == 18:
-                            self.AccelZ = data_field / UbloxConst.D1024
-                        elif data_type == 0:
-                            print("UBX Decoder: ", "MEAS: ","No data received")
-                else:
-                    print("UBX Decoder: ", "MEAS: ", "Checksum error: ", recv_data)
-            else:     
-                print("UBX Decoder: ", "MEAS: ", "recv_data length not enough: ", recv_data)
-    class ALG:
-        def __init__(self):
-            self.yaw = None
-            self.pitch = None
-            self.roll = None
-            self.status = None
-        def decode(self, recv_data):
-            if len(recv_data) > 22:
-                data = recv_data[6 + 8: 6 + 8 + 8]
-                self.yaw = int.from_bytes(data[0:4], byteorder='little', signed=True) / UbloxConst.D100
-                self.pitch = int.from_bytes(data[4:6], byteorder='little', signed=True) / UbloxConst.D100
-                self.roll = int.from_bytes(data[6:8], byteorder='little', signed=True) / UbloxConst.D100   
-            else:     
-                print("UBX Decoder: ", "ALG: ", "recv_data length not enough: ", recv_data) 
+            self.errors += 1
+            logger.warning("recv_data length not enough: %s", bytes(recv_data))
+        return None
 
-    """
-    To do: add more ubx data type, ID
-    """
+    def publish(self, name, record):
+        """
+        Makes a record decoded elsewhere (e.g. by a DecodePipeline worker) the current one.
+
+        Args:
+            name (str): Message name, e.g. "NAV-PVT".
+            record (namedtuple): The raw record returned by decode().
+        """
+        self.messages[name] = record
+        if name == ESF_MEAS.name:
+            self.meas = self.MEAS.from_record(record, self.meas)
+        elif name == ESF_ALG.name:
+            self.alg = self.ALG.from_record(record)
+        if self.history is not None:
+            self.history.append(name, record)
+
+    class MEAS(namedtuple("MEAS", ("AccelX", "AccelY", "AccelZ", "GyroX", "GyroY", "GyroZ"), defaults=(None,) * 6)):
+        """
+        Latest IMU sample in m/s^2 and deg/s. A measurement frame only carries some of the
+        axes, the missing ones are taken from the previous record.
+        """
+        __slots__ = ()
+        # data type of ESF-MEAS -> field index in the record
+        DATA_TYPES = {16: 0, 17: 1, 18: 2, 14: 3, 13: 4, 5: 5}
+
+        @classmethod
+        def from_record(cls, record, previous=None):
+            values = list(previous) if previous is not None else [None] * 6
+            for data in record.blocks.data:
+                # data is composed of 4 bytes and first 3 is data field and last one is data type
+                data_type = (data >> 24) & 0x3F
+                index = cls.DATA_TYPES.get(data_type)
+                if index is not None:
+                    values[index] = ((data & 0xFFFFFF) - ((data & 0x800000) << 1)) / UbloxConst.D1024
+                elif data_type == 0:
+                    logger.warning("MEAS: No data received")
+            return cls._make(values)
+
+    class ALG(namedtuple("ALG", ("yaw", "pitch", "roll", "status"), defaults=(None,) * 4)):
+        """Latest IMU mount alignment in degrees, status is the alignment status of the flags."""
+        __slots__ = ()
 
-    
-    
-    
\ No newline at end of file
+        @classmethod
+        def from_record(cls, record):
+            return cls(record.yaw / UbloxConst.D100, record.pitch / UbloxConst.D100, record.roll / UbloxConst.D100,
+                       (record.flags >> 1) & 0x07) # flags bits 1-3 are the alignment status
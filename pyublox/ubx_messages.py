@@ -0,0 +1,204 @@
+"""
+author: Xuanpeng Zhao
+Date: Oct 18 2026
+Description: This script is designed to declare the layout of UBX messages
+"""
+import struct
+from collections import namedtuple
+
+def _rebuild_record(name, block, values):
+    definition = UBXMessage.NAMES[name]
+    return (definition.block_record if block else definition.record)._make(values)
+
+class UBXMessage:
+    """
+    Declarative definition of one UBX message, compiled once into struct.Struct objects.
+
+    Fields are (name, format) or (name, format, scale) tuples using struct format codes
+    (little endian is implied). Reserved bytes use None as name and an 'x' format, e.g.
+    (None, "3x"). Messages that end with a repeated block (NAV-SAT, RXM-RAWX, ESF-MEAS...)
+    declare the block fields separately together with how many blocks there are:
+    block_count can be the name of a header field, a function of the decoded header
+    values, or None to fill the rest of the payload.
+
+    decode() returns a namedtuple of raw (unscaled) values. The repeated blocks are stored
+    column-wise in its last field called blocks: a block namedtuple whose fields are tuples
+    with one value per block (e.g. record.blocks.cno). scaled() applies the scale factors
+    of the definition.
+    """
+    REGISTRY = {} # (msg_class, msg_id) -> UBXMessage
+    NAMES = {} # message name -> UBXMessage, lets records be pickled (e.g. sent to worker processes)
+    HEADER_LENGTH = 6 # sync(2) + class(1) + id(1) + length(2)
+
+    def __init__(self, name, msg_class, msg_id, fields, block_fields=None, block_count=None):
+        self.name = name
+        self.msg_class = msg_class
+        self.msg_id = msg_id
+        self.fields = fields
+        self.block_fields = block_fields
+        self.struct = struct.Struct("<" + "".join(field[1] for field in fields))
+        names = [field[0] for field in fields if field[0]]
+        self.scales = {field[0]: field[2] for field in fields if len(field) > 2}
+        self.block_struct = None
+        self.block_record = None
+        self.block_scales = {}
+        self.block_count = None # function of the header values returning the number of blocks
+        self.__block_structs = {} # number of blocks -> struct.Struct of all blocks
+        self.__block_width = 0
+        if block_fields:
+            self.block_struct = struct.Struct("<" + "".join(field[1] for field in block_fields))
+            self.block_record = namedtuple(name.replace("-", "_") + "_block", [field[0] for field in block_fields if field[0]])
+            self.block_scales = {field[0]: field[2] for field in block_fields if len(field) > 2}
+            self.__block_width = len(self.block_record._fields)
+            if isinstance(block_count, str):
+                index = names.index(block_count)
+                self.block_count = lambda values: values[index]
+            else:
+                self.block_count = block_count
+            names.append("blocks")
+        self.record = namedtuple(name.replace("-", "_"), names)
+        # The record classes are built at run time and cannot be found by pickle, they are rebuilt by message name
+        self.record.__reduce__ = lambda record: (_rebuild_record, (name, False, tuple(record)))
+        if self.block_record is not None:
+            self.block_record.__reduce__ = lambda record: (_rebuild_record, (name, True, tuple(record)))
+
+    @classmethod
+    def register(cls, *args, **kwargs):
+        definition = cls(*args, **kwargs)
+        cls.REGISTRY[(definition.msg_class, definition.msg_id)] = definition
+        cls.NAMES[definition.name] = definition
+        return definition
+
+    @classmethod
+    def lookup(cls, msg_class, msg_id):
+        return cls.REGISTRY.get((msg_class, msg_id))
+
+    def decode(self, frame):
+        """
+        Decodes a complete UBX frame (header and checksum included) without copying it.
+
+        Args:
+            frame (bytes or memoryview): The UBX frame.
+
+        Returns:
+            namedtuple: The raw field values, or None if the payload is shorter than the definition.
+        """
+        length = frame[4] | frame[5] << 8
+        if length < self.struct.size or len(frame) < length + 8:
+            return None
+        values = self.struct.unpack_from(frame, self.HEADER_LENGTH)
+        if self.block_struct is None:
+            return self.record._make(values)
+        block_size = self.block_struct.size
+        available = (length - self.struct.size) // block_size
+        count = available if self.block_count is None else min(self.block_count(values), available)
+        block_struct = self.__block_structs.get(count)
+        if block_struct is None:
+            block_struct = self.__block_structs[count] = struct.Struct("<" + self.block_struct.format[1:] * count)
+        # All blocks are unpacked at once and regrouped per field with C level slicing
+        flat = block_struct.unpack_from(frame, self.HEADER_LENGTH + self.struct.size)
+        width = self.__block_width
+        blocks = self.block_record._make([flat[i::width] for i in range(width)])
+        return self.record(*values, blocks)
+
+    def scaled(self, record):
+        """Returns a dict of the record fields with the scale factors applied."""
+        scales = self.scales
+        values = {name: value * scales[name] if name in scales else value
+                  for name, value in zip(record._fields, record) if name != "blocks"}
+        if self.block_struct is not None:
+            block_scales = self.block_scales
+            values["blocks"] = {name: [value * block_scales[name] for value in column] if name in block_scales else list(column)
+                                for name, column in zip(record.blocks._fields, record.blocks)}
+        return values
+
+
+NAV_POSLLH = UBXMessage.register("NAV-POSLLH", 0x01, 0x02, [
+    ("iTOW", "I"), ("lon", "i", 1e-7), ("lat", "i", 1e-7), ("height", "i", 1e-3), ("hMSL", "i", 1e-3),
+    ("hAcc", "I", 1e-3), ("vAcc", "I", 1e-3)])
+
+NAV_STATUS = UBXMessage.register("NAV-STATUS", 0x01, 0x03, [
+    ("iTOW", "I"), ("gpsFix", "B"), ("flags", "B"), ("fixStat", "B"), ("flags2", "B"), ("ttff", "I"), ("msss", "I")])
+
+NAV_DOP = UBXMessage.register("NAV-DOP", 0x01, 0x04, [
+    ("iTOW", "I"), ("gDOP", "H", 1e-2), ("pDOP", "H", 1e-2), ("tDOP", "H", 1e-2), ("vDOP", "H", 1e-2),
+    ("hDOP", "H", 1e-2), ("nDOP", "H", 1e-2), ("eDOP", "H", 1e-2)])
+
+NAV_ATT = UBXMessage.register("NAV-ATT", 0x01, 0x05, [
+    ("iTOW", "I"), ("version", "B"), (None, "3x"), ("roll", "i", 1e-5), ("pitch", "i", 1e-5), ("heading", "i", 1e-5),
+    ("accRoll", "I", 1e-5), ("accPitch", "I", 1e-5), ("accHeading", "I", 1e-5)])
+
+NAV_PVT = UBXMessage.register("NAV-PVT", 0x01, 0x07, [
+    ("iTOW", "I"), ("year", "H"), ("month", "B"), ("day", "B"), ("hour", "B"), ("min", "B"), ("sec", "B"),
+    ("valid", "B"), ("tAcc", "I"), ("nano", "i"), ("fixType", "B"), ("flags", "B"), ("flags2", "B"), ("numSV", "B"),
+    ("lon", "i", 1e-7), ("lat", "i", 1e-7), ("height", "i", 1e-3), ("hMSL", "i", 1e-3), ("hAcc", "I", 1e-3),
+    ("vAcc", "I", 1e-3), ("velN", "i", 1e-3), ("velE", "i", 1e-3), ("velD", "i", 1e-3), ("gSpeed", "i", 1e-3),
+    ("headMot", "i", 1e-5), ("sAcc", "I", 1e-3), ("headAcc", "I", 1e-5), ("pDOP", "H", 1e-2), ("flags3", "H"),
+    (None, "4x"), ("headVeh", "i", 1e-5), ("magDec", "h", 1e-2), ("magAcc", "H", 1e-2)])
+
+NAV_VELNED = UBXMessage.register("NAV-VELNED", 0x01, 0x12, [
+    ("iTOW", "I"), ("velN", "i", 1e-2), ("velE", "i", 1e-2), ("velD", "i", 1e-2), ("speed", "I", 1e-2),
+    ("gSpeed", "I", 1e-2), ("heading", "i", 1e-5), ("sAcc", "I", 1e-2), ("cAcc", "I", 1e-5)])
+
+NAV_HPPOSLLH = UBXMessage.register("NAV-HPPOSLLH", 0x01, 0x14, [
+    ("version", "B"), (None, "2x"), ("flags", "B"), ("iTOW", "I"), ("lon", "i", 1e-7), ("lat", "i", 1e-7),
+    ("height", "i", 1e-3), ("hMSL", "i", 1e-3), ("lonHp", "b", 1e-9), ("latHp", "b", 1e-9), ("heightHp", "b", 1e-4),
+    ("hMSLHp", "b", 1e-4), ("hAcc", "I", 1e-4), ("vAcc", "I", 1e-4)])
+
+NAV_TIMEGPS = UBXMessage.register("NAV-TIMEGPS", 0x01, 0x20, [
+    ("iTOW", "I"), ("fTOW", "i"), ("week", "h"), ("leapS", "b"), ("valid", "B"), ("tAcc", "I")])
+
+NAV_SAT = UBXMessage.register("NAV-SAT", 0x01, 0x35, [
+    ("iTOW", "I"), ("version", "B"), ("numSvs", "B"), (None, "2x")],
+    block_fields=[("gnssId", "B"), ("svId", "B"), ("cno", "B"), ("elev", "b"), ("azim", "h"), ("prRes", "h", 0.1),
+                  ("flags", "I")],
+    block_count="numSvs")
+
+NAV_RELPOSNED = UBXMessage.register("NAV-RELPOSNED", 0x01, 0x3C, [
+    ("version", "B"), (None, "x"), ("refStationId", "H"), ("iTOW", "I"), ("relPosN", "i", 1e-2), ("relPosE", "i", 1e-2),
+    ("relPosD", "i", 1e-2), ("relPosLength", "i", 1e-2), ("relPosHeading", "i", 1e-5), (None, "4x"),
+    ("relPosHPN", "b", 1e-4), ("relPosHPE", "b", 1e-4), ("relPosHPD", "b", 1e-4), ("relPosHPLength", "b", 1e-4),
+    ("accN", "I", 1e-4), ("accE", "I", 1e-4), ("accD", "I", 1e-4), ("accLength", "I", 1e-4), ("accHeading", "I", 1e-5),
+    (None, "4x"), ("flags", "I")])
+
+NAV_EOE = UBXMessage.register("NAV-EOE", 0x01, 0x61, [("iTOW", "I")])
+
+RXM_RAWX = UBXMessage.register("RXM-RAWX", 0x02, 0x15, [
+    ("rcvTow", "d"), ("week", "H"), ("leapS", "b"), ("numMeas", "B"), ("recStat", "B"), ("version", "B"), (None, "2x")],
+    block_fields=[("prMes", "d"), ("cpMes", "d"), ("doMes", "f"), ("gnssId", "B"), ("svId", "B"), ("sigId", "B"),
+                  ("freqId", "B"), ("locktime", "H"), ("cno", "B"), ("prStdev", "B"), ("cpStdev", "B"),
+                  ("doStdev", "B"), ("trkStat", "B"), (None, "x")],
+    block_count="numMeas")
+
+ACK_NAK = UBXMessage.register("ACK-NAK", 0x05, 0x00, [("clsID", "B"), ("msgID", "B")])
+
+ACK_ACK = UBXMessage.register("ACK-ACK", 0x05, 0x01, [("clsID", "B"), ("msgID", "B")])
+
+# Only the header, the key/value pairs that follow have a size given by each key ID, see UbloxConfig
+CFG_VALGET = UBXMessage.register("CFG-VALGET", 0x06, 0x8B, [("version", "B"), ("layer", "B"), ("position", "H")])
+
+TIM_TP = UBXMessage.register("TIM-TP", 0x0D, 0x01, [
+    ("towMS", "I"), ("towSubMS", "I", 2 ** -32), ("qErr", "i"), ("week", "H"), ("flags", "B"), ("refInfo", "B")])
+
+# ESF-MEAS data words: bits 0-23 signed data field, bits 24-29 data type
+ESF_MEAS = UBXMessage.register("ESF-MEAS", 0x10, 0x02, [
+    ("timeTag", "I"), ("flags", "H"), ("id", "H")],
+    block_fields=[("data", "I")],
+    block_count=lambda values: values[1] >> 11) # numMeas is stored in flags bits 11-15
+
+ESF_RAW = UBXMessage.register("ESF-RAW", 0x10, 0x03, [
+    (None, "4x")],
+    block_fields=[("data", "I"), ("sTtag", "I")])
+
+ESF_STATUS = UBXMessage.register("ESF-STATUS", 0x10, 0x10, [
+    ("iTOW", "I"), ("version", "B"), (None, "7x"), ("fusionMode", "B"), (None, "2x"), ("numSens", "B")],
+    block_fields=[("sensStatus1", "B"), ("sensStatus2", "B"), ("freq", "B"), ("faults", "B")],
+    block_count="numSens")
+
+ESF_ALG = UBXMessage.register("ESF-ALG", 0x10, 0x14, [
+    ("iTOW", "I"), ("version", "B"), ("flags", "B"), ("error", "B"), (None, "x"), ("yaw", "I", 1e-2),
+    ("pitch", "h", 1e-2), ("roll", "h", 1e-2)])
+
+ESF_INS = UBXMessage.register("ESF-INS", 0x10, 0x15, [
+    ("bitfield0", "I"), (None, "4x"), ("iTOW", "I"), ("xAngRate", "i", 1e-3), ("yAngRate", "i", 1e-3),
+    ("zAngRate", "i", 1e-3), ("xAccel", "i", 1e-2), ("yAccel", "i", 1e-2), ("zAccel", "i", 1e-2)])
@@ -4,23 +4,21 @@ Date: Feb 09 2024
 Description: This script is the main user defined application
 """
 
+import logging
+import time
 from pyublox.python_ublox import PythonUblox
 from pyublox.ublox_utility import UbloxUtils
 from pyublox.ublox_constants import UbloxConst
-from datetime import datetime
-import csv
-import time
+from pyublox.record_logger import RecordLogger
 
 class main:
 
     def __init__(self, online=True, save=True, rtk=False, file_path=''):
 
+        self.logger = None
         if save:
-            timeSaved = time.strftime("%Y-%m-%d_%H-%M-%S")
-            fileName = f"Ublox_GPS_{timeSaved}.csv"
-            self.csv_file = open('logs/' + fileName, mode='w', newline='')
-            self.csv_writer = csv.writer(self.csv_file)
-            self.csv_writer.writerow(['Timestamp', 'Latitude', 'Longitude', 'Altitude', 'GNSS_Time', 'Quality', 'NumSatellites', "Local_Datatime"])
+            # GGA records in columnar batches (time_ns column = local time) and the raw frames for replay
+            self.logger = RecordLogger('logs', prefix="Ublox_GPS")
 
 
         self.python_ublox = PythonUblox()
@@ -30,6 +28,8 @@ class main:
         else:
             for row in self.python_ublox.read_ubx_file(file_path):
                 self.ublox_recv_data_callback(row)
+            if self.logger:
+                self.logger.close()
      
 
             # read data from 
@@ -44,28 +44,29 @@ class main:
 
     def ublox_recv_data_callback(self, data):
         if len(data) > 1:
+            if self.logger:
+                self.logger.write_frame(data)
             if data[0:2] == UbloxConst.HEADER_NMEA:
-                self.python_ublox.nmea.decode(data)
+                record = self.python_ublox.nmea.decode(data)
                 # print(self.python_ublox.nmea.vtg.cog_mag) # heading
-                current_datetime = datetime.now()
-                # print(current_datetime)
+                if data[3:6] != UbloxConst.SF_GGA or record is None:
+                    return # only log when a new GGA arrives, not the previous one again on every sentence
                 # print(self.python_ublox.nmea.gga.lat) # lat
                 # print(self.python_ublox.nmea.gga.lon) # lon 
                 # print(self.python_ublox.nmea.gga.alt) # lon   
                 # print(self.python_ublox.nmea.gga.time) # time  
                 # print(self.python_ublox.nmea.gga.quality)
                 # print(self.python_ublox.nmea.gga.numSV)
-                lat = self.python_ublox.nmea.gga.lat
-                lon = self.python_ublox.nmea.gga.lon
-                alt = self.python_ublox.nmea.gga.alt
-                time = self.python_ublox.nmea.gga.time
-                quality = self.python_ublox.nmea.gga.quality
-                numSV = self.python_ublox.nmea.gga.numSV
-                self.csv_writer.writerow([datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f'), lat, lon, alt, time, quality, numSV, current_datetime])
+                gga = record # one immutable record, all fields come from the same sentence
+                if self.logger:
+                    # local time of the read of the first byte of the sentence, not of its decoding
+                    read_ns = getattr(data, "first_ns", None)
+                    time_ns = time.time_ns() - (time.monotonic_ns() - read_ns) if read_ns is not None else None
+                    self.logger.write("GGA", gga, time_ns)
 
             elif data[0:2] == UbloxConst.HEADER_UBX:
                 pass
-                #self.python_ublox.ubx.decode(data)
+                #self.python_ublox.ubx.decode(data, verify=False)
                 #print(f"""yaw {self.python_ublox.ubx.alg.yaw} pitch {self.python_ublox.ubx.alg.pitch} roll {self.python_ublox.ubx.alg.roll}""")
             else:
                 # print("Unknown data: ", data)
@@ -74,5 +75,7 @@ class main:
 
 
 if __name__ == '__main__':
+    # pyublox reports connections and errors through logging (errors rate limited)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
     main(rtk=True)
     